@@ -0,0 +1,131 @@
+############################################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify'
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+############################################################################################
+
+""" Optional asyncio runtime for services (see `DialogSystem` with runtime 'asyncio').
+
+Instead of one thread and socket poller per subscriber function plus one thread per service for control
+messages, all listeners of a process run as coroutines on a single event loop (using `zmq.asyncio`).
+`async def` subscriber functions are awaited on the loop, all other (blocking) subscriber functions
+and the dialog control functions of services run in a bounded thread pool.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread
+from typing import Any, Callable, Dict, Hashable
+
+
+class AsyncioRuntime:
+    """ Owns the event loop thread and the thread pool shared by the listeners of all services of a process """
+
+    def __init__(self, max_workers: int = None):
+        """
+        Args:
+            max_workers (int): size of the thread pool running blocking subscriber functions
+                               (default: the `ThreadPoolExecutor` default)
+        """
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._listener_tasks = dict()  # service -> listener tasks
+        self._session_locks = dict()  # service -> lock serializing its calls within sessions
+        self._dispatch_tasks = dict()  # service -> {task -> session id} of its running subscriber calls
+        self._thread = Thread(target=self._run_loop)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def spawn(self, coroutine, owner=None):
+        """ Schedules a coroutine on the event loop (thread-safe).
+
+        Args:
+            coroutine: the coroutine to run
+            owner (Service): if given, the task is cancelled by `cancel(owner)`
+        """
+        def create_task():
+            task = self.loop.create_task(coroutine)
+            if owner is not None:
+                self._listener_tasks.setdefault(owner, []).append(task)
+        self.loop.call_soon_threadsafe(create_task)
+
+    def cancel(self, owner):
+        """ Cancels all tasks spawned for `owner` (call from the event loop) """
+        for task in self._listener_tasks.pop(owner, []):
+            task.cancel()
+
+    async def run_blocking(self, func: Callable, *args) -> Any:
+        """ Runs a blocking function in the thread pool """
+        return await self.loop.run_in_executor(self.executor, func, *args)
+
+    def session_lock(self, service) -> asyncio.Lock:
+        """ Returns the lock serializing the calls of `service` within sessions: subscriber functions
+            (blocking or coroutines, whose session attributes stay swapped in while they are suspended)
+            and opening / closing sessions (call from the event loop) """
+        lock = self._session_locks.get(service)
+        if lock is None:
+            lock = self._session_locks[service] = asyncio.Lock()
+        return lock
+
+    async def dispatch(self, service, func_instance, session_id: Hashable, values: Dict[str, Any]):
+        """ Calls a decorated subscriber function of `service`: coroutine functions on the event loop,
+            all other functions in the thread pool. The call is tracked until it returned (see `drain`).
+
+        Args:
+            service (Service): the service owning the function
+            func_instance (function instance): the decorated subscriber function
+            session_id (Hashable): id of the session to call the function for (or `None`)
+            values (Dict[str, Any]): the function arguments
+        """
+        task = self.loop.create_task(self._dispatch(service, func_instance, session_id, values))
+        tasks = self._dispatch_tasks.setdefault(service, dict())
+        tasks[task] = session_id
+        task.add_done_callback(lambda done: tasks.pop(done, None))
+        await task
+
+    async def _dispatch(self, service, func_instance, session_id: Hashable, values: Dict[str, Any]):
+        if session_id is None:
+            if asyncio.iscoroutinefunction(func_instance):
+                await service._invoke_subscriber(func_instance, values)
+            else:
+                await self.run_blocking(service._dispatch, func_instance, session_id, values)
+            return
+        # the service's threading lock is never held while the event loop waits
+        async with self.session_lock(service):
+            if not asyncio.iscoroutinefunction(func_instance):
+                await self.run_blocking(service._dispatch, func_instance, session_id, values)
+            elif session_id in service._session_states:  # session might have ended meanwhile
+                with service._session_scope(session_id, hold_lock=False):
+                    await service._invoke_subscriber(func_instance, values)
+
+    async def drain(self, service, session_id: Hashable = None):
+        """ Waits until all subscriber calls of `service` for the session (or outside of multi-session
+            mode) returned, including calls started meanwhile (call from the event loop) """
+        while True:
+            tasks = [task for task, task_session_id in self._dispatch_tasks.get(service, {}).items()
+                     if task_session_id == session_id]
+            if not tasks:
+                return
+            await asyncio.wait(tasks)
+
+    def stop(self):
+        """ Stops the event loop and the thread pool """
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.executor.shutdown(wait=True)
@@ -30,6 +30,8 @@ class HandcraftedBST(Service):
     A rule-based approach to belief state tracking.
     """
 
+    session_attributes = ('bs',)
+
     def __init__(self, domain=None, logger=None):
         Service.__init__(self, domain=domain)
         self.logger = logger
@@ -0,0 +1,292 @@
+############################################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify'
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+############################################################################################
+
+""" Serialization of the messages sent between services.
+
+A message is encoded into a list of frames (sent as one zmq multipart message after the topic frame):
+the first frame holds the pickled message, all following frames hold raw data buffers
+(e.g. the memory of numpy arrays and torch tensors) that are referenced from the first frame
+and sent without copying them into the pickle stream.
+
+All codecs produce frames that can be read by `decode`, so services using different codecs
+can still talk to each other.
+"""
+
+import io
+import os
+import pickle
+import sys
+import uuid
+import warnings
+import weakref
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+from utils.beliefstate import BeliefState, _CopyOnWriteDict
+from utils.domain.domain import Domain
+from utils.sysact import SysAct, SysActionType
+from utils.useract import UserAct, UserActionType
+
+Frame = Union[bytes, memoryview]
+
+# type -> function returning a reduce tuple (see pickle's `__reduce__`) for instances of this type
+_REDUCERS: Dict[type, Callable[[Any], Tuple]] = {}
+# id -> domain instance of the domains whose messages are only received within this process, these
+# domains are sent as a reference instead of sending the whole ontology
+_DOMAINS = weakref.WeakValueDictionary()
+# identifies this process in domain references (renewed in forked processes, which hold copies of the domains)
+_PROCESS_TOKEN = uuid.uuid4().hex
+# types of belief state values which are compared by value (not only by identity) when encoding turn deltas
+_COMPARED_BY_VALUE = (bool, int, float, str, set, frozenset, type(None))
+_MISSING = object()
+
+
+def register_reducer(cls: type, reducer: Callable[[Any], Tuple]):
+    """ Registers a compact encoding for a message type.
+
+    Args:
+        cls (type): the (exact) type to encode, subclasses are not affected
+        reducer (Callable): maps an instance of `cls` to a reduce tuple `(callable, args)`;
+                            on receive, the message is rebuilt by calling `callable(*args)`
+    """
+    _REDUCERS[cls] = reducer
+
+
+def _renew_process_token():
+    global _PROCESS_TOKEN  # pylint: disable=global-statement
+    _PROCESS_TOKEN = uuid.uuid4().hex
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_renew_process_token)
+
+
+def register_domain(domain: Domain):
+    """ Sends belief states referencing this domain instance as a reference to it instead of the whole
+        domain. Only register a domain if all messages referencing it are received within this process
+        (e.g. all services of the dialog system run in it), other processes cannot resolve the reference.
+
+    Args:
+        domain (Domain): the domain instance
+    """
+    _DOMAINS[id(domain)] = domain
+
+
+def unregister_domain(domain: Domain):
+    """ Sends belief states referencing this domain instance with the whole domain again (e.g. once
+        services of other processes receive them)
+
+    Args:
+        domain (Domain): the domain instance
+    """
+    if _DOMAINS.get(id(domain)) is domain:
+        del _DOMAINS[id(domain)]
+
+
+def _resolve_domain(process_token: str, domain_id: int, name: str) -> Domain:
+    """ Returns the domain instance a reference sent by this process points to """
+    domain = _DOMAINS.get(domain_id) if process_token == _PROCESS_TOKEN else None
+    if domain is None or domain.get_domain_name() != name:
+        raise ValueError(f"received a reference to domain '{name}' which is not registered in this process, "
+                         "domains may only be registered if all receivers run in the sending process")
+    return domain
+
+
+def _make_user_act(text: str, act_type: str, slot: str, value: str, score: float) -> UserAct:
+    return UserAct(text, UserActionType(act_type) if act_type is not None else None, slot, value, score)
+
+
+def _make_sys_act(act_type: str, slot_values: Dict[str, List[str]]) -> SysAct:
+    return SysAct(SysActionType(act_type) if act_type is not None else None, slot_values)
+
+
+def _turn_delta(turn: dict, successor: dict) -> Tuple[dict, dict, tuple]:
+    """ Describes a turn of a belief state relative to the following turn.
+
+    Returns:
+        (changed, nested, removed): the values differing from the following turn, the deltas of
+        nested dicts differing from the following turn and the keys missing in `turn`
+    """
+    changed, nested = {}, {}
+    for key, value in turn.items():
+        other = dict.get(successor, key, _MISSING)
+        if value is other:
+            continue
+        if isinstance(value, dict) and isinstance(other, dict):
+            delta = _turn_delta(value, other)
+            if any(delta):
+                nested[key] = delta
+        elif type(value) is not type(other) or not isinstance(value, _COMPARED_BY_VALUE) or value != other:
+            changed[key] = value
+    removed = tuple(key for key in successor if key not in turn)
+    return changed, nested, removed
+
+
+def _apply_turn_delta(successor: dict, delta: Tuple[dict, dict, tuple]) -> dict:
+    """ Rebuilds a turn from the following turn and its delta (see `_turn_delta`), sharing all
+        unchanged values with the following turn """
+    changed, nested, removed = delta
+    turn = dict(successor)
+    for key in removed:
+        del turn[key]
+    turn.update(changed)
+    for key, sub_delta in nested.items():
+        turn[key] = _apply_turn_delta(successor[key], sub_delta)
+    return turn
+
+
+def _make_belief_state(domain: Union[Tuple, Domain], turn: dict, deltas: List[Tuple]) -> BeliefState:
+    belief_state = BeliefState.__new__(BeliefState)
+    belief_state.domain = _resolve_domain(*domain) if isinstance(domain, tuple) else domain
+    history = [turn]
+    for delta in reversed(deltas):
+        history.append(_apply_turn_delta(history[-1], delta))
+    history.reverse()
+    belief_state._history = history
+    belief_state._copied = set()
+    return belief_state
+
+
+def _make_tensor(array, requires_grad: bool, device: str):
+    import torch
+    with warnings.catch_warnings():
+        # arrays received from the bus are read-only views of the message memory
+        warnings.simplefilter('ignore', UserWarning)
+        tensor = torch.from_numpy(array)
+    if device != 'cpu':
+        tensor = tensor.to(device)
+    return tensor.requires_grad_(requires_grad)
+
+
+def _reduce_user_act(act: UserAct) -> Tuple:
+    return _make_user_act, (act.text, act.type.value if act.type is not None else None,
+                            act.slot, act.value, act.score)
+
+
+def _reduce_sys_act(act: SysAct) -> Tuple:
+    return _make_sys_act, (act.type.value if act.type is not None else None, act.slot_values)
+
+
+def _reduce_belief_state(belief_state: BeliefState) -> Tuple:
+    domain = belief_state.domain
+    if isinstance(domain, Domain) and _DOMAINS.get(id(domain)) is domain:
+        domain = (_PROCESS_TOKEN, id(domain), domain.get_domain_name())
+    # only the current turn is sent completely, each previous turn as its difference to the following turn
+    # (turns share most of their values, see `BeliefState`). Receivers may not have seen the previous
+    # messages, so the differences are sent again with every message.
+    history = belief_state._history
+    deltas = [_turn_delta(turn, successor) for turn, successor in zip(history, history[1:])]
+    return _make_belief_state, (domain, history[-1], deltas)
+
+
+def _reduce_copy_on_write_dict(value: _CopyOnWriteDict) -> Tuple:
+    # received belief states copy the values of their current turn on access again
+    return dict, (dict(value),)
+
+
+register_reducer(UserAct, _reduce_user_act)
+register_reducer(SysAct, _reduce_sys_act)
+register_reducer(BeliefState, _reduce_belief_state)
+register_reducer(_CopyOnWriteDict, _reduce_copy_on_write_dict)
+
+
+class _MessagePickler(pickle.Pickler):
+    """ Pickler applying the registered reducers and sending torch tensors as numpy buffers """
+
+    def reducer_override(self, obj):
+        reducer = _REDUCERS.get(type(obj))
+        if reducer is not None:
+            return reducer(obj)
+        torch = sys.modules.get('torch')  # only relevant if torch was imported by some service
+        if torch is not None and isinstance(obj, torch.Tensor):
+            try:
+                array = obj.detach().cpu().numpy()
+            except TypeError:
+                return NotImplemented  # dtype without numpy equivalent (e.g. bfloat16)
+            return _make_tensor, (array, obj.requires_grad, str(obj.device))
+        return NotImplemented
+
+
+class MessageCodec:
+    """ Base class for message codecs """
+
+    def encode(self, message: Any) -> List[Frame]:
+        """ Serializes a message.
+
+        Args:
+            message (Any): the message
+
+        Returns:
+            List of frames to send
+        """
+        raise NotImplementedError
+
+
+class PickleCodec(MessageCodec):
+    """ Pickles the whole message into a single frame (no compact encodings, no out-of-band buffers) """
+
+    def encode(self, message: Any) -> List[Frame]:
+        return [pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)]
+
+
+class BufferCodec(MessageCodec):
+    """ Uses the compact encodings registered via `register_reducer` and sends the memory of
+        (contiguous) numpy arrays and torch tensors as separate frames, without copying it.
+        Falls back to plain pickling for all other objects.
+    """
+
+    def encode(self, message: Any) -> List[Frame]:
+        stream = io.BytesIO()
+        buffers = []
+        _MessagePickler(stream, protocol=5, buffer_callback=buffers.append).dump(message)
+        return [stream.getvalue()] + [buffer.raw() for buffer in buffers]
+
+
+_default_codec: MessageCodec = BufferCodec()
+
+
+def get_codec() -> MessageCodec:
+    """ Returns the codec used for all messages sent from this process """
+    return _default_codec
+
+
+def set_codec(codec: MessageCodec):
+    """ Sets the codec used for all messages sent from this process """
+    global _default_codec
+    _default_codec = codec
+
+
+def encode(message: Any) -> List[Frame]:
+    """ Serializes a message with the codec set for this process """
+    return _default_codec.encode(message)
+
+
+def decode(frames: List[Frame]) -> Any:
+    """ Deserializes a message encoded by any `MessageCodec`.
+
+    Note:
+        numpy arrays (and torch tensors) sent as separate frames are views of the received frame memory
+        and therefore read-only. Copy them before modifying them in place.
+
+    Args:
+        frames (List[Frame]): the received frames (without the topic frame)
+
+    Returns:
+        The message
+    """
+    return pickle.loads(frames[0], buffers=frames[1:])
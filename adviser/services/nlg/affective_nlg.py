@@ -40,7 +40,7 @@ class HandcraftedEmotionNLG(HandcraftedNLG):
     """
     def __init__(self, domain: Domain, sub_topic_domains={}, template_file: str = None,
                  logger: DiasysLogger = DiasysLogger(), template_file_german: str = None,
-                 emotions: List[str] = [], debug_logger = None):
+                 emotions: List[str] = [], debug_logger = None, render_cache_size: int = 0):
         """Constructor mainly extracts methods and rules from the template file"""
         Service.__init__(self, domain=domain, sub_topic_domains=sub_topic_domains, debug_logger=debug_logger)
 
@@ -49,6 +49,7 @@ class HandcraftedEmotionNLG(HandcraftedNLG):
         self.templates = {}
         self.logger = logger
         self.emotions = emotions
+        self.render_cache_size = render_cache_size
 
         self._initialise_templates()
 
@@ -99,11 +100,11 @@ class HandcraftedEmotionNLG(HandcraftedNLG):
             self.templates[emotion.lower()] = TemplateFile(os.path.join(
                 os.path.dirname(os.path.abspath(__file__)),
                 f'../../resources/nlg_templates/{self.domain.get_domain_name()}Messages{emotion}.nlg'),
-                self.domain)
+                self.domain, render_cache_size=self.render_cache_size)
         self.templates["neutral"] = TemplateFile(os.path.join(
             os.path.dirname(os.path.abspath(__file__)),
             f'../../resources/nlg_templates/{self.domain.get_domain_name()}Messages.nlg'),
-            self.domain)
+            self.domain, render_cache_size=self.render_cache_size)
 
         self._add_additional_methods_for_template_file()
 
@@ -48,10 +48,12 @@ class HandcraftedNLG(Service):
         template_english (str): the name of the English NLG template file
         template_german (str): the name of the German NLG template file
         language (Language): the language of the dialogue
+        render_cache_size (int): if > 0, the messages of up to this many system acts are cached
+                                 (see `TemplateFile.render_cache`)
     """
     def __init__(self, domain: Domain, template_file: str = None, sub_topic_domains: Dict[str, str] = {},
                  logger: DiasysLogger = DiasysLogger(), template_file_german: str = None,
-                 language: Language = None):
+                 language: Language = None, render_cache_size: int = 0):
         """Constructor mainly extracts methods and rules from the template file"""
         Service.__init__(self, domain=domain, sub_topic_domains=sub_topic_domains)
 
@@ -63,6 +65,7 @@ class HandcraftedNLG(Service):
         self.template_filename = None
         self.templates = None
         self.logger = logger
+        self.render_cache_size = render_cache_size
 
         self.language = Language.ENGLISH
         self._initialise_language(self.language)
@@ -136,7 +139,8 @@ class HandcraftedNLG(Service):
             else:
                 self.template_filename = self.template_german
 
-        self.templates = TemplateFile(self.template_filename, self.domain)
+        self.templates = TemplateFile(self.template_filename, self.domain,
+                                      render_cache_size=self.render_cache_size)
         self._add_additional_methods_for_template_file()
 
     def _add_additional_methods_for_template_file(self):
@@ -17,10 +17,11 @@
 #
 ###############################################################################
 
-from typing import List
+from typing import List, Union
 
 from services.nlg.templates.data.commands.command import Command
 from services.nlg.templates.data.commands.probability import Probability
+from services.nlg.templates.data.expressions.expression import Expression
 from services.nlg.templates.data.memory import Memory
 from services.nlg.templates.parsing.parsers.codeparser.codeparser import CodeParser
 from services.nlg.templates.parsing.parsers.messageparser.data.messagecomponent import MessageComponent, \
@@ -36,11 +37,27 @@ class Message(Command):
         Command.__init__(self, arguments)
 
         self.components = self._parse_message()
+        # the message compiled into constant strings and parsed code expressions
+        self.parts = self._compile_components()
         self.score = 1.0
 
     def _parse_message(self) -> List[MessageComponent]:
         return MESSAGE_PARSER.parse(self.arguments)
 
+    def _compile_components(self) -> List[Union[str, Expression]]:
+        parts = []
+        for component in self.components:
+            if component.component_type == MessageComponentType.STRING:
+                if parts and isinstance(parts[-1], str):
+                    parts[-1] += component.value
+                else:
+                    parts.append(component.value)
+            elif component.component_type == MessageComponentType.ADVISER_CODE or \
+                component.component_type == MessageComponentType.PYTHON_CODE:
+                code = component.value + '$'  # CodeParser expects end of statement
+                parts.append(CODE_PARSER.parse(code)[0])
+        return parts
+
     def are_arguments_valid(self) -> bool:
         return True  # since parse_arguments would have thrown an exception otherwise
 
@@ -58,13 +75,4 @@ class Message(Command):
         return True  # messages are always applicable
 
     def apply(self, parameters: Memory) -> str:
-        output = ''
-        for component in self.components:
-            if component.component_type == MessageComponentType.STRING:
-                output += component.value
-            elif component.component_type == MessageComponentType.ADVISER_CODE or \
-                component.component_type == MessageComponentType.PYTHON_CODE:
-                code = component.value + '$'  # CodeParser expects end of statement
-                expression = CODE_PARSER.parse(code)[0]
-                output += expression.evaluate(parameters)
-        return output
+        return ''.join([part if isinstance(part, str) else part.evaluate(parameters) for part in self.parts])
@@ -81,12 +81,12 @@ class Template(Command):
         return len(slot_names_to_check) == 0 or self.free_parameter is not None
 
     def apply(self, parameters: Memory = None) -> str:
-        slot_dict = parameters.variable_dict.copy()
         if self.free_parameter is not None:
-            variables = self._build_memory_with_free_parameter(slot_dict,
+            # the slots of the template are removed from the copy
+            variables = self._build_memory_with_free_parameter(parameters.variable_dict.copy(),
                                                                parameters.global_memory)
         else:
-            variables = self._build_memory_without_free_parameter(slot_dict,
+            variables = self._build_memory_without_free_parameter(parameters.variable_dict,
                                                                   parameters.global_memory)
 
         special_case = self._get_applicable_special_case(variables)
@@ -17,7 +17,8 @@
 #
 ###############################################################################
 
-from typing import Dict, List
+import sqlite3
+from typing import Dict, List, Set
 
 from utils.domain.jsonlookupdomain import JSONLookupDomain
 
@@ -76,13 +77,52 @@ class GlobalMemory(Memory):
     def __init__(self, domain: JSONLookupDomain):
         Memory.__init__(self, None)
         self.domain = domain
-    
+        # (primary key value, attribute) -> value, looked up before rendering a message (see prefetch)
+        self._prefetched: Dict[tuple, object] = {}
+        # number of queries sent to the database of the domain
+        self.db_round_trips = 0
+
+    def prefetch(self, entity_attributes: Dict[str, Set[str]]):
+        """ Looks up all given attributes of each entity with one query per entity, so `get_member`
+            does not query the database for them
+
+        Args:
+            entity_attributes (Dict[str, Set[str]]): attribute names for each primary key value
+        """
+        primary_key_name = self.domain.get_primary_key()
+        table_name = self.domain.get_domain_name()
+        for primary_key_value, attribute_names in entity_attributes.items():
+            attribute_names = sorted(attribute for attribute in attribute_names if attribute.isidentifier())
+            if not attribute_names:
+                continue
+            self.db_round_trips += 1
+            try:
+                query_result = self.domain.query_db(
+                    f'SELECT {", ".join(attribute_names)} FROM {table_name} WHERE {primary_key_name} = ?',
+                    (primary_key_value,))
+            except sqlite3.Error:
+                continue  # e.g. unknown attribute: get_member reports the error of its own query
+            if query_result:
+                for attribute_name in attribute_names:
+                    self._prefetched[(primary_key_value, attribute_name)] = query_result[0][attribute_name]
+
+    def clear_prefetched(self):
+        """ Forgets the values looked up by `prefetch` """
+        self._prefetched.clear()
+
     def get_member(self, primary_key_value: str, attribute_name: str) -> str:
+        try:
+            return self._prefetched[(primary_key_value, attribute_name)]
+        except (KeyError, TypeError):
+            pass
         primary_key_name = self.domain.get_primary_key()
         table_name = self.domain.get_domain_name()
+        if not attribute_name.isidentifier():
+            raise ValueError(f"Invalid attribute name {attribute_name}.")
+        self.db_round_trips += 1
         query_result = self.domain.query_db(
-            f'SELECT {attribute_name} FROM {table_name} '
-            f'WHERE {primary_key_name} = \'{primary_key_value}\'')
+            f'SELECT {attribute_name} FROM {table_name} WHERE {primary_key_name} = ?',
+            (primary_key_value,))
         if not query_result:
             raise ValueError(f"Couldn't find an entry for primary key {primary_key_value}.")
         return query_result[0][attribute_name]
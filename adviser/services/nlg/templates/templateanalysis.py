@@ -0,0 +1,101 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+""" Static analysis of parsed templates: whether their output can be cached and which entity
+attributes (`{slot.attribute}`) they look up. """
+
+from typing import Dict, Iterator, Set
+
+from services.nlg.templates.builtinfunctions import PythonFunction, ForFunction, ForEntryFunction, \
+    ForEntryListFunction
+from services.nlg.templates.data.commands.command import Command
+from services.nlg.templates.data.commands.message import Message
+from services.nlg.templates.data.expressions.constantexpression import ConstantExpression
+from services.nlg.templates.data.expressions.expression import Expression
+from services.nlg.templates.data.expressions.functionexpression import FunctionExpression
+from services.nlg.templates.data.expressions.memberexpression import MemberExpression
+from services.nlg.templates.data.memory import GlobalMemory
+
+
+def _own_expressions(command: Command) -> Iterator[Expression]:
+    """ Yields the expressions of a message or the constraints of a special case, including the
+        arguments of function calls (not the ones of inner commands) """
+    if isinstance(command, Message):
+        expressions = [part for part in command.parts if not isinstance(part, str)]
+    else:
+        expressions = [side for constraint in getattr(command, 'constraints', []) for side in constraint]
+    while expressions:
+        expression = expressions.pop()
+        yield expression
+        if isinstance(expression, FunctionExpression):
+            expressions.extend(expression.arguments)
+
+
+def _inner_commands(command: Command) -> list:
+    return getattr(command, 'messages', []) + getattr(command, 'special_cases', []) + getattr(command, 'additions', [])
+
+
+def is_deterministic(command: Command, global_memory: GlobalMemory, _visiting: Set[str] = None) -> bool:
+    """ Returns whether a command always creates the same output for the same parameters, i.e. it
+        never chooses between several messages at random and only calls such functions.
+
+        Functions added from python are assumed to depend only on their arguments. Called functions
+        which cannot be resolved (e.g. whose names are computed) make the command non-deterministic.
+    """
+    visiting = _visiting if _visiting is not None else set()
+    if not isinstance(command, Message) and (len(command.messages) > 1 or command.additions):
+        return False
+    for expression in _own_expressions(command):
+        if isinstance(expression, FunctionExpression) and \
+                not _is_function_deterministic(expression, global_memory, visiting):
+            return False
+    return all(is_deterministic(inner_command, global_memory, visiting) for inner_command in _inner_commands(command))
+
+
+def _is_function_deterministic(expression: FunctionExpression, global_memory: GlobalMemory,
+                               visiting: Set[str]) -> bool:
+    function = global_memory.function_dict.get(expression.name)
+    if function is None or expression.name in visiting:
+        return False
+    if isinstance(function, PythonFunction):
+        return True
+    if isinstance(function, (ForFunction, ForEntryFunction, ForEntryListFunction)):
+        # they call the function whose name is passed as second argument
+        if len(expression.arguments) < 2 or not isinstance(expression.arguments[1], ConstantExpression):
+            return False
+        return _is_function_deterministic(FunctionExpression(expression.arguments[1].value, []),
+                                          global_memory, visiting)
+    visiting.add(expression.name)
+    try:
+        return is_deterministic(function, global_memory, visiting)
+    finally:
+        visiting.discard(expression.name)
+
+
+def member_requests(command: Command) -> Dict[str, Set[str]]:
+    """ Returns the attributes looked up for each variable (`{variable.attribute}`) in a command and
+        its inner commands (not in the functions it calls, their variables are different) """
+    requests: Dict[str, Set[str]] = {}
+    for expression in _own_expressions(command):
+        if isinstance(expression, MemberExpression):
+            requests.setdefault(expression.variable, set()).add(expression.attribute)
+    for inner_command in _inner_commands(command):
+        for variable, attributes in member_requests(inner_command).items():
+            requests.setdefault(variable, set()).update(attributes)
+    return requests
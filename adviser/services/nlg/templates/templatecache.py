@@ -0,0 +1,85 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+import hashlib
+import os
+import pickle
+import sys
+from typing import List, Optional, Tuple
+
+# has to be increased whenever the format of the cache or the parsed template classes change
+CACHE_VERSION = 2
+
+
+def template_hash(filename: str) -> str:
+    """ Returns the hex digest of the SHA-256 hash of a template file """
+    with open(filename, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def cache_file_of(filename: str) -> str:
+    """ Returns the path of the compiled cache of a template file (`<name>Compiled.pkl` next to `<name>.nlg`) """
+    return os.path.splitext(filename)[0] + 'Compiled.pkl'
+
+
+def _read_header(f, file_hash: str) -> bool:
+    try:
+        version, python_version, cached_hash = pickle.load(f)
+    except (pickle.UnpicklingError, EOFError, ValueError, TypeError):
+        return False
+    return version == CACHE_VERSION and python_version == tuple(sys.version_info[:2]) and cached_hash == file_hash
+
+
+def is_cache_current(cache_file: str, file_hash: str) -> bool:
+    """ Returns whether the cache of a template file exists and was written for this version of the file
+        (given by its hash, see `template_hash`) by this version of adviser / python (without loading it) """
+    try:
+        with open(cache_file, 'rb') as f:
+            return _read_header(f, file_hash)
+    except OSError:
+        return False
+
+
+def read_cache(cache_file: str, file_hash: str) -> Optional[Tuple[List['Template'], List['Function']]]:
+    """ Reads the parsed templates and functions of a template file from its cache
+
+    Args:
+        cache_file (str): path of the cache file
+        file_hash (str): hash of the template file (see `template_hash`)
+
+    Returns:
+        (templates, functions) or `None` if the cache is not current (see `is_cache_current`)
+    """
+    try:
+        with open(cache_file, 'rb') as f:
+            if not _read_header(f, file_hash):
+                return None
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError, AttributeError, ImportError):
+        return None
+
+
+def write_cache(cache_file: str, file_hash: str, templates: List['Template'], functions: List['Function']):
+    """ Writes the parsed templates and functions of a template file to its cache (atomically, so
+        concurrently starting services never read a partially written file) """
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    with open(tmp_file, 'wb') as f:
+        pickle.dump((CACHE_VERSION, tuple(sys.version_info[:2]), file_hash), f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump((templates, functions), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, cache_file)
@@ -18,7 +18,7 @@
 ###############################################################################
 
 import sys
-from typing import Tuple, List, Dict, Callable
+from typing import Tuple, List, Dict, Callable, FrozenSet, Optional
 
 from services.nlg.templates.builtinfunctions import PythonFunction, ForFunction, ForEntryFunction, ForEntryListFunction
 from services.nlg.templates.data.commands.command import Command
@@ -29,7 +29,11 @@ from services.nlg.templates.data.commands.specialcase import SpecialCaseExceptio
 from services.nlg.templates.data.commands.template import Template
 from services.nlg.templates.data.memory import Memory, Variable, GlobalMemory
 from services.nlg.templates.preprocessing import _Preprocessor
+from services.nlg.templates.templateanalysis import is_deterministic, member_requests
+from services.nlg.templates.templatecache import cache_file_of, is_cache_current, read_cache, template_hash, \
+    write_cache
 from utils.domain.jsonlookupdomain import JSONLookupDomain
+from utils.lru import LRUCache
 from utils.sysact import SysAct
 
 KEYWORDS = {
@@ -55,17 +59,66 @@ KEYWORDS = {
 
 class TemplateFile:
     """Interprets a template file
-    
+
+    The parsed templates are cached next to the template file (see `templatecache`). If the cache
+    is up to date, it is only read when the first message is created; otherwise the file is parsed
+    right away (so errors in it are reported on start) and the cache is rewritten.
+
+    Messages of templates which always create the same message for the same system act (no
+    random choice between several messages) can be cached, see `render_cache`. Before a
+    template is applied, the entity attributes it looks up (`{slot.attribute}`) are queried with
+    one query per entity.
+
     Attributes:
         global_memory {GlobalMemory} -- memory that can be accessed at all times in the tempaltes
+        render_cache {LRUCache} -- messages of the last system acts (`None` if disabled)
+        last_utterance_stats {dict} -- whether the last message was taken from the render cache
+            and how many database queries were sent to create it
     """
 
-    def __init__(self, filename: str, domain: JSONLookupDomain):
+    def __init__(self, filename: str, domain: JSONLookupDomain, use_cache: bool = True,
+                 render_cache_size: int = 0):
         self.global_memory = GlobalMemory(domain)
         self._add_built_in_functions()
-        tfr = _TemplateFileReader(filename)
-        self._templates = self._create_template_dict(tfr.get_templates())
-        self._add_functions_to_global_memory(tfr.get_functions())
+        self._filename = filename
+        self._templates = None
+        # functions added with add_python_function (they override functions of the template file)
+        self._python_functions: List[Function] = []
+        self._cache_file = cache_file_of(filename) if use_cache else None
+        self._file_hash = template_hash(filename) if use_cache else None
+        self.render_cache = LRUCache(render_cache_size) if render_cache_size > 0 else None
+        # template -> whether its messages can be cached / looked up attributes per slot (filled on use)
+        self._deterministic: Dict[Template, bool] = {}
+        self._member_requests: Dict[Template, Dict[str, set]] = {}
+        self.last_utterance_stats = {'render_cache_hit': False, 'db_round_trips': 0}
+        if not use_cache or not is_cache_current(self._cache_file, self._file_hash):
+            self._parse()
+
+    def _parse(self):
+        tfr = _TemplateFileReader(self._filename)
+        self._set_parsed(tfr.get_templates(), tfr.get_functions())
+        if self._cache_file is not None:
+            try:
+                write_cache(self._cache_file, self._file_hash, tfr.get_templates(), tfr.get_functions())
+            except OSError:
+                pass  # e.g. read-only installation: the file is parsed on every start
+
+    def _load(self):
+        """Reads the parsed templates from the cache on first use (parses the file if the cache
+        was changed meanwhile)"""
+        parsed = read_cache(self._cache_file, self._file_hash)
+        if parsed is None:
+            self._parse()
+        else:
+            self._set_parsed(*parsed)
+
+    def _set_parsed(self, templates: List[Template], functions: List[Function]):
+        self._templates = self._create_template_dict(templates)
+        self._index_templates()
+        self._member_requests.clear()
+        self.clear_render_cache()
+        self._add_functions_to_global_memory(functions)
+        self._add_functions_to_global_memory(self._python_functions)
 
     def _add_built_in_functions(self):
         self.global_memory.add_function(ForFunction(self.global_memory))
@@ -80,12 +133,48 @@ class TemplateFile:
             template_dict[template.intent].append(template)
         return template_dict
     
+    def _index_templates(self):
+        """Indexes the templates of each intent by their slot names"""
+        # intent -> slot names -> position and template (the first one without free parameter)
+        self._exact_templates: Dict[str, Dict[FrozenSet[str], Tuple[int, Template]]] = {}
+        # intent -> position, slot names and template of all templates with free parameter
+        self._free_templates: Dict[str, List[Tuple[int, FrozenSet[str], Template]]] = {}
+        # (intent, slot names of a system act) -> applicable template (filled on use)
+        self._dispatch: Dict[Tuple[str, FrozenSet[str]], Optional[Template]] = {}
+        for intent, templates in self._templates.items():
+            exact = self._exact_templates[intent] = {}
+            free = self._free_templates[intent] = []
+            for position, template in enumerate(templates):
+                slot_names = frozenset(template.slot_names)
+                if len(slot_names) < len(template.slot_names):
+                    continue  # a slot can only occur once in a system act
+                if template.free_parameter is not None:
+                    free.append((position, slot_names, template))
+                elif slot_names not in exact:
+                    exact[slot_names] = (position, template)
+
+    def _find_template(self, intent: str, slot_names: FrozenSet[str]) -> Optional[Template]:
+        """Returns the first template of the intent which is applicable to a system act with the
+        given slots (see `Template.is_applicable`): the first one with exactly these slot names or
+        an earlier one with free parameter whose slot names are a subset of them"""
+        key = (intent, slot_names)
+        if key not in self._dispatch:
+            position, template = self._exact_templates[intent].get(slot_names, (None, None))
+            for free_position, free_slot_names, free_template in self._free_templates[intent]:
+                if position is not None and free_position > position:
+                    break
+                if free_slot_names <= slot_names:
+                    template = free_template
+                    break
+            self._dispatch[key] = template
+        return self._dispatch[key]
+
     def _add_functions_to_global_memory(self, functions: List[Function]):
         for function in functions:
             self.global_memory.add_function(function)
 
     def create_message(self, sys_act: SysAct) -> str:
-        """Iterates through all possible templates and applies the first one to fit the system act
+        """Applies the first template (in file order) which fits the system act
         
         Arguments:
             sys_act {SysAct} -- the system act to find a template for
@@ -96,11 +185,76 @@ class TemplateFile:
         Returns:
             str -- the message returned by the template
         """
-        slots = self._create_memory_from_sys_act(sys_act)
-        for template in self._templates[sys_act.type.value]:
-            if template.is_applicable(slots):
-                return template.apply(slots)
-        raise BaseException('No template was found for the given system act.')
+        if self._templates is None:
+            self._load()
+        template = self._find_template(sys_act.type.value, frozenset(sys_act.slot_values))
+        if template is None:
+            raise BaseException('No template was found for the given system act.')
+
+        cache_key = self._render_cache_key(template, sys_act)
+        if cache_key is not None:
+            message = self.render_cache.get(cache_key)
+            if message is not None:
+                self.last_utterance_stats = {'render_cache_hit': True, 'db_round_trips': 0}
+                return message
+
+        round_trips = self.global_memory.db_round_trips
+        try:
+            self._prefetch_members(template, sys_act)
+            message = template.apply(self._create_memory_from_sys_act(sys_act))
+        finally:
+            self.global_memory.clear_prefetched()
+        self.last_utterance_stats = {'render_cache_hit': False,
+                                     'db_round_trips': self.global_memory.db_round_trips - round_trips}
+        if cache_key is not None:
+            self.render_cache.put(cache_key, message)
+        return message
+
+    def _render_cache_key(self, template: Template, sys_act: SysAct) -> Optional[tuple]:
+        """Returns the key of the system act in the render cache or `None` if its message must not
+        be cached: the template and the slot values (in the order of the system act if the template
+        has a free parameter, since they are passed to it in this order)"""
+        if self.render_cache is None:
+            return None
+        if template not in self._deterministic:
+            self._deterministic[template] = is_deterministic(template, self.global_memory)
+        if not self._deterministic[template]:
+            return None
+        try:
+            slot_values = [(slot, tuple(values)) for slot, values in sys_act.slot_values.items()]
+            if template.free_parameter is None:
+                slot_values.sort()
+            key = (template, tuple(slot_values))
+            hash(key)
+        except TypeError:
+            return None  # e.g. lists as values
+        return key
+
+    def _prefetch_members(self, template: Template, sys_act: SysAct):
+        """Looks up all attributes the template reads of the entities given as slot values"""
+        if template not in self._member_requests:
+            self._member_requests[template] = member_requests(template)
+        if not self._member_requests[template] or self.global_memory.domain is None:
+            return
+        entity_attributes = {}
+        for slot, attributes in self._member_requests[template].items():
+            values = sys_act.slot_values.get(slot)
+            if values and len(values) == 1 and isinstance(values[0], str):
+                entity_attributes.setdefault(values[0], set()).update(attributes)
+        self.global_memory.prefetch(entity_attributes)
+
+    def render_stats(self) -> dict:
+        """Returns the usage statistics of the render cache (see `LRUCache.stats`, empty if it is
+        disabled) and the number of database queries sent so far"""
+        stats = self.render_cache.stats() if self.render_cache is not None else {}
+        stats['db_round_trips'] = self.global_memory.db_round_trips
+        return stats
+
+    def clear_render_cache(self):
+        """Removes all cached messages, e.g. after the python functions have changed"""
+        if self.render_cache is not None:
+            self.render_cache.clear()
+        self._deterministic.clear()
 
     def _create_memory_from_sys_act(self, sys_act: SysAct) -> Memory:
         slots = Memory(self.global_memory)
@@ -121,8 +275,10 @@ class TemplateFile:
             obligatory_arguments {List[object]} -- objects that are always passed as first
                 arguments to the python function, e.g. "self" (default: {[]})
         """
-        self.global_memory.add_function(PythonFunction(function_name, python_function,
-                                                       obligatory_arguments))
+        function = PythonFunction(function_name, python_function, obligatory_arguments)
+        self._python_functions.append(function)
+        self.global_memory.add_function(function)
+        self.clear_render_cache()
 
 
 class _TemplateFileReader:
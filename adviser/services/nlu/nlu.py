@@ -17,11 +17,12 @@
 #
 ###############################################################################
 
-import json
+import copy
 import os
-import re
 from typing import List
 
+from services.nlu.rule_cache import load_rules, rule_files
+from services.nlu.rule_engine import RegexRuleSet
 from services.service import PublishSubscribe
 from services.service import Service
 from utils import UserAct, UserActionType
@@ -29,6 +30,7 @@ from utils.beliefstate import BeliefState
 from utils.common import Language
 from utils.domain.jsonlookupdomain import JSONLookupDomain
 from utils.logger import DiasysLogger
+from utils.lru import LRUCache
 from utils.sysact import SysAct, SysActionType
 
 
@@ -65,8 +67,11 @@ class HandcraftedNLU(Service):
 
     """
 
+    session_attributes = ('sys_act_info', 'user_acts', 'slots_informed', 'slots_requested',
+                          'req_everything')
+
     def __init__(self, domain: JSONLookupDomain, logger: DiasysLogger = DiasysLogger(),
-                 language: Language = None):
+                 language: Language = None, result_cache_size: int = 0):
         """
         Loads
             - domain key
@@ -79,6 +84,8 @@ class HandcraftedNLU(Service):
 
         Args:
             domain {domain.jsonlookupdomain.JSONLookupDomain} -- Domain
+            result_cache_size {int} -- if > 0, the user acts of up to this many utterances (in the
+                                       context of the last system act) are cached, see `result_cache`
         """
         Service.__init__(self, domain=domain)
         self.logger = logger
@@ -101,6 +108,9 @@ class HandcraftedNLU(Service):
         self.sys_act_info = {
             'last_act': None, 'lastInformedPrimKeyVal': None, 'lastRequestSlot': None}
 
+        # user acts of recent utterances, shared by all sessions
+        self.result_cache = LRUCache(result_cache_size) if result_cache_size > 0 else None
+
         self.language = Language.ENGLISH
         self._initialize()
 
@@ -137,6 +147,13 @@ class HandcraftedNLU(Service):
         """
         result = {}
 
+        cache_key = None
+        if self.result_cache is not None and user_utterance is not None:
+            cache_key = self._result_cache_key(user_utterance.strip())
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                return self._restore_cached_result(cached, user_utterance.strip())
+
         # Setting request everything to False at every turn
         self.req_everything = False
 
@@ -167,8 +184,65 @@ class HandcraftedNLU(Service):
         self.logger.dialog_turn("User Actions: %s" % str(self.user_acts))
         result['user_acts'] = self.user_acts
 
+        if cache_key is not None:
+            self.result_cache.put(cache_key, ([copy.copy(user_act) for user_act in self.user_acts],
+                                              set(self.slots_requested), set(self.slots_informed),
+                                              self.req_everything))
         return result
 
+    def _result_cache_key(self, user_utterance: str) -> tuple:
+        """
+        Returns the key of the utterance in the result cache: everything the user acts extracted
+        from the utterance depend on
+
+        Args:
+            user_utterance {str} --  stripped text input from user
+
+        Returns:
+            (normalized utterance, whether the domain keyword occurs, type and slots of the last system act)
+        """
+        # all regexes ignore case (the text of the user acts is restored when reading the cache)
+        normalized = user_utterance.lower() if user_utterance.isascii() else user_utterance
+        keyword = self.domain.get_keyword()
+        last_act = self.sys_act_info['last_act']
+        if last_act is None:
+            context = None
+        elif last_act.type == SysActionType.Confirm:
+            # affirm / deny take over the confirmed values
+            context = (last_act.type, tuple((slot, repr(values)) for slot, values in last_act.slot_values.items()))
+        else:
+            context = (last_act.type, tuple(last_act.slot_values))
+        return normalized, keyword is not None and keyword in user_utterance, context
+
+    def _restore_cached_result(self, cached: tuple, user_utterance: str) -> dict:
+        """
+        Sets the state of this turn from a result cache entry
+
+        Args:
+            cached {tuple} -- cache entry
+            user_utterance {str} --  stripped text input from user
+
+        Returns:
+            dict of str: UserAct - a dictionary with the key "user_acts" and the value
+                                            containing a list of user actions
+        """
+        user_acts, slots_requested, slots_informed, self.req_everything = cached
+        self.user_acts = []
+        for cached_act in user_acts:
+            user_act = copy.copy(cached_act)
+            user_act.text = user_utterance
+            self.user_acts.append(user_act)
+        self.slots_requested, self.slots_informed = set(slots_requested), set(slots_informed)
+        self.logger.dialog_turn("User Actions: %s" % str(self.user_acts))
+        return {'user_acts': self.user_acts}
+
+    def clear_result_cache(self):
+        """
+        Removes all entries from the result cache (if enabled), e.g. after the regexes changed
+        """
+        if self.result_cache is not None:
+            self.result_cache.clear()
+
     @PublishSubscribe(sub_topics=["sys_state"])
     def _update_sys_act_info(self, sys_state):
         if "lastInformedPrimKeyVal" in sys_state:
@@ -189,10 +263,11 @@ class HandcraftedNLU(Service):
 
         """
 
+        matched_acts = {act for act, _ in self.general_rules.search(user_utterance)}
         # Iteration over all general acts
         for act in self.general_regex:
             # Check if the regular expression and the user utterance match
-            if re.search(self.general_regex[act], user_utterance, re.I):
+            if act in matched_acts:
                 # Mapping the act to User Act
                 if act != 'dontcare' and act != 'req_everything':
                     user_act_type = UserActionType(act)
@@ -281,9 +356,9 @@ class HandcraftedNLU(Service):
         Returns:
 
         """
-        # Iteration over all user requestable slots
-        for slot in self.USER_REQUESTABLE:
-            if self._check(re.search(self.request_regex[slot], user_utterance, re.I)):
+        # Iteration over all user requestable slots whose regex matches
+        for slot, match in self.request_rules.search(user_utterance):
+            if self._check(match):
                 self._add_request(user_utterance, slot)
 
     def _add_request(self, user_utterance: str, slot: str):
@@ -312,20 +387,19 @@ class HandcraftedNLU(Service):
         Returns:
 
         """
-        # Iteration over all user informable slots and their slots
-        for slot in self.USER_INFORMABLE:
-            for value in self.inform_regex[slot]:
-                if self._check(re.search(self.inform_regex[slot][value], user_utterance, re.I)):
-                    if slot == self.domain_key and self.req_everything:
-                        # Adding all requestable slots because of the req_everything
-                        for req_slot in self.USER_REQUESTABLE:
-                            # skipping the domain key slot
-                            if req_slot != self.domain_key:
-                                # Adding user request act
-                                self._add_request(user_utterance, req_slot)
-                    # Adding user inform act
-                    self._add_inform(user_utterance, slot, value)
-        
+        # Iteration over all user informable slot-value pairs whose regex matches
+        for (slot, value), match in self.inform_rules.search(user_utterance):
+            if self._check(match):
+                if slot == self.domain_key and self.req_everything:
+                    # Adding all requestable slots because of the req_everything
+                    for req_slot in self.USER_REQUESTABLE:
+                        # skipping the domain key slot
+                        if req_slot != self.domain_key:
+                            # Adding user request act
+                            self._add_request(user_utterance, req_slot)
+                # Adding user inform act
+                self._add_inform(user_utterance, slot, value)
+
     def _add_inform(self, user_utterance: str, slot: str, value: str):
         """
         Creates the user request act and adds it to the user act list
@@ -451,22 +525,31 @@ class HandcraftedNLU(Service):
             Args:
                 language (Language): Enum representing the language the user has selected
         """
-        if self.language == Language.ENGLISH:
-            # Loading regular expression from JSON files
-            # as dictionaries {act:regex, ...} or {slot:{value:regex, ...}, ...}
-            self.general_regex = json.load(open(self.base_folder + '/GeneralRules.json'))
-            self.request_regex = json.load(open(self.base_folder + '/' + self.domain_name
-                                                + 'RequestRules.json'))
-            self.inform_regex = json.load(open(self.base_folder + '/' + self.domain_name
-                                               + 'InformRules.json'))
-        elif self.language == Language.GERMAN:
-            # TODO: Change this once
-            # Loading regular expression from JSON files
-            # as dictionaries {act:regex, ...} or {slot:{value:regex, ...}, ...}
-            self.general_regex = json.load(open(self.base_folder + '/GeneralRulesGerman.json'))
-            self.request_regex = json.load(open(self.base_folder + '/' + self.domain_name
-                                                + 'GermanRequestRules.json'))
-            self.inform_regex = json.load(open(self.base_folder + '/' + self.domain_name
-                                               + 'GermanInformRules.json'))
-        else:
+        files = rule_files(self.base_folder, self.domain_name, self.language)
+        if files is None:
             print('No language')
+            return
+        general_file, request_file, inform_file, cache_file = files
+        self.clear_result_cache()
+        # Loading regular expression from JSON files
+        # as dictionaries {act:regex, ...} or {slot:{value:regex, ...}, ...}
+        # together with their rule sets (from the cache if the files did not change)
+        rules = load_rules(general_file, request_file, inform_file, self.USER_REQUESTABLE,
+                           self.USER_INFORMABLE, cache_file=cache_file)
+        self.general_regex = rules.general_regex
+        self.request_regex = rules.request_regex
+        self.inform_regex = rules.inform_regex
+        self.general_rules = rules.general_rules
+        self.request_rules = rules.request_rules
+        self.inform_rules = rules.inform_rules
+
+    def _compile_rules(self):
+        """
+            Compiles the loaded regular expressions once (see `rule_engine.RegexRuleSet`),
+            has to be called again whenever they are changed
+        """
+        self.clear_result_cache()
+        self.general_rules = RegexRuleSet(self.general_regex.items())
+        self.request_rules = RegexRuleSet((slot, self.request_regex[slot]) for slot in self.USER_REQUESTABLE)
+        self.inform_rules = RegexRuleSet(((slot, value), self.inform_regex[slot][value])
+                                         for slot in self.USER_INFORMABLE for value in self.inform_regex[slot])
@@ -0,0 +1,220 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+import gc
+import hashlib
+import json
+import os
+import pickle
+import sys
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from services.nlu.rule_engine import RegexRuleSet, required_literals
+from utils.common import Language
+
+# has to be increased whenever the format of the cache or the analysis of the rules changes
+CACHE_VERSION = 1
+
+
+def content_hash(data: bytes) -> str:
+    """ Returns the hex digest of the SHA-256 hash of the data """
+    return hashlib.sha256(data).hexdigest()
+
+
+def rule_files(folder: str, domain_name: str, language: Language) -> Optional[Tuple[str, str, str, str]]:
+    """ Returns the paths of the general, request and inform rule files of a domain and the path
+        of the compiled rule cache (`None` for unsupported languages) """
+    if language == Language.ENGLISH:
+        return (os.path.join(folder, 'GeneralRules.json'),
+                os.path.join(folder, domain_name + 'RequestRules.json'),
+                os.path.join(folder, domain_name + 'InformRules.json'),
+                os.path.join(folder, domain_name + 'CompiledRules.pkl'))
+    if language == Language.GERMAN:
+        return (os.path.join(folder, 'GeneralRulesGerman.json'),
+                os.path.join(folder, domain_name + 'GermanRequestRules.json'),
+                os.path.join(folder, domain_name + 'GermanInformRules.json'),
+                os.path.join(folder, domain_name + 'GermanCompiledRules.pkl'))
+    return None
+
+
+def _entry_hash(rules) -> str:
+    """ Returns the hash of the patterns of one slot (or of the general rules), including their order """
+    return content_hash(json.dumps(rules).encode('utf-8'))
+
+
+class CompiledRules(object):
+    """ The regular expressions of a `HandcraftedNLU` together with the rule sets searching them.
+
+    Keeps the results of analyzing the patterns (see `RegexRuleSet`) per slot, so when rules change,
+    only the patterns of the changed slots have to be analyzed again.
+
+    Attributes:
+        general_regex (dict): {act: regex}
+        request_regex (dict): {slot: regex}
+        inform_regex (dict): {slot: {value: regex}}
+        general_rules (RegexRuleSet): rule set of the general acts (keys: acts)
+        request_rules (RegexRuleSet): rule set of the requestable slots (keys: slots)
+        inform_rules (RegexRuleSet): rule set of the informable slots (keys: (slot, value))
+        file_hashes (List[str]): hashes of the rule files the rules were loaded from
+        build (dict): information about how the rule files were generated (see `tools/regextemplates`)
+        analyzed (List[tuple]): (group, slot) of all slots whose patterns were analyzed when creating
+                                these rules, i.e. which were new or changed; group is one of
+                                'general' (slot `None`), 'request' and 'inform'
+    """
+
+    def __init__(self, general_regex: dict, request_regex: dict, inform_regex: dict,
+                 requestable_slots: List[str], informable_slots: List[str], previous: 'CompiledRules' = None):
+        """
+        Args:
+            general_regex (dict): {act: regex}
+            request_regex (dict): {slot: regex}
+            inform_regex (dict): {slot: {value: regex}}
+            requestable_slots (List[str]): requestable slots in the order they are matched
+            informable_slots (List[str]): informable slots in the order they are matched
+            previous (CompiledRules): earlier version of the rules whose analysis results are reused
+                                      for all unchanged slots
+        """
+        self.general_regex = general_regex
+        self.request_regex = request_regex
+        self.inform_regex = inform_regex
+        self.slot_order = (list(requestable_slots), list(informable_slots))
+        self.file_hashes = []
+        self.build = {}
+        # (group, slot) of the slots whose patterns were analyzed (not taken from the previous version)
+        self.analyzed = []
+        # (group, slot) -> (hash of the slot's patterns, required literals of each pattern)
+        self._entries = {}
+        self._previous_entries = previous._entries if previous is not None else {}
+
+        self.general_rules = RegexRuleSet(general_regex.items(),
+                                          self._required(('general', None), general_regex))
+        request_rules = [(slot, request_regex[slot]) for slot in requestable_slots]
+        request_required = []
+        for slot, pattern in request_rules:
+            request_required += self._required(('request', slot), {slot: pattern})
+        self.request_rules = RegexRuleSet(request_rules, request_required)
+        inform_rules = []
+        inform_required = []
+        for slot in informable_slots:
+            inform_rules += [((slot, value), pattern) for value, pattern in inform_regex[slot].items()]
+            inform_required += self._required(('inform', slot), inform_regex[slot])
+        self.inform_rules = RegexRuleSet(inform_rules, inform_required)
+        del self._previous_entries
+
+    def _required(self, entry_key: tuple, rules: Dict[str, str]) -> list:
+        """ Returns the required literals of the patterns (dict values) of one slot, reusing the ones
+            of the previous version if the patterns did not change """
+        entry_hash = _entry_hash(rules)
+        previous = self._previous_entries.get(entry_key)
+        if previous is not None and previous[0] == entry_hash:
+            required = previous[1]
+        else:
+            required = [required_literals(pattern) for pattern in rules.values()]
+            self.analyzed.append(entry_key)
+        self._entries[entry_key] = (entry_hash, required)
+        return required
+
+
+@contextmanager
+def _gc_paused():
+    """ Disables the garbage collector, which would otherwise repeatedly traverse the many small
+        objects created when loading large rule sets """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def read_cache(cache_file: str) -> Optional[CompiledRules]:
+    """ Reads compiled rules from a cache file
+
+    Returns:
+        (CompiledRules): the rules or `None` if the file does not exist or was written by another
+                         version of adviser / python
+    """
+    try:
+        with open(cache_file, 'rb') as f, _gc_paused():
+            version, python_version, rules = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError, AttributeError, ImportError):
+        return None
+    if version != CACHE_VERSION or python_version != tuple(sys.version_info[:2]):
+        return None
+    return rules
+
+
+def write_cache(cache_file: str, rules: CompiledRules):
+    """ Writes compiled rules to a cache file (atomically, so concurrently starting services never read
+        a partially written file) """
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    with open(tmp_file, 'wb') as f:
+        pickle.dump((CACHE_VERSION, tuple(sys.version_info[:2]), rules), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, cache_file)
+
+
+def load_rules(general_file: str, request_file: str, inform_file: str, requestable_slots: List[str],
+               informable_slots: List[str], cache_file: str = None, build: dict = None) -> CompiledRules:
+    """ Loads the rules of a `HandcraftedNLU`, using the cache file if it is up to date.
+
+    The cache is up to date if the hashes of the rule files and the order of the slots are the same
+    as when it was written. Otherwise, the rule files are parsed, the patterns of all slots that
+    changed are analyzed again and the cache is rewritten (if possible).
+
+    Args:
+        general_file (str): path of the general rules (JSON)
+        request_file (str): path of the request rules (JSON)
+        inform_file (str): path of the inform rules (JSON)
+        requestable_slots (List[str]): requestable slots in the order they are matched
+        informable_slots (List[str]): informable slots in the order they are matched
+        cache_file (str): path of the cache file (no caching if `None`)
+        build (dict): if given, replaces the build information stored with the rules
+
+    Returns:
+        (CompiledRules): the rules
+    """
+    contents = []
+    for rule_file in (general_file, request_file, inform_file):
+        with open(rule_file, 'rb') as f:
+            contents.append(f.read())
+    file_hashes = [content_hash(content) for content in contents]
+    slot_order = (list(requestable_slots), list(informable_slots))
+
+    cached = read_cache(cache_file) if cache_file is not None else None
+    if cached is not None and cached.file_hashes == file_hashes and cached.slot_order == slot_order \
+            and (build is None or cached.build == build):
+        return cached
+
+    general_regex, request_regex, inform_regex = (json.loads(content.decode('utf-8')) for content in contents)
+    with _gc_paused():
+        rules = CompiledRules(general_regex, request_regex, inform_regex, requestable_slots, informable_slots,
+                              previous=cached)
+    rules.file_hashes = file_hashes
+    if build is not None:
+        rules.build = build
+    elif cached is not None:
+        rules.build = cached.build
+    if cache_file is not None:
+        try:
+            write_cache(cache_file, rules)
+        except OSError:
+            pass  # e.g. read-only installation: rules are analyzed on every start
+    return rules
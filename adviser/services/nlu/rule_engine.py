@@ -0,0 +1,278 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+import re
+import string
+from collections import deque
+from functools import lru_cache
+from typing import FrozenSet, Hashable, Iterable, List, Optional, Set, Tuple
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:  # python < 3.11
+    import sre_parse
+    import sre_constants
+
+# bound on the number of alternative strings tracked for a part of a pattern
+_MAX_ALTERNATIVES = 64
+# number of characters of a required string looked for by the prefilter (every part of a required
+# string is required as well, shorter strings keep the automaton small)
+_MAX_LITERAL_LENGTH = 10
+
+_REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT,
+            getattr(sre_constants, 'POSSESSIVE_REPEAT', sre_constants.MAX_REPEAT)}
+
+
+@lru_cache(maxsize=1)
+def _ascii_fold_table() -> dict:
+    """ Returns a translation table mapping every character that matches an ASCII letter when
+        ignoring case (e.g. 'A', 'K' (Kelvin sign)) to the lowercase letter """
+    table = {ord(char): char.lower() for char in string.ascii_uppercase}
+    # there are no case equivalents of ASCII letters outside the basic multilingual plane
+    non_ascii = ''.join(map(chr, range(128, 0x10000)))
+    for char in re.findall('[a-z]', non_ascii, re.I):
+        table[ord(char)] = next(letter for letter in string.ascii_lowercase if re.match(letter, char, re.I))
+    return table
+
+
+def _reduce(literals: Set[str]) -> Set[str]:
+    """ Removes all strings which contain another string of the set (containing these is implied) """
+    reduced = set()
+    for literal in sorted(literals, key=len):
+        if not any(other in literal for other in reduced):
+            reduced.add(literal)
+    return reduced
+
+
+def _analyze_node(op, av) -> Tuple[Optional[Set[str]], Optional[Set[str]]]:
+    """ Analyzes a single node of a parsed regular expression
+
+    Returns:
+        (Set[str]): all strings the node can match (lowercase) or None if unknown / too many
+        (Set[str]): strings of which one has to occur in the searched text if the node matches
+                    (in addition to the strings it matches itself) or None
+    """
+    if op == sre_constants.LITERAL:
+        char = chr(av)
+        return ({char.lower()}, None) if char.isascii() else (None, None)
+    if op == sre_constants.IN:
+        if len(av) <= _MAX_ALTERNATIVES and all(item_op == sre_constants.LITERAL and chr(item_av).isascii()
+                                                for item_op, item_av in av):
+            return {chr(item_av).lower() for _, item_av in av}, None
+        return None, None
+    if op == sre_constants.AT:
+        return {""}, None
+    if op == sre_constants.SUBPATTERN:
+        return _analyze_sequence(av[-1])
+    if op == getattr(sre_constants, 'ATOMIC_GROUP', None):
+        return _analyze_sequence(av)
+    if op == sre_constants.BRANCH:
+        branches = [_analyze_sequence(branch) for branch in av[1]]
+        if all(exact is not None for exact, _ in branches):
+            exact = set().union(*(exact for exact, _ in branches))
+            if len(exact) <= _MAX_ALTERNATIVES:
+                return exact, None
+        if all(required is not None for _, required in branches):
+            return None, set().union(*(required for _, required in branches))
+        return None, None
+    if op in _REPEATS:
+        min_repeat, max_repeat, item = av
+        exact, required = _analyze_sequence(item)
+        if min_repeat == 0:
+            return (exact | {""}, None) if max_repeat == 1 and exact is not None else (None, None)
+        if min_repeat == max_repeat == 1:
+            return exact, required
+        return None, required
+    if op == sre_constants.ASSERT:
+        # positive lookahead / lookbehind: the asserted text has to occur as well
+        return {""}, _analyze_sequence(av[1])[1]
+    if op == sre_constants.ASSERT_NOT:
+        return {""}, None
+    return None, None
+
+
+def _analyze_sequence(items) -> Tuple[Optional[Set[str]], Optional[Set[str]]]:
+    """ Analyzes a sequence of nodes of a parsed regular expression
+
+    Returns:
+        (Set[str]): all strings the sequence can match (lowercase) or None if unknown / too many
+        (Set[str]): strings of which one has to occur in the searched text if the sequence matches or None
+    """
+    candidates = []
+    # strings matched by the current run of nodes with known strings
+    current = {""}
+    complete = True
+    for op, av in items:
+        exact, required = _analyze_node(op, av)
+        if required is not None:
+            candidates.append(required)
+        if exact is not None and len(current) * len(exact) <= _MAX_ALTERNATIVES:
+            current = {prefix + suffix for prefix in current for suffix in exact}
+        else:
+            candidates.append(current)
+            current = {""} if exact is None else exact
+            complete = False
+    candidates.append(current)
+
+    best, best_score = None, None
+    for candidate in candidates:
+        if "" in candidate:
+            continue
+        candidate = _reduce(candidate)
+        # prefer long literals (fewer false positives), then few alternatives (fewer lookups)
+        score = (min(len(literal) for literal in candidate), -len(candidate))
+        if best_score is None or score > best_score:
+            best, best_score = candidate, score
+    return (current if complete else None), best
+
+
+@lru_cache(maxsize=4096)
+def required_literals(pattern: str) -> Optional[FrozenSet[str]]:
+    """ Computes lowercase strings of which at least one occurs (ignoring case) in every text the
+        pattern can be found in with `re.search(pattern, text, re.I)`
+
+    Args:
+        pattern (str): regular expression
+
+    Returns:
+        (FrozenSet[str]): the strings or None if no such strings could be determined
+    """
+    literals = _analyze_sequence(sre_parse.parse(pattern, re.I))[1]
+    return None if literals is None else frozenset(literals)
+
+
+class _AhoCorasick(object):
+    """ Aho-Corasick automaton finding all occurrences of a set of strings in one pass over a text """
+
+    def __init__(self, words: List[str]):
+        self._goto = [{}]
+        self._fail = [0]
+        # indices of all words ending in each state (including the ones reached via fail links)
+        self._output = [[]]
+        for word_idx, word in enumerate(words):
+            state = 0
+            for char in word:
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            self._output[state].append(word_idx)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text: str) -> Set[int]:
+        """ Returns the indices of all words occurring in the text """
+        goto, fail, output = self._goto, self._fail, self._output
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+class RegexRuleSet(object):
+    """ Ordered collection of regular expression rules searched case-insensitively in utterances.
+
+    For each pattern, strings are derived of which at least one occurs in every utterance the
+    pattern can match (see `required_literals`); an Aho-Corasick automaton over these strings
+    selects the rules worth searching for in a single pass over the utterance, so most rules are
+    never evaluated. Patterns without such strings are always searched. Each pattern is compiled
+    once, the first time it has to be searched.
+
+    `search` returns the same matches as calling `re.search(pattern, utterance, re.I)` for every rule.
+    Rule sets can be pickled (without their compiled patterns, see `services.nlu.rule_cache`).
+    """
+
+    def __init__(self, rules: Iterable[Tuple[Hashable, str]], required: List[Optional[FrozenSet[str]]] = None):
+        """
+        Args:
+            rules (Iterable[Tuple[Hashable, str]]): ordered (key, pattern) pairs
+            required (List[Optional[FrozenSet[str]]]): the result of `required_literals` for each
+                                                      pattern if known (e.g. from a cache)
+        """
+        self.keys = []
+        self.patterns = []
+        for key, pattern in rules:
+            self.keys.append(key)
+            self.patterns.append(pattern)
+        self.required = required if required is not None else [required_literals(pattern)
+                                                                for pattern in self.patterns]
+        self._compiled = [None] * len(self.patterns)
+        # rules which have to be searched for in every utterance
+        self._unfiltered = []
+        # required string -> indices of the rules requiring it
+        literal_rules = {}
+        for rule_idx, literals in enumerate(self.required):
+            if literals is None:
+                self._unfiltered.append(rule_idx)
+            else:
+                for literal in {literal[-_MAX_LITERAL_LENGTH:] for literal in literals}:
+                    literal_rules.setdefault(literal, []).append(rule_idx)
+        self._literal_rules = list(literal_rules.values())
+        self._automaton = _AhoCorasick(list(literal_rules))
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_compiled'] = [None] * len(self.patterns)
+        return state
+
+    def __len__(self):
+        return len(self.keys)
+
+    def candidates(self, utterance: str) -> List[int]:
+        """ Returns the indices of all rules which could match the utterance (in rule order) """
+        candidates = set(self._unfiltered)
+        for literal_idx in self._automaton.find(utterance.translate(_ascii_fold_table())):
+            candidates.update(self._literal_rules[literal_idx])
+        return sorted(candidates)
+
+    def search(self, utterance: str) -> List[Tuple[Hashable, re.Match]]:
+        """ Searches all rules in the utterance
+
+        Args:
+            utterance (str): text to search in
+
+        Returns:
+            (List[Tuple[Hashable, re.Match]]): key and match object of each rule found (in rule order)
+        """
+        matches = []
+        for rule_idx in self.candidates(utterance):
+            compiled = self._compiled[rule_idx]
+            if compiled is None:
+                compiled = self._compiled[rule_idx] = re.compile(self.patterns[rule_idx], re.I)
+            match = compiled.search(utterance)
+            if match is not None:
+                matches.append((self.keys[rule_idx], match))
+        return matches
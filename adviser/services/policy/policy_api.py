@@ -17,15 +17,15 @@
 #
 ###############################################################################
 
-from typing import List, Dict
+from typing import List, Dict, Mapping
 
 from utils.domain.lookupdomain import LookupDomain
+from services.policy.request_selection import RequestSelector, as_histogram, value_histograms
 from services.service import PublishSubscribe, Service
 from utils import SysAct, SysActionType
 from utils.logger import DiasysLogger
 from utils.beliefstate import BeliefState
 from utils.useract import UserActionType
-from collections import defaultdict
 
 
 class HandcraftedPolicy(Service):
@@ -38,12 +38,17 @@ class HandcraftedPolicy(Service):
     The classes will probably be merged in the future.
     """
 
-    def __init__(self, domain: LookupDomain, logger: DiasysLogger = DiasysLogger()):
+    session_attributes = ('first_turn', 'last_action', 'current_suggestions', 's_index')
+
+    def __init__(self, domain: LookupDomain, logger: DiasysLogger = DiasysLogger(),
+                 request_strategy: str = 'split'):
         """
         Initializes the policy
 
         Arguments:
             domain {domain.lookupdomain.LookupDomain} -- Domain
+            request_strategy {str} -- how the slot to request is chosen if several entities match
+                                      the constraints (see `request_selection.RequestSelector`)
 
         """
         self.first_turn = True
@@ -53,6 +58,7 @@ class HandcraftedPolicy(Service):
         self.s_index = 0  # the index in current suggestions for the current system reccomendation
         self.domain_key = domain.get_primary_key()
         self.logger = logger
+        self.request_selector = RequestSelector(domain, request_strategy)
 
     @PublishSubscribe(sub_topics=["beliefstate"], pub_topics=["sys_act", "sys_state"])
     def choose_sys_act(self, beliefstate: BeliefState = None, sys_act: SysAct = None)\
@@ -358,15 +364,10 @@ class HandcraftedPolicy(Service):
         sys_act = SysAct()
         # if there is more than one result
         if len(q_res) > 1:
-            constraints, dontcare = self._get_constraints(beliefstate)
-            # Gather all the results for each column
-            temp = {key: [] for key in q_res[0].keys()}
-            # If any column has multiple values, ask for clarification
-            for result in q_res:
-                for key in result.keys():
-                    if key != self.domain_key:
-                        temp[key].append(result[key])
-            next_req = self._gen_next_request(temp, beliefstate)
+            # If any column has multiple values, ask for clarification (the values of all slots
+            # which could be requested are counted in one pass over the results)
+            histograms = value_histograms(q_res, self._get_request_candidates(beliefstate))
+            next_req = self._gen_next_request(histograms, beliefstate)
             if next_req:
                 sys_act.type = SysActionType.Request
                 sys_act.add_value(next_req)
@@ -376,62 +377,43 @@ class HandcraftedPolicy(Service):
         sys_act.type = SysActionType.InformByName
         return sys_act
 
-    def _gen_next_request(self, temp: Dict[str, List[str]], belief_state: BeliefState):
-        """
-            Calculates which slot to request next based asking for non-binary slotes first and then
-            based on which binary slots provide the biggest reduction in the size of db results
+    def _get_request_candidates(self, belief_state: BeliefState) -> List[str]:
+        """Returns the system requestable slots the user has not specified a constraint for and
+           does not say they don't care about"""
+        constraints, dontcare = self._get_constraints(belief_state)
+        return [slot for slot in self.domain.get_system_requestable_slots()
+                if slot not in dontcare and slot not in constraints]
 
-            NOTE: If the dataset is large, this is probably not a great idea to calculate each turn
-                  it's relatively simple, but could add up over time
+    def _gen_next_request(self, temp: Dict[str, Mapping[object, int]], belief_state: BeliefState):
+        """
+            Calculates which slot to request next (see `request_selection.RequestSelector`), by
+            default asking for non-binary slots first and then based on which binary slots provide
+            the biggest reduction in the size of db results
 
             Args:
-                temp (Dict[str, List[str]]: a dictionary with the keys and values for each result
-                                            in the result set
+                temp (Dict[str, Mapping[object, int]]: value histogram (or list of values) of each
+                                                        slot over the result set
 
             Returns: (str) representing the slot to ask for next (or empty if none)
         """
-        req_slots = self.domain.get_system_requestable_slots()
-        # don't other to cacluate statistics for things which have been specified
-        constraints, dontcare = self._get_constraints(belief_state)
-        # split out binary slots so we can ask about them second
-        req_slots = [s for s in req_slots if s not in dontcare and s not in constraints]
-        bin_slots = [slot for slot in req_slots if len(self.domain.get_possible_values(slot)) == 2]
-        non_bin_slots = [slot for slot in req_slots if slot not in bin_slots]
-
-        # check if there are any differences in values for non-binary slots,
-        # if a slot has multiple values, ask about that slot
-        for slot in non_bin_slots:
-            if len(set(temp[slot])) > 1:
-                return slot
-        # Otherwise look to see if there are differnces in binary slots
-        return self._highest_info_gain(bin_slots, temp)
+        histograms = {slot: as_histogram(values) for slot, values in temp.items()}
+        return self.request_selector.select(self._get_request_candidates(belief_state), histograms)
 
-    def _highest_info_gain(self, bin_slots: List[str], temp: Dict[str, List[str]]):
-        """ Since we don't have lables, we can't properlly calculate entropy, so instead we'll go
-            for trying to ask after a feature that splits the results in half as evenly as possible
-            (that way we gain most info regardless of which way the user chooses)
+    def _highest_info_gain(self, bin_slots: List[str], temp: Dict[str, Mapping[object, int]]):
+        """ Asks after the binary feature that splits the results in half as evenly as possible
+            (that way we gain most info regardless of which way the user chooses), see the
+            `entropy` strategy of `request_selection.RequestSelector` for non-binary slots
 
             Args:
                 bin_slots: a list of strings representing system requestable binary slots which
                            have not yet been specified
-                temp (Dict[str, List[str]]: a dictionary with the keys and values for each result
-                                            in the result set
+                temp (Dict[str, Mapping[object, int]]: value histogram (or list of values) of each
+                                                        slot over the result set
 
             Returns: (str) representing the slot to ask for next (or empty if none)
         """
-        diffs = {}
-        for slot in bin_slots:
-            val1, val2 = self.domain.get_possible_values(slot)
-            values_dic = defaultdict(int)
-            for val in temp[slot]:
-                values_dic[val] += 1
-            if val1 in values_dic and val2 in values_dic:
-                diffs[slot] = abs(values_dic[val1] - values_dic[val2])
-            # If all slots have the same value, we don't need to request anything, return none
-        if not diffs:
-            return ""
-        sorted_diffs = sorted(diffs.items(), key=lambda kv: kv[1])
-        return sorted_diffs[0][0]
+        histograms = {slot: as_histogram(values) for slot, values in temp.items()}
+        return self.request_selector.most_even_split(bin_slots, histograms)
 
     def _convert_inform(self, q_results: iter,
                         sys_act: SysAct, beliefstate: BeliefState):
@@ -17,9 +17,9 @@
 #
 ###############################################################################
 
-from collections import defaultdict
-from typing import List, Dict
+from typing import List, Dict, Mapping
 
+from services.policy.request_selection import RequestSelector, as_histogram, value_histograms
 from services.service import PublishSubscribe
 from services.service import Service
 from utils import SysAct, SysActionType
@@ -48,13 +48,17 @@ class HandcraftedPolicy(Service):
 
     """
 
+    session_attributes = ('turns', 'first_turn', 'current_suggestions', 's_index')
+
     def __init__(self, domain: JSONLookupDomain, logger: DiasysLogger = DiasysLogger(),
-                 max_turns: int = 25):
+                 max_turns: int = 25, request_strategy: str = 'split'):
         """
         Initializes the policy
 
         Arguments:
             domain {domain.jsonlookupdomain.JSONLookupDomain} -- Domain
+            request_strategy {str} -- how the slot to request is chosen if several entities match
+                                      the constraints (see `request_selection.RequestSelector`)
 
         """
         self.first_turn = True
@@ -64,6 +68,7 @@ class HandcraftedPolicy(Service):
         self.domain_key = domain.get_primary_key()
         self.logger = logger
         self.max_turns = max_turns
+        self.request_selector = RequestSelector(domain, request_strategy)
 
     def dialog_start(self):
         """
@@ -188,7 +193,8 @@ class HandcraftedPolicy(Service):
             beliefstate (BeliefState): BeliefState object; contains all given user constraints to date
 
         Returns:
-            iterable: representing the results of the database lookup
+            iterable: representing the results of the database lookup (a lazy `EntityResult` for
+                      entity searches, the entities are only fetched when they are needed)
 
         --LV
         """
@@ -203,7 +209,7 @@ class HandcraftedPolicy(Service):
         # has given so far
         else:
             constraints, _ = self._get_constraints(beliefstate)
-            return self.domain.find_entities(constraints)
+            return self.domain.query_entities(constraints)
 
     def _get_name(self, beliefstate: BeliefState):
         """Finds if an entity has been suggested by the system (in the form of an offer candidate)
@@ -313,7 +319,12 @@ class HandcraftedPolicy(Service):
 
         # Otherwise we need to query the db to determine next action
         results = self._query_db(beliefstate)
-        sys_act = self._raw_action(results, beliefstate)
+        histograms = None
+        if len(results) > 1 and not beliefstate['requests']:
+            # the results are all entities meeting the constraints, the domain counts their values
+            constraints, _ = self._get_constraints(beliefstate)
+            histograms = self.domain.value_counts(constraints, self._get_request_candidates(beliefstate))
+        sys_act = self._raw_action(results, beliefstate, histograms)
 
         # requests are fairly easy, if it's a request, return it directly
         if sys_act.type == SysActionType.Request:
@@ -334,13 +345,17 @@ class HandcraftedPolicy(Service):
         sys_state['last_act'] = sys_act
         return (sys_act, sys_state)
 
-    def _raw_action(self, q_res: iter, beliefstate: BeliefState) -> SysAct:
+    def _raw_action(self, q_res: iter, beliefstate: BeliefState,
+                    histograms: Mapping[str, Mapping[object, int]] = None) -> SysAct:
         """Based on the output of the db query and the method, choose
            whether next action should be request or inform
 
         Args:
             q_res (list): rows (list of dicts) returned by the issued sqlite3 query
             beliefstate (BeliefState): contains all UserActionTypes for the current turn
+            histograms (Mapping[str, Mapping[object, int]]): value histograms of the rows for the
+                slots which could be requested, if already known (e.g. counted by the domain);
+                otherwise they are counted from the rows
 
         Returns:
             (SysAct): SysAct object of appropriate type
@@ -350,15 +365,10 @@ class HandcraftedPolicy(Service):
         sys_act = SysAct()
         # if there is more than one result
         if len(q_res) > 1 and not beliefstate['requests']:
-            constraints, dontcare = self._get_constraints(beliefstate)
-            # Gather all the results for each column
-            temp = {key: [] for key in q_res[0].keys()}
+            if histograms is None:
+                histograms = value_histograms(q_res, self._get_request_candidates(beliefstate))
             # If any column has multiple values, ask for clarification
-            for result in q_res:
-                for key in result.keys():
-                    if key != self.domain_key:
-                        temp[key].append(result[key])
-            next_req = self._gen_next_request(temp, beliefstate)
+            next_req = self._gen_next_request(histograms, beliefstate)
             if next_req:
                 sys_act.type = SysActionType.Request
                 sys_act.add_value(next_req)
@@ -368,61 +378,43 @@ class HandcraftedPolicy(Service):
         sys_act.type = SysActionType.InformByName
         return sys_act
 
-    def _gen_next_request(self, temp: Dict[str, List[str]], belief_state: BeliefState):
-        """
-            Calculates which slot to request next based asking for non-binary slotes first and then
-            based on which binary slots provide the biggest reduction in the size of db results
+    def _get_request_candidates(self, beliefstate: BeliefState) -> List[str]:
+        """Returns the system requestable slots the user has not specified a constraint for and
+           does not say they don't care about"""
+        constraints, dontcare = self._get_constraints(beliefstate)
+        return [slot for slot in self.domain.get_system_requestable_slots()
+                if slot not in dontcare and slot not in constraints]
 
-            NOTE: If the dataset is large, this is probably not a great idea to calculate each turn
-                  it's relatively simple, but could add up over time
+    def _gen_next_request(self, temp: Dict[str, Mapping[object, int]], belief_state: BeliefState):
+        """
+            Calculates which slot to request next (see `request_selection.RequestSelector`), by
+            default asking for non-binary slots first and then based on which binary slots provide
+            the biggest reduction in the size of db results
 
             Args:
-                temp (Dict[str, List[str]]: a dictionary with the keys and values for each result
-                                            in the result set
+                temp (Dict[str, Mapping[object, int]]: value histogram (or list of values) of each
+                                                        slot over the result set
 
             Returns: (str) representing the slot to ask for next (or empty if none)
         """
-        req_slots = self.domain.get_system_requestable_slots()
-        # don't other to cacluate statistics for things which have been specified
-        constraints, dontcare = self._get_constraints(belief_state)
-        # split out binary slots so we can ask about them second
-        req_slots = [s for s in req_slots if s not in dontcare and s not in constraints]
-        bin_slots = [slot for slot in req_slots if len(self.domain.get_possible_values(slot)) == 2]
-        non_bin_slots = [slot for slot in req_slots if slot not in bin_slots]
-        # check if there are any differences in values for non-binary slots,
-        # if a slot has multiple values, ask about that slot
-        for slot in non_bin_slots:
-            if len(set(temp[slot])) > 1:
-                return slot
-        # Otherwise look to see if there are differnces in binary slots
-        return self._highest_info_gain(bin_slots, temp)
+        histograms = {slot: as_histogram(values) for slot, values in temp.items()}
+        return self.request_selector.select(self._get_request_candidates(belief_state), histograms)
 
-    def _highest_info_gain(self, bin_slots: List[str], temp: Dict[str, List[str]]):
-        """ Since we don't have lables, we can't properlly calculate entropy, so instead we'll go
-            for trying to ask after a feature that splits the results in half as evenly as possible
-            (that way we gain most info regardless of which way the user chooses)
+    def _highest_info_gain(self, bin_slots: List[str], temp: Dict[str, Mapping[object, int]]):
+        """ Asks after the binary feature that splits the results in half as evenly as possible
+            (that way we gain most info regardless of which way the user chooses), see the
+            `entropy` strategy of `request_selection.RequestSelector` for non-binary slots
 
             Args:
                 bin_slots: a list of strings representing system requestable binary slots which
                            have not yet been specified
-                temp (Dict[str, List[str]]: a dictionary with the keys and values for each result
-                                            in the result set
+                temp (Dict[str, Mapping[object, int]]: value histogram (or list of values) of each
+                                                        slot over the result set
 
             Returns: (str) representing the slot to ask for next (or empty if none)
         """
-        diffs = {}
-        for slot in bin_slots:
-            val1, val2 = self.domain.get_possible_values(slot)
-            values_dic = defaultdict(int)
-            for val in temp[slot]:
-                values_dic[val] += 1
-            if val1 in values_dic and val2 in values_dic:
-                diffs[slot] = abs(values_dic[val1] - values_dic[val2])
-            # If all slots have the same value, we don't need to request anything, return none
-        if not diffs:
-            return ""
-        sorted_diffs = sorted(diffs.items(), key=lambda kv: kv[1])
-        return sorted_diffs[0][0]
+        histograms = {slot: as_histogram(values) for slot, values in temp.items()}
+        return self.request_selector.most_even_split(bin_slots, histograms)
 
     def _convert_inform(self, q_results: iter,
                         sys_act: SysAct, beliefstate: BeliefState):
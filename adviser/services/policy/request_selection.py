@@ -0,0 +1,133 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+""" Chooses the slot a handcrafted policy requests next from the value histograms of the entities
+still matching the user's constraints. """
+
+import math
+from collections import Counter
+from typing import Dict, Iterable, List, Mapping
+
+# strategies of the RequestSelector
+REQUEST_STRATEGIES = ('split', 'entropy')
+
+
+def value_histograms(entities: Iterable[dict], slots: Iterable[str]) -> Dict[str, Counter]:
+    """ Counts the values of the slots of the entities in one pass over them
+
+    Args:
+        entities (Iterable[dict]): entities (e.g. the rows of a database query)
+        slots (Iterable[str]): slots whose values are counted
+
+    Returns:
+        (Dict[str, Counter]): number of entities per value for each slot (missing values count as
+                              a value)
+    """
+    histograms = {slot: Counter() for slot in slots}
+    for entity in entities:
+        for slot, histogram in histograms.items():
+            histogram[entity.get(slot)] += 1
+    return histograms
+
+
+def as_histogram(values) -> Mapping[object, int]:
+    """ Returns a histogram as it is and counts the values of anything else (e.g. a list of values) """
+    return values if isinstance(values, Mapping) else Counter(values)
+
+
+def entropy(histogram: Mapping[object, int]) -> float:
+    """ Returns the entropy (in bits) of the distribution of the values given by a histogram, i.e.
+        the information gained by learning the value of an entity drawn uniformly at random """
+    total = sum(histogram.values())
+    if not total:
+        return 0.0
+    return -sum(count / total * math.log2(count / total) for count in histogram.values() if count)
+
+
+class RequestSelector(object):
+    """ Chooses which slot to request next.
+
+    Strategies:
+        * `split`: the first non-binary slot (in the given order) with different values, otherwise
+          the binary slot splitting the entities most evenly between its two values (values
+          other than the two possible ones are ignored)
+        * `entropy`: the slot (binary or not) whose values have the highest entropy, i.e. whose
+          answer is expected to rule out the most entities
+    """
+
+    def __init__(self, domain, strategy: str = 'split'):
+        """
+        Args:
+            domain (JSONLookupDomain): domain of the slots (for their possible values)
+            strategy (str): one of `REQUEST_STRATEGIES`
+        """
+        if strategy not in REQUEST_STRATEGIES:
+            raise ValueError(f"unknown request strategy {strategy}, expected one of {REQUEST_STRATEGIES}")
+        self.domain = domain
+        self.strategy = strategy
+        # slot -> possible values if the slot is binary, None otherwise (filled on use)
+        self._binary_values = {}
+
+    def binary_values(self, slot: str):
+        """ Returns the two possible values of a binary slot, `None` for all other slots """
+        if slot not in self._binary_values:
+            values = self.domain.get_possible_values(slot)
+            self._binary_values[slot] = tuple(values) if len(values) == 2 else None
+        return self._binary_values[slot]
+
+    def select(self, slots: List[str], histograms: Mapping[str, Mapping[object, int]]) -> str:
+        """ Returns the slot to request next (or an empty string if none of the slots tells the
+            entities apart)
+
+        Args:
+            slots (List[str]): candidate slots (in the order of preference for ties)
+            histograms (Mapping[str, Mapping[object, int]]): value histograms of the entities for
+                                                             (at least) the candidate slots
+        """
+        if self.strategy == 'entropy':
+            return self.highest_entropy(slots, histograms)
+        for slot in slots:
+            if self.binary_values(slot) is None and len(histograms.get(slot, ())) > 1:
+                return slot
+        return self.most_even_split([slot for slot in slots if self.binary_values(slot) is not None], histograms)
+
+    def most_even_split(self, bin_slots: List[str], histograms: Mapping[str, Mapping[object, int]]) -> str:
+        """ Returns the binary slot with the smallest difference between the number of entities with
+            its first and its second value (among the slots for which both values occur) or an
+            empty string """
+        best_slot, best_difference = "", None
+        for slot in bin_slots:
+            if self.binary_values(slot) is None:
+                continue
+            val1, val2 = self.binary_values(slot)
+            histogram = histograms.get(slot, {})
+            if histogram.get(val1) and histogram.get(val2):
+                difference = abs(histogram[val1] - histogram[val2])
+                if best_difference is None or difference < best_difference:
+                    best_slot, best_difference = slot, difference
+        return best_slot
+
+    def highest_entropy(self, slots: List[str], histograms: Mapping[str, Mapping[object, int]]) -> str:
+        """ Returns the slot whose values have the highest entropy (if it is above 0) or an empty string """
+        best_slot, best_entropy = "", 0.0
+        for slot in slots:
+            slot_entropy = entropy(histograms.get(slot, {}))
+            if slot_entropy > best_entropy:
+                best_slot, best_entropy = slot, slot_entropy
+        return best_slot
@@ -0,0 +1,177 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+import itertools
+from typing import Hashable, List
+
+import torch
+
+from services.bst import HandcraftedBST
+from services.policy.rl.dqnpolicy import DQNPolicy
+from services.simulator import HandcraftedUserSimulator
+from services.stats.evaluation import PolicyEvaluator
+from utils.sysact import SysActionType
+
+
+class BatchedDialogTrainer(object):
+    """ Runs simulated dialogs for training / evaluating a `DQNPolicy` without a `DialogSystem`.
+
+    Steps `num_parallel` dialogs in lockstep inside the calling thread: in every step, all running
+    dialogs advance by one turn and the states of all dialogs which need an action selected by the
+    agent are forwarded through the network at once.
+    The services are called directly (no message bus, no serialization), each dialog running in
+    its own session (see multi-session mode in `services.service.Service`), which is why this only
+    works for services declaring their dialog-level state in `session_attributes`.
+
+    The message flow is the same as in a `DialogSystem` built from the given services:
+    user simulator -> belief state tracker -> policy -> evaluator -> user simulator -> ...
+    until the policy says bye; a finished dialog is replaced by a new one until the requested
+    number of dialogs was run.
+    """
+
+    def __init__(self, user_sim: HandcraftedUserSimulator, bst: HandcraftedBST, policy: DQNPolicy,
+                 evaluator: PolicyEvaluator = None, num_parallel: int = 16):
+        """
+        Args:
+            user_sim (HandcraftedUserSimulator): the user simulator
+            bst (HandcraftedBST): the belief state tracker
+            policy (DQNPolicy): the policy to train / evaluate
+            evaluator (PolicyEvaluator): if given, records rewards and success of all dialogs
+            num_parallel (int): maximum number of dialogs stepped in lockstep
+        """
+        assert num_parallel > 0, "at least one dialog has to run at a time"
+        self.user_sim = user_sim
+        self.bst = bst
+        self.policy = policy
+        self.evaluator = evaluator
+        self.num_parallel = num_parallel
+        self.services = [service for service in (user_sim, bst, policy, evaluator) if service is not None]
+        self._session_counter = itertools.count()
+
+    def run_dialogs(self, num_dialogs: int):
+        """ Runs the given number of dialogs (blocking).
+
+        Args:
+            num_dialogs (int): number of dialogs to run
+        """
+        dialogs_to_start = num_dialogs
+        # session id -> user acts to be processed in the next step
+        user_acts = {}
+        while dialogs_to_start > 0 or user_acts:
+            while dialogs_to_start > 0 and len(user_acts) < self.num_parallel:
+                user_acts[self._start_dialog()] = []
+                dialogs_to_start -= 1
+            user_acts = self._step(user_acts)
+
+    def _start_dialog(self) -> Hashable:
+        """ Opens a new session in all services (calling their `dialog_start`) """
+        session_id = next(self._session_counter)
+        if self.policy.logger:
+            self.policy.logger.dialog_turn("\n\n!!!!!!!!!!!!!!!! NEW DIALOG !!!!!!!!!!!!!!!!!!!!!!!!!!!!\n\n")
+        for service in self.services:
+            service._open_session(session_id)
+        return session_id
+
+    def _end_dialog(self, session_id: Hashable):
+        """ Closes the session in all services (calling their `dialog_end`, which trains the policy) """
+        for service in self.services:
+            service._close_session(session_id)
+
+    def _step(self, user_acts: dict) -> dict:
+        """ Advances all running dialogs by one turn.
+
+        Args:
+            user_acts (dict): mapping from session id -> user acts of the last user turn
+
+        Returns:
+            (dict): mapping from session id -> user acts of this turn for all dialogs still running
+        """
+        session_ids = list(user_acts)
+
+        beliefstates = {}
+        for session_id in session_ids:
+            with self.bst._session_scope(session_id):
+                beliefstates[session_id] = self.bst.update_bst(user_acts=user_acts[session_id])['beliefstate']
+
+        sys_outputs = self._choose_sys_acts(session_ids, beliefstates)
+
+        next_user_acts = {}
+        for session_id in session_ids:
+            sys_act = sys_outputs[session_id]['sys_act']
+            if self.evaluator is not None:
+                with self.evaluator._session_scope(session_id):
+                    self.evaluator.evaluate_turn(sys_act=sys_act)
+            with self.user_sim._session_scope(session_id):
+                user_output = self.user_sim.user_turn(sys_act=sys_act, sys_turn_over=True)
+            if sys_act.type == SysActionType.Bye:
+                sim_goal = user_output['sim_goal']
+                with self.policy._session_scope(session_id):
+                    self.policy.end(sim_goal=sim_goal)
+                if self.evaluator is not None:
+                    with self.evaluator._session_scope(session_id):
+                        self.evaluator.end_dialog(sim_goal=sim_goal)
+                self._end_dialog(session_id)
+            else:
+                next_user_acts[session_id] = user_output['user_acts']
+        return next_user_acts
+
+    def _choose_sys_acts(self, session_ids: List[Hashable], beliefstates: dict) -> dict:
+        """ Batched version of `DQNPolicy.choose_sys_act` for all given dialogs.
+
+        Args:
+            session_ids (List[Hashable]): ids of the dialogs
+            beliefstates (dict): mapping from session id -> current belief state
+
+        Returns:
+            (dict): mapping from session id -> output of `DQNPolicy.choose_sys_act`
+        """
+        sys_outputs = {}
+        sys_states = {}
+        action_indices = {}
+        for session_id in session_ids:
+            with self.policy._session_scope(session_id):
+                out_dict = self.policy.start_turn(beliefstates[session_id])
+                if out_dict is not None:
+                    sys_outputs[session_id] = out_dict
+                    continue
+                sys_states[session_id] = self.policy.sys_state
+                action_indices[session_id] = self.policy.required_action_idx(beliefstates[session_id])
+
+        # featurize all dialogs at once, each dialog keeps its row as state vector
+        state_vectors = {}
+        if action_indices:
+            state_matrix = self.policy.beliefstates_to_batch(
+                [beliefstates[session_id] for session_id in action_indices],
+                [sys_states[session_id] for session_id in action_indices])
+            for row, session_id in enumerate(action_indices):
+                state_vectors[session_id] = state_matrix[row:row + 1]
+
+        # single forward pass for all dialogs without a required action
+        select_ids = [session_id for session_id in action_indices if action_indices[session_id] == -1]
+        if select_ids:
+            state_batch = torch.cat([state_vectors[session_id] for session_id in select_ids])
+            for session_id, action_idx in zip(select_ids, self.policy.select_actions_eps_greedy(state_batch)):
+                action_indices[session_id] = action_idx
+
+        for session_id in action_indices:
+            with self.policy._session_scope(session_id):
+                sys_outputs[session_id] = self.policy.finish_turn(beliefstates[session_id],
+                                                                  state_vectors[session_id],
+                                                                  action_indices[session_id])
+        return sys_outputs
@@ -41,6 +41,8 @@ from utils.useract import UserActionType
 
 class DQNPolicy(RLPolicy, Service):
 
+    session_attributes = ('turns', 'last_sys_act', 'sys_state', 'sim_goal', 'episode')
+
     def __init__(self, domain: JSONLookupDomain,
                  architecture: NetArchitecture = NetArchitecture.DUELING,
                  hidden_layer_sizes: List[int] = [256, 700, 700],  # vanilla architecture
@@ -116,11 +118,13 @@ class DQNPolicy(RLPolicy, Service):
         self.total_train_dialogs = 0
         self.epsilon = self.epsilon_start
         self.turns = 0
+        self.sim_goal = None
         self.cumulative_train_dialogs = -1
 
     def dialog_start(self, dialog_start=False):
         self.turns = 0
         self.last_sys_act = None
+        self.episode = []
         if self.is_training:
             self.cumulative_train_dialogs += 1
         self.sys_state = {
@@ -150,6 +154,30 @@ class DQNPolicy(RLPolicy, Service):
             torch.autograd.set_grad_enabled(True)
         return next_action_idx
 
+    def select_actions_eps_greedy(self, state_batch: torch.FloatTensor) -> List[int]:
+        """ Epsilon-greedy policy for several dialogs at once: exploration is decided per state,
+            Q-values for all remaining states are computed in a single forward pass.
+
+        Args:
+            state_batch (torch.FloatTensor): current states of the dialogs (dimension batch x state_dim)
+
+        Returns:
+            action indices for the actions selected by the agent, one per state
+        """
+        self.eps_scheduler()
+
+        action_indices = [common.random.randint(0, self.action_dim - 1)
+                          if self.is_training and common.random.random() < self.epsilon else None
+                          for _ in range(state_batch.size(0))]
+        greedy_rows = [row for row, action_idx in enumerate(action_indices) if action_idx is None]
+        if greedy_rows:
+            torch.autograd.set_grad_enabled(False)
+            q_values = self.model(state_batch[greedy_rows])
+            for row, action_idx in zip(greedy_rows, q_values.max(dim=1)[1].tolist()):
+                action_indices[row] = action_idx
+            torch.autograd.set_grad_enabled(True)
+        return action_indices
+
     @PublishSubscribe(sub_topics=["sim_goal"])
     def end(self, sim_goal: Goal):
         """
@@ -183,7 +211,30 @@ class DQNPolicy(RLPolicy, Service):
                         the policy, and "sys_state" which contains additional informatino which might
                         be needed by the NLU to disambiguate challenging utterances.
         """
+        out_dict = self.start_turn(beliefstate)
+        if out_dict is not None:
+            return out_dict
+
+        # intermediate or closing turn
+        state_vector = self.beliefstate_dict_to_vector(beliefstate)
+        next_action_idx = self.required_action_idx(beliefstate)
+        if next_action_idx == -1:
+            # dialog continues
+            next_action_idx = self.select_action_eps_greedy(state_vector)
+        return self.finish_turn(beliefstate, state_vector, next_action_idx)
+
+    def start_turn(self, beliefstate: BeliefState) -> dict:
+        """
+            Starts a new system turn. The first and the last turn of a dialog (greeting / turn limit
+            reached) don't need the agent to select an action.
 
+            Args:
+                beliefstate (BeliefState): the current beliefstate
+
+            Returns:
+                (dict): the output of `choose_sys_act` if this turn doesn't need an action selected
+                        by the agent, else `None`
+        """
         self.num_dialogs = self.cumulative_train_dialogs % self.train_dialogs
         if self.cumulative_train_dialogs == 0 and self.target_model is not None:
             # start with same weights for target and online net when a new epoch begins
@@ -205,19 +256,32 @@ class DQNPolicy(RLPolicy, Service):
                 self.logger.dialog_turn("system action > " + str(bye_action))
             sys_state = {"last_act": bye_action}
             return {'sys_act': bye_action, "sys_state": sys_state}
+        return None
 
-        # intermediate or closing turn
-        state_vector = self.beliefstate_dict_to_vector(beliefstate)
-        next_action_idx = -1
-
-        # check if user ended dialog
+    def required_action_idx(self, beliefstate: BeliefState) -> int:
+        """
+            Returns:
+                (int): index of the action the system has to take in reaction to the user
+                       (saying bye if the user ended the dialog), or -1 if the agent should select one
+        """
         if UserActionType.Bye in beliefstate["user_acts"]:
             # user terminated current dialog -> say bye
-            next_action_idx = self.action_idx(SysActionType.Bye.value)
-        if next_action_idx == -1:
-            # dialog continues
-            next_action_idx = self.select_action_eps_greedy(state_vector)
+            return self.action_idx(SysActionType.Bye.value)
+        return -1
+
+    def finish_turn(self, beliefstate: BeliefState, state_vector: torch.FloatTensor,
+                    next_action_idx: int) -> dict(sys_act=SysAct):
+        """
+            Expands the selected action into the system act and finishes the current system turn.
 
+            Args:
+                beliefstate (BeliefState): the current beliefstate
+                state_vector (torch.FloatTensor): the current state (dimension 1 x state_dim)
+                next_action_idx (int): index of the selected action
+
+            Returns:
+                (dict): the output of `choose_sys_act`
+        """
         self.turn_end(beliefstate, state_vector, next_action_idx)
 
         # Update the sys_state
@@ -335,11 +399,10 @@ class DQNPolicy(RLPolicy, Service):
             # calculate loss
             loss = self.loss(s_batch, a_batch, s2_batch, r_batch, t_batch, gamma)
             if importance_weights is not None:
+                # importance weighting
                 loss = loss * importance_weights
-                for i in range(self.batch_size):
-                    # importance weighting
-                    # update priorities
-                    self.buffer.update(i, loss[i].item())
+                # update priorities
+                self.buffer.update_batch(indices, loss.detach().view(-1))
             loss = loss.mean()
             loss.backward()
 
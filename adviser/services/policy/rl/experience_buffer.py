@@ -256,6 +256,11 @@ class NaivePrioritizedBuffer(Buffer):
             self.max_p = p
         self.probs[idx] = p
 
+    def update_batch(self, indices: torch.LongTensor, errors: torch.FloatTensor):
+        """ Update the priorities of the transitions with the given buffer indices """
+        for idx, error in zip(indices.tolist(), errors.tolist()):
+            self.update(idx, error)
+
     def sample(self):
         """ Sample from buffer.
         
@@ -303,3 +308,147 @@ class NaivePrioritizedBuffer(Buffer):
 
         return s_batch, a_batch, r_batch, s2_batch, t_batch, data_indices, \
                importance_weights.view(-1, 1)
+
+
+class SumTree(object):
+    """ Binary tree over a fixed number of non-negative priorities where each inner node holds the sum of
+    its children. Supports updating and sampling (proportional to priority) batches of leaves
+    in O(batch size * log capacity), vectorized with numpy.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.num_leaves = 1 << max(0, (capacity - 1).bit_length())
+        # node 1 is the root, the children of node i are 2i and 2i+1, leaves start at num_leaves
+        self.nodes = np.zeros(2 * self.num_leaves, dtype=np.float64)
+
+    def total(self) -> float:
+        """ Returns the sum of all priorities """
+        return self.nodes[1]
+
+    def get(self, indices: np.ndarray) -> np.ndarray:
+        """ Returns the priorities of the given leaves """
+        return self.nodes[indices + self.num_leaves]
+
+    def set(self, indices: np.ndarray, priorities: np.ndarray):
+        """ Sets the priorities of the given leaves (if a leaf is given several times, the last priority counts) """
+        nodes = np.asarray(indices, dtype=np.int64) + self.num_leaves
+        self.nodes[nodes] = priorities
+        nodes = np.unique(nodes // 2)
+        while nodes[0] > 0:
+            # recompute the sums of all affected nodes level by level (no accumulating rounding errors)
+            self.nodes[nodes] = self.nodes[2 * nodes] + self.nodes[2 * nodes + 1]
+            nodes = np.unique(nodes // 2)
+
+    def find(self, values: np.ndarray) -> np.ndarray:
+        """ Returns for each value v in [0, total) the leaf i with sum(priorities[:i]) <= v < sum(priorities[:i+1]) """
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        while nodes[0] < self.num_leaves:
+            left = 2 * nodes
+            left_sums = self.nodes[left]
+            # never descend into an empty subtree (guards against rounding errors)
+            go_right = (values >= left_sums) & (self.nodes[left + 1] > 0)
+            values -= left_sums * go_right
+            nodes = left + go_right
+        return nodes - self.num_leaves
+
+
+class SumTreePrioritizedBuffer(Buffer):
+    """ Prioritized experience replay buffer backed by a sum tree.
+
+    Drop-in replacement for `NaivePrioritizedBuffer`: sampling and priority updates cost O(batch size * log n)
+    instead of O(n). Batches are sampled stratified (one transition from each of batch size equally large
+    priority segments), the importance sampling exponent beta is annealed linearly to `beta_end`
+    (see Schaul et al.: Prioritized experience replay).
+    """
+
+    def __init__(self, buffer_size: int, batch_size: int, state_dim: int,
+                 sample_last_transition: bool = True,
+                 regularisation: float = 0.00001, exponent: float = 0.6, beta: float = 0.4,
+                 beta_end: float = 1.0, beta_annealing_steps: int = 10000,
+                 discount_gamma: float = 0.99, device=torch.device('cpu')):
+        """
+        Args:
+            sample_last_transition (bool): if True, a batch will always include the most recent transition
+            regularisation (float): added to each priority, so that no transition has probability 0
+            exponent (float): priority exponent alpha (0: uniform sampling)
+            beta (float): initial importance sampling exponent
+            beta_end (float): final importance sampling exponent
+            beta_annealing_steps (int): number of batches sampled until beta reaches `beta_end`
+        """
+        super(SumTreePrioritizedBuffer, self).__init__(buffer_size, batch_size, state_dim,
+                                                       discount_gamma=discount_gamma,
+                                                       device=device)
+        print("  REPLAY MEMORY: Sum-Tree Prioritized")
+
+        self.tree = SumTree(buffer_size)
+        self.regularisation = regularisation
+        self.exponent = exponent
+        self.beta_start = beta
+        self.beta = beta
+        self.beta_end = beta_end
+        self.beta_annealing_steps = beta_annealing_steps
+        self.sample_count = 0
+        self.max_p = 1.0
+        self.sample_last_transition = sample_last_transition
+
+    def _priority_to_probability(self, priority):
+        """ Convert priority number(s) to (unnormalized) probability space """
+        return (priority + self.regularisation) ** self.exponent
+
+    def store(self, state: torch.FloatTensor, action: torch.LongTensor, reward: float,
+              terminal: bool = False):
+        """ Store an experience of the form (s,a,r,s',t), see `Buffer.store`.
+            Newly added experience tuples will be assigned maximum priority.
+        """
+        if super(SumTreePrioritizedBuffer, self).store(state, action, reward, terminal=terminal):
+            self.tree.set([self.last_write_pos], [self.max_p])
+
+    def update(self, idx: int, error: float):
+        """ Update the priority of transition with index idx """
+        self.update_batch(torch.tensor([idx]), torch.tensor([error]))
+
+    def update_batch(self, indices: torch.LongTensor, errors: torch.FloatTensor):
+        """ Update the priorities of the transitions with the given buffer indices """
+        priorities = self._priority_to_probability(np.abs(errors.detach().cpu().numpy().astype(np.float64)))
+        self.max_p = max(self.max_p, priorities.max())
+        self.tree.set(indices.cpu().numpy(), priorities)
+
+    def sample(self):
+        """ Sample from buffer.
+
+        Returns:
+            states, actions, rewards, next states, terminal state indicator {0,1}, buffer indices,
+            importance weights
+        """
+        # one uniformly drawn value from each of batch size equally large segments of the total priority
+        total = self.tree.total()
+        segment = total / self.batch_size
+        values = (np.arange(self.batch_size) + common.numpy.random.random_sample(self.batch_size)) * segment
+        indices = self.tree.find(np.minimum(values, np.nextafter(total, 0)))
+        # leaves beyond the filled part of the buffer have priority 0 and are never drawn
+        if self.sample_last_transition:
+            # include last transition -> see Sutton: A deeper look at experience replay
+            indices[0] = self.last_write_pos
+        probabilities = self.tree.get(indices) / total
+
+        data_indices = torch.from_numpy(indices).to(self.device)
+        s_batch = self.mem_state.index_select(0, data_indices)
+        a_batch = self.mem_action.index_select(0, data_indices)
+        r_batch = self.mem_reward.index_select(0, data_indices)
+        t_batch = self.mem_terminal.index_select(0, data_indices)
+        s2_batch = self.mem_next_state.index_select(0, data_indices)
+
+        # calculate importance sampling weights (normalized by the largest weight in the batch)
+        importance_weights = (float(len(self)) * probabilities) ** -self.beta
+        importance_weights = torch.tensor(importance_weights / importance_weights.max(), dtype=torch.float,
+                                          device=self.device)
+
+        # anneal beta
+        self.sample_count += 1
+        self.beta = min(self.beta_end, self.beta_start + (self.beta_end - self.beta_start) *
+                        self.sample_count / self.beta_annealing_steps)
+
+        return s_batch, a_batch, r_batch, s2_batch, t_batch, data_indices, \
+               importance_weights.view(-1, 1)
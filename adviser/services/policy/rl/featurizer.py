@@ -0,0 +1,157 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+from typing import List, Union
+
+import numpy as np
+import torch
+
+from utils.beliefstate import BeliefState
+from utils.domain.domain import Domain
+from utils.useract import UserActionType
+
+
+class BeliefStateFeaturizer(object):
+    """ Converts belief states into the state vectors of `RLPolicy`.
+
+    The layout of the vector is computed once per domain:
+
+    * one entry per user act type (1 if the user performed an act of this type)
+    * a constant 1
+    * for each informable slot (sorted): a flag for slot not mentioned, followed by the belief
+      of each possible value and of 'dontcare'
+    * for each requestable slot (sorted): 1 if the slot was requested
+    * system features: last inform found no entity, offer happened, number of database matches
+      (buckets 0, 1, 2-4, >4), discriminable
+
+    Only the entries differing from the default vector (nothing performed, mentioned or requested)
+    are collected and written into a copy of it at once.
+    """
+
+    def __init__(self, domain: Domain):
+        """
+        Args:
+            domain (Domain): domain the belief states belong to
+        """
+        index = 0
+        self.user_act_indices = {}
+        for act in UserActionType:
+            self.user_act_indices[act] = index
+            index += 1
+        constant_indices = [index]
+        index += 1
+
+        # slot -> index of the 'slot not mentioned' flag / value -> indices of the value's belief
+        self.inform_none_indices = {}
+        self.inform_value_indices = {}
+        for slot in sorted(domain.get_informable_slots()):
+            self.inform_none_indices[slot] = index
+            constant_indices.append(index)
+            index += 1
+            value_indices = {}
+            for value in domain.get_possible_values(slot) + ["dontcare"]:
+                value_indices.setdefault(value, []).append(index)
+                index += 1
+            self.inform_value_indices[slot] = value_indices
+
+        self.request_indices = {}
+        for slot in sorted(domain.get_requestable_slots()):
+            self.request_indices[slot] = index
+            index += 1
+
+        self.sys_feature_index = index
+        self.state_dim = index + 7
+
+        # default vector: nothing performed, mentioned or requested
+        self.template = np.zeros(self.state_dim, dtype=np.float32)
+        self.template[constant_indices] = 1.0
+
+    def _collect(self, beliefstate: Union[BeliefState, dict], sys_state: dict, offset: int,
+                 indices: List[int], values: List[float]):
+        """ Appends the (flat) indices and values of the entries differing from the template """
+        turn = beliefstate[-1] if isinstance(beliefstate, BeliefState) else beliefstate
+
+        for act in turn['user_acts']:
+            indices.append(offset + self.user_act_indices[act])
+            values.append(1.0)
+
+        for slot, bs_slot in turn['informs'].items():
+            if slot not in self.inform_none_indices:
+                continue
+            indices.append(offset + self.inform_none_indices[slot])
+            values.append(0.0)
+            value_indices = self.inform_value_indices[slot]
+            for value, belief in bs_slot.items():
+                for index in value_indices.get(value, ()):
+                    indices.append(offset + index)
+                    values.append(belief)
+
+        for slot in turn['requests']:
+            if slot in self.request_indices:
+                indices.append(offset + self.request_indices[slot])
+                values.append(1.0)
+
+        index = offset + self.sys_feature_index
+        candidate_count = turn['num_matches']
+        # buckets for match count: 0, 1, 2-4, >4
+        if candidate_count == 0:
+            bucket = 2
+        elif candidate_count == 1:
+            bucket = 3
+        elif 2 <= candidate_count <= 4:
+            bucket = 4
+        else:
+            bucket = 5
+        indices += [index, index + 1, index + bucket, index + 6]
+        values += [float(sys_state['lastActionInformNone']), float(sys_state['offerHappened']), 1.0,
+                   float(turn['discriminable'])]
+
+    def featurize(self, beliefstate: Union[BeliefState, dict], sys_state: dict,
+                  device=torch.device('cpu')) -> torch.FloatTensor:
+        """ Converts a belief state into a state vector
+
+        Args:
+            beliefstate (Union[BeliefState, dict]): belief state (or the dict of a single turn)
+            sys_state (dict): system features of the policy (see `RLPolicy.sys_state`)
+            device: torch device of the returned tensor
+
+        Returns:
+            state tensor with dimension 1 x state_dim
+        """
+        return self.featurize_batch([beliefstate], [sys_state], device)
+
+    def featurize_batch(self, beliefstates: List[Union[BeliefState, dict]], sys_states: List[dict],
+                        device=torch.device('cpu')) -> torch.FloatTensor:
+        """ Converts several belief states into one matrix of state vectors
+
+        Args:
+            beliefstates (List[Union[BeliefState, dict]]): belief states (or the dicts of single turns)
+            sys_states (List[dict]): system features of the policy for each belief state
+            device: torch device of the returned tensor
+
+        Returns:
+            state tensor with dimension len(beliefstates) x state_dim
+        """
+        indices = []
+        values = []
+        for row, (beliefstate, sys_state) in enumerate(zip(beliefstates, sys_states)):
+            self._collect(beliefstate, sys_state, row * self.state_dim, indices, values)
+        states = np.tile(self.template, (len(beliefstates), 1))
+        states.reshape(-1)[indices] = values
+        return torch.from_numpy(states).to(device)
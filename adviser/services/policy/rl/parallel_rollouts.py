@@ -0,0 +1,231 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+import multiprocessing
+import os
+from multiprocessing.connection import Connection
+from typing import List
+
+import torch
+
+from services.bst import HandcraftedBST
+from services.policy.rl.batched_training import BatchedDialogTrainer
+from services.policy.rl.dqnpolicy import DQNPolicy
+from services.simulator import HandcraftedUserSimulator
+from services.stats.evaluation import PolicyEvaluator
+from utils import common
+from utils.domain.jsonlookupdomain import JSONLookupDomain
+from utils.logger import DiasysLogger, LogLevel
+
+
+class _TransitionRecorder(object):
+    """ Stands in for the experience replay buffer of a rollout worker's policy.
+
+    Records all calls to `store` (with states converted to numpy arrays) so they can be sent to the learner,
+    which replays them into its own buffer. Reports a length of 0, so the worker's policy never trains.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def store(self, state: torch.FloatTensor, action: int, reward: float, terminal: bool = False):
+        self.calls.append((None if state is None else state.numpy().copy(), action, reward, terminal))
+
+    def pop(self) -> list:
+        """ Returns all recorded calls and clears the record """
+        calls, self.calls = self.calls, []
+        return calls
+
+    def __len__(self):
+        return 0
+
+
+def _rollout_worker(worker_idx: int, seed: int, domain_name: str, policy_kwargs: dict, num_parallel: int,
+                    conn: Connection):
+    """ Main function of a rollout worker process.
+
+    Runs dialogs between its own user simulator, belief state tracker and policy snapshot on request
+    of the learner and sends back the recorded transitions and dialog statistics.
+
+    Args:
+        worker_idx (int): index of this worker
+        seed (int): seed for this worker's random generators (`None` for a random seed)
+        domain_name (str): name of the `JSONLookupDomain` to simulate dialogs in
+        policy_kwargs (dict): keyword arguments for creating the policy snapshot (`DQNPolicy`)
+        num_parallel (int): number of dialogs simulated in lockstep (see `BatchedDialogTrainer`)
+        conn (Connection): pipe to the learner
+    """
+    torch.set_num_threads(1)
+    common.GLOBAL_SEED = None  # forked workers inherit the learner's seed
+    common.init_random(seed)
+
+    logger = DiasysLogger(console_log_lvl=LogLevel.NONE, file_log_lvl=LogLevel.NONE)
+    domain = JSONLookupDomain(domain_name)
+    user = HandcraftedUserSimulator(domain, logger=logger)
+    bst = HandcraftedBST(domain=domain, logger=logger)
+    policy = DQNPolicy(domain=domain, logger=logger, **policy_kwargs)
+    evaluator = PolicyEvaluator(domain=domain, logger=logger)
+    recorder = _TransitionRecorder()
+    policy.buffer = recorder
+    trainer = BatchedDialogTrainer(user, bst, policy, evaluator, num_parallel=num_parallel)
+
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+        num_dialogs, is_training, model_state, cumulative_train_dialogs = request
+        policy.model.load_state_dict(model_state)
+        if is_training:
+            policy.train()
+            evaluator.train()
+        else:
+            policy.eval()
+            evaluator.eval()
+        policy.cumulative_train_dialogs = cumulative_train_dialogs
+        evaluator.start_epoch()
+        trainer.run_dialogs(num_dialogs)
+        if is_training:
+            stats = (evaluator.train_rewards, evaluator.train_success, evaluator.train_turns)
+        else:
+            stats = (evaluator.eval_rewards, evaluator.eval_success, evaluator.eval_turns)
+        conn.send((recorder.pop(), stats))
+    conn.close()
+
+
+class RolloutManager(object):
+    """ Simulates the dialogs for training / evaluating a `DQNPolicy` in several worker processes.
+
+    Each worker owns a user simulator, a belief state tracker and a snapshot of the policy and runs
+    its share of the dialogs in lockstep (see `BatchedDialogTrainer`).
+    Workers are seeded deterministically (from the seed given to `utils.common.init_random`).
+
+    While training, dialogs are run in rounds of `sync_dialogs` dialogs per worker.
+    The transitions of each round are sent back to the learner (the policy given to the constructor),
+    which stores them in its experience replay buffer and trains on them just as if the dialogs had run
+    locally (worker by worker, in order), while the workers already simulate the next round.
+    The learner pushes its current weights to the workers at the start of every round, so the
+    workers act with weights lagging behind by at most one round.
+    """
+
+    def __init__(self, domain_name: str, policy: DQNPolicy, num_workers: int = None, policy_kwargs: dict = None,
+                 parallel_dialogs: int = 8, sync_dialogs: int = 25):
+        """
+        Args:
+            domain_name (str): name of the `JSONLookupDomain` to simulate dialogs in
+            policy (DQNPolicy): the learner
+            num_workers (int): number of worker processes (defaults to the number of cores)
+            policy_kwargs (dict): keyword arguments for creating the workers' policy snapshots;
+                                  have to result in the same network architecture and action space as the learner
+            parallel_dialogs (int): number of dialogs each worker simulates in lockstep
+            sync_dialogs (int): number of dialogs each worker simulates between two weight updates while training
+        """
+        self.policy = policy
+        self.num_workers = num_workers if num_workers else os.cpu_count()
+        self.sync_dialogs = sync_dialogs
+        self._connections = []
+        self._workers = []
+
+        base_seed = common.GLOBAL_SEED
+        ctx = multiprocessing.get_context('spawn')
+        for worker_idx in range(self.num_workers):
+            conn, worker_conn = ctx.Pipe()
+            seed = None if base_seed is None else (int(base_seed) + worker_idx + 1) % 2**32
+            worker = ctx.Process(target=_rollout_worker, daemon=True,
+                                 args=(worker_idx, seed, domain_name, policy_kwargs or {}, parallel_dialogs,
+                                       worker_conn))
+            worker.start()
+            self._connections.append(conn)
+            self._workers.append(worker)
+
+    def run_dialogs(self, num_dialogs: int, evaluator: PolicyEvaluator = None):
+        """ Runs the given number of dialogs on all workers (blocking).
+            Trains the policy if it is in training mode.
+
+        Args:
+            num_dialogs (int): number of dialogs to run
+            evaluator (PolicyEvaluator): if given, the statistics of all dialogs are added to it
+        """
+        is_training = self.policy.is_training
+        round_size = self.sync_dialogs if is_training else -(-num_dialogs // self.num_workers)
+        rounds = []
+        while num_dialogs > 0:
+            shares = [min(round_size, max(0, num_dialogs - worker_idx * round_size))
+                      for worker_idx in range(self.num_workers)]
+            rounds.append(shares)
+            num_dialogs -= sum(shares)
+
+        if rounds:
+            self._request(rounds[0], is_training)
+        for round_idx in range(len(rounds)):
+            results = [conn.recv() if share > 0 else ([], ([], [], []))
+                       for conn, share in zip(self._connections, rounds[round_idx])]
+            if round_idx + 1 < len(rounds):
+                # let the workers simulate the next round while the learner trains
+                self._request(rounds[round_idx + 1], is_training)
+            for calls, stats in results:
+                if is_training:
+                    self._learn(calls)
+                if evaluator is not None:
+                    self._add_stats(evaluator, is_training, *stats)
+
+    def _request(self, shares: List[int], is_training: bool):
+        """ Sends the current weights and the number of dialogs to run to all workers """
+        model_state = {key: value.cpu() for key, value in self.policy.model.state_dict().items()}
+        for conn, share in zip(self._connections, shares):
+            if share > 0:
+                conn.send((share, is_training, model_state, self.policy.cumulative_train_dialogs))
+
+    def _learn(self, calls: list):
+        """ Stores the transitions recorded by a worker in the learner's buffer, training after each dialog
+            (see `DQNPolicy.dialog_end`) """
+        policy = self.policy
+        for state, action, reward, terminal in calls:
+            if state is not None:
+                state = torch.from_numpy(state).to(policy.device)
+            policy.buffer.store(state, action, reward, terminal=terminal)
+            if terminal:
+                policy.cumulative_train_dialogs += 1
+                if policy.cumulative_train_dialogs == 0 and policy.target_model is not None:
+                    # start with same weights for target and online net
+                    policy.target_model.load_state_dict(policy.model.state_dict())
+                policy.total_train_dialogs += 1
+                policy.train_batch()
+
+    def _add_stats(self, evaluator: PolicyEvaluator, is_training: bool, rewards: List[float],
+                   success: List[int], turns: List[int]):
+        """ Adds the statistics of dialogs run by a worker to the evaluator """
+        if is_training:
+            evaluator.total_train_dialogs += len(rewards)
+            evaluator.epoch_train_dialogs += len(rewards)
+            evaluator.train_rewards.extend(rewards)
+            evaluator.train_success.extend(success)
+            evaluator.train_turns.extend(turns)
+        else:
+            evaluator.total_eval_dialogs += len(rewards)
+            evaluator.epoch_eval_dialogs += len(rewards)
+            evaluator.eval_rewards.extend(rewards)
+            evaluator.eval_success.extend(success)
+            evaluator.eval_turns.extend(turns)
+
+    def shutdown(self):
+        """ Stops all worker processes """
+        for conn in self._connections:
+            conn.send(None)
+        for worker in self._workers:
+            worker.join()
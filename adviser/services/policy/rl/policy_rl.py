@@ -18,10 +18,12 @@
 ###############################################################################
 
 import random
+from typing import List
 
 import torch
 
 from services.policy.rl.experience_buffer import UniformBuffer
+from services.policy.rl.featurizer import BeliefStateFeaturizer
 from services.simulator.goal import Goal
 from services.stats.evaluation import ObjectiveReachedEvaluator
 from utils import common
@@ -29,7 +31,6 @@ from utils.beliefstate import BeliefState
 from utils.domain.jsonlookupdomain import JSONLookupDomain
 from utils.logger import DiasysLogger
 from utils.sysact import SysAct, SysActionType
-from utils.useract import UserActionType
 
 
 class RLPolicy(object):
@@ -98,8 +99,8 @@ class RLPolicy(object):
         self.writer = None
 
         # get state size
-        self.state_dim = self.beliefstate_dict_to_vector(
-            BeliefState(domain)._init_beliefstate()).size(1)
+        self.featurizer = BeliefStateFeaturizer(domain)
+        self.state_dim = self.featurizer.state_dim
         self.logger.info("state space dim: " + str(self.state_dim))
 
         # get system action list
@@ -132,6 +133,8 @@ class RLPolicy(object):
         self.sys_state = {}
 
         self.last_sys_act = None
+        # (state, action, reward) of each system turn in the current dialog, stored in the buffer when it ends
+        self.episode = []
 
     def action_name(self, action_idx: int):
         """ Returns the action name for the specified action index """
@@ -151,47 +154,19 @@ class RLPolicy(object):
             belief tensor with dimension 1 x state_dim
         """
 
-        belief_vec = []
-
-        # add user acts
-        belief_vec += [1 if act in beliefstate['user_acts'] else 0 for act in UserActionType]
-        # handle none actions
-        belief_vec.append(1 if sum(belief_vec) == 0 else 1)
-
-        # add informs (including special flag if slot not mentioned)
-        for slot in sorted(self.domain.get_informable_slots()):
-            values = self.domain.get_possible_values(slot) + ["dontcare"]
-            if slot not in beliefstate['informs']:
-                # add **NONE** value first, then 0.0 for all others
-                belief_vec.append(1.0)
-                # also add value for don't care
-                belief_vec += [0 for i in range(len(values))]
-            else:
-                # add **NONE** value first
-                belief_vec.append(0.0)
-                bs_slot = beliefstate['informs'][slot]
-                belief_vec += [bs_slot[value] if value in bs_slot else 0.0 for value in values]
-
-        # add requests
-        for slot in sorted(self.domain.get_requestable_slots()):
-            if slot in beliefstate['requests']:
-                belief_vec.append(1.0)
-            else:
-                belief_vec.append(0.0)
-
-        # append system features
-        belief_vec.append(float(self.sys_state['lastActionInformNone']))
-        belief_vec.append(float(self.sys_state['offerHappened']))
-        candidate_count = beliefstate['num_matches']
-        # buckets for match count: 0, 1, 2-4, >4
-        belief_vec.append(float(candidate_count == 0))
-        belief_vec.append(float(candidate_count == 1))
-        belief_vec.append(float(2 <= candidate_count <= 4))
-        belief_vec.append(float(candidate_count > 4))
-        belief_vec.append(float(beliefstate["discriminable"]))
-
-        # convert to torch tensor
-        return torch.tensor([belief_vec], dtype=torch.float, device=self.device)
+        return self.featurizer.featurize(beliefstate, self.sys_state, self.device)
+
+    def beliefstates_to_batch(self, beliefstates: List[BeliefState], sys_states: List[dict]):
+        """ Converts several beliefstates to one torch tensor (see `beliefstate_dict_to_vector`)
+
+        Args:
+            beliefstates: belief states of several dialogs
+            sys_states: system state (`self.sys_state`) of the dialog each belief state belongs to
+
+        Returns:
+            belief tensor with dimension len(beliefstates) x state_dim
+        """
+        return self.featurizer.featurize_batch(beliefstates, sys_states, self.device)
 
     def _remove_dontcare_slots(self, slot_value_dict: dict):
         """ Returns a new dictionary without the slots set to dontcare """
@@ -238,7 +213,7 @@ class RLPolicy(object):
         constraints = beliefstate.get_most_probable_inf_beliefs(consider_NONE=True, threshold=0.7,
                                                                 max_results=1)
 
-        db_matches = self.domain.find_entities(constraints, requested_slots=constraints)
+        db_matches = self.domain.query_entities(constraints, requested_slots=constraints)
         if not db_matches:
             # no matching entity found -> return inform with primary key=none
             # and other constraints
@@ -253,14 +228,18 @@ class RLPolicy(object):
         else:
             # match found -> return its name
             # if > 1 match and matches contain last informed entity,
-            # stick to this
-            match = [db_match for db_match in db_matches
-                     if db_match[self.primary_key] ==
-                     self.sys_state['lastInformedPrimKeyVal']]
+            # stick to this (only the entities with its primary key are fetched)
+            last_informed = self.sys_state['lastInformedPrimKeyVal']
+            match = []
+            if last_informed is not None and constraints.get(self.primary_key, last_informed) == last_informed:
+                match = [db_match for db_match in self.domain.query_entities(
+                            {**constraints, self.primary_key: last_informed},
+                            requested_slots=constraints).first(2)
+                         if db_match[self.primary_key] == last_informed]
             if not match:
                 # none matches last informed venue -> pick first result
                 # match = db_matches[0]
-                match = common.random.choice(db_matches)
+                match = db_matches.sample(1, common.random)[0]
             else:
                 assert len(match) == 1
                 match = match[0]
@@ -343,13 +322,13 @@ class RLPolicy(object):
         constraints = beliefstate.get_most_probable_inf_beliefs(consider_NONE=True, threshold=0.7,
                                                                 max_results=1)
 
-        db_matches = self.domain.find_entities({**constraints, self.primary_key: primkeyval})
+        db_matches = self.domain.query_entities({**constraints, self.primary_key: primkeyval})
         # NOTE usually not needed to give all constraints (shouldn't make a difference)
         if not db_matches:
             # select random entity if none could be found
             primkeyvals = self.domain.get_possible_values(self.primary_key)
             primkeyval = common.random.choice(primkeyvals)
-            db_matches = self.domain.find_entities(
+            db_matches = self.domain.query_entities(
                 constraints, self.domain.get_requestable_slots())
             # use knowledge from current belief state
 
@@ -364,7 +343,7 @@ class RLPolicy(object):
             return act
 
         # select random match
-        db_match = common.random.choice(db_matches)
+        db_match = db_matches.sample(1, common.random)[0]
         db_match = self.domain.find_info_about_entity(
             db_match[self.primary_key], requested_slots=self.domain.get_requestable_slots())[0]
 
@@ -412,8 +391,8 @@ class RLPolicy(object):
         candidates = beliefstate.get_most_probable_inf_beliefs(consider_NONE=True, threshold=0.7,
                                                                max_results=1)
         filtered_slot_values = self._remove_dontcare_slots(candidates)
-        # query db by constraints
-        db_matches = self.domain.find_entities(candidates)
+        # query db by constraints (the entities are streamed until one was not informed yet)
+        db_matches = self.domain.query_entities(candidates)
         if not db_matches:
             # no results found
             for slot in common.numpy.random.choice(
@@ -529,7 +508,7 @@ class RLPolicy(object):
         turn_reward = self.evaluator.get_turn_reward()
 
         if self.is_training:
-            self.buffer.store(state_vector, sys_act_idx, turn_reward, terminal=False)
+            self.episode.append((state_vector, sys_act_idx, turn_reward))
 
     def _expand_hello(self):
         """ Call this function when a dialog begins """
@@ -542,7 +521,13 @@ class RLPolicy(object):
         return {'sys_act': hello_action}
 
     def end_dialog(self, sim_goal: Goal):
-        """ Call this function when a dialog ended """
+        """ Call this function when a dialog ended.
+            Stores the transitions of the dialog in the experience replay buffer all at once, so that
+            the buffer sees whole trajectories even if several dialogs run concurrently. """
+        for state_vector, sys_act_idx, turn_reward in self.episode:
+            self.buffer.store(state_vector, sys_act_idx, turn_reward, terminal=False)
+        self.episode = []
+
         if sim_goal is None:
             # real user interaction, no simulator - don't have to evaluate
             # anything, just reset counters
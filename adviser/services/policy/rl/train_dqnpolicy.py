@@ -27,6 +27,7 @@
 import os
 import sys
 import argparse
+import time
 
 def get_root_dir():
     return os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -34,11 +35,13 @@ def get_root_dir():
 
 sys.path.append(get_root_dir())
 
-from services.policy.rl.experience_buffer import NaivePrioritizedBuffer, UniformBuffer
+from services.policy.rl.batched_training import BatchedDialogTrainer
+from services.policy.rl.experience_buffer import NaivePrioritizedBuffer, SumTreePrioritizedBuffer, UniformBuffer
+from services.policy.rl.parallel_rollouts import RolloutManager
 
 from services.bst import HandcraftedBST
 from services.simulator import HandcraftedUserSimulator
-from services.policy import DQNPolicy
+from services.policy.rl.dqnpolicy import DQNPolicy
 from services.stats.evaluation import PolicyEvaluator
 from utils.domain.jsonlookupdomain import JSONLookupDomain
 from utils import DiasysLogger, LogLevel
@@ -52,7 +55,7 @@ from utils import common
 def train(domain_name: str, log_to_file: bool, seed: int, train_epochs: int, train_dialogs: int,
           eval_dialogs: int, max_turns: int, train_error_rate: float, test_error_rate: float,
           lr: float, eps_start: float, grad_clipping: float, buffer_classname: str,
-          buffer_size: int, use_tensorboard: bool):
+          buffer_size: int, use_tensorboard: bool, parallel_dialogs: int = 0, workers: int = 0):
 
     """
         Training loop for the RL policy, for information on the parameters, look at the descriptions
@@ -68,6 +71,8 @@ def train(domain_name: str, log_to_file: bool, seed: int, train_epochs: int, tra
     
     if buffer_classname == "prioritized":
         buffer_cls = NaivePrioritizedBuffer
+    elif buffer_classname == "sumtree":
+        buffer_cls = SumTreePrioritizedBuffer
     elif buffer_classname == "uniform":
         buffer_cls = UniformBuffer
 
@@ -84,23 +89,42 @@ def train(domain_name: str, log_to_file: bool, seed: int, train_epochs: int, tra
     evaluator = PolicyEvaluator(domain=domain, use_tensorboard=use_tensorboard,
                                 experiment_name=domain_name, logger=logger,
                                 summary_writer=summary_writer)
-    ds = DialogSystem(services=[user, bst, policy, evaluator], protocol='tcp')
-    # ds.draw_system_graph()
-
-    error_free = ds.is_error_free_messaging_pipeline()
-    if not error_free:
-        ds.print_inconsistencies()
+    if workers > 0:
+        # simulate dialogs in worker processes
+        rollouts = RolloutManager(domain_name, policy, num_workers=workers,
+                                  policy_kwargs=dict(eps_start=eps_start, train_dialogs=train_dialogs),
+                                  parallel_dialogs=max(parallel_dialogs, 1))
+    elif parallel_dialogs > 0:
+        # step dialogs in lockstep without message bus
+        trainer = BatchedDialogTrainer(user, bst, policy, evaluator, num_parallel=parallel_dialogs)
+    else:
+        ds = DialogSystem(services=[user, bst, policy, evaluator], protocol='tcp')
+        # ds.draw_system_graph()
+
+        error_free = ds.is_error_free_messaging_pipeline()
+        if not error_free:
+            ds.print_inconsistencies()
+
+    def run_dialogs(num_dialogs: int, print_progress: bool = False):
+        if workers > 0:
+            rollouts.run_dialogs(num_dialogs, evaluator)
+            return
+        if parallel_dialogs > 0:
+            trainer.run_dialogs(num_dialogs)
+            return
+        for episode in range(num_dialogs):
+            if print_progress and episode % 100 == 0:
+                print("DIALOG", episode)
+            logger.dialog_turn("\n\n!!!!!!!!!!!!!!!! NEW DIALOG !!!!!!!!!!!!!!!!!!!!!!!!!!!!\n\n")
+            ds.run_dialog(start_signals={f'user_acts/{domain.get_domain_name()}': []})
 
+    start_time = time.time()
     for j in range(train_epochs):
         # START TRAIN EPOCH
         evaluator.train()
         policy.train()
         evaluator.start_epoch()
-        for episode in range(train_dialogs):
-            if episode % 100 == 0:
-                print("DIALOG", episode)
-            logger.dialog_turn("\n\n!!!!!!!!!!!!!!!! NEW DIALOG !!!!!!!!!!!!!!!!!!!!!!!!!!!!\n\n")
-            ds.run_dialog(start_signals={f'user_acts/{domain.get_domain_name()}': []})
+        run_dialogs(train_dialogs, print_progress=True)
         evaluator.end_epoch()
         policy.save()
 
@@ -108,11 +132,14 @@ def train(domain_name: str, log_to_file: bool, seed: int, train_epochs: int, tra
         evaluator.eval()
         policy.eval()
         evaluator.start_epoch()
-        for episode in range(eval_dialogs):
-            logger.dialog_turn("\n\n!!!!!!!!!!!!!!!! NEW DIALOG !!!!!!!!!!!!!!!!!!!!!!!!!!!!\n\n")
-            ds.run_dialog(start_signals={f'user_acts/{domain.get_domain_name()}': []})
+        run_dialogs(eval_dialogs)
         evaluator.end_epoch()
-    ds.shutdown()
+    total_dialogs = train_epochs * (train_dialogs + eval_dialogs)
+    logger.result(f"# {total_dialogs / (time.time() - start_time):.1f} dialogs/sec")
+    if workers > 0:
+        rollouts.shutdown()
+    elif parallel_dialogs == 0:
+        ds.shutdown()
 
 
 if __name__ == "__main__":
@@ -152,10 +179,15 @@ if __name__ == "__main__":
     parser.add_argument("-cg", "--clipgrad", type=float, default=0.0,
                         help="upper bound gradient is going to be clipped to")
 
-    parser.add_argument("-bn", "--buffername", choices=['uniform', 'prioritized'],
+    parser.add_argument("-bn", "--buffername", choices=['uniform', 'prioritized', 'sumtree'],
                         help="experience replay buffer type", default='prioritized')
     parser.add_argument("-bs", "--buffersize", type=int, default=8192,
                         help="capacity of experience replay buffer")
+    parser.add_argument("-pd", "--paralleldialogs", type=int, default=0,
+                        help="number of dialogs simulated in lockstep without message bus "
+                             "(0: run dialogs one after another on a DialogSystem)")
+    parser.add_argument("-w", "--workers", type=int, default=0,
+                        help="number of worker processes simulating dialogs (0: simulate in this process)")
     args = parser.parse_args()
     assert 0 <= args.epsilon <= 1, "exploration rate has to be between 0 and 1"
 
@@ -167,5 +199,5 @@ if __name__ == "__main__":
           train_dialogs=args.traindialogs, eval_dialogs=args.evaldialogs, max_turns=args.maxturns,
           train_error_rate=args.trainerror, test_error_rate=args.evalerror, lr=args.learningrate,
           eps_start=args.epsilon, grad_clipping=args.clipgrad, buffer_classname=args.buffername,
-          buffer_size=args.buffersize
+          buffer_size=args.buffersize, parallel_dialogs=args.paralleldialogs, workers=args.workers
           )
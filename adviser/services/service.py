@@ -17,26 +17,38 @@
 #
 ############################################################################################
 
+import asyncio
 import copy
 import datetime
 import inspect
+import itertools
 import pickle
+import queue
 import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
 from threading import Thread
-from typing import List, Dict, Union, Iterable, Any
+from typing import List, Dict, Union, Iterable, Any, Hashable, Tuple, Optional
 import platform
 
 import zmq
+import zmq.asyncio
 from zmq import Context, Socket
 from zmq.devices import ThreadProxy, ProcessProxy
 
+from services import codec
+from services.asyncio_runtime import AsyncioRuntime
 from utils.domain.domain import Domain
 from utils.logger import DiasysLogger
-from utils.topics import Topic
+from utils.topics import Topic, TopicTrie
 
+# seconds to wait for an answer to a readiness probe before probing again
+_PROBE_INTERVAL = 0.01
 
-def _send_msg(pub_channel: Socket, topic: str, content: Any):
+
+def _send_msg(pub_channel: Socket, topic: str, content: Any, session_id: Hashable = None):
     """ Serializes message, appends current timespamp and sends it over the specified channel to the specified topic.
         Use this function for all internal message passing.
 
@@ -44,10 +56,36 @@ def _send_msg(pub_channel: Socket, topic: str, content: Any):
         pub_channel (Socket): publisher socket
         topic (str): topic to publish to
         content (Any): message content
+        session_id (Hashable): id of the dialog session the message belongs to
+                               (`None` for messages outside of multi-session mode)
      """
     timestamp = datetime.datetime.now().timestamp()  # current timestamp as POSIX float
-    data = pickle.dumps((timestamp, content))
-    pub_channel.send_multipart((bytes(topic, encoding="ascii"), data))
+    frames = codec.encode((timestamp, session_id, content))
+    pub_channel.send_multipart([bytes(topic, encoding="ascii")] + frames, copy=False)
+
+
+def _recv_msg(sub_channel: Socket) -> Tuple[str, float, Hashable, Any]:
+    """ Blocks until a message is received via the specified subscriber channel and deserializes it.
+        Counterpart of `_send_msg`.
+
+    Args:
+        sub_channel (Socket): subscriber socket
+
+    Returns:
+        A tuple (topic, timestamp, session id, content)
+    """
+    return _decode_msg(sub_channel.recv_multipart(copy=False))
+
+
+def _decode_msg(frames: List[zmq.Frame]) -> Tuple[str, float, Hashable, Any]:
+    """ Deserializes a message received (without copying) as multipart frames.
+
+    Returns:
+        A tuple (topic, timestamp, session id, content)
+    """
+    topic = frames[0].bytes.decode("ascii")
+    timestamp, session_id, content = codec.decode([frame.buffer for frame in frames[1:]])
+    return topic, timestamp, session_id, content
 
 
 def _send_ack(pub_channel: Socket, topic: str, content: bool = True):
@@ -71,14 +109,98 @@ def _recv_ack(sub_channel: Socket, topic: str, expected_content: bool = True):
         topic (str): topic to listen for ACK's
         expected_content (bool): are we expecting `True` (ACK) or `False` (NACK)
     """
-    ack_topic = topic if topic.startswith("ACK/") else f"ACK/{topic}"
-    while True:
-        msg = sub_channel.recv_multipart(copy=True)
-        recv_topic = msg[0].decode("ascii")
-        content = pickle.loads(msg[1])[1]  # pickle.loads(msg) -> tuple(timestamp, content) -> return content
-        if recv_topic == ack_topic:
-            if content == expected_content:
-                return
+    _recv_acks(sub_channel, [topic], expected_content)
+
+
+def _recv_acks(sub_channel: Socket, topics: List[str], expected_content: bool = True,
+               timeout: float = None) -> List[str]:
+    """ Blocks until acknowledge-messages for all specified topics with the expected content are received via the
+        specified subscriber channel (in any order), or until the timeout passed.
+
+    Args:
+        sub_channel (Socket): subscriber socket
+        topics (List[str]): topics to listen for ACK's
+        expected_content (bool): are we expecting `True` (ACK) or `False` (NACK)
+        timeout (float): maximum time in seconds to wait for all ACK's (`None` waits forever)
+
+    Returns:
+        (List[str]): the topics no ACK was received for before the timeout passed (empty if all ACK'ed)
+    """
+    pending = {(topic if topic.startswith("ACK/") else f"ACK/{topic}"): topic for topic in topics}
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while pending:
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not sub_channel.poll(int(remaining * 1000) + 1):
+                break
+        recv_topic, _, _, content = _recv_msg(sub_channel)
+        if recv_topic in pending and content == expected_content:
+            del pending[recv_topic]
+    return list(pending.values())
+
+
+class _MessageCollector:
+    """ Collects the messages received for one subscriber function until there is a value for each
+        subscribed topic (keeping only the newest value for `sub_topics` and all values for `queued_sub_topics`).
+    """
+
+    def __init__(self, topics: List[str], queued_topics: List[str], timestamp_enabled: bool,
+                 router: TopicTrie = None):
+        self.topics = topics
+        self.queued_topics = queued_topics
+        self.all_sub_topics = topics + queued_topics
+        self.timestamp_enabled = timestamp_enabled
+        # maps received topics to argument names (compiled once, shared by all collectors of a function)
+        self.router = router if router is not None else TopicTrie(self.all_sub_topics)
+        self.reset()
+
+    def reset(self):
+        """ Discards all collected values """
+        self.values = {}
+        self.timestamps = {}
+
+    def new(self) -> '_MessageCollector':
+        """ Returns an empty collector for the same topics """
+        return _MessageCollector(self.topics, self.queued_topics, self.timestamp_enabled, self.router)
+
+    def add(self, topic: str, timestamp: float, content: Any) -> Optional[Dict[str, Any]]:
+        """ Adds a received message.
+
+        Args:
+            topic (str): topic (including domain suffix) the message was published to
+            timestamp (float): time the message was sent
+            content (Any): message content
+
+        Returns:
+            The complete set of function arguments, if there is a value for each subscribed topic now
+            (the collector is reset in this case), else `None`
+        """
+        # problem: routing based on prefixes -> function argument names may differ
+        # solution: find longest common prefix of argument name and received topic
+        common_prefix = self.router.longest_prefix(topic)
+        if common_prefix is None:
+            return None  # not subscribed to
+        if common_prefix in self.topics:
+            # store only latest value
+            self.values[common_prefix] = content  # set value for received topic
+            self.timestamps[common_prefix] = timestamp  # set timestamp for received value
+        else:
+            # topic is a queued_topic - queue all values and their timestamps
+            if not common_prefix in self.values:
+                self.values[common_prefix] = []
+                self.timestamps[common_prefix] = []
+            self.values[common_prefix].append(content)
+            self.timestamps[common_prefix].append(timestamp)
+
+        if len(self.values) < len(self.all_sub_topics):
+            return None
+        # received a new value for each topic -> hand out complete set of values and start collecting again
+        values = self.values
+        if self.timestamp_enabled:
+            # append timestamps, if required
+            values['timestamps'] = self.timestamps
+        self.reset()
+        return values
 
 
 class RemoteService:
@@ -109,8 +231,19 @@ class Service:
 
     Note: A `Service` will only start listening to messages once it is added to a `DialogSystem` 
           (or calling `run_standalone()` in the remote case and adding a corresponding `RemoteService` to the `DialogSystem`).
+
+    Multi-session mode:
+        A `DialogSystem` can multiplex several concurrent dialogs (sessions) through one service graph
+        (see `DialogSystem.start_session`). List all instance attributes holding dialog-level state in
+        `session_attributes`: each session gets its own copy of them, which is swapped in whenever
+        a subscriber function, `dialog_start` or `dialog_end` is called for that session.
+        Each session starts from a shallow copy of the attribute values at registration time,
+        so `dialog_start` should re-assign (not mutate in place) mutable dialog-level attributes.
     """
 
+    # names of instance attributes that hold dialog-level state (see multi-session mode above)
+    session_attributes: Tuple[str, ...] = ()
+
     def __init__(self, domain: Union[str, Domain] = "", sub_topic_domains: Dict[str, str] = {}, pub_topic_domains: Dict[str, str] = {},
                  ds_host_addr: str = "127.0.0.1", sub_port: int = 64000, pub_port: int = 64001, protocol: str = "tcp",
                  debug_logger: DiasysLogger = None, identifier: str = None):
@@ -159,32 +292,86 @@ class Service:
         self._sub_topics = set()
         self._pub_topics = set()
         self._publish_sockets = dict()
+        self._bus = None  # set if running on a `DialogSystem` with transport 'direct'
+        self._runtime = None  # set if running on the asyncio runtime
+        self._async_collectors = dict()  # listener -> collector (asyncio runtime only)
+        self._async_active = False  # listeners accept messages outside of multi-session mode (asyncio runtime only)
 
         self._internal_start_topics = dict()
         self._internal_end_topics = dict()
         self._internal_terminate_topics = dict()
+        self._internal_ready_topics = dict()
 
         # NOTE: class name + memory pointer make topic unique (required, e.g. for running mutliple instances of same module!)
         self._start_topic = f"{type(self).__name__}/{id(self)}/START"
         self._end_topic = f"{type(self).__name__}/{id(self)}/END"
         self._terminate_topic = f"{type(self).__name__}/{id(self)}/TERMINATE"
+        self._ready_topic = f"{type(self).__name__}/{id(self)}/READY"
         self._train_topic = f"{type(self).__name__}/{id(self)}/TRAIN"
         self._eval_topic = f"{type(self).__name__}/{id(self)}/EVAL"
+        self._session_start_topic = f"{type(self).__name__}/{id(self)}/SESSION_START"
+        self._session_end_topic = f"{type(self).__name__}/{id(self)}/SESSION_END"
+
+        # multi-session state: session id -> {attribute name -> value} / {listener -> collected messages}
+        self._session_states = dict()
+        self._session_buffers = dict()
+        self._session_defaults = None
+        self._session_lock = threading.RLock()
+        self._session_local = threading.local()
+
+    def _init_pubsub(self, bus: '_DirectBus' = None, runtime: AsyncioRuntime = None):
+        """ Search for all functions decorated with the `PublishSubscribe` decorator and call the setup methods for them
 
-    def _init_pubsub(self): 
-        """ Search for all functions decorated with the `PublishSubscribe` decorator and call the setup methods for them """
+        Args:
+            bus (_DirectBus): if given, connect the functions to this in-process bus instead of setting up sockets
+            runtime (AsyncioRuntime): if given, run the listeners on this runtime's event loop instead of in threads
+        """
+        self._bus = bus
+        self._runtime = runtime
         for func_name in dir(self):
             func_inst = getattr(self, func_name)
             if hasattr(func_inst, "pubsub"):
                 # found decorated publisher / subscriber function -> setup sockets and listeners
-                self._setup_listener(func_inst, getattr(func_inst, "sub_topics"),
-                                     getattr(func_inst, 'queued_sub_topics'))
+                if bus is None:
+                    self._setup_listener(func_inst, getattr(func_inst, "sub_topics"),
+                                         getattr(func_inst, 'queued_sub_topics'))
+                else:
+                    self._setup_direct_listener(func_inst, getattr(func_inst, "sub_topics"),
+                                                getattr(func_inst, 'queued_sub_topics'))
                 self._setup_publishers(func_inst, getattr(func_inst, "pub_topics"))
 
     def _register_with_dialogsystem(self):
         """ Start listening to dialog system control channel messages """
+        # remember initial values of dialog-level attributes - every new session starts from these
+        self._session_defaults = {attr: getattr(self, attr, None) for attr in self.session_attributes}
+        if self._bus is not None:
+            return  # the dialog system calls the control functions directly
         self._setup_dialog_ctrl_msg_listener()
-        Thread(target=self._control_channel_listener).start()
+        if self._runtime is not None:
+            self._runtime.spawn(self._async_control_channel_listener())
+        else:
+            Thread(target=self._control_channel_listener).start()
+
+    def _get_sub_topic_domain_str(self, topic: str) -> str:
+        """ Returns the subscription string (topic with domain suffix) for a subscribed topic """
+        topic_domain_str = f"{topic}/{self._domain_name}" if self._domain_name else topic
+        if topic in self._sub_topic_domains:
+            # overwrite domain for this specific topic and service instance
+            topic_domain_str = f"{topic}/{self._sub_topic_domains[topic]}" if self._sub_topic_domains[topic] else topic
+        return topic_domain_str
+
+    def _get_pub_topic_domain_str(self, topic: str, domain: str = "") -> str:
+        """ Returns the topic string (topic with domain suffix) a message for a published topic is sent to
+
+        Args:
+            topic (str): the published topic
+            domain (str): domain suffix used if this service has no domain (e.g. given in a function's return keys)
+        """
+        domain = self._domain_name if self._domain_name else domain
+        topic_domain_str = f"{topic}/{domain}" if domain else topic
+        if topic in self._pub_topic_domains:
+            topic_domain_str = f"{topic}/{self._pub_topic_domains[topic]}" if self._pub_topic_domains[topic] else topic
+        return topic_domain_str
 
     def _setup_listener(self, func_instance, topics: List[str], queued_topics: List[str]):
         """
@@ -206,37 +393,69 @@ class Service:
         subscriber = ctx.socket(zmq.SUB)
         # subscribe to all listed topics
         for topic in topics + queued_topics:
-            topic_domain_str = f"{topic}/{self._domain_name}" if self._domain_name else topic
-            if topic in self._sub_topic_domains:
-                # overwrite domain for this specific topic and service instance
-                topic_domain_str = f"{topic}/{self._sub_topic_domains[topic]}" if self._sub_topic_domains[topic] else topic
-            subscriber.setsockopt(zmq.SUBSCRIBE, bytes(topic_domain_str, encoding="ascii"))
+            subscriber.setsockopt(zmq.SUBSCRIBE, bytes(self._get_sub_topic_domain_str(topic), encoding="ascii"))
         # subscribe to control channels
         subscriber.setsockopt(zmq.SUBSCRIBE, bytes(f"{func_instance}/START", encoding="ascii"))
         subscriber.setsockopt(zmq.SUBSCRIBE, bytes(f"{func_instance}/END", encoding="ascii"))
         subscriber.setsockopt(zmq.SUBSCRIBE, bytes(f"{func_instance}/TERMINATE", encoding="ascii"))
+        subscriber.setsockopt(zmq.SUBSCRIBE, bytes(f"{func_instance}/READY", encoding="ascii"))
         subscriber.connect(f"{self._protocol}://{self._host_addr}:{self._sub_port}")
         self._internal_start_topics[f"{str(func_instance)}/START"] = str(func_instance)
         self._internal_end_topics[f"{str(func_instance)}/END"] = str(func_instance)
         self._internal_terminate_topics[f"{str(func_instance)}/TERMINATE"] = str(func_instance)
+        self._internal_ready_topics[f"{str(func_instance)}/READY"] = str(func_instance)
+
+        if self._runtime is not None:
+            # run as coroutine on the shared event loop (started / stopped by the control channel coroutine)
+            self._async_collectors[func_instance] = _MessageCollector(topics, queued_topics,
+                                                                      func_instance.timestamp_enabled)
+            self._runtime.spawn(self._async_receiver(subscriber, func_instance, f"{str(func_instance)}/READY"),
+                                owner=self)
+            self._sub_topics.update(topics + queued_topics)
+            return
 
         # register and run listener thread
         listener_thread = Thread(target=self._receiver_thread, args=(subscriber, func_instance,
                                                                      topics, queued_topics,
                                                                      f"{str(func_instance)}/START",
                                                                      f"{str(func_instance)}/END",
-                                                                     f"{str(func_instance)}/TERMINATE"))
+                                                                     f"{str(func_instance)}/TERMINATE",
+                                                                     f"{str(func_instance)}/READY"))
         listener_thread.start()
 
         # add to list of local topics
         # TODO maybe add topic_domain_str instead for more clarity?
         self._sub_topics.update(topics + queued_topics)
 
+    def _setup_direct_listener(self, func_instance, topics: List[str], queued_topics: List[str]):
+        """
+        Subscribes a function decorated with `services.service.PublishSubscribe` to the in-process bus.
+
+        Args:
+            func_instance (function): instance of the function that was decorated with `services.service.PublishSubscribe`.
+            topics (List[str]): list of subscribed topics (drops all but most recent messages before function call)
+            queued_topics (List[str]): list for subscribed topics (drops no messages, forward a list of received messages to function call)
+        """
+        if len(topics + queued_topics) == 0:
+            return
+        assert set(topics).isdisjoint(queued_topics), "sub_topics and queued_sub_topics have to be disjoint!"
+        self._bus.subscribe(self, func_instance,
+                            [self._get_sub_topic_domain_str(topic) for topic in topics + queued_topics],
+                            _MessageCollector(topics, queued_topics, func_instance.timestamp_enabled))
+        self._sub_topics.update(topics + queued_topics)
+
     def _setup_publishers(self, func_instance, topics):
         """ Creates a publish socket for a function decorated with `services.service.PublishSubscribe`. """
         if len(topics) == 0:
             return # no topics - no need for a socket
 
+        if self._bus is not None:
+            # publish directly on the in-process bus
+            self._publish_sockets[func_instance] = self._bus
+            self._bus.advertise(self._get_pub_topic_domain_str(topic) for topic in topics)
+            self._pub_topics.update(topics)
+            return
+
         # setup publish socket
         ctx = Context.instance()
         publisher = ctx.socket(zmq.PUB)
@@ -257,8 +476,11 @@ class Service:
         self._control_channel_sub.setsockopt(zmq.SUBSCRIBE, bytes(self._start_topic, encoding="ascii"))
         self._control_channel_sub.setsockopt(zmq.SUBSCRIBE, bytes(self._end_topic, encoding="ascii"))
         self._control_channel_sub.setsockopt(zmq.SUBSCRIBE, bytes(self._terminate_topic, encoding="ascii"))
+        self._control_channel_sub.setsockopt(zmq.SUBSCRIBE, bytes(self._ready_topic, encoding="ascii"))
         self._control_channel_sub.setsockopt(zmq.SUBSCRIBE, bytes(self._train_topic, encoding="ascii"))
         self._control_channel_sub.setsockopt(zmq.SUBSCRIBE, bytes(self._eval_topic, encoding="ascii"))
+        self._control_channel_sub.setsockopt(zmq.SUBSCRIBE, bytes(self._session_start_topic, encoding="ascii"))
+        self._control_channel_sub.setsockopt(zmq.SUBSCRIBE, bytes(self._session_end_topic, encoding="ascii"))
         self._control_channel_sub.connect(f"{self._protocol}://{self._host_addr}:{self._sub_port}")
 
         # setup sender for dialog system control message acknowledgements 
@@ -269,7 +491,8 @@ class Service:
         # setup receiver for internal ACK messages
         self._internal_control_channel_sub = ctx.socket(zmq.SUB)
         for internal_ctrl_topic in list(self._internal_end_topics.keys()) + list(
-                self._internal_start_topics.keys()) + list(self._internal_terminate_topics.keys()):
+                self._internal_start_topics.keys()) + list(self._internal_terminate_topics.keys()) + list(
+                self._internal_ready_topics.keys()):
             self._internal_control_channel_sub.setsockopt(zmq.SUBSCRIBE,
                                                           bytes(f"ACK/{internal_ctrl_topic}", encoding="ascii"))
         self._internal_control_channel_sub.connect(f"{self._protocol}://{self._host_addr}:{self._sub_port}")
@@ -282,39 +505,42 @@ class Service:
         while listen:
             try:
                 # receive message for subscribed control topic
-                msg = self._control_channel_sub.recv_multipart(copy=True)
-                topic = msg[0].decode("ascii")
-                timestamp, content = pickle.loads(msg[1])
+                topic, timestamp, session_id, content = _recv_msg(self._control_channel_sub)
 
                 if topic == self._start_topic:
                     # initialize dialog state
                     self.dialog_start()
                     # set all listeners of this service to listening mode (block until they are listening)
-                    for internal_start_topic in self._internal_start_topics:
-                        _send_msg(self._control_channel_pub, internal_start_topic, True)
-                        _recv_ack(self._internal_control_channel_sub, internal_start_topic)
+                    self._notify_listeners(self._internal_start_topics)
                     _send_ack(self._control_channel_pub, self._start_topic)
                 elif topic == self._end_topic:
                     # stop all listeners of this service (block until they stopped)
-                    for internal_end_topic in self._internal_end_topics:
-                        _send_msg(self._control_channel_pub, internal_end_topic, True)
-                        _recv_ack(self._internal_control_channel_sub, internal_end_topic, True)
+                    self._notify_listeners(self._internal_end_topics)
                     self.dialog_end()
                     _send_ack(self._control_channel_pub, self._end_topic)
                 elif topic == self._terminate_topic:
                     # terminate all listeners of this service (block until they stopped)
-                    for internal_terminate_topic in self._internal_terminate_topics:
-                        _send_msg(self._control_channel_pub, internal_terminate_topic, True)
-                        _recv_ack(self._internal_control_channel_sub, internal_terminate_topic, True)
+                    self._notify_listeners(self._internal_terminate_topics)
                     self.dialog_exit()
                     _send_ack(self._control_channel_pub, self._terminate_topic)
                     listen = False
+                elif topic == self._ready_topic:
+                    # block until all listeners of this service are connected to the message bus
+                    self._probe_listeners()
+                    _send_ack(self._control_channel_pub, self._ready_topic)
                 elif topic == self._train_topic:
                     self.train()
                     _send_ack(self._control_channel_pub, self._train_topic)
                 elif topic == self._eval_topic:
                     self.eval()
                     _send_ack(self._control_channel_pub, self._eval_topic)
+                elif topic == self._session_start_topic:
+                    # content is the id of the new session
+                    self._open_session(content)
+                    _send_ack(self._control_channel_pub, self._session_start_topic, content)
+                elif topic == self._session_end_topic:
+                    self._close_session(content)
+                    _send_ack(self._control_channel_pub, self._session_end_topic, content)
                 else:
                     if self.debug_logger:
                         self.debug_logger.info("- (Service): received unknown control message from topic", topic,
@@ -326,6 +552,148 @@ class Service:
                 print("ERROR in Service: _control_channel_listener")
                 traceback.print_exc()
 
+    async def _async_control_channel_listener(self):
+        """ Coroutine version of `_control_channel_listener` for the asyncio runtime.
+            Listeners share the event loop with this coroutine, so they are started / stopped directly
+            instead of by handshakes. Control functions (`dialog_start`, ...) run in the runtime's thread pool.
+        """
+        control_channel_sub = zmq.asyncio.Socket(self._control_channel_sub)
+        listen = True
+        while listen:
+            frames = await control_channel_sub.recv_multipart(copy=False)
+            try:
+                topic, timestamp, session_id, content = _decode_msg(frames)
+                if topic == self._start_topic:
+                    await self._runtime.run_blocking(self.dialog_start)
+                    for collector in self._async_collectors.values():
+                        collector.reset()
+                    self._async_active = True
+                    _send_ack(self._control_channel_pub, self._start_topic)
+                elif topic == self._end_topic:
+                    self._async_active = False
+                    # subscriber functions still running finish before the dialog ends
+                    await self._runtime.drain(self)
+                    await self._runtime.run_blocking(self.dialog_end)
+                    _send_ack(self._control_channel_pub, self._end_topic)
+                elif topic == self._terminate_topic:
+                    self._async_active = False
+                    self._runtime.cancel(self)
+                    await self._runtime.run_blocking(self.dialog_exit)
+                    _send_ack(self._control_channel_pub, self._terminate_topic)
+                    listen = False
+                elif topic == self._ready_topic:
+                    await self._runtime.run_blocking(self._probe_listeners)
+                    _send_ack(self._control_channel_pub, self._ready_topic)
+                elif topic == self._train_topic:
+                    self.train()
+                    _send_ack(self._control_channel_pub, self._train_topic)
+                elif topic == self._eval_topic:
+                    self.eval()
+                    _send_ack(self._control_channel_pub, self._eval_topic)
+                elif topic == self._session_start_topic:
+                    async with self._runtime.session_lock(self):
+                        await self._runtime.run_blocking(self._open_session, content)
+                    _send_ack(self._control_channel_pub, self._session_start_topic, content)
+                elif topic == self._session_end_topic:
+                    await self._runtime.drain(self, content)
+                    async with self._runtime.session_lock(self):
+                        await self._runtime.run_blocking(self._close_session, content)
+                    _send_ack(self._control_channel_pub, self._session_end_topic, content)
+            except:
+                import traceback
+                print("ERROR in Service: _async_control_channel_listener")
+                traceback.print_exc()
+
+    def _notify_listeners(self, internal_topics: Iterable[str]):
+        """ Sends an internal control message to all listeners of this service at once,
+            then blocks until every listener acknowledged it.
+
+        Args:
+            internal_topics (Iterable[str]): the internal control topics (one per listener) to notify
+        """
+        for internal_topic in internal_topics:
+            _send_msg(self._control_channel_pub, internal_topic, True)
+        _recv_acks(self._internal_control_channel_sub, list(internal_topics))
+
+    def _probe_listeners(self):
+        """ Blocks until all listeners of this service acknowledged a readiness probe.
+            Messages published before a subscription reached the message bus are lost, so unanswered
+            probes are repeated until all listeners answered.
+        """
+        pending = list(self._internal_ready_topics)
+        while pending:
+            for internal_ready_topic in pending:
+                _send_msg(self._control_channel_pub, internal_ready_topic, True)
+            pending = _recv_acks(self._internal_control_channel_sub, pending, timeout=_PROBE_INTERVAL)
+
+    def _open_session(self, session_id: Hashable):
+        """ Creates the dialog-level state for a new session and calls `dialog_start` for it.
+
+        Args:
+            session_id (Hashable): id of the new session
+        """
+        with self._session_lock:
+            if self._session_defaults is None:
+                self._session_defaults = {attr: getattr(self, attr, None) for attr in self.session_attributes}
+            self._session_states[session_id] = {attr: copy.copy(value)
+                                                for attr, value in self._session_defaults.items()}
+            with self._session_scope(session_id):
+                self.dialog_start()
+            # only now start accepting messages for this session
+            self._session_buffers[session_id] = dict()
+
+    def _close_session(self, session_id: Hashable):
+        """ Calls `dialog_end` for the given session and discards its dialog-level state.
+
+        Args:
+            session_id (Hashable): id of the session to close
+        """
+        with self._session_lock:
+            if session_id not in self._session_states:
+                return
+            self._session_buffers.pop(session_id, None)
+            with self._session_scope(session_id):
+                self.dialog_end()
+            del self._session_states[session_id]
+
+    @contextmanager
+    def _session_scope(self, session_id: Hashable, hold_lock: bool = True):
+        """ Swaps the dialog-level attributes of the given session into this instance for the duration of
+            the `with`-block (and the previous values back in afterwards).
+            Messages published inside the block are tagged with `session_id`.
+
+        Args:
+            session_id (Hashable): id of an open session
+            hold_lock (bool): whether the session lock is held for the whole block; if `False`, it is only
+                              held while swapping the attributes and the caller has to serialize the calls
+                              within sessions (e.g. coroutines suspended inside the block, see
+                              `services.asyncio_runtime`)
+        """
+        with self._session_lock if hold_lock else nullcontext():
+            with self._session_lock:
+                state = self._session_states[session_id]
+                outer_values = {attr: getattr(self, attr, None) for attr in self.session_attributes}
+                outer_session_id = self.get_session_id()
+                for attr, value in state.items():
+                    setattr(self, attr, value)
+                self._session_local.session_id = session_id
+            try:
+                yield
+            finally:
+                with self._session_lock:
+                    for attr in self.session_attributes:
+                        state[attr] = getattr(self, attr, None)
+                        setattr(self, attr, outer_values[attr])
+                    self._session_local.session_id = outer_session_id
+
+    def get_session_id(self) -> Hashable:
+        """
+        Returns:
+            The id of the session the calling thread currently works on,
+            `None` outside of multi-session mode.
+        """
+        return getattr(self._session_local, 'session_id', None)
+
     def dialog_start(self):
         """ This function is called before the first message to a new dialog is published.
             You should overwrite this function to set/reset dialog-level variables. """
@@ -349,7 +717,7 @@ class Service:
         """ Sets module to eval mode """
         self.is_training = False
 
-    def run_standalone(self, host_reg_port: int = 65535):
+    def run_standalone(self, host_reg_port: int = 65535, runtime: str = 'threads'):
         """
         Run this service as a standalone serivce (without a `DialogSystem`) on a remote node.
         Use a `RemoteService` with *corresponding identifier* on the `DialogSystem` node to connect both.
@@ -357,17 +725,19 @@ class Service:
 
         Args:
             host_reg_port (int): The port on the `DialogSystem` node listening for `Service` register requests
+            runtime (str): 'threads' or 'asyncio' (see `DialogSystem`)
         """
         assert self._identifier is not None, "running a service on a remote node requires a unique identifier"
         print("Waiting for dialog system host...")
 
         # send service info to dialog system node
-        self._init_pubsub()
+        self._init_pubsub(runtime=AsyncioRuntime() if runtime == 'asyncio' else None)
         ctx = Context.instance()
         sync_endpoint = ctx.socket(zmq.REQ)
         sync_endpoint.connect(f"tcp://{self._host_addr}:{host_reg_port}")
         data = pickle.dumps((self._domain_name, self._sub_topics, self._pub_topics, self._start_topic, self._end_topic,
-                             self._terminate_topic))
+                             self._terminate_topic, self._ready_topic, self._session_start_topic,
+                             self._session_end_topic))
         sync_endpoint.send_multipart((bytes(f"REGISTER_{self._identifier}", encoding="ascii"), data))
 
         # wait for registration confirmation
@@ -400,7 +770,7 @@ class Service:
 
     def _receiver_thread(self, subscriber: Socket, func_instance,
                          topics: Iterable[str], queued_topics: Iterable[str],
-                         start_topic: str, end_topic: str, terminate_topic: str):
+                         start_topic: str, end_topic: str, terminate_topic: str, ready_topic: str):
         """
         Loop for receiving messages.
         Will continue until a message for `terminate_topic` is received.
@@ -419,6 +789,8 @@ class Service:
             end_topic (str): Control message topic to set this specific `function_instance` into non-listening mode (ignore all non-control messages)
             terminate_topic (str): Control message topic to end the listener loop for this specific `function_instance`. 
                                    Also closes the socket before returning.
+            ready_topic (str): Control message topic to probe whether this specific `function_instance` is connected
+                               to the message bus (only acknowledged)
         """
 
         ctx = Context.instance()
@@ -426,22 +798,17 @@ class Service:
         control_channel_pub.sndhwm = 1100000
         control_channel_pub.connect(f"{self._protocol}://{self._host_addr}:{self._pub_port}")
 
-        values = {}
-        timestamps = {}
-        all_sub_topics = topics + queued_topics
-        num_topics = len(all_sub_topics)
+        collector = _MessageCollector(topics, queued_topics, func_instance.timestamp_enabled)
         active = False
         terminating = False
 
         while not terminating:
             try:
-                msg = subscriber.recv_multipart(copy=True)
-                topic = msg[0].decode("ascii")
+                topic, timestamp, session_id, content = _recv_msg(subscriber)
                 # based on topic, decide what to do
                 if topic == start_topic:
                     # reset values and start listening to non-control messages
-                    values = {}
-                    timestamps = {}
+                    collector.reset()
                     active = True
                     _send_ack(control_channel_pub, start_topic)
                 elif topic == end_topic:
@@ -453,54 +820,23 @@ class Service:
                     active = False
                     _send_ack(control_channel_pub, terminate_topic)
                     terminating = True
-                else:
+                elif topic == ready_topic:
+                    _send_ack(control_channel_pub, ready_topic)
+                elif session_id is not None or active:
                     # non-control message
-                    if active:
-                        # process message
-                        timestamp, content = pickle.loads(msg[1])
+                    if self.debug_logger:
+                        self.debug_logger.info(
+                            f"- (DS): listener thread for function {func_instance}:\n   received for topic {topic}:\n   {content}")
+
+                    # simple synchronization mechanism: remember only newest values,
+                    # store them until there was at least 1 new value received per topic.
+                    # Then call callback function with complete set of values.
+                    values = self._collect_message(func_instance, collector, topic, timestamp, session_id, content)
+                    if values is not None:
                         if self.debug_logger:
                             self.debug_logger.info(
-                                f"- (DS): listener thread for function {func_instance}:\n   received for topic {topic}:\n   {content}")
-
-                        # simple synchronization mechanism: remember only newest values,
-                        # store them until there was at least 1 new value received per topic.
-                        # Then call callback function with complete set of values.
-                        # Reset values afterwards and start collecting again.
-
-                        # problem: routing based on prefixes -> function argument names may differ
-                        # solution: find longest common prefix of argument name and received topic
-                        common_prefix = ""
-                        for key in all_sub_topics:
-                            if topic.startswith(key) and len(topic) > len(common_prefix):
-                                common_prefix = key
-                        if common_prefix in topics:
-                            # store only latest value
-                            values[common_prefix] = content  # set value for received topic
-                            timestamps[common_prefix] = timestamp  # set timestamp for received value
-                        else:
-                            # topic is a queued_topic - queue all values and their timestamps
-                            if not common_prefix in values:
-                                values[common_prefix] = []
-                                timestamps[common_prefix] = []
-                            values[common_prefix].append(content)
-                            timestamps[common_prefix].append(timestamp)
-
-                        if len(values) == num_topics:
-                            # received a new value for each topic -> call callback function
-                            if func_instance.timestamp_enabled:
-                                # append timestamps, if required
-                                values['timestamps'] = timestamps
-                            if self.debug_logger:
-                                self.debug_logger.info(
-                                    f"- (DS): received all messages for function {func_instance}\n   -> CALLING function")
-                            if self.__class__ == Service:
-                                # NOTE workaround for publisher / subscriber without being an instance method
-                                func_instance(**values)
-                            else:
-                                func_instance(self, **values)
-                            # reset values
-                            values = {}
-                            timestamps = {}
+                                f"- (DS): received all messages for function {func_instance}\n   -> CALLING function")
+                        self._dispatch(func_instance, session_id, values)
             except KeyboardInterrupt:
                 break
             except:
@@ -510,6 +846,100 @@ class Service:
         # shutdown
         subscriber.close()
 
+    async def _async_receiver(self, subscriber: Socket, func_instance, ready_topic: str):
+        """
+        Coroutine version of `_receiver_thread` for the asyncio runtime.
+        Runs until cancelled by the control channel coroutine.
+
+        Args:
+            subscriber (Socket): subscriber socket
+            func_instance (function instance): the decorated subscriber function instance to be called with the received messages
+            ready_topic (str): Control message topic to probe whether this listener is connected to the message bus
+        """
+        subscriber = zmq.asyncio.Socket(subscriber)
+        control_channel_pub = Context.instance().socket(zmq.PUB)
+        control_channel_pub.sndhwm = 1100000
+        control_channel_pub.connect(f"{self._protocol}://{self._host_addr}:{self._pub_port}")
+        collector = self._async_collectors[func_instance]
+        try:
+            while True:
+                frames = await subscriber.recv_multipart(copy=False)
+                try:
+                    topic, timestamp, session_id, content = _decode_msg(frames)
+                    if topic == ready_topic:
+                        _send_ack(control_channel_pub, ready_topic)
+                        continue
+                    if session_id is None and not self._async_active:
+                        continue
+                    if self.debug_logger:
+                        self.debug_logger.info(
+                            f"- (DS): listener for function {func_instance}:\n   received for topic {topic}:\n   {content}")
+                    values = self._collect_message(func_instance, collector, topic, timestamp, session_id, content)
+                    if values is not None:
+                        await self._runtime.dispatch(self, func_instance, session_id, values)
+                except asyncio.CancelledError:
+                    raise
+                except:
+                    print("THREAD ERROR")
+                    import traceback
+                    traceback.print_exc()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            subscriber.close()
+            control_channel_pub.close()
+
+    def _collect_message(self, func_instance, collector: _MessageCollector, topic: str, timestamp: float,
+                         session_id: Hashable, content: Any) -> Optional[Dict[str, Any]]:
+        """ Adds a received message to the values collected for a subscriber function.
+            Messages of a session are collected separately per session (and dropped if the session is not open).
+
+        Args:
+            func_instance (function instance): the decorated subscriber function the message is meant for
+            collector (_MessageCollector): collector of the function for messages outside of multi-session mode
+            topic (str): topic (including domain suffix) the message was published to
+            timestamp (float): time the message was sent
+            session_id (Hashable): id of the session the message belongs to (or `None`)
+            content (Any): message content
+
+        Returns:
+            The function arguments, if the function should be called now, else `None`
+        """
+        if session_id is not None:
+            session_buffers = self._session_buffers.get(session_id)
+            if session_buffers is None:
+                return None
+            if func_instance not in session_buffers:
+                session_buffers[func_instance] = collector.new()
+            collector = session_buffers[func_instance]
+        return collector.add(topic, timestamp, content)
+
+    def _dispatch(self, func_instance, session_id: Hashable, values: Dict[str, Any]):
+        """ Calls a decorated subscriber function for the given session (or outside of multi-session mode) """
+        if session_id is None:
+            self._call_subscriber(func_instance, values)
+            return
+        with self._session_lock:
+            if session_id in self._session_states:  # session might have ended meanwhile
+                with self._session_scope(session_id):
+                    self._call_subscriber(func_instance, values)
+
+    def _invoke_subscriber(self, func_instance, values: Dict[str, Any]):
+        """ Calls a decorated subscriber function with the collected values as keyword arguments
+            and returns its result (a coroutine for `async def` functions) """
+        if self.__class__ == Service:
+            # NOTE workaround for publisher / subscriber without being an instance method
+            return func_instance(**values)
+        else:
+            return func_instance(self, **values)
+
+    def _call_subscriber(self, func_instance, values: Dict[str, Any]):
+        """ Calls a decorated subscriber function with the collected values as keyword arguments """
+        result = self._invoke_subscriber(func_instance, values)
+        if inspect.iscoroutine(result):
+            # async def function outside of the asyncio runtime: run it to completion in this thread
+            asyncio.run(result)
+
 
 # Each decorated function should return a dictonary with the keys matching the pub_topics names
 def PublishSubscribe(sub_topics: List[str] = [], pub_topics: List[str] = [], queued_sub_topics: List[str] = []):
@@ -542,22 +972,24 @@ def PublishSubscribe(sub_topics: List[str] = [], pub_topics: List[str] = [], que
           It will be filled by a dictionary providing timestamps for each received value, indexed by name.
     
     Technical notes:
-        * Data will be automatically pickled / unpickled during send / receive to reduce meassage size.
+        * Data will be automatically serialized / deserialized during send / receive (see `services.codec`):
+          numpy arrays and torch tensors are sent without copying (and received as read-only views),
+          user acts, system acts and belief states use a compact encoding, everything else is pickled.
           However, some python objects are not serializable (e.g. database connections) for good reasons
           and will throw an error if you try to publish them.
         * The domain name of your service class will be appended to your publish topics.
           Subscription topics are prefix-matched, so you will receive all messages from 'topic/suffix'
           if you subscibe to 'topic'.
+        * Published messages are tagged with the id of the session the function was called for
+          (see `DialogSystem.start_session`), so replies stay within their dialog.
+        * Decorated functions may be coroutines (`async def`). On the asyncio runtime (see `DialogSystem`)
+          they are awaited on the event loop, while other functions run in a thread pool; elsewhere they
+          are run to completion in the listener thread.
     """
 
     def wrapper(func):
-        def delegate(self, *args, **kwargs):
+        def publish(self, result):
             func_inst = getattr(self, func.__name__)
-
-            callargs = list(args)
-            if self in callargs:    # remove self when in *args, because already known to function
-                callargs.remove(self)
-            result = func(self, *callargs, **kwargs)
             if result:
                 # fix! (user could have multiple "/" characters in topic - only use last one )
                 domains = {res.split("/")[0]: res.split("/")[1] if "/" in res else "" for res in result}
@@ -569,21 +1001,36 @@ def PublishSubscribe(sub_topics: List[str] = [], pub_topics: List[str] = [], que
 
             socket = self._publish_sockets[func_inst]
             domain = self._domain_name
+            session_id = self.get_session_id()
             if socket and result:
                 # publish messages
                 for topic in pub_topics:
                 # for topic in result: # NOTE publish any returned value in dict with it's key as topic
                     if topic in result:
                         domain = domain if domain else domains[topic]
-                        topic_domain_str = f"{topic}/{domain}" if domain else topic
-                        if topic in self._pub_topic_domains:
-                            topic_domain_str = f"{topic}/{self._pub_topic_domains[topic]}" if self._pub_topic_domains[topic] else topic
-                        _send_msg(socket, topic_domain_str, result[topic])
+                        topic_domain_str = self._get_pub_topic_domain_str(topic, domain)
+                        if self._bus is not None:
+                            self._bus.publish(topic_domain_str, result[topic], session_id)
+                        else:
+                            _send_msg(socket, topic_domain_str, result[topic], session_id)
                         if self.debug_logger:
                             self.debug_logger.info(
                                 f"- (DS): sent message from {func} to topic {topic_domain_str}:\n   {result[topic]}")
             return result
 
+        if inspect.iscoroutinefunction(func):
+            async def delegate(self, *args, **kwargs):
+                callargs = list(args)
+                if self in callargs:    # remove self when in *args, because already known to function
+                    callargs.remove(self)
+                return publish(self, await func(self, *callargs, **kwargs))
+        else:
+            def delegate(self, *args, **kwargs):
+                callargs = list(args)
+                if self in callargs:    # remove self when in *args, because already known to function
+                    callargs.remove(self)
+                return publish(self, func(self, *callargs, **kwargs))
+
         # declare function as publish / subscribe functions and attach the respective topics
         delegate.pubsub = True
         delegate.sub_topics = sub_topics
@@ -597,6 +1044,147 @@ def PublishSubscribe(sub_topics: List[str] = [], pub_topics: List[str] = [], que
     return wrapper
 
 
+class _DirectListener:
+    """ A subscriber function connected to the in-process bus """
+
+    def __init__(self, service: Service, func_instance, subscriptions: List[str], collector: _MessageCollector):
+        self.service = service
+        self.func_instance = func_instance
+        self.subscriptions = subscriptions
+        self.collector = collector
+        self.collect_lock = threading.Lock()  # guards the collected values
+        self.call_lock = threading.Lock()  # calls of one function never overlap (as with one listener thread each)
+
+
+class _DirectBus:
+    """
+    In-process replacement for the zmq message bus (see `DialogSystem` with transport 'direct').
+    Published messages are handed to the subscriber functions without serialization: the subscribers of
+    each topic are resolved once, and functions are called either in the publishing thread or,
+    if `max_workers` is set, by a thread pool of that size.
+
+    In the publishing thread, calls triggered while a subscriber function is running are queued
+    and made after it returned, so long dialogs do not grow the call stack. With a thread pool, the
+    calls still running or waiting are counted, so dialogs can wait for them (see `drain`).
+    """
+
+    def __init__(self, max_workers: int = None):
+        self._listeners = []
+        self._subscriptions = TopicTrie()
+        self._subscribers = {}  # subscription -> listeners
+        self._published_topics = set()
+        self._routes = {}  # published topic -> listeners subscribed to a prefix of it
+        self._executor = ThreadPoolExecutor(max_workers=max_workers) if max_workers else None
+        self._in_flight = 0  # subscriber calls submitted to the thread pool which did not return yet
+        self._idle = threading.Condition()
+        self._local = threading.local()
+        self.active = False  # accept messages outside of multi-session mode
+        self.dialog_end_messages = queue.Queue()  # (session id, content) of all Topic.DIALOG_END messages
+
+    def subscribe(self, service: Service, func_instance, subscriptions: List[str], collector: _MessageCollector):
+        """ Connects a subscriber function to the bus """
+        listener = _DirectListener(service, func_instance, subscriptions, collector)
+        self._listeners.append(listener)
+        for subscription in subscriptions:
+            self._subscriptions.add(subscription)
+            self._subscribers.setdefault(subscription, []).append(listener)
+        self._routes.clear()
+
+    def advertise(self, topics: Iterable[str]):
+        """ Declares topics that will be published to (their subscribers are resolved in `resolve`) """
+        self._published_topics.update(topics)
+
+    def resolve(self):
+        """ Resolves the subscribers of all declared topics (topics not declared are resolved on first use) """
+        self._routes.clear()
+        for topic in self._published_topics:
+            self._get_route(topic)
+
+    def _get_route(self, topic: str) -> List[_DirectListener]:
+        route = self._routes.get(topic)
+        if route is None:
+            # subscriptions are prefix-matched, as with zmq (each listener receives a message once)
+            route = []
+            for subscription in self._subscriptions.prefixes(topic):
+                route.extend(listener for listener in self._subscribers[subscription] if listener not in route)
+            self._routes[topic] = route
+        return route
+
+    def reset(self):
+        """ Discards all values collected outside of multi-session mode """
+        for listener in self._listeners:
+            with listener.collect_lock:
+                listener.collector.reset()
+
+    def publish(self, topic: str, content: Any, session_id: Hashable = None):
+        """ Delivers a message to all subscribers of the topic.
+
+        Args:
+            topic (str): topic (including domain suffix) to publish to
+            content (Any): message content
+            session_id (Hashable): id of the dialog session the message belongs to
+        """
+        timestamp = datetime.datetime.now().timestamp()  # current timestamp as POSIX float
+        if topic.startswith(Topic.DIALOG_END):
+            self.dialog_end_messages.put((session_id, content))
+        if session_id is None and not self.active:
+            return
+        for listener in self._get_route(topic):
+            with listener.collect_lock:
+                values = listener.service._collect_message(listener.func_instance, listener.collector,
+                                                           topic, timestamp, session_id, content)
+            if values is not None:
+                self._schedule(listener, session_id, values)
+
+    def _schedule(self, listener: _DirectListener, session_id: Hashable, values: Dict[str, Any]):
+        if self._executor is not None:
+            with self._idle:
+                self._in_flight += 1
+            self._executor.submit(self._call_in_pool, listener, session_id, values)
+            return
+        pending = getattr(self._local, 'pending', None)
+        if pending is not None:
+            # this thread is already running a subscriber function - call after it returned
+            pending.append((listener, session_id, values))
+            return
+        pending = self._local.pending = deque([(listener, session_id, values)])
+        try:
+            while pending:
+                self._call(*pending.popleft())
+        finally:
+            self._local.pending = None
+
+    def _call_in_pool(self, listener: _DirectListener, session_id: Hashable, values: Dict[str, Any]):
+        try:
+            self._call(listener, session_id, values)
+        finally:
+            # calls scheduled by this one were counted before it returned
+            with self._idle:
+                self._in_flight -= 1
+                if not self._in_flight:
+                    self._idle.notify_all()
+
+    def drain(self):
+        """ Waits until all subscriber calls submitted to the thread pool (and the calls they
+            triggered) returned """
+        with self._idle:
+            self._idle.wait_for(lambda: not self._in_flight)
+
+    def _call(self, listener: _DirectListener, session_id: Hashable, values: Dict[str, Any]):
+        try:
+            with listener.call_lock:
+                listener.service._dispatch(listener.func_instance, session_id, values)
+        except:
+            print("ERROR in direct dispatch")
+            import traceback
+            traceback.print_exc()
+
+    def shutdown(self):
+        """ Waits for all running subscriber calls and stops the thread pool """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+
 class DialogSystem:
     """
     This class will constrct a dialog system from the list of services provided to the constructor.
@@ -606,7 +1194,9 @@ class DialogSystem:
     """
 
     def __init__(self, services: List[Union[Service, RemoteService]], sub_port: int = 64000, pub_port: int = 64001,
-                 reg_port: int = 64002, protocol: str = 'tcp', debug_logger: DiasysLogger = None):
+                 reg_port: int = 64002, protocol: str = 'tcp', debug_logger: DiasysLogger = None,
+                 transport: str = 'zmq', max_workers: int = None, runtime: str = 'threads',
+                 control_timeout: float = 30.0):
         """
         Args:
             services (List[Union[Service, RemoteService]]): List of all (remote) services to connect to.
@@ -621,6 +1211,18 @@ class DialogSystem:
             debug_logger (DiasysLogger): If not `None`, all messags are printed to the logger, including send/receive events.
                                 Can be useful for debugging because you can still see messages received by the `DialogSystem`
                                 even if they are never forwarded (as expected) to your `Service`
+            transport (str): 'zmq' to connect services via zmq sockets (required for remote services), or
+                             'direct' to call subscriber functions directly within this process
+                             (no sockets, no serialization; ports and protocol are ignored)
+            max_workers (int): for transport 'direct': if set, subscriber functions are called by a thread pool
+                               of this size instead of in the publishing thread;
+                               for runtime 'asyncio': size of the thread pool running blocking subscriber functions
+            runtime (str): for transport 'zmq': 'threads' to run one listener thread per subscriber function
+                           (and one control thread per service), or 'asyncio' to run all listeners of the local
+                           services on one event loop (see `services.asyncio_runtime`)
+            control_timeout (float): for transport 'zmq': seconds to wait for all services to acknowledge a control
+                                     message (e.g. dialog start / end) before raising a `TimeoutError` naming the
+                                     services that did not answer (`None` waits forever)
         """
         # node-local topics
         self.debug_logger = debug_logger
@@ -633,6 +1235,19 @@ class DialogSystem:
 
         # node-local sockets
         self._domains = set()
+        self._stopEvent = threading.Event()
+
+        # multi-session mode
+        self._session_counter = itertools.count()
+        self._open_sessions = set()
+
+        assert transport in ('zmq', 'direct'), f"unknown transport {transport}"
+        assert runtime in ('threads', 'asyncio'), f"unknown runtime {runtime}"
+        self._bus = None
+        self._runtime = None
+        if transport == 'direct':
+            self._init_direct_transport(services, max_workers)
+            return
 
         # start proxy thread
         self._proxy_dev = ProcessProxy(in_type=zmq.XSUB, out_type=zmq.XPUB)  # , mon_type=zmq.XSUB)
@@ -646,7 +1261,14 @@ class DialogSystem:
         self._start_topics = set()
         self._end_topics = set()
         self._terminate_topics = set()
-        self._stopEvent = threading.Event()
+        self._ready_topics = set()
+        self._session_start_topics = set()
+        self._session_end_topics = set()
+        self._control_topic_services = dict()  # control topic -> name of the service listening to it
+        self._control_timeout = control_timeout
+
+        if runtime == 'asyncio':
+            self._runtime = AsyncioRuntime(max_workers)
 
         # control channels
         ctx = Context.instance()
@@ -661,18 +1283,43 @@ class DialogSystem:
             if isinstance(service, Service):
                 # register local service
                 service_name = type(service).__name__ if service._identifier is None else service._identifier
-                service._init_pubsub()
+                self._services.append(service)
+                service._init_pubsub(runtime=self._runtime)
                 self._add_service_info(service_name, service._domain_name, service._sub_topics, service._pub_topics,
-                                       service._start_topic, service._end_topic, service._terminate_topic)
+                                       service._start_topic, service._end_topic, service._terminate_topic,
+                                       service._ready_topic, service._session_start_topic,
+                                       service._session_end_topic)
                 service._register_with_dialogsystem()
             elif isinstance(service, RemoteService):
                 remote_services[getattr(service, 'identifier')] = service
+        # domains are sent as references only if no service of another process receives the messages
+        for service in self._services:
+            if isinstance(service.domain, Domain):
+                if remote_services:
+                    codec.unregister_domain(service.domain)
+                else:
+                    codec.register_domain(service.domain)
         self._register_remote_services(remote_services, reg_port)
 
         self._control_channel_sub.connect(f"{protocol}://127.0.0.1:{sub_port}")
         self._setup_dialog_end_listener()
 
-        time.sleep(0.25)
+        self._wait_until_ready()
+
+    def _init_direct_transport(self, services: List[Service], max_workers: int):
+        """ Connects all services to an in-process bus (see `_DirectBus`) """
+        self._bus = _DirectBus(max_workers)
+        for service in services:
+            assert isinstance(service, Service), "remote services require transport 'zmq'"
+            service_name = type(service).__name__ if service._identifier is None else service._identifier
+            self._services.append(service)
+            service._init_pubsub(self._bus)
+            self._add_service_info(service_name, service._domain_name, service._sub_topics, service._pub_topics,
+                                   service._start_topic, service._end_topic, service._terminate_topic,
+                                   service._ready_topic, service._session_start_topic, service._session_end_topic)
+            service._register_with_dialogsystem()
+        # subscriptions are complete now -> resolve subscribers of all declared publish topics
+        self._bus.resolve()
 
     def _register_pub_topic(self, publisher, topic: str):
         """ Map a publisher instance to a topic """
@@ -713,9 +1360,11 @@ class DialogSystem:
                 if remote_service_identifier in remote_services:
                     print(f"registering service {remote_service_identifier}...")
                     # add remote service interface info
-                    domain_name, sub_topics, pub_topics, start_topic, end_topic, terminate_topic = pickle.loads(data)
+                    domain_name, sub_topics, pub_topics, start_topic, end_topic, terminate_topic, ready_topic, \
+                        session_start_topic, session_end_topic = pickle.loads(data)
                     self._add_service_info(remote_service_identifier, domain_name, sub_topics, pub_topics, start_topic,
-                                           end_topic, terminate_topic)
+                                           end_topic, terminate_topic, ready_topic, session_start_topic,
+                                           session_end_topic)
                     self._remote_identifiers.add(remote_service_identifier)
                     # acknowledge service registration
                     reg_service.send(bytes(f'ACK_REGISTER_{remote_service_identifier}', encoding="ascii"))
@@ -729,7 +1378,8 @@ class DialogSystem:
         print("########## Finished registering all remote services ##########")
 
     def _add_service_info(self, service_name: str, domain_name: str, sub_topics: List[str], pub_topics: List[str], 
-                            start_topic: str, end_topic:str, terminate_topic: str):
+                            start_topic: str, end_topic:str, terminate_topic: str, ready_topic: str,
+                            session_start_topic: str, session_end_topic: str):
         """ Add all relevant info from a service (needed to construct dialog graph for debugging).
             Also, sets up all required control channels for this service based on the service's info.
             
@@ -742,6 +1392,10 @@ class DialogSystem:
             end_topic (str): control channel topic for setting given service into `non-listening` mode
             terminate_topic (str): control channel topic for stopping given service's listener loops and
                                    closing the listener sockets
+            ready_topic (str): control channel topic for probing whether all of the given service's listeners are
+                               connected to the message bus
+            session_start_topic (str): control channel topic for opening a new session in the given service
+            session_end_topic (str): control channel topic for closing a session in the given service
         """
         self._domains.add(domain_name)
         for topic in sub_topics:
@@ -749,14 +1403,61 @@ class DialogSystem:
         for topic in pub_topics:
             self._register_pub_topic(service_name, topic)
 
+        if self._bus is not None:
+            return  # no control channels needed in-process
+
         # setup control channels
         self._start_topics.add(start_topic)
         self._end_topics.add(end_topic)
         self._terminate_topics.add(terminate_topic)
+        self._ready_topics.add(ready_topic)
+        self._session_start_topics.add(session_start_topic)
+        self._session_end_topics.add(session_end_topic)
+        for control_topic in (start_topic, end_topic, terminate_topic, ready_topic, session_start_topic,
+                              session_end_topic):
+            self._control_topic_services[control_topic] = service_name
+            self._control_channel_sub.setsockopt(zmq.SUBSCRIBE, bytes(f"ACK/{control_topic}", encoding="ascii"))
+
+    def _broadcast_control_msg(self, topics: Iterable[str], content: Any = True):
+        """ Sends a control message to all given control topics at once, then blocks until every service
+            acknowledged it.
 
-        self._control_channel_sub.setsockopt(zmq.SUBSCRIBE, bytes(f"ACK/{start_topic}", encoding="ascii"))
-        self._control_channel_sub.setsockopt(zmq.SUBSCRIBE, bytes(f"ACK/{end_topic}", encoding="ascii"))
-        self._control_channel_sub.setsockopt(zmq.SUBSCRIBE, bytes(f"ACK/{terminate_topic}", encoding="ascii"))
+        Args:
+            topics (Iterable[str]): control topics (one per service) to send the message to
+            content (Any): message content, which is also the expected content of the ACK's
+
+        Raises:
+            TimeoutError: if not all services acknowledged the message within the control timeout
+        """
+        topics = list(topics)
+        for topic in topics:
+            _send_msg(self._control_channel_pub, topic, content)
+        missing = _recv_acks(self._control_channel_sub, topics, content, self._control_timeout)
+        if missing:
+            self._raise_missing_acks(missing)
+
+    def _wait_until_ready(self):
+        """ Blocks until all services acknowledged a readiness probe, i.e. until all their listeners are connected
+            to the message bus. Unanswered probes are repeated, since messages published before a subscription
+            reached the message bus are lost.
+
+        Raises:
+            TimeoutError: if not all services are ready within the control timeout
+        """
+        deadline = None if self._control_timeout is None else time.monotonic() + self._control_timeout
+        pending = list(self._ready_topics)
+        while pending:
+            for ready_topic in pending:
+                _send_msg(self._control_channel_pub, ready_topic, True)
+            pending = _recv_acks(self._control_channel_sub, pending, timeout=_PROBE_INTERVAL)
+            if pending and deadline is not None and time.monotonic() > deadline:
+                self._raise_missing_acks(pending)
+
+    def _raise_missing_acks(self, topics: List[str]):
+        """ Raises a `TimeoutError` naming the services that did not acknowledge the given control topics """
+        services = sorted({self._control_topic_services.get(topic, topic) for topic in topics})
+        raise TimeoutError(f"no ACK for {topics[0].split('/')[-1]} within {self._control_timeout}s "
+                           f"from services: {', '.join(services)}")
 
     def _setup_dialog_end_listener(self):
         """ Creates socket for listening to Topic.DIALOG_END messages """
@@ -787,22 +1488,30 @@ class DialogSystem:
             Blocks until all services sent ACK's confirming they're stopped.
         """
         self._stopEvent.set()
-        for terminate_topic in self._terminate_topics:
-            _send_msg(self._control_channel_pub, terminate_topic, True)
-            _recv_ack(self._control_channel_sub, terminate_topic)
+        if self._bus is not None:
+            self._bus.active = False
+            self._bus.shutdown()
+            for service in self._services:
+                service.dialog_exit()
+            return
+        self._broadcast_control_msg(self._terminate_topics)
+        if self._runtime is not None:
+            self._runtime.stop()
 
     def _end_dialog(self):
         """ Block until all receivers stopped listening.
             Then, calls `dialog_end` on all registered services. """
 
+        if self._bus is not None:
+            self._end_direct_dialog()
+            return
+
         # listen for Topic.DIALOG_END messages
         while True:
             try:
-                msg = self._end_socket.recv_multipart(copy=True)
                 # receive message for subscribed topic
-                topic = msg[0].decode("ascii")
-                timestamp, content = pickle.loads(msg[1])
-                if content:
+                topic, timestamp, session_id, content = _recv_msg(self._end_socket)
+                if content and session_id is None:
                     if self.debug_logger:
                         self.debug_logger.info(f"- (DS): received DIALOG_END message in _end_dialog from topic {topic}")
                     self.stop()
@@ -815,9 +1524,22 @@ class DialogSystem:
                 print("ERROR in _end_dialog ")
 
         # stop receivers (blocking)
-        for end_topic in self._end_topics:
-            _send_msg(self._control_channel_pub, end_topic, True)
-            _recv_ack(self._control_channel_sub, end_topic)
+        self._broadcast_control_msg(self._end_topics)
+        if self.debug_logger:
+            self.debug_logger.info(f"- (DS): all services STOPPED listening")
+
+    def _end_direct_dialog(self):
+        """ `_end_dialog` for transport 'direct' """
+        while True:
+            session_id, content = self._bus.dialog_end_messages.get()
+            if content and session_id is None:
+                break
+        self.stop()
+        self._bus.active = False
+        # subscriber functions still running in the thread pool finish before the dialog ends
+        self._bus.drain()
+        for service in self._services:
+            service.dialog_end()
         if self.debug_logger:
             self.debug_logger.info(f"- (DS): all services STOPPED listening")
 
@@ -827,12 +1549,13 @@ class DialogSystem:
             Finally, publish all start signals given. """
     
         self._stopEvent.clear()
+        if self._bus is not None:
+            self._start_direct_dialog(start_signals)
+            return
         if platform.system().lower() == 'windows':
             time.sleep(1) # wait until stop event is cleared and dialog system is listening
         # start receivers (blocking)
-        for start_topic in self._start_topics:
-            _send_msg(self._control_channel_pub, start_topic, True)
-            _recv_ack(self._control_channel_sub, start_topic)
+        self._broadcast_control_msg(self._start_topics)
         if self.debug_logger:
             self.debug_logger.info(f"- (DS): all services STARTED listening")
         # publish first turn trigger
@@ -841,6 +1564,27 @@ class DialogSystem:
         for topic in start_signals:
             _send_msg(self._control_channel_pub, f"{topic}", start_signals[topic])
 
+    def _start_direct_dialog(self, start_signals: dict):
+        """ `_start_dialog` for transport 'direct' """
+        # forget DIALOG_END messages of previous dialogs (outside of multi-session mode)
+        unfinished = []
+        while not self._bus.dialog_end_messages.empty():
+            message = self._bus.dialog_end_messages.get()
+            if message[0] is not None:
+                unfinished.append(message)
+        for message in unfinished:
+            self._bus.dialog_end_messages.put(message)
+        # calls of the previous dialog must not see the state of the new one
+        self._bus.drain()
+        self._bus.reset()
+        for service in self._services:
+            service.dialog_start()
+        self._bus.active = True
+        if self.debug_logger:
+            self.debug_logger.info(f"- (DS): all services STARTED listening")
+        for topic in start_signals:
+            self._bus.publish(f"{topic}", start_signals[topic])
+
     def run_dialog(self, start_signals: dict = {Topic.DIALOG_END: False}):
         """ Run a complete dialog (blocking).
             Dialog will be started via messages to the topics specified in `start_signals`.
@@ -855,6 +1599,91 @@ class DialogSystem:
         self._start_dialog(start_signals)
         self._end_dialog()
 
+    def start_session(self, start_signals: dict = {Topic.DIALOG_END: False}, session_id: Hashable = None) -> Hashable:
+        """ Opens a new dialog session (non-blocking with regard to the dialog itself).
+            Blocks until all services created the session's dialog-level state (calling `dialog_start`
+            for the new session), then publishes the start signals tagged with the session id.
+            Any number of sessions can be live at the same time, all sharing the same service graph.
+
+        Args:
+            start_signals (Dict[str, Any]): mapping from topic -> value
+                                            Publishes the value given for each topic to the respective topic.
+            session_id (Hashable): id for the new session; if `None`, a new unique id is generated
+
+        Returns:
+            The id of the new session
+        """
+        if session_id is None:
+            session_id = next(self._session_counter)
+        assert session_id not in self._open_sessions, f"session {session_id} is already open"
+        if self._bus is not None:
+            for service in self._services:
+                service._open_session(session_id)
+        else:
+            self._broadcast_control_msg(self._session_start_topics, session_id)
+        self._open_sessions.add(session_id)
+        if self.debug_logger:
+            self.debug_logger.info(f"- (DS): all services STARTED session {session_id}")
+        for topic in start_signals:
+            if self._bus is not None:
+                self._bus.publish(f"{topic}", start_signals[topic], session_id)
+            else:
+                _send_msg(self._control_channel_pub, f"{topic}", start_signals[topic], session_id)
+        return session_id
+
+    def end_session(self, session_id: Hashable):
+        """ Closes a dialog session.
+            Blocks until all services called `dialog_end` for the session and discarded its state.
+            Messages belonging to a closed session are ignored by all services.
+
+        Args:
+            session_id (Hashable): id of the session to close
+        """
+        if self._bus is not None:
+            for service in self._services:
+                service._close_session(session_id)
+        else:
+            self._broadcast_control_msg(self._session_end_topics, session_id)
+        self._open_sessions.discard(session_id)
+        if self.debug_logger:
+            self.debug_logger.info(f"- (DS): all services ENDED session {session_id}")
+
+    def wait_for_session_end(self) -> Hashable:
+        """ Blocks until a `Topic.DIALOG_END` message with value `True` is received for any open session.
+
+        Returns:
+            The id of the session that ended (the session itself is still open, see `end_session`)
+        """
+        while True:
+            if self._bus is not None:
+                session_id, content = self._bus.dialog_end_messages.get()
+            else:
+                _, _, session_id, content = _recv_msg(self._end_socket)
+            if content and session_id in self._open_sessions:
+                return session_id
+
+    def run_sessions(self, num_sessions: int, start_signals: dict = {Topic.DIALOG_END: False},
+                     max_concurrent: int = None):
+        """ Run `num_sessions` complete dialogs (blocking), keeping up to `max_concurrent` of them live
+            at the same time. Whenever a session ends, it is closed and the next one is started.
+
+        Args:
+            num_sessions (int): total number of dialogs to run
+            start_signals (Dict[str, Any]): mapping from topic -> value, published at the start of each session
+            max_concurrent (int): maximum number of concurrently live sessions (default: `num_sessions`)
+        """
+        max_concurrent = max_concurrent or num_sessions
+        started = 0
+        live_sessions = set()
+        while started < num_sessions or live_sessions:
+            while started < num_sessions and len(live_sessions) < max_concurrent:
+                live_sessions.add(self.start_session(start_signals))
+                started += 1
+            session_id = self.wait_for_session_end()
+            if session_id in live_sessions:
+                self.end_session(session_id)
+                live_sessions.remove(session_id)
+
     def list_published_topics(self):
         """ Get all declared publisher topics.
 
@@ -952,25 +1781,13 @@ class DialogSystem:
             eventually publish to their respective topics.
         """
         # look for subscribers w/o publishers by checking topic prefixes
-        errors = {}
-        for sub_topic in self._sub_topics:
-            found_pub = False
-            for pub_topic in self._pub_topics:
-                if pub_topic.startswith(sub_topic):
-                    found_pub = True
-                    break
-            if not found_pub:
-                errors[sub_topic] = self._sub_topics[sub_topic]
+        pub_topics = TopicTrie(self._pub_topics)
+        errors = {sub_topic: self._sub_topics[sub_topic] for sub_topic in self._sub_topics
+                  if not pub_topics.has_extension(sub_topic)}
         # look for publishers w/o subscribers by checking topic prefixes
-        warnings = {}
-        for pub_topic in self._pub_topics:
-            found_sub = False
-            for sub_topic in self._sub_topics:
-                if pub_topic.startswith(sub_topic):
-                    found_sub = True
-                    break
-            if not found_sub:
-                warnings[pub_topic] = self._pub_topics[pub_topic]
+        sub_topics = TopicTrie(self._sub_topics)
+        warnings = {pub_topic: self._pub_topics[pub_topic] for pub_topic in self._pub_topics
+                    if not sub_topics.prefixes(pub_topic)}
 
         return errors, warnings
 
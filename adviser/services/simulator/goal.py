@@ -21,6 +21,7 @@
 
 import copy
 
+from services.simulator.goal_sampler import GoalSampler
 from utils import common, UserAct, UserActionType
 from utils.domain.jsonlookupdomain import JSONLookupDomain
 
@@ -85,6 +86,8 @@ class Goal(object):
         """
         self.domain = domain
         self.parameters = parameters or {}
+        # entities of the domain for drawing goals (read on first use)
+        self._sampler = None
 
         # cache inform and request slots
         # make sure to copy the list (shallow is sufficient)
@@ -142,6 +145,14 @@ class Goal(object):
         self.missing_informs = [UserAct(act_type=UserActionType.Inform, slot=_constraint.slot, value=_constraint.value)
                                 for _constraint in self.constraints]
 
+    @property
+    def sampler(self) -> GoalSampler:
+        """ Table of the entities of the domain the goals are drawn from (shared by all goals of
+            the domain) """
+        if self._sampler is None:
+            self._sampler = GoalSampler.for_domain(self.domain)
+        return self._sampler
+
     def _init_random_goal(self):
         """Randomly sets the constraints and requests for the goal."""
         num_venues = -1
@@ -175,11 +186,9 @@ class Goal(object):
             if ('Reachable' in self.parameters
                     and common.random.random() < self.parameters['Reachable']):
                 # pick entity from database and set constraints
-                results = self.domain.find_entities(
-                    constraints={}, requested_slots=constraint_slots.tolist())
-                assert results, "Cannot receive entity from database,\
+                assert self.sampler.num_entities, "Cannot receive entity from database,\
                         probably because the database is empty."
-                entity = common.random.choice(results)
+                entity = self.sampler.sample_entity(constraint_slots.tolist(), common.random)
                 for constraint in constraint_slots:
                     self.constraints.append(Constraint(
                         constraint, entity[constraint]))
@@ -190,8 +199,8 @@ class Goal(object):
                         self.inf_slot_values[constraint], size=1)[0]))
 
             # check if there are enough venues for the current goal
-            num_venues = len(self.domain.find_entities(constraints={
-                constraint.slot: constraint.value for constraint in self.constraints}))
+            num_venues = self.sampler.count({
+                constraint.slot: constraint.value for constraint in self.constraints})
 
             possible_req_slots = sorted(
                 list(set(self.req_slots).difference(constraint_slots)))
@@ -240,8 +249,8 @@ class Goal(object):
         else:
             self.requests = requests
 
-        num_venues = len(self.domain.find_entities(constraints={
-            constraint.slot: constraint.value for constraint in self.constraints}))
+        num_venues = self.sampler.count({
+            constraint.slot: constraint.value for constraint in self.constraints})
         if 'MinVenues' in self.parameters:
             assert num_venues >= self.parameters['MinVenues'], "There are not enough venues for\
                 the given constraints in the database. Either change constraints or lower\
@@ -0,0 +1,141 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+""" Answers the database lookups of random user goals (reachable entities and number of matching
+entities) from a table of the informable slots read once per domain. """
+
+import weakref
+from typing import Dict, List
+
+import numpy as np
+
+from utils.domain.jsonlookupdomain import JSONLookupDomain
+from utils.domain.lookupdomain import fold_case
+from utils.lru import LRUCache
+
+# samplers of all domains goals were drawn for (a domain's table is read once and dropped with it)
+_SAMPLERS = weakref.WeakKeyDictionary()
+
+
+class _SlotIndex(object):
+    """ Values of one slot of all entities and the entities of each value (ignoring the case of ASCII
+        letters, like the `COLLATE NOCASE` comparisons of the domain)
+
+    Attributes:
+        values (list): value of each entity
+        codes (np.ndarray): code of the folded value of each entity (int32, -1 for NULL)
+        code_of (dict): folded value -> code
+    """
+
+    def __init__(self, values: list):
+        self.values = values
+        self.code_of = {}
+        self.codes = np.fromiter(
+            (self.code_of.setdefault(fold_case(str(value)), len(self.code_of)) if value is not None else -1
+             for value in values), dtype=np.int32, count=len(values))
+        # entities sorted by code and the start of the entities of each code in it
+        self.order = np.argsort(self.codes, kind='stable')
+        self.starts = np.searchsorted(self.codes[self.order], np.arange(len(self.code_of) + 1))
+
+    def count(self, code: int) -> int:
+        return int(self.starts[code + 1] - self.starts[code])
+
+    def entities(self, code: int) -> np.ndarray:
+        return self.order[self.starts[code]:self.starts[code + 1]]
+
+
+class GoalSampler(object):
+    """ Table of the informable slots of all entities of a domain, read from the database once (in
+        the order of `find_entities`), and a cache of the number of entities matching the
+        constraints of goals.
+
+        Random entities are drawn with the same random numbers as drawing them from the results of
+        `find_entities`, so goals are the same as when they are looked up in the database. The
+        database must not change while the sampler is in use.
+    """
+
+    def __init__(self, domain: JSONLookupDomain, count_cache_size: int = 4096):
+        """
+        Args:
+            domain (JSONLookupDomain): domain whose entities are read
+            count_cache_size (int): number of constraint combinations whose number of matching
+                                    entities is cached (0 disables caching)
+        """
+        self.domain = domain
+        self.slots = sorted(domain.get_informable_slots())
+        values = {slot: [] for slot in self.slots}
+        for entity in domain.query_entities({}, requested_slots=self.slots):
+            for slot in self.slots:
+                values[slot].append(entity[slot])
+        self.num_entities = len(values[self.slots[0]]) if self.slots else domain.query_entities({}).count()
+        self._indexes = {slot: _SlotIndex(slot_values) for slot, slot_values in values.items()}
+        self.counts = LRUCache(count_cache_size) if count_cache_size > 0 else None
+
+    @classmethod
+    def for_domain(cls, domain: JSONLookupDomain) -> 'GoalSampler':
+        """ Returns the sampler of a domain (created on first use and shared by all goals of the
+            same domain instance) """
+        sampler = _SAMPLERS.get(domain)
+        if sampler is None:
+            sampler = _SAMPLERS[domain] = cls(domain)
+        return sampler
+
+    def sample_entity(self, slots: List[str], rng) -> Dict[str, object]:
+        """ Returns the values of the slots of an entity drawn uniformly at random
+
+        Args:
+            slots (List[str]): informable slots
+            rng: random generator (`random` module or `random.Random`), consumes the same random
+                 numbers as `rng.choice(domain.find_entities({}))`
+        """
+        index = rng.sample(range(self.num_entities), 1)[0]
+        return {slot: self._indexes[slot].values[index] for slot in slots}
+
+    def count(self, constraints: dict) -> int:
+        """ Returns the number of entities meeting the constraints (see `find_entities`), constraints
+            on slots which are not informable are counted by the domain """
+        constraints = JSONLookupDomain._normalize_constraints(constraints)
+        if any(slot not in self._indexes for slot in constraints):
+            return self.domain.query_entities(constraints).count()
+        if self.counts is None:
+            return self._count(constraints)
+        key = JSONLookupDomain._constraints_key(constraints)
+        count = self.counts.get(key)
+        if count is None:
+            count = self._count(constraints)
+            self.counts.put(key, count)
+        return count
+
+    def _count(self, constraints: Dict[str, str]) -> int:
+        if not constraints:
+            return self.num_entities
+        terms = []
+        for slot, value in constraints.items():
+            index = self._indexes[slot]
+            code = index.code_of.get(fold_case(value))
+            if code is None:
+                return 0
+            terms.append((index.count(code), index, code))
+        terms.sort(key=lambda term: term[0])
+        # filter the entities of the most selective constraint by the others
+        _, index, code = terms[0]
+        entities = index.entities(code)
+        for _, index, code in terms[1:]:
+            entities = entities[index.codes[entities] == code]
+        return len(entities)
@@ -40,6 +40,10 @@ class HandcraftedUserSimulator(Service):
         this domain to generate the goals.
     """
 
+    session_attributes = ('goal', 'agenda', 'turn', 'dialog_patience', 'patience',
+                          'last_user_actions', 'last_system_action', 'excluded_venues',
+                          'num_actions_next_turn')
+
     def __init__(self, domain: Domain, logger: DiasysLogger = DiasysLogger()):
         super(HandcraftedUserSimulator, self).__init__(domain)
 
@@ -707,7 +711,8 @@ class Agenda(object):
             goal (Goal): The goal for which the agenda will be initialized.
 
         """
-        self.stack.clear()
+        # re-assign instead of clearing, so agendas copied for other sessions keep their own stack
+        self.stack = []
         # populate agenda according to goal
 
         # NOTE don't push bye action here since bye action could be poppped with another (missing)
@@ -27,6 +27,8 @@ class HandcraftedUST(Service):
     A rule-based approach on user state tracking. Currently very minimalist
     """
 
+    session_attributes = ('us',)
+
     def __init__(self, domain=None, logger=None):
         Service.__init__(self, domain=domain)
         self.logger = logger
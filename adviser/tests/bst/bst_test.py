@@ -69,6 +69,30 @@ def test_update_bst_with_user_act(bst, constraintA):
     assert str(bs_dict['beliefstate']) != str(previous_bs)
 
 
+def test_update_bst_keeps_previous_turns(bst, constraintA, constraintB):
+    """
+    Tests whether updating the BST leaves the previous turns unchanged while the new turn shares
+    the informs of unchanged slots with them.
+
+    Args:
+        bst: BST Object (given in conftest.py)
+        constraintA (dict): an existing slot-value pair in the domain (given in
+        conftest_<domain>.py)
+        constraintB (dict): another existing slot-value pair in the domain (given in
+        conftest_<domain>.py)
+    """
+    bst.update_bst([UserAct(act_type=UserActionType.Inform, slot=constraintA['slot'],
+                            value=constraintA['value'], score=0.5)])
+    previous_turn = deepcopy(bst.bs[-1])
+    bst.update_bst([UserAct(act_type=UserActionType.Inform, slot=constraintB['slot'],
+                            value=constraintB['value'], score=0.7)])
+    assert bst.bs[-2] == previous_turn
+    assert bst.bs['informs'][constraintB['slot']] == {constraintB['value']: 0.7}
+    if constraintA['slot'] != constraintB['slot']:
+        # read without accessing by key (which copies the value for modification)
+        assert dict(bst.bs[-1]['informs'])[constraintA['slot']] is dict(bst.bs[-2]['informs'])[constraintA['slot']]
+
+
 def test_update_bst_sets_number_of_db_matches(bst, constraintA):
     """
     Tests whether updating the BST also updates the number of matches in the database and whether they are discriminable.
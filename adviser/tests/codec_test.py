@@ -0,0 +1,136 @@
+import os
+import pickle
+import sys
+
+import numpy as np
+import pytest
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.append(get_root_dir())
+from services import codec
+from utils import UserActionType, UserAct
+from utils.sysact import SysAct, SysActionType
+
+
+def test_acts_roundtrip(constraintA):
+    """
+    Tests whether user and system acts are restored with the compact encoding.
+
+    Args:
+        constraintA (dict): an existing slot-value pair in the domain (given in
+        conftest_<domain>.py)
+    """
+    user_acts = [UserAct('text', UserActionType.Inform, constraintA['slot'], constraintA['value'], 0.5),
+                 UserAct(act_type=UserActionType.Hello)]
+    sys_act = SysAct(SysActionType.InformByName, {constraintA['slot']: [constraintA['value']]})
+    decoded_user_acts, decoded_sys_act = codec.decode(codec.encode((user_acts, sys_act)))
+    assert decoded_user_acts == user_acts
+    assert decoded_user_acts[0].text == 'text'
+    assert decoded_sys_act.type == sys_act.type
+    assert decoded_sys_act.slot_values == sys_act.slot_values
+
+
+def test_beliefstate_sends_registered_domain_by_reference(beliefstate, constraintA):
+    """
+    Tests whether a belief state referencing a registered domain is sent without the ontology
+    and resolved to the same domain instance on receive.
+
+    Args:
+        beliefstate: BeliefState object (given in conftest.py)
+        constraintA (dict): an existing slot-value pair in the domain (given in
+        conftest_<domain>.py)
+    """
+    codec.register_domain(beliefstate.domain)
+    try:
+        beliefstate['informs'][constraintA['slot']] = {constraintA['value']: 1.0}
+        frames = codec.encode(beliefstate)
+        decoded = codec.decode(frames)
+    finally:
+        codec.unregister_domain(beliefstate.domain)
+    assert len(frames[0]) < len(codec.PickleCodec().encode(beliefstate)[0])
+    assert decoded.domain is beliefstate.domain
+    assert decoded['informs'] == beliefstate['informs']
+
+
+def test_beliefstate_sends_unregistered_domain_completely(beliefstate):
+    """
+    Tests whether a belief state referencing a domain which is not registered is sent with the whole
+    domain, and whether references of other processes are rejected instead of loading a domain.
+
+    Args:
+        beliefstate: BeliefState object (given in conftest.py)
+    """
+    codec.unregister_domain(beliefstate.domain)
+    decoded = codec.decode(codec.encode(beliefstate))
+    assert decoded.domain is not beliefstate.domain
+    assert decoded.domain.get_domain_name() == beliefstate.domain.get_domain_name()
+    with pytest.raises(ValueError):
+        codec._resolve_domain('other process', id(beliefstate.domain), beliefstate.domain.get_domain_name())
+
+
+def test_beliefstate_history_roundtrip(bst, constraintA, constraintB):
+    """
+    Tests whether all turns of a belief state are restored when only the current turn and the
+    differences of the previous turns are sent.
+
+    Args:
+        bst: BST Object (given in conftest.py)
+        constraintA (dict): an existing slot-value pair in the domain (given in
+        conftest_<domain>.py)
+        constraintB (dict): another existing slot-value pair in the domain (given in
+        conftest_<domain>.py)
+    """
+    for constraint in (constraintA, constraintB, constraintA):
+        bst.update_bst([UserAct(act_type=UserActionType.Inform, slot=constraint['slot'],
+                                value=constraint['value'], score=0.5)])
+        bst.update_bst([UserAct(act_type=UserActionType.Request, slot=constraint['slot'], score=1.0)])
+    decoded = codec.decode(codec.encode(bst.bs))
+    assert len(decoded) == len(bst.bs)
+    assert all(decoded[turn] == bst.bs[turn] for turn in range(len(bst.bs)))
+    decoded['informs'][constraintA['slot']][constraintA['value']] = 0.9
+    assert decoded[-2]['informs'][constraintA['slot']][constraintA['value']] == 0.5
+
+
+def test_arrays_are_sent_out_of_band():
+    """
+    Tests whether numpy arrays are sent as separate frames and restored unchanged.
+    """
+    audio = np.arange(16000, dtype=np.float32)
+    frames = codec.encode(('speech_in', (audio, 16000)))
+    assert len(frames) == 2
+    assert len(frames[0]) < audio.nbytes
+    _, (decoded, rate) = codec.decode([memoryview(frame) for frame in frames])
+    assert rate == 16000
+    assert np.array_equal(decoded, audio)
+
+
+def test_pickle_codec_is_compatible():
+    """
+    Tests whether messages of the plain pickle codec can be decoded.
+    """
+    message = (1.0, None, [UserAct(act_type=UserActionType.Bye)])
+    assert codec.decode(codec.PickleCodec().encode(message)) == message
+
+
+def test_beliefstate_pickle_roundtrip(bst, constraintA, constraintB):
+    """
+    Tests whether a belief state of several turns (whose current turn copies values on write) can be
+    sent with the `PickleCodec` and with plain pickle.
+
+    Args:
+        bst: BST Object (given in conftest.py)
+        constraintA (dict): an existing slot-value pair in the domain (given in
+        conftest_<domain>.py)
+        constraintB (dict): another existing slot-value pair in the domain (given in
+        conftest_<domain>.py)
+    """
+    bst.dialog_start()
+    for constraint in (constraintA, constraintB):
+        bst.bs.start_new_turn()
+        bst.bs['informs'][constraint['slot']] = {constraint['value']: 1.0}
+    frames = codec.PickleCodec().encode(bst.bs)
+    for decoded in (codec.decode(frames), pickle.loads(pickle.dumps(bst.bs))):
+        assert decoded._history == bst.bs._history
+        assert decoded['informs'] == bst.bs['informs']
@@ -1,13 +1,20 @@
+import json
 import os
 import sys
 import argparse
+import pickle
+import random
+import sqlite3
+import threading
 
 def get_root_dir():
     return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 sys.path.append(get_root_dir())
 import pytest
+from utils.domain.columnardomain import ColumnarLookupDomain
 from utils.domain.jsonlookupdomain import JSONLookupDomain
+from utils.domain.lookupdomain import LookupDomain
 
 
 # Test case using pytest.fixture
@@ -41,3 +48,211 @@ def test_query_db(load_supehero_domain : JSONLookupDomain):
     # print(entities[0])
 
 
+
+def test_shared_db_mode_equals_memory_mode(domain_name):
+    """
+        Test functionality: a domain opening its database file read-only and memory-mapped returns
+        the same rows as one copying the database into memory, also after pickling, and cannot
+        modify the database
+    """
+    memory = JSONLookupDomain(domain_name)
+    shared = JSONLookupDomain(domain_name, db_mode='shared')
+    query_str = "SELECT * FROM {}".format(domain_name)
+
+    assert shared.query_db(query_str) == memory.query_db(query_str)
+    assert pickle.loads(pickle.dumps(shared)).query_db(query_str) == memory.query_db(query_str)
+    with pytest.raises(sqlite3.OperationalError):
+        shared.query_db("DELETE FROM {}".format(domain_name))
+    with pytest.raises(ValueError):
+        JSONLookupDomain(domain_name, db_mode='mmap')
+
+
+def test_query_cache_returns_read_only_rows(domain_name):
+    """
+        Test functionality: repeated queries (also with constraints in a different order or case)
+        are answered by the query cache, the cached rows cannot be modified and reloading the
+        database empties the cache
+    """
+    domain = JSONLookupDomain(domain_name, query_cache_size=8)
+    uncached = JSONLookupDomain(domain_name, query_cache_size=0)
+    entity = domain.find_entities({})[0]
+    slots = [slot for slot in domain.get_informable_slots() if slot != domain.get_primary_key()][:2]
+    constraints = {slot: entity[slot] for slot in slots if entity.get(slot) is not None}
+    assert constraints
+
+    rows = domain.find_entities(constraints)
+    swapped = {slot: str(value).upper() for slot, value in reversed(list(constraints.items()))}
+    assert domain.find_entities(swapped) is rows
+    assert rows == uncached.find_entities(constraints)
+    info = domain.find_info_about_entity(entity[domain.get_primary_key()], slots)
+    assert domain.find_info_about_entity(entity[domain.get_primary_key()], list(reversed(slots))) is info
+    assert domain.query_cache_stats()['hits'] == 2
+
+    with pytest.raises(TypeError):
+        rows[0][slots[0]] = 'changed'
+    assert pickle.loads(pickle.dumps(rows)) == rows
+
+    domain.db = domain._open_db()
+    assert len(domain.query_cache) == 0
+
+
+def test_query_cache_shared_by_threads(domain_name):
+    """
+        Test functionality: services in different threads can share a domain with a small query
+        cache (entries are evicted while other threads look them up)
+    """
+    domain = JSONLookupDomain(domain_name, query_cache_size=2)
+    uncached = JSONLookupDomain(domain_name, query_cache_size=0)
+    slot = next(slot for slot in domain.get_informable_slots() if slot != domain.get_primary_key())
+    queries = [{}] + [{slot: value} for value in domain.get_possible_values(slot)]
+    expected = [uncached.find_entities(constraints) for constraints in queries]
+    errors = []
+
+    def lookup(offset):
+        try:
+            for step in range(200):
+                idx = (offset + step) % len(queries)
+                assert domain.find_entities(queries[idx]) == expected[idx]
+        except BaseException as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=lookup, args=(offset,)) for offset in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    stats = domain.query_cache_stats()
+    assert stats['hits'] + stats['misses'] == 8 * 200
+    assert pickle.loads(pickle.dumps(domain.query_cache)).max_size == 2
+
+
+def test_columnar_domain_equals_sql_domain(domain_name):
+    """
+        Test functionality: the columnar backend finds the same entities (and entity information)
+        as SQL for constraints on one or more slots, values in a different case, dontcare and
+        unknown values, and counts them without fetching them
+    """
+    sql = JSONLookupDomain(domain_name, query_cache_size=0)
+    columnar = ColumnarLookupDomain(domain_name, query_cache_size=0)
+    slots = list(sql.get_informable_slots())
+    rng = random.Random(0)
+    for _ in range(100):
+        constraints = {}
+        for slot in rng.sample(slots, rng.randint(0, 3)):
+            value = rng.choice(list(sql.get_possible_values(slot)) + ['dontcare', 'unknown value'])
+            constraints[slot] = value.upper() if rng.random() < 0.3 else value
+        requested_slots = rng.sample(slots, 2)
+        entities = sql.find_entities(constraints, requested_slots)
+        assert columnar.find_entities(constraints, requested_slots) == entities
+        assert columnar.count_entities(constraints) == len(entities)
+        for entity in entities[:1]:
+            entity_id = entity[sql.get_primary_key()]
+            assert columnar.find_info_about_entity(entity_id, requested_slots) == \
+                sql.find_info_about_entity(entity_id, requested_slots)
+            assert columnar.find_info_about_entity(entity_id, []) == sql.find_info_about_entity(entity_id, [])
+    assert pickle.loads(pickle.dumps(columnar)).find_entities({}) == sql.find_entities({})
+
+
+def test_columnar_domain_finds_integer_primary_keys(tmp_path):
+    """
+        Test functionality: entities with an INTEGER primary key are found by the columnar backend
+        for the id as integer and as string, like SQL does
+    """
+    ontology = {'requestable': ['id', 'color'], 'system_requestable': ['color'],
+                'informable': {'color': ['red', 'blue']}, 'key': 'id', 'pronoun_map': {}}
+    ontology_file, db_file = str(tmp_path / 'numbered.json'), str(tmp_path / 'numbered.db')
+    with open(ontology_file, 'w') as f:
+        json.dump(ontology, f)
+    db = sqlite3.connect(db_file)
+    db.execute("CREATE TABLE numbered (id INTEGER PRIMARY KEY, color TEXT)")
+    db.executemany("INSERT INTO numbered VALUES (?, ?)", [(5, 'red'), (7, 'blue')])
+    db.commit()
+    db.close()
+    sql, columnar = (domain_class('numbered', json_ontology_file=ontology_file, sqllite_db_file=db_file,
+                                  query_cache_size=0)
+                     for domain_class in (JSONLookupDomain, ColumnarLookupDomain))
+    for entity_id in (5, '5', 7, '7', 6, '6'):
+        expected = sql.find_info_about_entity(entity_id, ['color'])
+        assert columnar.find_info_about_entity(entity_id, ['color']) == expected
+        assert len(expected) == (0 if str(entity_id) == '6' else 1)
+
+
+def test_count_and_discriminable_equals_fetching_entities(domain_name):
+    """
+        Test functionality: counting the matching entities and checking whether they have different
+        values for some slot in the database gives the same result as fetching the entities
+    """
+    domain = JSONLookupDomain(domain_name, query_cache_size=0)
+    columnar = ColumnarLookupDomain(domain_name, query_cache_size=0)
+    informable = list(domain.get_informable_slots())
+    rng = random.Random(0)
+    for _ in range(100):
+        constraints = {slot: rng.choice(list(domain.get_possible_values(slot)) + ['dontcare'])
+                       for slot in rng.sample(informable, rng.randint(0, 2))}
+        slots = rng.sample(informable, rng.randint(0, len(informable)))
+        expected = LookupDomain.count_and_discriminable(domain, constraints, slots)
+        assert domain.count_and_discriminable(constraints, slots) == expected
+        assert columnar.count_and_discriminable(constraints, slots) == expected
+
+
+def test_value_counts_equal_counting_fetched_entities(domain_name):
+    """
+        Test functionality: the grouped counts of the values of slots computed by the database (and
+        the columnar backend) equal counting the values of the fetched entities
+    """
+    domain = JSONLookupDomain(domain_name, query_cache_size=0)
+    columnar = ColumnarLookupDomain(domain_name, query_cache_size=0)
+    informable = list(domain.get_informable_slots())
+    rng = random.Random(0)
+    for _ in range(100):
+        constraints = {slot: rng.choice(list(domain.get_possible_values(slot)) + ['dontcare'])
+                       for slot in rng.sample(informable, rng.randint(0, 2))}
+        slots = rng.sample(informable, rng.randint(0, len(informable)))
+        expected = LookupDomain.value_counts(domain, constraints, slots)
+        assert domain.value_counts(constraints, slots) == expected
+        assert columnar.value_counts(constraints, slots) == expected
+
+
+def test_lazy_entity_results_equal_fetched_entities(domain_name):
+    """
+        Test functionality: the lazy results of `query_entities` (counted, streamed, indexed and
+        sampled) equal the entities fetched by `find_entities`, with and without query cache
+    """
+    for domain_class in (JSONLookupDomain, ColumnarLookupDomain):
+        for cache_size in (0, 16):
+            domain = domain_class(domain_name, query_cache_size=cache_size)
+            informable = list(domain.get_informable_slots())
+            rng = random.Random(0)
+            for _ in range(20):
+                constraints = {slot: rng.choice(list(domain.get_possible_values(slot)))
+                               for slot in rng.sample(informable, rng.randint(0, 2))}
+                expected = list(domain.find_entities(constraints))
+                results = domain.query_entities(constraints)
+                assert len(results) == len(expected)
+                assert bool(results) == bool(expected)
+                assert list(results) == expected
+                assert results.first(3) == expected[:3]
+                if expected:
+                    assert results[0] == expected[0]
+                    random.seed(1)
+                    choice = random.choice(expected)
+                    random.seed(1)
+                    assert results.sample(1, random)[0] == choice
+                    assert all(set(row) == {domain.get_primary_key()}
+                               for row in results.project([domain.get_primary_key()]))
+
+
+def test_queries_bind_values_and_use_indexes(domain_name):
+    """
+        Test functionality: values containing quotes or SQL are compared as values (not executed),
+        and constraints on informable slots are looked up in an index
+    """
+    domain = JSONLookupDomain(domain_name, query_cache_size=0)
+    slot = next(iter(domain.get_informable_slots()))
+    for value in ["x' OR '1'='1", 'x" OR "1"="1', "'; DROP TABLE {};".format(domain_name)]:
+        assert domain.find_entities({slot: value}) == ()
+        assert domain.find_info_about_entity(value, [slot]) == ()
+        assert domain.count_and_discriminable({slot: value}, [slot]) == (0, False)
+    assert len(domain.find_entities({})) > 0
+    assert any('USING INDEX' in step for step in domain.explain_entities({slot: 'value'}))
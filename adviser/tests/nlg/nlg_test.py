@@ -1,4 +1,6 @@
 import os
+import random
+import shutil
 import sys
 import argparse
 import pytest
@@ -9,6 +11,8 @@ def get_root_dir():
 
 sys.path.append(get_root_dir())
 from services.nlg import HandcraftedNLG
+from services.nlg.templates.templatecache import cache_file_of
+from services.nlg.templates.templatefile import TemplateFile
 from utils.common import Language
 from services.service import Service
 from utils.sysact import SysAct, SysActionType
@@ -105,6 +109,58 @@ def test_generate_system_utterance_request_primary_uniform_colour(nlg):
 
 
 
+def test_template_file_reads_cache_on_first_use(domain, tmp_path):
+	"""
+
+	Tests whether a template file is parsed and cached once, read from the cache on first use
+	while the file is unchanged and parsed again after changing it
+
+	Args:
+		domain: Domain Object (given in conftest.py)
+		tmp_path: temporary folder (given by pytest)
+
+	"""
+	template_file = str(tmp_path / 'Messages.nlg')
+	shutil.copy(os.path.join(get_root_dir(), '..', 'resources', 'nlg_templates',
+							 f'{domain.get_domain_name()}Messages.nlg'), template_file)
+	sys_act = SysAct(act_type=SysActionType.Welcome)
+	parsed = TemplateFile(template_file, domain)
+	assert os.path.exists(cache_file_of(template_file))
+	cached = TemplateFile(template_file, domain)
+	assert cached._templates is None
+	random.seed(0)
+	expected_message = parsed.create_message(sys_act)
+	random.seed(0)
+	assert cached.create_message(sys_act) == expected_message
+
+	with open(template_file, 'a') as f:
+		f.write('\n# changed\n')
+	assert TemplateFile(template_file, domain)._templates is not None
+
+
+
+def test_template_index_finds_first_applicable_template(nlg):
+	"""
+
+	Tests whether the templates found by slot names are the first ones (in file order) which
+	are applicable, for the signatures of all templates (with and without extra slots)
+
+	Args:
+		nlg: NLG Object (given in conftest.py)
+
+	"""
+	template_file = nlg.templates
+	template_file.create_message(SysAct(act_type=SysActionType.Welcome))
+	for intent, templates in template_file._templates.items():
+		for template in templates:
+			for slot_names in (template.slot_names, template.slot_names + ['extra_slot']):
+				sys_act = SysAct(act_type=SysActionType.Welcome, slot_values={slot: ['value'] for slot in slot_names})
+				slots = template_file._create_memory_from_sys_act(sys_act)
+				expected = next((candidate for candidate in templates if candidate.is_applicable(slots)), None)
+				assert template_file._find_template(intent, frozenset(slot_names)) is expected
+
+
+
 def test_initialize_language_english(nlg):
 	"""
 
@@ -136,4 +192,37 @@ def test_initialize_language_german_courses(nlg):
 	assert nlg.template_filename != None
 	assert nlg.template_english == None
 	assert nlg.template_german == None
-	assert 'ImsCoursesMessagesGerman' in nlg.template_filename
\ No newline at end of file
+	assert 'ImsCoursesMessagesGerman' in nlg.template_filename
+
+
+def test_template_file_caches_deterministic_messages(domain, tmp_path):
+	"""
+
+	Tests whether messages of templates without random choice are cached, whether the entity
+	attributes a template looks up are queried at once and whether the counters are updated
+
+	Args:
+		domain: Domain Object (given in conftest.py)
+		tmp_path: temporary folder (given by pytest)
+
+	"""
+	template_file = str(tmp_path / 'Messages.nlg')
+	with open(template_file, 'w') as f:
+		f.write('template inform_byname(name): "{name} ({name.real_name}) works with {name.loyalty}."\n'
+				'template request(name)\n\t"Which hero?"\n\t"Whom?"\n')
+	templates = TemplateFile(template_file, domain, use_cache=False, render_cache_size=8)
+	entity = domain.find_entities({}, requested_slots=['real_name', 'loyalty'])[0]
+	inform = SysAct(act_type=SysActionType.InformByName, slot_values={'name': [entity['name']]})
+	expected_message = f"{entity['name']} ({entity['real_name']}) works with {entity['loyalty']}."
+
+	assert templates.create_message(inform) == expected_message
+	assert templates.last_utterance_stats == {'render_cache_hit': False, 'db_round_trips': 1}
+	assert templates.create_message(inform) == expected_message
+	assert templates.last_utterance_stats == {'render_cache_hit': True, 'db_round_trips': 0}
+
+	request = SysAct(act_type=SysActionType.Request, slot_values={'name': []})
+	for _ in range(3):
+		templates.create_message(request)
+		assert not templates.last_utterance_stats['render_cache_hit']
+	stats = templates.render_stats()
+	assert stats['hits'] == 1 and stats['size'] == 1 and stats['db_round_trips'] == 1
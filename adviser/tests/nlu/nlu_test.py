@@ -234,4 +234,37 @@ def test_initializing_language_is_english_by_default(nlu):
 	"""
 	nlu._initialize()
 	assert nlu.language == Language.ENGLISH
-	assert nlu.language != Language.GERMAN
\ No newline at end of file
+	assert nlu.language != Language.GERMAN
+
+
+def test_result_cache_returns_same_user_acts(domain):
+	"""
+
+	Tests whether the result cache returns the same user acts (and text) as matching without cache,
+	also for utterances differing in case and for different last system acts, and counts hits and evictions
+
+	Args:
+		domain: Domain Object (given in conftest.py)
+
+	"""
+	cached_nlu = HandcraftedNLU(domain, result_cache_size=3)
+	nlu = HandcraftedNLU(domain)
+	last_acts = [SysAct(act_type=SysActionType.Welcome), SysAct(act_type=SysActionType.Request, slot_values={"primary_uniform_color": []}),
+				 SysAct(act_type=SysActionType.Confirm, slot_values={"loyalty": ["Avengers"]}),
+				 SysAct(act_type=SysActionType.Confirm, slot_values={"loyalty": ["Justice League"]})]
+	for last_act in last_acts:
+		for utterance in ["yes", "Yes ", "I don't care", "the uniform should be Purple", "THE UNIFORM SHOULD BE PURPLE"]:
+			for service in (cached_nlu, nlu):
+				service.dialog_start()
+				service.sys_act_info['last_act'] = last_act
+			user_acts = cached_nlu.extract_user_acts(user_utterance=utterance)['user_acts']
+			expected = nlu.extract_user_acts(user_utterance=utterance)['user_acts']
+			assert user_acts == expected
+			assert [act.text for act in user_acts] == [act.text for act in expected]
+			assert cached_nlu.slots_informed == nlu.slots_informed
+	# "Yes " and the uppercase utterance hit the entry of the utterance before
+	assert cached_nlu.result_cache.hits == 2 * len(last_acts)
+	assert cached_nlu.result_cache.evictions == 3 * len(last_acts) - 3
+
+	cached_nlu._compile_rules()
+	assert len(cached_nlu.result_cache) == 0
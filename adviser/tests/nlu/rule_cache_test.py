@@ -0,0 +1,66 @@
+import json
+import os
+import shutil
+import sys
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+sys.path.append(get_root_dir())
+from services.nlu.rule_cache import load_rules, rule_files
+from tools.regextemplates.gen_regexes import create_json_from_template
+from utils.common import Language
+
+
+def _copy_rule_files(domain_name, folder):
+    """ Copies the rule files of the domain into the folder, returns their new paths """
+    files = rule_files(str(folder), domain_name, Language.ENGLISH)
+    originals = rule_files(os.path.join(get_root_dir(), 'resources', 'nlu_regexes'), domain_name, Language.ENGLISH)
+    for original, copy in zip(originals[:3], files[:3]):
+        shutil.copy(original, copy)
+    return files
+
+
+def test_load_rules_analyzes_changed_slots_only(domain, domain_name, tmp_path):
+    """
+    Tests whether the compiled rules are read from the cache if the rule files did not change and
+    whether only the patterns of changed slots are analyzed again otherwise.
+    """
+    general_file, request_file, inform_file, cache_file = _copy_rule_files(domain_name, tmp_path)
+    slots = (domain.get_requestable_slots(), domain.get_informable_slots())
+
+    rules = load_rules(general_file, request_file, inform_file, *slots, cache_file=cache_file)
+    assert len(rules.analyzed) == 1 + len(slots[0]) + len(slots[1])
+    cached = load_rules(general_file, request_file, inform_file, *slots, cache_file=cache_file)
+    assert cached.analyzed == rules.analyzed
+    assert cached.inform_regex == rules.inform_regex
+
+    with open(inform_file) as f:
+        inform_regex = json.load(f)
+    inform_regex['loyalty']['Avengers'] = "(the (avengers|revengers))"
+    with open(inform_file, 'w') as f:
+        json.dump(inform_regex, f)
+    changed = load_rules(general_file, request_file, inform_file, *slots, cache_file=cache_file)
+    assert changed.analyzed == [('inform', 'loyalty')]
+    assert changed.inform_rules.search("I like the Revengers")[0][0] == ('loyalty', 'Avengers')
+
+
+def test_gen_regexes_recreates_changed_slots_only(domain, domain_name, tmp_path):
+    """
+    Tests whether regenerating the rule files from a template only creates the regexes of slots
+    whose values in the ontology changed, unless forced to recreate all.
+    """
+    _copy_rule_files(domain_name, tmp_path)
+    template_file = os.path.join(get_root_dir(), 'resources', 'nlu_regexes', f'{domain_name}.nlu')
+    num_slots = len(domain.get_requestable_slots()) + len(domain.get_informable_slots())
+
+    assert len(create_json_from_template(domain, template_file, folder=str(tmp_path))) == num_slots
+    assert create_json_from_template(domain, template_file, folder=str(tmp_path)) == []
+
+    get_possible_values = domain.get_possible_values
+    domain.get_possible_values = lambda slot: get_possible_values(slot) + (['Avengers 2'] if slot == 'loyalty' else [])
+    assert create_json_from_template(domain, template_file, folder=str(tmp_path)) == [('inform', 'loyalty')]
+    with open(os.path.join(str(tmp_path), f'{domain_name}InformRules.json')) as f:
+        assert 'Avengers 2' in json.load(f)['loyalty']
+
+    assert len(create_json_from_template(domain, template_file, folder=str(tmp_path), force=True)) == num_slots
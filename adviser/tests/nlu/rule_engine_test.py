@@ -0,0 +1,54 @@
+import glob
+import json
+import os
+import re
+import sys
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+sys.path.append(get_root_dir())
+from services.nlu.rule_engine import RegexRuleSet, required_literals
+
+
+UTTERANCES = ["hello", "Bye!", "no", "I don't care", "what is their real name", "the uniform should be Purple",
+              "they should be part of Avengers", "I want a SEMINAR about NLP", "is it not about syntax?",
+              "what's the course code", "how many credit points is it", "İs it about nlp", "ſeminar",
+              "Gibt es ein Seminar über Semantik?", "I want Aqua Man", "WHAT IS THEIR ADDRESS"]
+
+
+def test_required_literals():
+    """
+    Tests whether the strings required by a pattern are derived from literals, alternations,
+    optional parts and lookaheads, and whether patterns without such strings yield None.
+    """
+    assert required_literals(r"(\b|^| )(hi|hello)(\b|$| )") == {"hi", "hello"}
+    assert required_literals(r"what is their (location|last (known)? address)") == \
+        {"what is their location", "what is their last  address", "what is their last known address"}
+    assert required_literals(r"^(?=.*((applied )?(\bnlp\b|natural language processing)))(?!.*not).*$") == \
+        {"nlp", "natural language processing"}
+    assert required_literals(r"Äpfel") == {"pfel"}
+    assert required_literals(r"Ä+") is None
+    assert required_literals(r".*") is None
+
+
+def test_rule_set_search_equals_re_search():
+    """
+    Tests whether searching a rule set finds exactly the rules (and matches) found by calling
+    re.search for each rule, for all rule files shipped with adviser.
+    """
+    for rule_file in glob.glob(os.path.join(get_root_dir(), 'resources', 'nlu_regexes', '*.json')):
+        with open(rule_file) as f:
+            rules = json.load(f)
+        patterns = []
+        for key, rule in rules.items():
+            if isinstance(rule, dict):
+                patterns += [((key, value), pattern) for value, pattern in rule.items()]
+            else:
+                patterns.append((key, rule))
+        rule_set = RegexRuleSet(patterns)
+        for utterance in UTTERANCES:
+            expected = [(key, match.span(), match.groups()) for key, pattern in patterns
+                        for match in [re.search(pattern, utterance, re.I)] if match is not None]
+            found = [(key, match.span(), match.groups()) for key, match in rule_set.search(utterance)]
+            assert found == expected, (rule_file, utterance)
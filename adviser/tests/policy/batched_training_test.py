@@ -0,0 +1,64 @@
+import os
+import sys
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+sys.path.append(get_root_dir())
+from services.policy.rl.batched_training import BatchedDialogTrainer
+from services.policy.rl.dqnpolicy import DQNPolicy
+from services.policy.rl.experience_buffer import UniformBuffer
+from services.policy.rl.parallel_rollouts import RolloutManager
+from services.stats.evaluation import PolicyEvaluator
+
+
+def test_lockstep_dialogs_store_whole_trajectories(domain, bst, simulator):
+    """
+    Tests whether dialogs stepped in lockstep are all run to completion and each dialog's transitions
+    end up in the replay buffer as one trajectory, ending in exactly one terminal transition.
+    """
+    policy = DQNPolicy(domain, shared_layer_sizes=[16], value_layer_sizes=[16], advantage_layer_sizes=[16],
+                       replay_buffer_size=1024, batch_size=8, buffer_cls=UniformBuffer)
+    evaluator = PolicyEvaluator(domain)
+    policy.train()
+    evaluator.train()
+    evaluator.start_epoch()
+    trainer = BatchedDialogTrainer(simulator, bst, policy, evaluator, num_parallel=3)
+    trainer.run_dialogs(7)
+
+    assert evaluator.epoch_train_dialogs == 7
+    assert policy.total_train_dialogs == 7
+    assert not policy._session_states and not bst._session_states and not simulator._session_states
+    num_transitions = len(policy.buffer)
+    terminals = policy.buffer.mem_terminal[:num_transitions].view(-1).tolist()
+    # dialogs ended by the user after the first system turn don't contain a transition
+    assert 0 < sum(terminals) <= 7
+    assert terminals[-1] == 1.0
+
+
+def test_rollout_workers_feed_learner(domain, domain_name):
+    """
+    Tests whether dialogs simulated by worker processes are all trained on and evaluated by the learner.
+    """
+    policy_kwargs = dict(shared_layer_sizes=[16], value_layer_sizes=[16], advantage_layer_sizes=[16],
+                         replay_buffer_size=1024, batch_size=8, buffer_cls=UniformBuffer)
+    policy = DQNPolicy(domain, **policy_kwargs)
+    evaluator = PolicyEvaluator(domain)
+    rollouts = RolloutManager(domain_name, policy, num_workers=2, policy_kwargs=policy_kwargs,
+                              parallel_dialogs=2, sync_dialogs=2)
+    try:
+        policy.train()
+        evaluator.train()
+        evaluator.start_epoch()
+        rollouts.run_dialogs(7, evaluator)
+        assert evaluator.epoch_train_dialogs == 7
+        assert policy.total_train_dialogs == 7
+
+        policy.eval()
+        evaluator.eval()
+        evaluator.start_epoch()
+        rollouts.run_dialogs(3, evaluator)
+        assert evaluator.epoch_eval_dialogs == 3
+        assert policy.total_train_dialogs == 7
+    finally:
+        rollouts.shutdown()
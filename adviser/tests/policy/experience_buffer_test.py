@@ -0,0 +1,49 @@
+import os
+import sys
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+sys.path.append(get_root_dir())
+import numpy as np
+import torch
+
+from services.policy.rl.experience_buffer import SumTree, SumTreePrioritizedBuffer
+
+
+def test_sum_tree_finds_leaf_by_prefix_sum():
+    """
+    Tests whether the sum tree maps values to the leaf whose priority interval contains them,
+    also after updating priorities (including repeated indices in one update).
+    """
+    tree = SumTree(5)
+    tree.set(np.arange(5), np.array([1.0, 0.0, 2.0, 0.5, 1.5]))
+    tree.set(np.array([3, 3]), np.array([7.0, 0.5]))
+    priorities = np.array([1.0, 0.0, 2.0, 0.5, 1.5])
+    assert tree.total() == priorities.sum()
+    values = np.array([0.0, 0.99, 1.0, 2.99, 3.0, 3.49, 3.5, 4.99])
+    expected = np.searchsorted(np.cumsum(priorities), values, side='right')
+    assert tree.find(values).tolist() == expected.tolist()
+
+
+def test_sum_tree_buffer_samples_by_priority():
+    """
+    Tests whether transitions with higher priority are sampled more often and get smaller importance weights,
+    and whether beta is annealed with every sampled batch.
+    """
+    buffer = SumTreePrioritizedBuffer(16, 4, 2, sample_last_transition=False, beta_annealing_steps=10)
+    for i in range(9):
+        buffer.store(torch.tensor([[float(i), 0.0]]), i % 3, -1.0)
+    assert len(buffer) == 8
+    buffer.update_batch(torch.arange(8), torch.tensor([0.0] * 7 + [100.0]))
+
+    counts = np.zeros(16)
+    for _ in range(50):
+        _, _, _, _, _, indices, weights = buffer.sample()
+        counts[indices.numpy()] += 1
+        assert weights.max().item() == 1.0
+        if 7 in indices.tolist() and len(set(indices.tolist())) > 1:
+            assert weights[indices.tolist().index(7)].item() == weights.min().item()
+    assert counts[8:].sum() == 0
+    assert counts[7] > counts[:7].max()
+    assert buffer.beta == 1.0
@@ -0,0 +1,62 @@
+import os
+import sys
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+sys.path.append(get_root_dir())
+import torch
+
+from services.policy.rl.featurizer import BeliefStateFeaturizer
+from utils.useract import UserActionType
+
+
+def _reference_vector(domain, beliefstate, sys_state):
+    """ Builds the state vector element by element, as RLPolicy used to """
+    belief_vec = [1 if act in beliefstate['user_acts'] else 0 for act in UserActionType]
+    belief_vec.append(1)
+    for slot in sorted(domain.get_informable_slots()):
+        values = domain.get_possible_values(slot) + ["dontcare"]
+        if slot not in beliefstate['informs']:
+            belief_vec.append(1.0)
+            belief_vec += [0 for _ in values]
+        else:
+            belief_vec.append(0.0)
+            bs_slot = beliefstate['informs'][slot]
+            belief_vec += [bs_slot[value] if value in bs_slot else 0.0 for value in values]
+    for slot in sorted(domain.get_requestable_slots()):
+        belief_vec.append(1.0 if slot in beliefstate['requests'] else 0.0)
+    belief_vec.append(float(sys_state['lastActionInformNone']))
+    belief_vec.append(float(sys_state['offerHappened']))
+    candidate_count = beliefstate['num_matches']
+    belief_vec.append(float(candidate_count == 0))
+    belief_vec.append(float(candidate_count == 1))
+    belief_vec.append(float(2 <= candidate_count <= 4))
+    belief_vec.append(float(candidate_count > 4))
+    belief_vec.append(float(beliefstate["discriminable"]))
+    return torch.tensor([belief_vec], dtype=torch.float)
+
+
+def test_featurize_batch_matches_reference(domain, beliefstate):
+    """
+    Tests whether the rows of a featurized batch equal the state vectors built element by element,
+    for the initial belief state as well as for belief states with acts, informs and requests.
+    """
+    featurizer = BeliefStateFeaturizer(domain)
+    initial = beliefstate._init_beliefstate()
+    beliefstate['user_acts'] = {UserActionType.Inform, UserActionType.Request}
+    beliefstate['informs'] = {'primary_uniform_color': {'Red': 0.7, 'Blue': 0.2},
+                              'loyalty': {'dontcare': 1.0}}
+    beliefstate['requests'] = {'real_name': 1.0}
+    beliefstate['num_matches'] = 3
+    beliefstate['discriminable'] = False
+    sys_states = [{'lastActionInformNone': False, 'offerHappened': False},
+                  {'lastActionInformNone': True, 'offerHappened': True}]
+
+    batch = featurizer.featurize_batch([initial, beliefstate], sys_states)
+    expected = torch.cat([_reference_vector(domain, initial, sys_states[0]),
+                          _reference_vector(domain, beliefstate, sys_states[1])])
+
+    assert batch.size() == (2, featurizer.state_dim)
+    assert torch.equal(batch, expected)
+    assert torch.equal(featurizer.featurize(beliefstate, sys_states[1]), expected[1:])
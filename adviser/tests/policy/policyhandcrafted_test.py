@@ -991,4 +991,48 @@ def test_convert_inform_by_constraints_without_results(policy, beliefstate):
     sys_act = SysAct()
     policy._convert_inform_by_constraints([], sys_act, beliefstate)
     assert sys_act.type == SysActionType.InformByName
-    assert 'none' in sys_act.slot_values[primkey]
\ No newline at end of file
+    assert 'none' in sys_act.slot_values[primkey]
+
+def test_entropy_strategy_requests_slot_with_most_even_values(policy, beliefstate):
+    """
+    Tests whether the entropy strategy selects the slot whose values split the results most
+    evenly (binary or not) and no slot if all results have the same values.
+
+    Args:
+        policy: Policy Object (given in conftest.py)
+        beliefstate: BeliefState object (given in conftest.py)
+    """
+    system_requestable = policy.domain.get_system_requestable_slots()
+    beliefstate['informs'] = {}
+    policy.request_selector.strategy = 'entropy'
+    try:
+        temp = {slot: ['foo'] * 4 for slot in system_requestable}
+        assert policy._gen_next_request(temp, beliefstate) == ""
+        if len(system_requestable) > 1:
+            temp[system_requestable[0]] = ['foo'] * 3 + ['bar']
+            temp[system_requestable[-1]] = ['foo', 'bar', 'baz', 'qux']
+            assert policy._gen_next_request(temp, beliefstate) == system_requestable[-1]
+    finally:
+        policy.request_selector.strategy = 'split'
+
+
+def test_raw_action_uses_given_histograms(policy, beliefstate, entryA, entryB):
+    """
+    Tests whether the system requests the slot selected from given value histograms (e.g. counted by
+    the domain) instead of counting the values of the results.
+
+    Args:
+        policy: Policy Object (given in conftest.py)
+        beliefstate: BeliefState object (given in conftest.py)
+        entryA (dict): slot-value pairs for a complete entry in the domain (given in
+        conftest_<domain>.py)
+        entryB (dict): slot-value pairs for another complete entry in the domain (given in
+        conftest_<domain>.py)
+    """
+    beliefstate['requests'] = {}
+    beliefstate['informs'] = {}
+    slot = policy.domain.get_system_requestable_slots()[0]
+    histograms = {slot: {value: 1 for value in list(policy.domain.get_possible_values(slot))[:2]}}
+    sys_act = policy._raw_action([entryA, entryB], beliefstate, histograms)
+    assert sys_act.type == SysActionType.Request
+    assert list(sys_act.slot_values) == [slot]
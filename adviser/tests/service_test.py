@@ -0,0 +1,225 @@
+import asyncio
+import os
+import sys
+import time
+
+import zmq
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.append(get_root_dir())
+from services.asyncio_runtime import AsyncioRuntime
+from services.service import DialogSystem, PublishSubscribe, Service, _recv_acks, _send_ack
+from utils import UserActionType, UserAct
+
+
+class _Producer(Service):
+    @PublishSubscribe(sub_topics=['go'], pub_topics=['a'])
+    def produce(self, go):
+        return {'a': go}
+
+
+class _Consumer(Service):
+    def __init__(self, domain):
+        Service.__init__(self, domain=domain)
+        self.calls = []
+
+    @PublishSubscribe(sub_topics=['a'], queued_sub_topics=['b'])
+    def consume(self, a, b, timestamps):
+        self.calls.append((a, b, timestamps))
+
+
+class _Ender(Service):
+    @PublishSubscribe(sub_topics=['go'], pub_topics=['dialog_end'])
+    def end(self, go):
+        return {'dialog_end': True}
+
+
+class _SlowConsumer(Service):
+    def __init__(self):
+        Service.__init__(self)
+        self.events = []
+
+    @PublishSubscribe(sub_topics=['go'])
+    def consume(self, go):
+        time.sleep(0.1)
+        self.events.append('handler')
+
+    def dialog_end(self):
+        self.events.append('dialog_end')
+
+
+class _WaitingAsyncConsumer(Service):
+    @PublishSubscribe(sub_topics=['a'])
+    async def consume(self, a):
+        await asyncio.sleep(0.5)
+
+
+class _AsyncConsumer(Service):
+    def __init__(self):
+        Service.__init__(self)
+        self.received = []
+
+    @PublishSubscribe(sub_topics=['a'])
+    async def consume(self, a):
+        await asyncio.sleep(0)
+        self.received.append(a)
+
+
+def test_sessions_have_separate_state(bst, constraintA):
+    """
+    Tests whether dialog-level attributes are kept separately per session.
+
+    Args:
+        bst: BST Object (given in conftest.py)
+        constraintA (dict): an existing slot-value pair in the domain (given in
+        conftest_<domain>.py)
+    """
+    base_bs = bst.bs
+    bst._open_session('a')
+    bst._open_session('b')
+    user_acts = [UserAct(act_type=UserActionType.Inform, slot=constraintA['slot'],
+                         value=constraintA['value'])]
+    with bst._session_scope('a'):
+        assert bst.get_session_id() == 'a'
+        bst.update_bst(user_acts)
+    with bst._session_scope('b'):
+        assert constraintA['slot'] not in bst.bs['informs']
+    with bst._session_scope('a'):
+        assert constraintA['slot'] in bst.bs['informs']
+    assert bst.bs is base_bs
+    assert bst.get_session_id() is None
+
+
+def test_close_session_discards_state(bst):
+    """
+    Tests whether closing a session removes its state and ignores further messages for it.
+
+    Args:
+        bst: BST Object (given in conftest.py)
+    """
+    bst._open_session(1)
+    assert 1 in bst._session_states
+    bst._close_session(1)
+    assert 1 not in bst._session_states
+    assert 1 not in bst._session_buffers
+
+
+def test_direct_transport_keeps_subscription_semantics():
+    """
+    Tests whether the in-process transport keeps latest-only and queued topics, domain suffixes
+    and timestamps.
+    """
+    consumer = _Consumer('dom')
+    ds = DialogSystem([_Producer('dom'), consumer], transport='direct')
+    ds._start_dialog({})
+    ds._bus.publish('b/dom', 1)
+    ds._bus.publish('b/dom', 2)
+    ds._bus.publish('a/other', 'ignored')
+    ds._bus.publish('go/dom', 'first')
+    ds._bus.publish('go/dom', 'second')
+    ds.shutdown()
+    assert len(consumer.calls) == 1
+    a, b, timestamps = consumer.calls[0]
+    assert a == 'first'
+    assert b == [1, 2]
+    assert set(timestamps) == {'a', 'b'} and len(timestamps['b']) == 2
+
+
+def test_direct_transport_waits_for_thread_pool_before_dialog_end():
+    """
+    Tests whether subscriber functions still running in the thread pool of the direct transport
+    return before the services' `dialog_end` is called.
+    """
+    consumer = _SlowConsumer()
+    ds = DialogSystem([_Ender(''), consumer], transport='direct', max_workers=2)
+    ds.run_dialog({'go': True})
+    ds.shutdown()
+    assert consumer.events == ['handler', 'dialog_end']
+
+
+def test_async_subscriber_outside_asyncio_runtime():
+    """
+    Tests whether `async def` subscriber functions are run to completion by the direct transport.
+    """
+    consumer = _AsyncConsumer()
+    ds = DialogSystem([_Producer(''), consumer], transport='direct')
+    ds._start_dialog({'go': 'x'})
+    ds.shutdown()
+    assert consumer.received == ['x']
+
+
+def test_asyncio_runtime_dispatch():
+    """
+    Tests whether the asyncio runtime awaits coroutine functions and runs blocking functions in its thread pool.
+    """
+    runtime = AsyncioRuntime(max_workers=1)
+    consumer = _AsyncConsumer()
+    consumer_sync = _Consumer('')
+    asyncio.run_coroutine_threadsafe(runtime.dispatch(consumer, consumer.consume, None, {'a': 'x'}),
+                                     runtime.loop).result()
+    asyncio.run_coroutine_threadsafe(runtime.dispatch(consumer_sync, consumer_sync.consume, None,
+                                                      {'a': 'y', 'b': [], 'timestamps': {}}),
+                                     runtime.loop).result()
+    runtime.stop()
+    assert consumer.received == ['x']
+    assert consumer_sync.calls == [('y', [], {})]
+
+
+def test_asyncio_runtime_drains_calls_before_dialog_end():
+    """
+    Tests whether the asyncio runtime waits for running subscriber calls of a service, and whether a
+    coroutine suspended within a session does not hold the service's threading lock.
+    """
+    runtime = AsyncioRuntime(max_workers=2)
+    consumer = _SlowConsumer()
+    consumer_async = _WaitingAsyncConsumer()
+    consumer_async._open_session('s')
+
+    def try_lock():
+        if not consumer_async._session_lock.acquire(timeout=0.1):
+            return False
+        consumer_async._session_lock.release()
+        return True
+
+    async def end_dialog():
+        asyncio.ensure_future(runtime.dispatch(consumer, consumer.consume, None, {'go': True}))
+        await asyncio.sleep(0)
+        await runtime.drain(consumer)
+        consumer.dialog_end()
+
+    async def lock_while_suspended():
+        dispatched = asyncio.ensure_future(runtime.dispatch(consumer_async, consumer_async.consume, 's', {'a': 'x'}))
+        await asyncio.sleep(0)
+        acquired = await runtime.run_blocking(try_lock)
+        await dispatched
+        return acquired
+
+    try:
+        asyncio.run_coroutine_threadsafe(end_dialog(), runtime.loop).result(timeout=5)
+        acquired = asyncio.run_coroutine_threadsafe(lock_while_suspended(), runtime.loop).result(timeout=5)
+    finally:
+        runtime.stop()
+    assert consumer.events == ['handler', 'dialog_end']
+    assert acquired
+
+
+def test_recv_acks_collects_in_any_order():
+    """
+    Tests whether ACK's are collected independent of their order and missing ACK's are reported after the timeout.
+    """
+    ctx = zmq.Context.instance()
+    pub = ctx.socket(zmq.PUB)
+    pub.bind('inproc://recv_acks_test')
+    sub = ctx.socket(zmq.SUB)
+    sub.setsockopt(zmq.SUBSCRIBE, b'ACK/')
+    sub.connect('inproc://recv_acks_test')
+    time.sleep(0.1)  # wait for subscription
+    _send_ack(pub, 'B/END')
+    _send_ack(pub, 'C/END', False)
+    _send_ack(pub, 'A/END')
+    missing = _recv_acks(sub, ['A/END', 'B/END', 'C/END'], timeout=0.1)
+    pub.close()
+    sub.close()
+    assert missing == ['C/END']
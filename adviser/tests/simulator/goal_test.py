@@ -8,6 +8,7 @@ def get_root_dir():
 
 sys.path.append(get_root_dir())
 from services.simulator.goal import Constraint
+from utils import common
 
 
 def test_init_random_goal_without_parameters(goal):
@@ -45,6 +46,28 @@ def test_init_random_goal_with_parameters(goal):
     assert len(goal.requests) >= min_requests
     assert len(goal.requests) <= max_requests + 1 # primary key slot is added separately
 
+def test_goal_sampler_equals_database_lookups(goal):
+    """
+    Tests whether the goal sampler counts the same entities as the domain and draws the same
+    entities as choosing from the results of the database.
+
+    Args:
+        goal: Goal object (given in conftest.py)
+    """
+    entities = goal.domain.find_entities({}, requested_slots=goal.inf_slots)
+    for seed in range(10):
+        common.random.seed(seed)
+        slots = list(common.random.sample(goal.inf_slots, min(2, len(goal.inf_slots))))
+        constraints = {slot: common.random.choice(goal.inf_slot_values[slot]) for slot in slots}
+        assert goal.sampler.count(constraints) == len(goal.domain.find_entities(constraints))
+        assert goal.sampler.count({slot: value.upper() for slot, value in constraints.items()}) == \
+            len(goal.domain.find_entities(constraints))
+        state = common.random.getstate()
+        expected = common.random.choice(entities)
+        common.random.setstate(state)
+        assert goal.sampler.sample_entity(slots, common.random) == {slot: expected[slot] for slot in slots}
+
+
 @pytest.mark.parametrize('constraints', [
     lambda x, y: [(x['slot'], x['value']), (y['slot'], y['value'])], # as list of tuples
     lambda x, y: [Constraint(x['slot'], x['value']), Constraint(y['slot'], y['value'])], # as list of Constraints
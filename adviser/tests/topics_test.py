@@ -0,0 +1,33 @@
+import os
+import sys
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.append(get_root_dir())
+from utils.topics import TopicTrie
+
+
+def test_longest_prefix_follows_subscription_semantics():
+    """
+    Tests whether topics are matched to the longest subscribed prefix, character-wise as in zmq.
+    """
+    trie = TopicTrie(['user', 'user_acts', 'user_acts/ImsLecturers'])
+    assert trie.longest_prefix('user_acts/ImsLecturers') == 'user_acts/ImsLecturers'
+    assert trie.longest_prefix('user_acts/ImsCourses') == 'user_acts'
+    assert trie.longest_prefix('user_utterance') == 'user'
+    assert trie.prefixes('user_acts/ImsLecturers') == ('user', 'user_acts', 'user_acts/ImsLecturers')
+    assert trie.longest_prefix('sys_act') is None
+
+
+def test_has_extension():
+    """
+    Tests whether prefixes of stored topics are detected (used to find subscriptions with publishers).
+    """
+    trie = TopicTrie(['beliefstate/ImsLecturers'])
+    assert trie.has_extension('beliefstate')
+    assert trie.has_extension('beliefstate/ImsLecturers')
+    assert not trie.has_extension('beliefstate/ImsCourses')
+    assert 'beliefstate' not in trie
+    trie.add('beliefstate')
+    assert 'beliefstate' in trie
@@ -0,0 +1,121 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+"""
+Runs dialogs of random user acts through the `HandcraftedBST` and compares belief states copying
+the whole last turn for each new turn (as `BeliefState` used to) with belief states sharing the
+unchanged values between turns: memory of the history, size of the last published message and of
+all messages published during the dialog (the old encoding pickled the whole history).
+"""
+
+import argparse
+import copy
+import os
+import pickle
+import random
+import sys
+
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+sys.path.append(get_root_dir())
+
+from services import codec
+from services.bst import HandcraftedBST
+from utils.beliefstate import BeliefState
+from utils.domain.jsonlookupdomain import JSONLookupDomain
+from utils.useract import UserAct, UserActionType
+
+
+class DeepCopyBeliefState(BeliefState):
+    """ `BeliefState` copying the whole last turn for each new turn """
+
+    def __getitem__(self, val):
+        if isinstance(val, str):
+            return self._history[-1][val]
+        return self._history[val]
+
+    def start_new_turn(self):
+        self._history.append(copy.deepcopy(self._history[-1]))
+
+
+def random_dialog(domain: JSONLookupDomain, num_turns: int, seed: int = 0) -> list:
+    """ Returns the user acts of each turn: an inform with 1 - 3 hypotheses and a request """
+    rng = random.Random(seed)
+    informable = list(domain.get_informable_slots())
+    requestable = list(domain.get_requestable_slots())
+    turns = []
+    for _ in range(num_turns):
+        slot = rng.choice(informable)
+        values = rng.sample(domain.get_possible_values(slot), min(rng.randint(1, 3), len(domain.get_possible_values(slot))))
+        turns.append([UserAct(act_type=UserActionType.Inform, slot=slot, value=value, score=rng.random())
+                      for value in values] +
+                     [UserAct(act_type=UserActionType.Request, slot=rng.choice(requestable), score=1.0)])
+    return turns
+
+
+def deep_size(obj, seen: set = None) -> int:
+    """ Returns the memory of an object and all containers and values reachable from it, each counted once """
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(key, seen) + deep_size(value, seen) for key, value in dict.items(obj))
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in obj)
+    return size
+
+
+def run_dialog(bst: HandcraftedBST, belief_state: BeliefState, dialog: list, encode) -> tuple:
+    """ Returns the memory of the history, the size of the last message and of all messages in bytes """
+    bst.bs = belief_state
+    total_bytes = 0
+    for user_acts in dialog:
+        message_bytes = len(encode(bst.update_bst(user_acts=user_acts)['beliefstate']))
+        total_bytes += message_bytes
+    return deep_size(bst.bs._history), message_bytes, total_bytes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--domains", type=str, nargs='+', default=["ImsLecturers", "ImsCourses"],
+                        help="names of the domains")
+    parser.add_argument("-t", "--turns", type=int, nargs='+', default=[25, 100], help="numbers of turns")
+    args = parser.parse_args()
+
+    print(f"{'domain':>13} {'turns':>6} {'history':>9} {'memory KB':>10} {'last msg B':>11} {'all msgs KB':>12}")
+    for name in args.domains:
+        domain = JSONLookupDomain(name)
+        codec.register_domain(domain)
+        bst = HandcraftedBST(domain=domain)
+        for num_turns in args.turns:
+            dialog = random_dialog(domain, num_turns)
+            results = {}
+            for history, belief_state, encode in (
+                    ('copied', DeepCopyBeliefState(domain),
+                     lambda bs: pickle.dumps((name, bs._history), protocol=pickle.HIGHEST_PROTOCOL)),
+                    ('shared', BeliefState(domain), lambda bs: codec.encode(bs)[0])):
+                memory, last_message, all_messages = run_dialog(bst, belief_state, dialog, encode)
+                results[history] = bst.bs._history
+                print(f"{name:>13} {num_turns:>6} {history:>9} {memory / 1024:>10.1f} {last_message:>11} "
+                      f"{all_messages / 1024:>12.1f}")
+            assert results['copied'] == results['shared'], "histories differ"
@@ -0,0 +1,123 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+"""
+Compares per-message latency and bytes on the wire of the legacy bus serialization
+(one pickled frame) with the default `services.codec` codec for typical message types.
+A message is counted from serialization to deserialization, sent over an inproc zmq socket pair.
+"""
+
+import argparse
+import datetime
+import os
+import pickle
+import sys
+import time
+
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+sys.path.append(get_root_dir())
+
+import numpy as np
+import torch
+import zmq
+
+from services import codec
+from utils.beliefstate import BeliefState
+from utils.domain.jsonlookupdomain import JSONLookupDomain
+from utils.sysact import SysAct, SysActionType
+from utils.useract import UserAct, UserActionType
+
+
+def example_messages(domain_name: str) -> dict:
+    """ Returns topic -> message content for typical message types """
+    domain = JSONLookupDomain(domain_name)
+    codec.register_domain(domain)
+    slots = list(domain.get_informable_slots())[:2]
+    values = [domain.get_possible_values(slot)[0] for slot in slots]
+    user_acts = [UserAct(f"{slot} {value}", UserActionType.Inform, slot, value) for slot, value in zip(slots, values)]
+    user_acts.append(UserAct(act_type=UserActionType.Request, slot=domain.get_requestable_slots()[0]))
+    beliefstate = BeliefState(domain)
+    for slot, value in zip(slots, values):
+        beliefstate['informs'][slot] = {value: 1.0}
+    beliefstate['user_acts'] = {act.type for act in user_acts}
+    return {
+        'user_utterance': "I am looking for a lecturer in the field of speech",
+        'user_acts': user_acts,
+        'beliefstate': beliefstate,
+        'sys_act': SysAct(SysActionType.InformByName, {slot: [value] for slot, value in zip(slots, values)}),
+        'speech_in': (np.random.rand(16000 * 5).astype(np.float32), 16000),  # 5 seconds of audio
+        'speech_features': np.random.rand(500, 83).astype(np.float32),
+        'mfcc': torch.rand(500, 13),
+    }
+
+
+def legacy_roundtrip(sender: zmq.Socket, receiver: zmq.Socket, topic: bytes, content) -> int:
+    """ Send / receive as done before `services.codec`, returns bytes on the wire """
+    data = pickle.dumps((datetime.datetime.now().timestamp(), None, content))
+    sender.send_multipart((topic, data))
+    msg = receiver.recv_multipart(copy=True)
+    pickle.loads(msg[1])
+    return len(data)
+
+
+def codec_roundtrip(sender: zmq.Socket, receiver: zmq.Socket, topic: bytes, content) -> int:
+    """ Send / receive with `services.codec`, returns bytes on the wire """
+    frames = codec.encode((datetime.datetime.now().timestamp(), None, content))
+    sender.send_multipart([topic] + frames, copy=False)
+    msg = receiver.recv_multipart(copy=False)
+    codec.decode([frame.buffer for frame in msg[1:]])
+    return sum(memoryview(frame).nbytes for frame in frames)
+
+
+def measure(roundtrip, sender, receiver, topic: str, content, repetitions: int):
+    """ Returns (microseconds per message, bytes per message) """
+    topic = bytes(topic, encoding="ascii")
+    num_bytes = roundtrip(sender, receiver, topic, content)  # warm up
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        roundtrip(sender, receiver, topic, content)
+    return (time.perf_counter() - start) / repetitions * 1e6, num_bytes
+
+
+def benchmark(domain_name: str, repetitions: int):
+    ctx = zmq.Context.instance()
+    receiver = ctx.socket(zmq.PAIR)
+    receiver.bind("inproc://bench_codec")
+    sender = ctx.socket(zmq.PAIR)
+    sender.connect("inproc://bench_codec")
+
+    print(f"{'topic':>16} {'pickle us':>10} {'codec us':>10} {'pickle B':>10} {'codec B':>10}")
+    for topic, content in example_messages(domain_name).items():
+        legacy_us, legacy_bytes = measure(legacy_roundtrip, sender, receiver, topic, content, repetitions)
+        codec_us, codec_bytes = measure(codec_roundtrip, sender, receiver, topic, content, repetitions)
+        print(f"{topic:>16} {legacy_us:>10.1f} {codec_us:>10.1f} {legacy_bytes:>10} {codec_bytes:>10}")
+    sender.close()
+    receiver.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--domain", default="ImsLecturers", help="domain of the example messages")
+    parser.add_argument("-n", "--repetitions", type=int, default=2000, help="messages sent per topic")
+    args = parser.parse_args()
+
+    benchmark(args.domain, args.repetitions)
@@ -0,0 +1,130 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+"""
+Compares `JSONLookupDomain` (SQL) with `ColumnarLookupDomain` (columns with bitmap indexes) on
+synthetic domains with 10^3, 10^5 and 10^6 entities: load time, time per `find_entities` call and
+time per count of matching entities, for random queries with 1 - 3 constraints (query caches
+disabled).
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+sys.path.append(get_root_dir())
+
+from utils.domain.columnardomain import ColumnarLookupDomain
+from utils.domain.jsonlookupdomain import JSONLookupDomain
+
+# slot -> number of distinct values of the synthetic domain
+SLOTS = {'color': 8, 'size': 3, 'region': 50, 'rating': 5, 'open': 2, 'city': 1000}
+
+
+def create_domain(folder: str, name: str, num_rows: int, seed: int = 0) -> tuple:
+    """ Writes ontology and database of a synthetic domain, returns their paths """
+    rng = random.Random(seed)
+    values = {slot: [f"{slot}{idx}" for idx in range(num_values)] for slot, num_values in SLOTS.items()}
+    ontology = {'requestable': ['name', *SLOTS, 'description'], 'system_requestable': list(SLOTS),
+                'informable': values, 'key': 'name', 'pronoun_map': {}}
+    ontology_file = os.path.join(folder, name + '.json')
+    with open(ontology_file, 'w') as f:
+        json.dump(ontology, f)
+    db_file = os.path.join(folder, name + '.db')
+    db = sqlite3.connect(db_file)
+    db.execute(f"CREATE TABLE {name} (name TEXT PRIMARY KEY, {', '.join(SLOTS)}, description TEXT)")
+    db.executemany(f"INSERT INTO {name} VALUES ({', '.join('?' * (len(SLOTS) + 2))})",
+                   ((f"entity{row}", *(rng.choice(values[slot]) for slot in SLOTS), f"description of entity{row}")
+                    for row in range(num_rows)))
+    db.commit()
+    db.close()
+    return ontology_file, db_file
+
+
+def random_queries(domain: JSONLookupDomain, num_queries: int, seed: int = 0) -> list:
+    """ Returns constraints of 1 - 3 random slots with random values """
+    rng = random.Random(seed)
+    slots = [slot for slot in domain.get_informable_slots()]
+    return [{slot: rng.choice(domain.get_possible_values(slot)) for slot in rng.sample(slots, rng.randint(1, 3))}
+            for _ in range(num_queries)]
+
+
+def sql_count(domain: JSONLookupDomain, constraints: dict) -> int:
+    """ Counts the matching entities with SQL """
+    query = f"SELECT COUNT(*) AS num FROM {domain.get_domain_name()} WHERE " + \
+        ' AND '.join(f"{slot}='{value}' COLLATE NOCASE" for slot, value in constraints.items())
+    return domain.query_db(query)[0]['num']
+
+
+def timed(function, queries: list) -> tuple:
+    """ Returns the number of results of calling the function with each query and the mean time per
+        call in ms (results are not kept, they can get large) """
+    sizes = []
+    start = time.perf_counter()
+    for constraints in queries:
+        result = function(constraints)
+        sizes.append(result if isinstance(result, int) else len(result))
+    return sizes, (time.perf_counter() - start) / len(queries) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-s", "--sizes", type=int, nargs='+', default=[10 ** 3, 10 ** 5, 10 ** 6],
+                        help="numbers of entities")
+    parser.add_argument("-q", "--queries", type=int, default=20, help="number of queries per size")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        print(f"{'rows':>8} {'backend':>8} {'load s':>7} {'find ms':>9} {'count ms':>9} {'rows/query':>11}")
+        for num_rows in args.sizes:
+            name = f"synthetic{num_rows}"
+            ontology_file, db_file = create_domain(tmp_dir, name, num_rows)
+            domains = []
+            for backend, domain_class in (('sql', JSONLookupDomain), ('columnar', ColumnarLookupDomain)):
+                start = time.perf_counter()
+                domain = domain_class(name, json_ontology_file=ontology_file, sqllite_db_file=db_file,
+                                      query_cache_size=0)
+                load_s = time.perf_counter() - start
+                queries = random_queries(domain, args.queries)
+                found, find_ms = timed(domain.find_entities, queries)
+                if backend == 'sql':
+                    counts, count_ms = timed(lambda constraints: sql_count(domain, constraints), queries)
+                else:
+                    counts, count_ms = timed(domain.count_entities, queries)
+                assert counts == found, "counts differ"
+                domains.append(domain)
+                print(f"{num_rows:>8} {backend:>8} {load_s:>7.2f} {find_ms:>9.3f} {count_ms:>9.3f} "
+                      f"{sum(counts) / len(counts):>11.1f}")
+            for constraints in queries[:3]:
+                assert domains[0].find_entities(constraints) == domains[1].find_entities(constraints), \
+                    "backends disagree"
+            del domains
+    finally:
+        shutil.rmtree(tmp_dir)
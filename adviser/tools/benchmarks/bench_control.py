@@ -0,0 +1,92 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+"""
+Measures the control message handshakes of `DialogSystem`: startup time (until all services are ready)
+and the time for starting / ending a dialog with many services, each having several listeners.
+Handshakes are measured pipelined (as used by `DialogSystem`) and one service at a time for comparison.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+sys.path.append(get_root_dir())
+
+import numpy as np
+
+from services.service import DialogSystem, PublishSubscribe, Service, _recv_acks, _send_msg
+
+
+class ListenerService(Service):
+    """ Service with several listener functions doing nothing """
+
+    @PublishSubscribe(sub_topics=['a'])
+    def listen_a(self, a):
+        pass
+
+    @PublishSubscribe(sub_topics=['b'])
+    def listen_b(self, b):
+        pass
+
+    @PublishSubscribe(sub_topics=['c'])
+    def listen_c(self, c):
+        pass
+
+
+def handshake_serial(ds: DialogSystem, topics):
+    """ Sends a control message to one service at a time, waiting for its ACK before sending the next one """
+    for topic in topics:
+        _send_msg(ds._control_channel_pub, topic, True)
+        _recv_acks(ds._control_channel_sub, [topic])
+
+
+def handshake_pipelined(ds: DialogSystem, topics):
+    """ Sends a control message to all services at once, then collects the ACK's """
+    ds._broadcast_control_msg(topics)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-s", "--services", type=int, default=20, help="number of services")
+    parser.add_argument("-n", "--dialogs", type=int, default=50, help="number of dialog starts / ends per mode")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    ds = DialogSystem(services=[ListenerService(identifier=f"listener{i}") for i in range(args.services)])
+    print(f"startup with {args.services} services ({3 * args.services} listeners): "
+          f"{(time.perf_counter() - start) * 1000:.1f} ms")
+
+    print(f"{'mode':>10} {'start ms':>10} {'end ms':>10}")
+    for mode, handshake in (('serial', handshake_serial), ('pipelined', handshake_pipelined)):
+        start_times, end_times = [], []
+        for _ in range(args.dialogs):
+            start = time.perf_counter()
+            handshake(ds, ds._start_topics)
+            start_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            handshake(ds, ds._end_topics)
+            end_times.append(time.perf_counter() - start)
+        print(f"{mode:>10} {np.median(start_times) * 1000:>10.3f} {np.median(end_times) * 1000:>10.3f}")
+    ds.shutdown()
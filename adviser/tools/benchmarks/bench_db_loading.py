@@ -0,0 +1,153 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+"""
+Measures the time it takes to create a `JSONLookupDomain` and the memory its database occupies,
+for 1, 8 and 32 worker processes each creating the domain at the same time, comparing
+    - dump: replaying an SQL dump of the database file in memory (as adviser used to)
+    - memory: copying the database file into memory with the sqlite backup API
+    - shared: opening the database file read-only and memory-mapped
+
+The database is the one of the domain, enlarged by adding copies of its rows (with different
+primary keys). Memory is the proportional set size (PSS, Linux only), so pages shared by several
+workers are only counted once in the total.
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from io import StringIO
+
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+sys.path.append(get_root_dir())
+
+from utils.domain.jsonlookupdomain import JSONLookupDomain
+
+
+class DumpLoadingDomain(JSONLookupDomain):
+    """ `JSONLookupDomain` loading its database by replaying an SQL dump """
+
+    def _load_db_to_memory(self, db_file_path: str):
+        file_db = sqlite3.connect(db_file_path, check_same_thread=False)
+        dump = StringIO()
+        for line in file_db.iterdump():
+            dump.write('%s\n' % line)
+        file_db.close()
+        db = sqlite3.connect(':memory:', check_same_thread=False)
+        db.row_factory = self._sqllite_dict_factory
+        db.cursor().executescript(dump.getvalue())
+        db.commit()
+        return db
+
+
+def enlarge_db(domain_name: str, db_file: str, copies: int):
+    """ Copies the database of the domain to db_file, adding the given number of copies of each row """
+    domain = JSONLookupDomain(domain_name)
+    shutil.copy(os.path.join(get_root_dir(), 'resources', 'databases', domain_name + '.db'), db_file)
+    db = sqlite3.connect(db_file)
+    columns = [row[1] for row in db.execute(f"PRAGMA table_info({domain_name})")]
+    key = domain.get_primary_key()
+    for copy_idx in range(1, copies + 1):
+        select = ", ".join(f"{column} || '#{copy_idx}'" if column == key else column for column in columns)
+        db.execute(f"INSERT INTO {domain_name} SELECT {select} FROM {domain_name} WHERE {key} NOT LIKE '%#%'")
+    db.commit()
+    db.close()
+
+
+def memory_kb() -> int:
+    """ Returns the proportional set size of this process in kB (resident set size if unknown) """
+    for status_file, field in (('/proc/self/smaps_rollup', 'Pss:'), ('/proc/self/status', 'VmRSS:')):
+        try:
+            with open(status_file) as f:
+                for line in f:
+                    if line.startswith(field):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+    return 0
+
+
+def worker(domain_name: str, db_file: str, mode: str, barrier, results):
+    """ Creates the domain, runs a query reading every row, then reports its load time and memory
+        once all workers are done loading """
+    before = memory_kb()
+    start = time.perf_counter()
+    if mode == 'dump':
+        domain = DumpLoadingDomain(domain_name, sqllite_db_file=db_file)
+    else:
+        domain = JSONLookupDomain(domain_name, sqllite_db_file=db_file, db_mode=mode)
+    key = domain.get_primary_key()
+    num_rows = domain.query_db(
+        f"SELECT COUNT(*) AS num_rows FROM {domain_name} WHERE {key} LIKE '%'")[0]['num_rows']
+    seconds = time.perf_counter() - start
+    barrier.wait()
+    results.put((seconds, memory_kb() - before, num_rows))
+    barrier.wait()
+
+
+def benchmark(domain_name: str, db_file: str, mode: str, num_workers: int) -> tuple:
+    """ Returns the mean load time (ms), the total memory of the databases (MB) and the rows per worker """
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(num_workers)
+    results = context.Queue()
+    workers = [context.Process(target=worker, args=(domain_name, db_file, mode, barrier, results))
+               for _ in range(num_workers)]
+    for process in workers:
+        process.start()
+    reported = [results.get() for _ in workers]
+    for process in workers:
+        process.join()
+    num_rows = {rows for _, _, rows in reported}
+    assert len(num_rows) == 1, "workers disagree"
+    return (sum(seconds for seconds, _, _ in reported) / num_workers * 1000,
+            sum(kb for _, kb, _ in reported) / 1024, num_rows.pop())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--domain", type=str, default="ImsCourses", help="name of the domain")
+    parser.add_argument("-c", "--copies", type=int, default=200,
+                        help="number of copies of each row added to the database")
+    parser.add_argument("-w", "--workers", type=int, nargs='+', default=[1, 8, 32],
+                        help="numbers of worker processes")
+    parser.add_argument("-m", "--modes", type=str, nargs='+', default=['dump', 'memory', 'shared'],
+                        help="ways of loading the database")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        db_file = os.path.join(tmp_dir, args.domain + '.db')
+        enlarge_db(args.domain, db_file, args.copies)
+        print(f"domain {args.domain}, database {os.path.getsize(db_file) / 2 ** 20:.1f} MB")
+        print(f"{'workers':>8} {'mode':>7} {'rows':>8} {'load ms':>9} {'total MB':>9} {'MB/worker':>10}")
+        for num_workers in args.workers:
+            for mode in args.modes:
+                load_ms, total_mb, num_rows = benchmark(args.domain, db_file, mode, num_workers)
+                print(f"{num_workers:>8} {mode:>7} {num_rows:>8} {load_ms:>9.1f} {total_mb:>9.1f} "
+                      f"{total_mb / num_workers:>10.2f}")
+    finally:
+        shutil.rmtree(tmp_dir)
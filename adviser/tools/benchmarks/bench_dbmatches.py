@@ -0,0 +1,96 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+"""
+Measures the time per `count_and_discriminable` call (as made by `BeliefState.get_num_dbmatches`)
+when fetching all matching entities and comparing their values in Python (as the belief state
+used to), with aggregate SQL (`JSONLookupDomain`) and with bitmap counts (`ColumnarLookupDomain`),
+for the shipped domains and synthetic domains (query caches disabled).
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+sys.path.append(get_root_dir())
+
+from tools.benchmarks.bench_columnar_domain import create_domain
+from utils.domain.columnardomain import ColumnarLookupDomain
+from utils.domain.jsonlookupdomain import JSONLookupDomain
+from utils.domain.lookupdomain import LookupDomain
+
+
+def random_calls(domain: JSONLookupDomain, num_calls: int, seed: int = 0) -> list:
+    """ Returns (constraints, slots) as passed by the belief state for random constraints """
+    rng = random.Random(seed)
+    informable = list(domain.get_informable_slots())
+    calls = []
+    for _ in range(num_calls):
+        constraints = {slot: rng.choice(list(domain.get_possible_values(slot)) + ['dontcare'])
+                       for slot in rng.sample(informable, rng.randint(0, 2))}
+        slots = [slot for slot in informable
+                 if slot != domain.get_primary_key() and constraints.get(slot) != 'dontcare']
+        calls.append((constraints, slots))
+    return calls
+
+
+def timed(function, calls: list) -> tuple:
+    """ Returns the results of all calls and the mean time per call in ms """
+    start = time.perf_counter()
+    results = [function(constraints, slots) for constraints, slots in calls]
+    return results, (time.perf_counter() - start) / len(calls) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--domains", type=str, nargs='+', default=["ImsLecturers", "ImsCourses"],
+                        help="names of the shipped domains")
+    parser.add_argument("-s", "--sizes", type=int, nargs='+', default=[10 ** 4, 10 ** 5],
+                        help="numbers of entities of the synthetic domains")
+    parser.add_argument("-n", "--calls", type=int, default=50, help="number of calls per domain")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        domains = [(name, {}) for name in args.domains]
+        for num_rows in args.sizes:
+            ontology_file, db_file = create_domain(tmp_dir, f"synthetic{num_rows}", num_rows)
+            domains.append((f"synthetic{num_rows}", {'json_ontology_file': ontology_file,
+                                                     'sqllite_db_file': db_file}))
+        print(f"{'domain':>18} {'fetch ms':>9} {'sql ms':>9} {'columnar ms':>12}")
+        for name, files in domains:
+            sql = JSONLookupDomain(name, query_cache_size=0, **files)
+            columnar = ColumnarLookupDomain(name, query_cache_size=0, **files)
+            calls = random_calls(sql, args.calls)
+            fetched, fetch_ms = timed(lambda constraints, slots: LookupDomain.count_and_discriminable(
+                sql, constraints, slots), calls)
+            aggregated, sql_ms = timed(sql.count_and_discriminable, calls)
+            counted, columnar_ms = timed(columnar.count_and_discriminable, calls)
+            assert fetched == aggregated == counted, "results differ"
+            print(f"{name:>18} {fetch_ms:>9.3f} {sql_ms:>9.3f} {columnar_ms:>12.3f}")
+    finally:
+        shutil.rmtree(tmp_dir)
@@ -0,0 +1,113 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+"""
+Compares converting belief states into state vectors element by element (as `RLPolicy` used to)
+with `BeliefStateFeaturizer`, one belief state at a time and in batches.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+sys.path.append(get_root_dir())
+
+import torch
+
+from services.policy.rl.featurizer import BeliefStateFeaturizer
+from utils.beliefstate import BeliefState
+from utils.domain.jsonlookupdomain import JSONLookupDomain
+from utils.useract import UserActionType
+
+
+def legacy_vector(domain, beliefstate, sys_state):
+    """ State vector built element by element (the former `RLPolicy.beliefstate_dict_to_vector`) """
+    belief_vec = [1 if act in beliefstate['user_acts'] else 0 for act in UserActionType]
+    belief_vec.append(1 if sum(belief_vec) == 0 else 1)
+    for slot in sorted(domain.get_informable_slots()):
+        values = domain.get_possible_values(slot) + ["dontcare"]
+        if slot not in beliefstate['informs']:
+            belief_vec.append(1.0)
+            belief_vec += [0 for i in range(len(values))]
+        else:
+            belief_vec.append(0.0)
+            bs_slot = beliefstate['informs'][slot]
+            belief_vec += [bs_slot[value] if value in bs_slot else 0.0 for value in values]
+    for slot in sorted(domain.get_requestable_slots()):
+        belief_vec.append(1.0 if slot in beliefstate['requests'] else 0.0)
+    belief_vec.append(float(sys_state['lastActionInformNone']))
+    belief_vec.append(float(sys_state['offerHappened']))
+    candidate_count = beliefstate['num_matches']
+    belief_vec.append(float(candidate_count == 0))
+    belief_vec.append(float(candidate_count == 1))
+    belief_vec.append(float(2 <= candidate_count <= 4))
+    belief_vec.append(float(candidate_count > 4))
+    belief_vec.append(float(beliefstate["discriminable"]))
+    return torch.tensor([belief_vec], dtype=torch.float)
+
+
+def random_beliefstate(domain, rng: random.Random) -> dict:
+    """ Returns a belief state (turn dict) with a few random acts, informs and requests """
+    beliefstate = BeliefState(domain)._init_beliefstate()
+    beliefstate['user_acts'] = set(rng.sample(list(UserActionType), 2))
+    for slot in rng.sample(sorted(domain.get_informable_slots()), 2):
+        values = domain.get_possible_values(slot)
+        beliefstate['informs'][slot] = {value: rng.random() for value in rng.sample(sorted(values), min(2, len(values)))}
+    beliefstate['requests'] = {slot: 1.0 for slot in rng.sample(sorted(domain.get_requestable_slots()), 1)}
+    beliefstate['num_matches'] = rng.randint(0, 10)
+    beliefstate['discriminable'] = rng.random() < 0.5
+    return beliefstate
+
+
+def timed(func, repetitions: int) -> float:
+    """ Returns the mean time of calling func in microseconds """
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        func()
+    return (time.perf_counter() - start) / repetitions * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--domain", type=str, default="ImsLecturers", help="name of the domain")
+    parser.add_argument("-b", "--batchsizes", type=int, nargs='+', default=[1, 16, 64], help="batch sizes")
+    parser.add_argument("-r", "--repetitions", type=int, default=200, help="calls per measurement")
+    args = parser.parse_args()
+
+    domain = JSONLookupDomain(args.domain)
+    featurizer = BeliefStateFeaturizer(domain)
+    rng = random.Random(12345)
+    sys_state = {'lastActionInformNone': False, 'offerHappened': True}
+    print(f"domain {args.domain}, state dim {featurizer.state_dim}")
+    print(f"{'batch':>6} {'legacy us':>10} {'featurizer us':>14} {'speedup':>8}")
+    for batch_size in args.batchsizes:
+        beliefstates = [random_beliefstate(domain, rng) for _ in range(batch_size)]
+        sys_states = [sys_state] * batch_size
+        assert torch.equal(torch.cat([legacy_vector(domain, bs, sys_state) for bs in beliefstates]),
+                           featurizer.featurize_batch(beliefstates, sys_states))
+        legacy = timed(lambda: torch.cat([legacy_vector(domain, bs, sys_state) for bs in beliefstates]),
+                       args.repetitions)
+        compiled = timed(lambda: featurizer.featurize_batch(beliefstates, sys_states), args.repetitions)
+        print(f"{batch_size:>6} {legacy:>10.1f} {compiled:>14.1f} {legacy / compiled:>8.1f}")
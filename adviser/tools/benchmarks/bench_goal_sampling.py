@@ -0,0 +1,121 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+"""
+Measures random user goals drawn per second (with the goal parameters of `usermodel.cfg`, without
+query cache) when the reachable entity and the number of matching entities are looked up in the
+database for every attempt (fetching all entities, as `Goal._init_random_goal` used to) and when
+they are answered by the `GoalSampler` of the domain (including the time to read its table once).
+Checks that both draw the same goals for the same seed.
+"""
+
+import argparse
+import configparser
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+sys.path.append(get_root_dir())
+
+from bench_columnar_domain import create_domain
+from services.simulator.goal import Goal
+from services.simulator.goal_sampler import GoalSampler
+from utils import common
+from utils.domain.jsonlookupdomain import JSONLookupDomain
+
+
+class DatabaseLookups(object):
+    """ Answers the lookups of a goal by fetching the entities from the database """
+
+    def __init__(self, domain: JSONLookupDomain):
+        self.domain = domain
+        self.num_entities = len(domain.find_entities({}))
+
+    def sample_entity(self, slots: list, rng) -> dict:
+        entity = rng.choice(self.domain.find_entities({}, requested_slots=slots))
+        return {slot: entity[slot] for slot in slots}
+
+    def count(self, constraints: dict) -> int:
+        return len(self.domain.find_entities(constraints))
+
+
+def goal_parameters() -> dict:
+    """ Returns the goal parameters of the user simulator's configuration """
+    config = configparser.ConfigParser(inline_comment_prefixes=('#', ';'))
+    config.optionxform = str
+    config.read(os.path.join(get_root_dir(), 'services', 'simulator', 'usermodel.cfg'))
+    return {key: float(config.get('goal', key)) for key in config['goal']}
+
+
+def draw_goals(goal: Goal, num_goals: int) -> tuple:
+    """ Returns the goals drawn with a fixed seed and the number of goals drawn per second """
+    common.random.seed(0)
+    common.numpy.random.seed(0)
+    start = time.perf_counter()
+    goals = []
+    for _ in range(num_goals):
+        goal.init(random_goal=True)
+        goals.append(repr(goal))
+    return goals, num_goals / (time.perf_counter() - start)
+
+
+def run(name: str, domain: JSONLookupDomain, num_goals: int):
+    parameters = goal_parameters()
+    legacy_goal = Goal(domain, parameters)
+    legacy_goal._sampler = DatabaseLookups(domain)
+    expected, legacy = draw_goals(legacy_goal, num_goals)
+    start = time.perf_counter()
+    sampler_goal = Goal(domain, parameters)
+    sampler_goal._sampler = GoalSampler(domain)
+    setup_ms = (time.perf_counter() - start) * 1000
+    goals, sampled = draw_goals(sampler_goal, num_goals)
+    assert goals == expected, "goals differ"
+    print(f"{name:>18} {sampler_goal.sampler.num_entities:>9} {legacy:>13.0f} {sampled:>14.0f} "
+          f"{setup_ms:>9.1f} {sampler_goal.sampler.counts.hit_rate:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--domains", type=str, nargs='+', default=["ImsCourses", "ImsLecturers"],
+                        help="names of the domains")
+    parser.add_argument("-s", "--sizes", type=int, nargs='+', default=[10 ** 5],
+                        help="numbers of entities of synthetic domains")
+    parser.add_argument("-n", "--goals", type=int, default=1000, help="number of goals per domain")
+    parser.add_argument("--synthetic-goals", type=int, default=50, help="number of goals per synthetic domain")
+    args = parser.parse_args()
+
+    print(f"{'domain':>18} {'entities':>9} {'db goals/s':>13} {'sampler goals/s':>14} "
+          f"{'setup ms':>9} {'hit rate':>9}")
+    for name in args.domains:
+        run(name, JSONLookupDomain(name, query_cache_size=0), args.goals)
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        for num_rows in args.sizes:
+            name = f"synthetic{num_rows}"
+            ontology_file, db_file = create_domain(tmp_dir, name, num_rows)
+            run(name, JSONLookupDomain(name, json_ontology_file=ontology_file, sqllite_db_file=db_file,
+                                       query_cache_size=0), args.synthetic_goals)
+    finally:
+        shutil.rmtree(tmp_dir)
@@ -0,0 +1,121 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+"""
+Measures what a policy turn costs (without query cache) when the matching entities are fetched
+with `find_entities` and then counted, indexed and sampled (as the policies used to) and when they
+are looked up through the lazy results of `query_entities`: ms per turn and peak memory allocated
+per turn (tracemalloc) for the shipped domains and synthetic domains of growing size.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+sys.path.append(get_root_dir())
+
+from bench_columnar_domain import create_domain
+from utils.domain.columnardomain import ColumnarLookupDomain
+from utils.domain.jsonlookupdomain import JSONLookupDomain
+
+
+def random_constraints(domain: JSONLookupDomain, num_turns: int, seed: int = 0) -> list:
+    """ Returns random constraints (0 - 2 slots) matching at least one entity """
+    rng = random.Random(seed)
+    informable = list(domain.get_informable_slots())
+    turns = []
+    while len(turns) < num_turns:
+        constraints = {slot: rng.choice(list(domain.get_possible_values(slot)))
+                       for slot in rng.sample(informable, rng.randint(0, 2))}
+        if domain.count_and_discriminable(constraints, ())[0]:
+            turns.append(constraints)
+    return turns
+
+
+def eager_turn(domain, constraints: dict, rng: random.Random) -> tuple:
+    """ Count, first entity and random entity of the fetched entities """
+    results = domain.find_entities(constraints)
+    return len(results), results[0], rng.choice(results)
+
+
+def lazy_turn(domain, constraints: dict, rng: random.Random) -> tuple:
+    """ Count, first entity and random entity of the lazy results """
+    results = domain.query_entities(constraints)
+    return len(results), results[0], results.sample(1, rng)[0]
+
+
+def measure(turn, domain, turns: list) -> tuple:
+    """ Returns the results, the mean time (ms) and the mean peak memory (KiB) per turn """
+    rng = random.Random(0)
+    start = time.perf_counter()
+    results = [turn(domain, constraints, rng) for constraints in turns]
+    ms = (time.perf_counter() - start) * 1000 / len(turns)
+    peak = 0
+    for constraints in turns:
+        tracemalloc.start()
+        turn(domain, constraints, rng)
+        peak += tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return results, ms, peak / 1024 / len(turns)
+
+
+def run(name: str, sql: JSONLookupDomain, columnar: ColumnarLookupDomain, num_turns: int):
+    turns = random_constraints(sql, num_turns)
+    matches = sum(sql.count_and_discriminable(constraints, ())[0] for constraints in turns) / len(turns)
+    for backend, domain in (('sql', sql), ('columnar', columnar)):
+        expected, eager_ms, eager_kib = measure(eager_turn, domain, turns)
+        results, lazy_ms, lazy_kib = measure(lazy_turn, domain, turns)
+        assert results == expected, "lazy results differ"
+        print(f"{name:>18} {backend:>9} {matches:>9.0f} {eager_ms:>9.3f} {lazy_ms:>8.3f} "
+              f"{eager_kib:>10.1f} {lazy_kib:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--domains", type=str, nargs='+', default=["ImsCourses", "ImsLecturers"],
+                        help="names of the domains")
+    parser.add_argument("-s", "--sizes", type=int, nargs='+', default=[10 ** 4, 10 ** 5],
+                        help="numbers of entities of synthetic domains")
+    parser.add_argument("-t", "--turns", type=int, default=50, help="number of turns per domain")
+    args = parser.parse_args()
+
+    print(f"{'domain':>18} {'backend':>9} {'matches':>9} {'eager ms':>9} {'lazy ms':>8} "
+          f"{'eager KiB':>10} {'lazy KiB':>9}")
+    for name in args.domains:
+        run(name, JSONLookupDomain(name, query_cache_size=0), ColumnarLookupDomain(name, query_cache_size=0),
+            args.turns)
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        for num_rows in args.sizes:
+            name = f"synthetic{num_rows}"
+            ontology_file, db_file = create_domain(tmp_dir, name, num_rows)
+            run(name, *(domain_class(name, json_ontology_file=ontology_file, sqllite_db_file=db_file,
+                                     query_cache_size=0)
+                        for domain_class in (JSONLookupDomain, ColumnarLookupDomain)), args.turns)
+    finally:
+        shutil.rmtree(tmp_dir)
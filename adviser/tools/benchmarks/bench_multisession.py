@@ -0,0 +1,81 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+"""
+Measures simulated turns per second of one service graph
+(user simulator, belief state tracker, handcrafted policy, evaluator)
+multiplexing 1, 10, 100 and 1000 concurrent dialog sessions.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+sys.path.append(get_root_dir())
+
+from services.bst import HandcraftedBST
+from services.policy import HandcraftedPolicy
+from services.service import DialogSystem
+from services.simulator import HandcraftedUserSimulator
+from services.stats.evaluation import PolicyEvaluator
+from utils import common
+from utils.domain.jsonlookupdomain import JSONLookupDomain
+from utils.logger import DiasysLogger, LogLevel
+
+
+def benchmark(domain_name: str, concurrency_levels: list, dialogs_per_session: int):
+    """ Runs `dialogs_per_session * concurrency` dialogs for each concurrency level and prints turns/sec """
+    logger = DiasysLogger(console_log_lvl=LogLevel.NONE, file_log_lvl=LogLevel.NONE)
+    domain = JSONLookupDomain(domain_name)
+    evaluator = PolicyEvaluator(domain=domain, logger=logger)
+    ds = DialogSystem(services=[HandcraftedUserSimulator(domain, logger=logger), HandcraftedBST(domain),
+                                HandcraftedPolicy(domain, logger=logger), evaluator])
+    start_signals = {f'user_acts/{domain_name}': []}
+    evaluator.train()
+
+    print(f"{'sessions':>10} {'dialogs':>10} {'turns':>10} {'seconds':>10} {'turns/sec':>10}")
+    for concurrency in concurrency_levels:
+        num_dialogs = concurrency * dialogs_per_session
+        evaluator.start_epoch()
+        start = time.perf_counter()
+        ds.run_sessions(num_dialogs, start_signals=start_signals, max_concurrent=concurrency)
+        elapsed = time.perf_counter() - start
+        turns = sum(evaluator.train_turns)
+        print(f"{concurrency:>10} {num_dialogs:>10} {turns:>10} {elapsed:>10.2f} {turns / elapsed:>10.1f}")
+    ds.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--domain", default="ImsLecturers", help="name of the domain to simulate")
+    parser.add_argument("-c", "--concurrency", nargs="+", type=int, default=[1, 10, 100, 1000],
+                        help="numbers of concurrently live sessions to measure")
+    parser.add_argument("-n", "--dialogs", type=int, default=2,
+                        help="number of dialogs per session slot for each concurrency level")
+    parser.add_argument("-rs", "--randomseed", type=int, default=12345, help="seed for random generators")
+    args = parser.parse_args()
+
+    common.init_random(args.randomseed)
+    benchmark(args.domain, args.concurrency, args.dialogs)
@@ -0,0 +1,140 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+"""
+Measures utterances per second of `TemplateFile.create_message` for all shipped template files
+when walking all templates of the intent and parsing the code of each message on every call (as
+`TemplateFile` used to) and with templates indexed by their slot names and compiled messages.
+The system acts have the signatures of all templates of the file, filled with the values of a
+random entity (or the slot names for domains without database).
+"""
+
+import argparse
+import glob
+import inspect
+import os
+import random
+import sys
+import time
+
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+sys.path.append(get_root_dir())
+
+from services.nlg.nlg import HandcraftedNLG
+from services.nlg.templates.data.commands.message import CODE_PARSER, Message
+from services.nlg.templates.parsing.parsers.messageparser.data.messagecomponent import MessageComponentType
+from services.nlg.templates.templatefile import TemplateFile
+from utils.domain.jsonlookupdomain import JSONLookupDomain
+from utils.sysact import SysAct, SysActionType
+
+
+def legacy_message_apply(message: Message, parameters) -> str:
+    """ `Message.apply` parsing the code of the message on every call """
+    output = ''
+    for component in message.components:
+        if component.component_type == MessageComponentType.STRING:
+            output += component.value
+        else:
+            output += CODE_PARSER.parse(component.value + '$')[0].evaluate(parameters)
+    return output
+
+
+def legacy_create_message(template_file: TemplateFile, sys_act: SysAct) -> str:
+    """ `TemplateFile.create_message` trying all templates of the intent in order """
+    slots = template_file._create_memory_from_sys_act(sys_act)
+    for template in template_file._templates[sys_act.type.value]:
+        if template.is_applicable(slots):
+            return template.apply(slots)
+    raise BaseException('No template was found for the given system act.')
+
+
+def load_template_file(filename: str) -> TemplateFile:
+    """ Loads a template file with the python functions of the `HandcraftedNLG` """
+    domain_name = os.path.basename(filename).split('Messages')[0]
+    domain = None  # domains of web APIs or without database
+    if all(os.path.exists(os.path.join(get_root_dir(), 'resources', folder, domain_name + extension))
+           for folder, extension in (('ontologies', '.json'), ('databases', '.db'))):
+        domain = JSONLookupDomain(domain_name)
+    template_file = TemplateFile(filename, domain, use_cache=False)
+    for method_name, method in inspect.getmembers(HandcraftedNLG, inspect.isfunction):
+        if method_name.startswith('_template_'):
+            template_file.add_python_function(method_name[10:], method, [None])
+    return template_file
+
+
+def signature_acts(template_file: TemplateFile, seed: int = 0) -> list:
+    """ Returns a system act for the signature of each template of the file (for intents which are
+        system act types) """
+    rng = random.Random(seed)
+    domain = template_file.global_memory.domain
+    entities = domain.find_entities({}) if domain is not None else []
+    acts = []
+    for intent, templates in template_file._templates.items():
+        if intent not in SysActionType._value2member_map_:
+            continue
+        for template in templates:
+            entity = rng.choice(entities) if entities else {}
+            slots = list(template.slot_names)
+            if template.free_parameter is not None:
+                slots += [slot for slot in entity if slot not in slots][:2]
+            acts.append(SysAct(SysActionType(intent), {slot: [entity.get(slot, slot)] for slot in slots}))
+    return acts
+
+
+def utterances_per_second(create_message, template_file: TemplateFile, acts: list, repetitions: int) -> tuple:
+    """ Returns the messages (with a fixed random seed) and the number of messages created per second """
+    random.seed(0)
+    messages = [create_message(template_file, act) for act in acts]
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        for act in acts:
+            create_message(template_file, act)
+    return messages, repetitions * len(acts) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-r", "--repetitions", type=int, default=50, help="number of passes over all acts")
+    args = parser.parse_args()
+
+    print(f"{'template file':>33} {'templates':>10} {'acts':>5} {'legacy utt/s':>13} {'indexed utt/s':>14}")
+    for filename in sorted(glob.glob(os.path.join(get_root_dir(), 'resources', 'nlg_templates', '*.nlg'))):
+        template_file = load_template_file(filename)
+        acts = []
+        generated = signature_acts(template_file)
+        for act in generated:
+            try:
+                legacy_create_message(template_file, act)
+                acts.append(act)
+            except BaseException:
+                pass  # e.g. generated values which the template cannot handle
+
+        compiled_apply = Message.apply
+        Message.apply = legacy_message_apply
+        try:
+            expected, legacy = utterances_per_second(legacy_create_message, template_file, acts, args.repetitions)
+        finally:
+            Message.apply = compiled_apply
+        messages, indexed = utterances_per_second(TemplateFile.create_message, template_file, acts,
+                                                  args.repetitions)
+        assert messages == expected, "messages differ"
+        print(f"{os.path.basename(filename):>33} {len(generated):>10} {len(acts):>5} {legacy:>13.0f} {indexed:>14.0f}")
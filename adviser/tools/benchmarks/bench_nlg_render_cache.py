@@ -0,0 +1,127 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+"""
+Measures `TemplateFile.create_message` for system acts drawn with Zipf distributed frequencies
+from the signatures of all templates of the shipped template files (see `bench_nlg_render.py`)
+without and with render cache: utterances per second, share of acts whose template can be cached,
+cache hit rate and database queries per utterance. A template file looking up entity attributes
+(`{name.attribute}`, none of the shipped files does) shows the queries sent when each attribute is
+looked up on its own (as `GlobalMemory.get_member` used to) and when they are prefetched.
+"""
+
+import argparse
+import glob
+import os
+import random
+import sys
+import tempfile
+import time
+
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+sys.path.append(get_root_dir())
+
+from bench_nlg_render import load_template_file, signature_acts
+from services.nlg.templates.data.memory import GlobalMemory
+from services.nlg.templates.templatefile import TemplateFile
+from utils.domain.jsonlookupdomain import JSONLookupDomain
+from utils.lru import LRUCache
+from utils.sysact import SysAct, SysActionType
+
+MEMBER_TEMPLATES = """
+template inform_byname(name): "{name} is a {name.position} of the {name.department} department."
+template inform_byname(name, phone): "You can call {name} ({name.position}) at {phone}, office {name.room}."
+template inform_byname(name, mail)
+	"The mail address of {name} is {mail}."
+	"{name} can be reached at {mail}."
+"""
+
+
+def zipf_workload(acts: list, num_utterances: int, seed: int = 0) -> list:
+    """ Draws system acts with frequencies proportional to 1 / rank """
+    rng = random.Random(seed)
+    return rng.choices(acts, weights=[1 / rank for rank in range(1, len(acts) + 1)], k=num_utterances)
+
+
+def run(template_file: TemplateFile, workload: list) -> tuple:
+    """ Returns the utterances per second, the share of cacheable acts and the database queries per utterance """
+    round_trips = template_file.global_memory.db_round_trips
+    start = time.perf_counter()
+    for sys_act in workload:
+        template_file.create_message(sys_act)
+    seconds = time.perf_counter() - start
+    cacheable = 0
+    if template_file.render_cache is not None:
+        cacheable = sum(template_file._render_cache_key(template_file._find_template(
+            sys_act.type.value, frozenset(sys_act.slot_values)), sys_act) is not None for sys_act in workload)
+    return (len(workload) / seconds, cacheable / len(workload),
+            (template_file.global_memory.db_round_trips - round_trips) / len(workload))
+
+
+def report(name: str, template_file: TemplateFile, setting: str, workload: list):
+    utterances, cacheable, round_trips = run(template_file, workload)
+    hit_rate = template_file.render_cache.hit_rate if template_file.render_cache is not None else 0.0
+    print(f"{name:>33} {setting:>12} {utterances:>10.0f} {cacheable:>10.2f} {hit_rate:>9.2f} {round_trips:>12.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--utterances", type=int, default=5000, help="number of system acts per template file")
+    parser.add_argument("-c", "--cache-size", type=int, default=256, help="size of the render cache")
+    args = parser.parse_args()
+
+    print(f"{'template file':>33} {'setting':>12} {'utt/s':>10} {'cacheable':>10} {'hit rate':>9} {'queries/utt':>12}")
+    for filename in sorted(glob.glob(os.path.join(get_root_dir(), 'resources', 'nlg_templates', '*.nlg'))):
+        acts = []
+        template_file = load_template_file(filename)
+        for sys_act in signature_acts(template_file):
+            try:
+                template_file.create_message(sys_act)
+                acts.append(sys_act)
+            except BaseException:
+                pass  # e.g. generated values which the template cannot handle
+        workload = zipf_workload(acts, args.utterances)
+        for setting, cache_size in (('no cache', 0), ('cache', args.cache_size)):
+            template_file = load_template_file(filename)
+            template_file.render_cache = LRUCache(cache_size) if cache_size else None
+            report(os.path.basename(filename), template_file, setting, workload)
+
+    domain = JSONLookupDomain('ImsLecturers')
+    names = [entity['name'] for entity in domain.find_entities({}, requested_slots=['phone', 'mail'])]
+    rng = random.Random(0)
+    workload = [SysAct(SysActionType.InformByName,
+                       {'name': [name], **({slot: [slot]} if slot else {})})
+                for name, slot in zip(rng.choices(names, k=args.utterances),
+                                      rng.choices([None, 'phone', 'mail'], k=args.utterances))]
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, 'ImsLecturersMembers.nlg')
+        with open(filename, 'w') as f:
+            f.write(MEMBER_TEMPLATES)
+        prefetch = GlobalMemory.prefetch
+        GlobalMemory.prefetch = lambda self, entity_attributes: None
+        try:
+            report('members', TemplateFile(filename, domain, use_cache=False), 'per attr', workload)
+        finally:
+            GlobalMemory.prefetch = prefetch
+        report('members', TemplateFile(filename, domain, use_cache=False), 'prefetch', workload)
+        report('members', TemplateFile(filename, domain, use_cache=False, render_cache_size=args.cache_size),
+               'cache', workload)
@@ -0,0 +1,99 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+"""
+Measures the startup of `run_chat.py` (loading the services of the given domains as `run_chat.py`
+does, plus affective NLGs with all emotion variants) in fresh processes: when parsing all template
+files (as `TemplateFile` used to), when writing the template caches and when the caches are up to
+date. Reports the whole startup, the time spent constructing template files and the time to create
+the first message with each of them (which reads the cache if it was not parsed).
+"""
+
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+sys.path.append(get_root_dir())
+
+STARTUP = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+import services.nlg.templates.templatefile as templatefile
+if {parse_only!r}:
+    templatefile.is_cache_current = lambda cache_file, file_hash: False
+    templatefile.write_cache = lambda *args: None
+created = []
+init = templatefile.TemplateFile.__init__
+def timed_init(self, *args, **kwargs):
+    init_start = time.perf_counter()
+    init(self, *args, **kwargs)
+    created.append((self, time.perf_counter() - init_start))
+templatefile.TemplateFile.__init__ = timed_init
+
+import run_chat
+from services.nlg.affective_nlg import HandcraftedEmotionNLG
+from utils.sysact import SysAct, SysActionType
+for name in {domains!r}:
+    domain, _ = getattr(run_chat, f"load_{{name}}_domain")()
+    if name in ('lecturers', 'mensa'):
+        HandcraftedEmotionNLG(domain, emotions=['Angry', 'Happy', 'Sad'])
+startup = time.perf_counter() - start
+
+first_start = time.perf_counter()
+for template_file, _ in created:
+    template_file.create_message(SysAct(act_type=SysActionType.Welcome))
+print(json.dumps({{'startup': startup, 'templates': sum(seconds for _, seconds in created),
+                  'first': time.perf_counter() - first_start, 'files': len(created)}}))
+"""
+
+
+def run_startup(domains: list, parse_only: bool) -> dict:
+    """ Loads the services in a fresh process, returns the measured times (s) """
+    code = STARTUP.format(root=get_root_dir(), domains=domains, parse_only=parse_only)
+    output = subprocess.run([sys.executable, '-c', code], cwd=get_root_dir(), check=True,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--domains", type=str, nargs='+', default=['lecturers', 'mensa', 'trivia'],
+                        help="domains as passed to run_chat.py")
+    parser.add_argument("-r", "--repetitions", type=int, default=5, help="number of starts per setting")
+    args = parser.parse_args()
+
+    cache_pattern = os.path.join(get_root_dir(), 'resources', 'nlg_templates', '*Compiled.pkl')
+    print(f"{'setting':>14} {'files':>6} {'startup ms':>11} {'templates ms':>13} {'first message ms':>17}")
+    for setting in ('parse', 'write cache', 'cached'):
+        if setting == 'write cache':
+            for cache_file in glob.glob(cache_pattern):
+                os.remove(cache_file)
+        runs = [run_startup(args.domains, parse_only=setting == 'parse')
+                for _ in range(1 if setting == 'write cache' else args.repetitions)]
+        best = {key: min(run[key] for run in runs) for key in ('startup', 'templates', 'first')}
+        print(f"{setting:>14} {runs[0]['files']:>6} {best['startup'] * 1000:>11.1f} "
+              f"{best['templates'] * 1000:>13.1f} {best['first'] * 1000:>17.1f}")
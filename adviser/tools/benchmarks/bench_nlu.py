@@ -0,0 +1,152 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+"""
+Compares the time `HandcraftedNLU.extract_user_acts` takes per utterance when searching every rule
+with `re.search(pattern, utterance, re.I)` (as the NLU used to), when searching every precompiled rule
+and with `RegexRuleSet` (precompiled rules with literal prefilter).
+
+The utterances are the ones of the NLU tests; the rules are the ones of the domain, multiplied by
+adding copies of each inform / request rule with altered words (which behave like the rules for
+additional values / slots of a larger ontology).
+"""
+
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+sys.path.append(get_root_dir())
+
+from services.nlu.nlu import HandcraftedNLU
+from utils.domain.jsonlookupdomain import JSONLookupDomain
+from utils.logger import DiasysLogger, LogLevel
+from utils.sysact import SysAct, SysActionType
+
+
+class LegacyRuleSet(object):
+    """ Searches every rule in order, either with `re.search` or with precompiled patterns """
+
+    def __init__(self, rules, precompile: bool):
+        self.rules = [(key, re.compile(pattern, re.I) if precompile else pattern) for key, pattern in rules]
+        self.precompile = precompile
+
+    def search(self, utterance: str):
+        if self.precompile:
+            matches = [(key, pattern.search(utterance)) for key, pattern in self.rules]
+        else:
+            matches = [(key, re.search(pattern, utterance, re.I)) for key, pattern in self.rules]
+        return [(key, match) for key, match in matches if match is not None]
+
+
+class LegacyNLU(HandcraftedNLU):
+    """ `HandcraftedNLU` without literal prefilter """
+
+    def __init__(self, domain, precompile: bool, **kwargs):
+        self.precompile = precompile
+        HandcraftedNLU.__init__(self, domain, **kwargs)
+
+    def _compile_rules(self):
+        self.general_rules = LegacyRuleSet(self.general_regex.items(), self.precompile)
+        self.request_rules = LegacyRuleSet([(slot, self.request_regex[slot]) for slot in self.USER_REQUESTABLE],
+                                           self.precompile)
+        self.inform_rules = LegacyRuleSet([((slot, value), self.inform_regex[slot][value])
+                                           for slot in self.USER_INFORMABLE for value in self.inform_regex[slot]],
+                                          self.precompile)
+
+
+def test_utterances() -> list:
+    """ Returns the user utterances of the NLU tests """
+    utterances = set()
+    for test_file in glob.glob(os.path.join(get_root_dir(), 'tests', 'nlu', '*.py')):
+        with open(test_file) as f:
+            utterances.update(re.findall(r"user_utterance=['\"]([^'\"]*)['\"]", f.read()))
+    return sorted(utterances)
+
+
+def alter(pattern: str, copy_idx: int) -> str:
+    """ Appends a suffix to all words of a pattern, so it matches different utterances """
+    suffix = 'z' + ''.join(chr(ord('a') + int(digit)) for digit in str(copy_idx))
+    return re.sub(r'[A-Za-z]{3,}', lambda word: word.group(0) + suffix, pattern)
+
+
+def scale_rules(nlu: HandcraftedNLU, factor: int):
+    """ Multiplies the inform and request rules of the NLU by the given factor """
+    for slot in nlu.USER_INFORMABLE:
+        rules = nlu.inform_regex[slot]
+        for value, pattern in list(rules.items()):
+            for copy_idx in range(1, factor):
+                rules[f"{value}#{copy_idx}"] = alter(pattern, copy_idx)
+    nlu.USER_REQUESTABLE = list(nlu.USER_REQUESTABLE)
+    for slot in list(nlu.USER_REQUESTABLE):
+        for copy_idx in range(1, factor):
+            nlu.request_regex[f"{slot}#{copy_idx}"] = alter(nlu.request_regex[slot], copy_idx)
+            nlu.USER_REQUESTABLE.append(f"{slot}#{copy_idx}")
+    nlu._compile_rules()
+
+
+def extract_all(nlu: HandcraftedNLU, utterances: list) -> tuple:
+    """ Returns the user acts of all utterances and the mean time per utterance in ms """
+    user_acts = []
+    start = time.perf_counter()
+    for utterance in utterances:
+        nlu.dialog_start()
+        # as after the first system turn
+        nlu.sys_act_info['last_act'] = SysAct(act_type=SysActionType.Welcome)
+        user_acts.append(nlu.extract_user_acts(user_utterance=utterance)['user_acts'])
+    return user_acts, (time.perf_counter() - start) / len(utterances) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--domain", type=str, default="ImsCourses", help="name of the domain")
+    parser.add_argument("-s", "--scales", type=int, nargs='+', default=[1, 10, 100],
+                        help="factors to multiply the number of rules with")
+    parser.add_argument("-l", "--legacyutterances", type=int, default=5,
+                        help="number of utterances to time re.search on")
+    args = parser.parse_args()
+
+    domain = JSONLookupDomain(args.domain)
+    logger = DiasysLogger(console_log_lvl=LogLevel.NONE, file_log_lvl=LogLevel.NONE)
+    utterances = test_utterances()
+    print(f"{len(utterances)} utterances, domain {args.domain}")
+    print(f"{'rules':>7} {'re.search ms':>13} {'compiled ms':>12} {'prefilter ms':>13} {'speedup':>8}")
+    for factor in args.scales:
+        nlus = [LegacyNLU(domain, precompile=False, logger=logger), LegacyNLU(domain, precompile=True, logger=logger),
+                HandcraftedNLU(domain, logger=logger)]
+        for nlu in nlus:
+            scale_rules(nlu, factor)
+        # warm up (patterns are compiled when they are searched for the first time)
+        extract_all(nlus[0], utterances[:1])
+        for nlu in nlus[1:]:
+            extract_all(nlu, utterances)
+        # searching with re.search gets very slow once the patterns don't fit into re's cache anymore
+        results = [extract_all(nlus[0], utterances[:args.legacyutterances])]
+        results += [extract_all(nlu, utterances) for nlu in nlus[1:]]
+        assert results[0][0] == results[2][0][:args.legacyutterances] and results[1][0] == results[2][0], \
+            "NLUs disagree"
+        num_rules = len(nlus[2].general_rules) + len(nlus[2].request_rules) + len(nlus[2].inform_rules)
+        legacy, compiled, prefiltered = (ms for _, ms in results)
+        print(f"{num_rules:>7} {legacy:>13.3f} {compiled:>12.3f} {prefiltered:>13.3f} {legacy / prefiltered:>8.1f}")
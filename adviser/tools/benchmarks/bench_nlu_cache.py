@@ -0,0 +1,107 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+"""
+Compares the time `HandcraftedNLU.extract_user_acts` takes per utterance with and without the
+utterance result cache (`result_cache_size`), for a stream of utterances in which some are much
+more frequent than others (Zipf distribution over the utterances of the NLU tests, with random
+changes of case and surrounding whitespace).
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+sys.path.append(get_root_dir())
+
+from services.nlu.nlu import HandcraftedNLU
+from tools.benchmarks.bench_nlu import scale_rules, test_utterances
+from utils.domain.jsonlookupdomain import JSONLookupDomain
+from utils.logger import DiasysLogger, LogLevel
+from utils.sysact import SysAct, SysActionType
+
+
+def utterance_stream(utterances: list, length: int, exponent: float, seed: int) -> list:
+    """ Samples utterances with probability proportional to 1 / rank^exponent """
+    rng = random.Random(seed)
+    ranked = list(utterances)
+    rng.shuffle(ranked)
+    weights = [1 / rank ** exponent for rank in range(1, len(ranked) + 1)]
+    stream = []
+    for utterance in rng.choices(ranked, weights=weights, k=length):
+        if rng.random() < 0.2:
+            utterance = utterance.upper()
+        stream.append(utterance + ' ' * rng.randint(0, 1))
+    return stream
+
+
+def extract_stream(nlu: HandcraftedNLU, stream: list) -> tuple:
+    """ Returns the user acts of all utterances and the mean time per utterance in ms """
+    user_acts = []
+    start = time.perf_counter()
+    for utterance in stream:
+        nlu.dialog_start()
+        nlu.sys_act_info['last_act'] = SysAct(act_type=SysActionType.Welcome)
+        user_acts.append(nlu.extract_user_acts(user_utterance=utterance)['user_acts'])
+    return user_acts, (time.perf_counter() - start) / len(stream) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--domain", type=str, default="ImsCourses", help="name of the domain")
+    parser.add_argument("-s", "--scales", type=int, nargs='+', default=[1, 10],
+                        help="factors to multiply the number of rules with")
+    parser.add_argument("-c", "--cachesizes", type=int, nargs='+', default=[16, 64, 256],
+                        help="sizes of the result cache")
+    parser.add_argument("-n", "--utterances", type=int, default=5000, help="length of the utterance stream")
+    parser.add_argument("-z", "--zipf", type=float, default=1.1, help="exponent of the Zipf distribution")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the utterance stream")
+    args = parser.parse_args()
+
+    domain = JSONLookupDomain(args.domain)
+    logger = DiasysLogger(console_log_lvl=LogLevel.NONE, file_log_lvl=LogLevel.NONE)
+    utterances = test_utterances()
+    stream = utterance_stream(utterances, args.utterances, args.zipf, args.seed)
+    print(f"{len(stream)} utterances ({len(set(stream))} distinct), domain {args.domain}")
+    print(f"{'rules':>7} {'cache size':>10} {'ms':>8} {'speedup':>8} {'hit rate':>9} {'evictions':>10}")
+    for factor in args.scales:
+        uncached = HandcraftedNLU(domain, logger=logger)
+        scale_rules(uncached, factor)
+        # warm up (patterns are compiled when they are searched for the first time)
+        extract_stream(uncached, utterances)
+        expected, uncached_ms = extract_stream(uncached, stream)
+        num_rules = len(uncached.general_rules) + len(uncached.request_rules) + len(uncached.inform_rules)
+        print(f"{num_rules:>7} {'-':>10} {uncached_ms:>8.3f} {1:>8.1f} {'-':>9} {'-':>10}")
+        for cache_size in args.cachesizes:
+            nlu = HandcraftedNLU(domain, logger=logger, result_cache_size=cache_size)
+            scale_rules(nlu, factor)
+            extract_stream(nlu, utterances)
+            nlu.clear_result_cache()
+            nlu.result_cache.hits = nlu.result_cache.misses = nlu.result_cache.evictions = 0
+            user_acts, ms = extract_stream(nlu, stream)
+            assert user_acts == expected, "cached results differ"
+            stats = nlu.result_cache.stats()
+            print(f"{num_rules:>7} {cache_size:>10} {ms:>8.3f} {uncached_ms / ms:>8.1f} "
+                  f"{stats['hit_rate']:>9.2f} {stats['evictions']:>10}")
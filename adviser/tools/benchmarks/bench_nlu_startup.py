@@ -0,0 +1,111 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+"""
+Measures how long loading the rules of a `HandcraftedNLU` takes (see `services.nlu.rule_cache.load_rules`):
+without cache, when writing the cache, when the cache is up to date and after changing the
+rules of a single slot. The rules of the domain are multiplied as in `bench_nlu.py`.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+sys.path.append(get_root_dir())
+
+from services.nlu import rule_engine
+from services.nlu.rule_cache import load_rules, rule_files
+from tools.benchmarks.bench_nlu import alter
+from utils.common import Language
+from utils.domain.jsonlookupdomain import JSONLookupDomain
+
+
+def write_scaled_rules(domain: JSONLookupDomain, folder: str, factor: int) -> tuple:
+    """ Writes the rule files of the domain, multiplied by the given factor, into the folder.
+        Returns their paths and the requestable and informable slots """
+    source_folder = os.path.join(get_root_dir(), 'resources', 'nlu_regexes')
+    sources = rule_files(source_folder, domain.get_domain_name(), Language.ENGLISH)
+    files = rule_files(folder, domain.get_domain_name(), Language.ENGLISH)
+    rules = []
+    for source in sources[:3]:
+        with open(source) as f:
+            rules.append(json.load(f))
+    general_regex, request_regex, inform_regex = rules
+
+    requestable_slots = list(domain.get_requestable_slots())
+    for slot in domain.get_requestable_slots():
+        for copy_idx in range(1, factor):
+            request_regex[f"{slot}#{copy_idx}"] = alter(request_regex[slot], copy_idx)
+            requestable_slots.append(f"{slot}#{copy_idx}")
+    informable_slots = list(domain.get_informable_slots())
+    for slot in domain.get_informable_slots():
+        for value, pattern in list(inform_regex[slot].items()):
+            for copy_idx in range(1, factor):
+                inform_regex[slot][f"{value}#{copy_idx}"] = alter(pattern, copy_idx)
+
+    for rule_file, regex in zip(files, (general_regex, request_regex, inform_regex)):
+        with open(rule_file, 'w') as f:
+            json.dump(regex, f)
+    return files, requestable_slots, informable_slots
+
+
+def timed_load(files: tuple, requestable_slots: list, informable_slots: list, use_cache: bool) -> float:
+    """ Returns the time in ms it takes to load the rules """
+    # analysis results of patterns are also cached in memory
+    rule_engine.required_literals.cache_clear()
+    start = time.perf_counter()
+    load_rules(*files[:3], requestable_slots, informable_slots, cache_file=files[3] if use_cache else None)
+    return (time.perf_counter() - start) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--domain", type=str, default="ImsCourses", help="name of the domain")
+    parser.add_argument("-s", "--scales", type=int, nargs='+', default=[1, 10, 100],
+                        help="factors to multiply the number of rules with")
+    args = parser.parse_args()
+
+    domain = JSONLookupDomain(args.domain)
+    print(f"{'rules':>7} {'no cache ms':>12} {'write ms':>9} {'cached ms':>10} {'1 slot changed ms':>18}")
+    for factor in args.scales:
+        with tempfile.TemporaryDirectory() as folder:
+            files, requestable_slots, informable_slots = write_scaled_rules(domain, folder, factor)
+            no_cache = timed_load(files, requestable_slots, informable_slots, use_cache=False)
+            write = timed_load(files, requestable_slots, informable_slots, use_cache=True)
+            cached = timed_load(files, requestable_slots, informable_slots, use_cache=True)
+
+            with open(files[2]) as f:
+                inform_regex = json.load(f)
+            slot = informable_slots[0]
+            value = next(iter(inform_regex[slot]))
+            inform_regex[slot][value] = "(changed)"
+            with open(files[2], 'w') as f:
+                json.dump(inform_regex, f)
+            changed = timed_load(files, requestable_slots, informable_slots, use_cache=True)
+
+            num_rules = len(json.load(open(files[0]))) + len(requestable_slots) + \
+                sum(len(values) for values in inform_regex.values())
+            print(f"{num_rules:>7} {no_cache:>12.1f} {write:>9.1f} {cached:>10.1f} {changed:>18.1f}")
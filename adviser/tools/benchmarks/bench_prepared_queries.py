@@ -0,0 +1,123 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+"""
+Compares the time per `find_entities` / `count_and_discriminable` / `find_info_about_entity` call
+when values are formatted into the SQL text and every table is scanned (as `JSONLookupDomain` used
+to query) with bound parameters, reused prepared statements and indexes on the informable columns,
+for the shipped domains and a synthetic domain (query caches disabled).
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+sys.path.append(get_root_dir())
+
+from tools.benchmarks.bench_columnar_domain import create_domain
+from utils.domain.jsonlookupdomain import JSONLookupDomain
+
+
+class FormattingDomain(JSONLookupDomain):
+    """ `JSONLookupDomain` formatting values into the SQL text, without indexes """
+
+    def _create_indexes(self, db):
+        pass
+
+    def _count_and_discriminable(self, constraints, slots):
+        different = ["(MIN({0}) < MAX({0}) OR COUNT({0}) NOT IN (0, COUNT(*)))".format(slot) for slot in slots]
+        query = "SELECT COUNT(*) AS num_matches, {} AS different FROM {}".format(
+            " OR ".join(different) if different else "0", self.get_domain_name())
+        if constraints:
+            query += ' WHERE ' + ' AND '.join("{}='{}' COLLATE NOCASE".format(key, val.replace("'", "''"))
+                                              for key, val in constraints.items())
+        result = self.query_db(query)[0]
+        return result['num_matches'], result['num_matches'] > 1 and bool(result['different'])
+
+    def _select_entities(self, constraints, columns):
+        query = "SELECT {} FROM {}".format(", ".join(columns), self.get_domain_name())
+        if constraints:
+            query += ' WHERE ' + ' AND '.join("{}='{}' COLLATE NOCASE".format(key, val.replace("'", "''"))
+                                              for key, val in constraints.items())
+        return self.query_db(query)
+
+    def _select_entity_info(self, entity_id, columns):
+        query = 'SELECT {} FROM {} WHERE {}="{}";'.format(
+            ", ".join(columns) if columns is not None else "*", self.get_domain_name(),
+            self.get_primary_key(), entity_id)
+        return self.query_db(query)
+
+
+def random_calls(domain: JSONLookupDomain, num_calls: int, seed: int = 0) -> list:
+    """ Returns arguments of `find_entities` with 1 - 2 constraints and entity ids """
+    rng = random.Random(seed)
+    slots = [slot for slot in domain.get_informable_slots() if slot != domain.get_primary_key()]
+    constraints = [{slot: rng.choice(domain.get_possible_values(slot)) for slot in rng.sample(slots, rng.randint(1, 2))}
+                   for _ in range(num_calls)]
+    entities = [row[domain.get_primary_key()] for row in domain.find_entities({})]
+    return constraints, [rng.choice(entities) for _ in range(num_calls)]
+
+
+def timed(function, calls: list) -> tuple:
+    """ Returns the results of all calls and the mean time per call in ms """
+    start = time.perf_counter()
+    results = [function(call) for call in calls]
+    return results, (time.perf_counter() - start) / len(calls) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--domains", type=str, nargs='+', default=["ImsLecturers", "ImsCourses"],
+                        help="names of the shipped domains")
+    parser.add_argument("-s", "--sizes", type=int, nargs='+', default=[10 ** 5],
+                        help="numbers of entities of the synthetic domains")
+    parser.add_argument("-n", "--calls", type=int, default=200, help="number of calls per domain")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        domains = [(name, {}) for name in args.domains]
+        for num_rows in args.sizes:
+            ontology_file, db_file = create_domain(tmp_dir, f"synthetic{num_rows}", num_rows)
+            domains.append((f"synthetic{num_rows}", {'json_ontology_file': ontology_file,
+                                                     'sqllite_db_file': db_file}))
+        print(f"{'domain':>18} {'query':>7} {'formatted ms':>13} {'prepared ms':>12}")
+        for name, files in domains:
+            formatting = FormattingDomain(name, query_cache_size=0, **files)
+            prepared = JSONLookupDomain(name, query_cache_size=0, **files)
+            constraints, entities = random_calls(prepared, args.calls)
+            for query, calls, call in (
+                    ('find', constraints, lambda domain: domain.find_entities),
+                    ('count', constraints, lambda domain: lambda constraint: domain.count_and_discriminable(
+                        constraint, domain.get_system_requestable_slots())),
+                    ('info', entities, lambda domain: lambda entity: domain.find_info_about_entity(entity, ['name']))):
+                expected, formatted_ms = timed(call(formatting), calls)
+                results, prepared_ms = timed(call(prepared), calls)
+                assert results == expected, "results differ"
+                print(f"{name:>18} {query:>7} {formatted_ms:>13.3f} {prepared_ms:>12.3f}")
+    finally:
+        shutil.rmtree(tmp_dir)
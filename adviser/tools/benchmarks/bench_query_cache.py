@@ -0,0 +1,87 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+"""
+Measures how many domain queries (`find_entities` / `find_info_about_entity`) per dialog are
+answered by the query cache of `JSONLookupDomain` when the user simulator, belief state tracker,
+handcrafted policy and evaluator share one domain, and the simulated turns per second with and
+without the cache.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+sys.path.append(get_root_dir())
+
+from services.bst import HandcraftedBST
+from services.policy import HandcraftedPolicy
+from services.service import DialogSystem
+from services.simulator import HandcraftedUserSimulator
+from services.stats.evaluation import PolicyEvaluator
+from utils import common
+from utils.domain.jsonlookupdomain import JSONLookupDomain
+from utils.logger import DiasysLogger, LogLevel
+from utils.lru import LRUCache
+
+
+def benchmark(domain_name: str, cache_sizes: list, num_dialogs: int, seed: int):
+    """ Runs the dialogs for each cache size and prints turns/sec and the query cache statistics per dialog """
+    logger = DiasysLogger(console_log_lvl=LogLevel.NONE, file_log_lvl=LogLevel.NONE)
+    domain = JSONLookupDomain(domain_name)
+    evaluator = PolicyEvaluator(domain=domain, logger=logger)
+    ds = DialogSystem(services=[HandcraftedUserSimulator(domain, logger=logger), HandcraftedBST(domain),
+                                HandcraftedPolicy(domain, logger=logger), evaluator])
+    evaluator.train()
+
+    print(f"{'cache size':>10} {'turns/sec':>10} {'queries/dlg':>12} {'hits/dlg':>10} {'hit rate':>9}")
+    for cache_size in cache_sizes:
+        common.init_random(seed)
+        domain.query_cache = LRUCache(cache_size) if cache_size > 0 else None
+        evaluator.start_epoch()
+        start = time.perf_counter()
+        for _ in range(num_dialogs):
+            ds.run_dialog(start_signals={f'user_acts/{domain_name}': []})
+        elapsed = time.perf_counter() - start
+        turns = sum(evaluator.train_turns)
+        if cache_size > 0:
+            stats = domain.query_cache_stats()
+            print(f"{cache_size:>10} {turns / elapsed:>10.1f} {(stats['hits'] + stats['misses']) / num_dialogs:>12.1f} "
+                  f"{stats['hits'] / num_dialogs:>10.1f} {stats['hit_rate']:>9.2f}")
+        else:
+            print(f"{cache_size:>10} {turns / elapsed:>10.1f} {'-':>12} {'-':>10} {'-':>9}")
+    ds.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--domain", default="ImsCourses", help="name of the domain to simulate")
+    parser.add_argument("-c", "--cachesizes", nargs="+", type=int, default=[0, 16, 256],
+                        help="sizes of the query cache (0: no cache)")
+    parser.add_argument("-n", "--dialogs", type=int, default=200, help="number of dialogs per cache size")
+    parser.add_argument("-rs", "--randomseed", type=int, default=12345, help="seed for random generators")
+    args = parser.parse_args()
+
+    benchmark(args.domain, args.cachesizes, args.dialogs, args.randomseed)
@@ -0,0 +1,85 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+"""
+Compares the cost of sampling a batch and updating its priorities (as done by `DQNPolicy.train_batch`)
+of `NaivePrioritizedBuffer` and `SumTreePrioritizedBuffer` for full buffers of different sizes.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+sys.path.append(get_root_dir())
+
+import numpy as np
+import torch
+
+from services.policy.rl.experience_buffer import NaivePrioritizedBuffer, SumTreePrioritizedBuffer
+from utils import common
+
+
+def fill(buffer, priorities: np.ndarray):
+    """ Fills the buffer with random transitions with the given priorities (bypassing `store` for speed) """
+    size = buffer.buffer_size
+    buffer.mem_state.uniform_()
+    buffer.mem_next_state.uniform_()
+    buffer.mem_action.random_(0, 10)
+    buffer.mem_reward.fill_(-0.05)
+    buffer.mem_terminal.zero_()
+    buffer.buffer_count = size
+    buffer.last_write_pos = size - 1
+    if isinstance(buffer, SumTreePrioritizedBuffer):
+        buffer.tree.set(np.arange(size), priorities)
+    else:
+        buffer.probs = priorities.tolist()
+
+
+def benchmark(buffer_cls, size: int, batch_size: int, state_dim: int, repetitions: int) -> float:
+    """ Returns the mean time in ms for sampling a batch and updating its priorities """
+    buffer = buffer_cls(size, batch_size, state_dim)
+    fill(buffer, common.numpy.random.random_sample(size) + 0.01)
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        _, _, _, _, _, indices, _ = buffer.sample()
+        buffer.update_batch(indices, torch.rand(batch_size))
+    return (time.perf_counter() - start) / repetitions * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-s", "--sizes", type=int, nargs='+', default=[8192, 100000, 1000000],
+                        help="buffer sizes")
+    parser.add_argument("-b", "--batchsize", type=int, default=64, help="batch size")
+    parser.add_argument("-d", "--statedim", type=int, default=16,
+                        help="state dimension (small, the memory is not what is measured)")
+    parser.add_argument("-r", "--repetitions", type=int, default=20, help="batches per measurement")
+    args = parser.parse_args()
+
+    common.init_random(12345)
+    print(f"{'size':>10} {'naive ms':>10} {'sumtree ms':>10} {'speedup':>8}")
+    for size in args.sizes:
+        naive = benchmark(NaivePrioritizedBuffer, size, args.batchsize, args.statedim, args.repetitions)
+        sumtree = benchmark(SumTreePrioritizedBuffer, size, args.batchsize, args.statedim, args.repetitions)
+        print(f"{size:>10} {naive:>10.3f} {sumtree:>10.3f} {naive / sumtree:>8.1f}")
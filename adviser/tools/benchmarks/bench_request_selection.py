@@ -0,0 +1,140 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+"""
+Measures how long the handcrafted policy takes to choose the slot to request for random
+constraints (without query cache): fetching the matching entities and gathering the values of
+each column in lists (as `HandcraftedPolicy._raw_action` used to), fetching them and counting the
+values in one pass, and counting the values in the database (grouped counts in SQL, or from the
+columns of the `ColumnarLookupDomain`). Also reports how often the `entropy` strategy requests a
+different slot than the `split` strategy.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+sys.path.append(get_root_dir())
+
+from bench_columnar_domain import create_domain
+from services.policy.request_selection import RequestSelector, value_histograms
+from utils.domain.columnardomain import ColumnarLookupDomain
+from utils.domain.jsonlookupdomain import JSONLookupDomain
+
+
+def legacy_select(domain: JSONLookupDomain, rows: list, candidates: list) -> str:
+    """ Slot chosen by `HandcraftedPolicy._gen_next_request` from lists of the values of each column """
+    temp = {key: [] for key in rows[0].keys()}
+    for result in rows:
+        for key in result.keys():
+            if key != domain.get_primary_key():
+                temp[key].append(result[key])
+    bin_slots = [slot for slot in candidates if len(domain.get_possible_values(slot)) == 2]
+    for slot in candidates:
+        if slot not in bin_slots and len(set(temp[slot])) > 1:
+            return slot
+    diffs = {}
+    for slot in bin_slots:
+        val1, val2 = domain.get_possible_values(slot)
+        values_dic = defaultdict(int)
+        for val in temp[slot]:
+            values_dic[val] += 1
+        if val1 in values_dic and val2 in values_dic:
+            diffs[slot] = abs(values_dic[val1] - values_dic[val2])
+    return sorted(diffs.items(), key=lambda kv: kv[1])[0][0] if diffs else ""
+
+
+def random_turns(domain: JSONLookupDomain, num_turns: int, seed: int = 0) -> list:
+    """ Returns random constraints (0 - 2 slots) matching at least two entities and the slots which
+        could be requested """
+    rng = random.Random(seed)
+    informable = list(domain.get_informable_slots())
+    turns = []
+    while len(turns) < num_turns:
+        constraints = {slot: rng.choice(list(domain.get_possible_values(slot)))
+                       for slot in rng.sample(informable, rng.randint(0, 2))}
+        if len(domain.find_entities(constraints)) > 1:
+            candidates = [slot for slot in domain.get_system_requestable_slots() if slot not in constraints]
+            turns.append((constraints, candidates))
+    return turns
+
+
+def timed(select, turns: list) -> tuple:
+    """ Returns the chosen slots and the mean time per turn in ms """
+    start = time.perf_counter()
+    slots = [select(constraints, candidates) for constraints, candidates in turns]
+    return slots, (time.perf_counter() - start) * 1000 / len(turns)
+
+
+def run(name: str, sql: JSONLookupDomain, columnar: ColumnarLookupDomain, num_turns: int):
+    turns = random_turns(sql, num_turns)
+    split, entropy = RequestSelector(sql, 'split'), RequestSelector(sql, 'entropy')
+    matches = sum(len(sql.find_entities(constraints)) for constraints, _ in turns) / len(turns)
+    expected, legacy_ms = timed(lambda constraints, candidates: legacy_select(
+        sql, sql.find_entities(constraints), candidates), turns)
+    results = {}
+    for setting, select in (
+            ('one pass', lambda constraints, candidates: split.select(
+                candidates, value_histograms(sql.find_entities(constraints), candidates))),
+            ('sql counts', lambda constraints, candidates: split.select(
+                candidates, sql.value_counts(constraints, candidates))),
+            ('columnar', lambda constraints, candidates: split.select(
+                candidates, columnar.value_counts(constraints, candidates)))):
+        slots, results[setting] = timed(select, turns)
+        assert slots == expected, f"{setting} requests different slots"
+    entropy_slots, _ = timed(lambda constraints, candidates: entropy.select(
+        candidates, sql.value_counts(constraints, candidates)), turns)
+    changed = sum(slot != expected_slot for slot, expected_slot in zip(entropy_slots, expected)) / len(turns)
+    print(f"{name:>18} {matches:>9.0f} {legacy_ms:>10.3f} {results['one pass']:>12.3f} "
+          f"{results['sql counts']:>14.3f} {results['columnar']:>12.3f} {changed:>17.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--domains", type=str, nargs='+', default=["ImsCourses", "ImsLecturers"],
+                        help="names of the domains")
+    parser.add_argument("-s", "--sizes", type=int, nargs='+', default=[10 ** 4, 10 ** 5],
+                        help="numbers of entities of synthetic domains")
+    parser.add_argument("-t", "--turns", type=int, default=50, help="number of turns per domain")
+    args = parser.parse_args()
+
+    print(f"{'domain':>18} {'matches':>9} {'legacy ms':>10} {'one pass ms':>12} {'sql counts ms':>14} "
+          f"{'columnar ms':>12} {'entropy differs':>17}")
+    for name in args.domains:
+        run(name, JSONLookupDomain(name, query_cache_size=0), ColumnarLookupDomain(name, query_cache_size=0),
+            args.turns)
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        for num_rows in args.sizes:
+            name = f"synthetic{num_rows}"
+            ontology_file, db_file = create_domain(tmp_dir, name, num_rows)
+            run(name, *(domain_class(name, json_ontology_file=ontology_file, sqllite_db_file=db_file,
+                                     query_cache_size=0)
+                        for domain_class in (JSONLookupDomain, ColumnarLookupDomain)), args.turns)
+    finally:
+        shutil.rmtree(tmp_dir)
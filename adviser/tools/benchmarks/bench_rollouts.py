@@ -0,0 +1,76 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+"""
+Measures simulated dialogs per second of `RolloutManager` (ImsLecturers domain, DQN policy) for an increasing
+number of worker processes, separately for evaluation (simulation only) and training (learner included).
+Worker startup is not included in the measurement.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+sys.path.append(get_root_dir())
+
+from services.policy.rl.dqnpolicy import DQNPolicy
+from services.policy.rl.parallel_rollouts import RolloutManager
+from utils import common
+from utils.domain.jsonlookupdomain import JSONLookupDomain
+from utils.logger import DiasysLogger, LogLevel
+
+
+def benchmark(num_workers: int, num_dialogs: int, parallel_dialogs: int):
+    """ Prints dialogs per second for evaluation and training with the given number of workers """
+    logger = DiasysLogger(console_log_lvl=LogLevel.NONE, file_log_lvl=LogLevel.NONE)
+    policy = DQNPolicy(JSONLookupDomain('ImsLecturers'), logger=logger, train_dialogs=num_dialogs)
+    rollouts = RolloutManager('ImsLecturers', policy, num_workers=num_workers,
+                              policy_kwargs=dict(train_dialogs=num_dialogs), parallel_dialogs=parallel_dialogs)
+    rollouts.run_dialogs(num_workers)  # wait for all workers to be up
+    throughput = []
+    for train in (False, True):
+        policy.train() if train else policy.eval()
+        start = time.perf_counter()
+        rollouts.run_dialogs(num_dialogs)
+        throughput.append(num_dialogs / (time.perf_counter() - start))
+    rollouts.shutdown()
+    print(f"{num_workers:>8} {throughput[0]:>12.1f} {throughput[1]:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--dialogs", type=int, default=1000, help="number of dialogs per measurement")
+    parser.add_argument("-w", "--workers", type=int, nargs='+', help="numbers of workers to measure "
+                                                                      "(default: powers of 2 up to the core count)")
+    parser.add_argument("-p", "--parallel", type=int, default=8, help="dialogs simulated in lockstep per worker")
+    args = parser.parse_args()
+
+    common.init_random(12345)
+    workers = args.workers
+    if not workers:
+        workers = [2 ** i for i in range(os.cpu_count().bit_length()) if 2 ** i <= os.cpu_count()]
+    print(f"cores: {os.cpu_count()}")
+    print(f"{'workers':>8} {'eval dlg/s':>12} {'train dlg/s':>12}")
+    for num_workers in workers:
+        benchmark(num_workers, args.dialogs, args.parallel)
@@ -0,0 +1,85 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+"""
+Compares the thread-per-listener runtime with the asyncio runtime of `DialogSystem` on the text-only
+ImsLecturers pipeline of `bench_transport.py`: number of threads while the system is running and
+turn latency (median and 99th percentile).
+Each runtime is measured in a separate process (both bind the default ports).
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import threading
+
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+sys.path.append(get_root_dir())
+
+import numpy as np
+
+from bench_transport import ScriptedUser
+from services.bst import HandcraftedBST
+from services.domain_tracker.domain_tracker import DomainTracker
+from services.nlg.nlg import HandcraftedNLG
+from services.nlu.nlu import HandcraftedNLU
+from services.policy import HandcraftedPolicy
+from services.service import DialogSystem
+from utils.domain.jsonlookupdomain import JSONLookupDomain
+from utils.logger import DiasysLogger, LogLevel
+from utils.topics import Topic
+
+
+def benchmark(runtime: str, num_dialogs: int, turns: int):
+    """ Runs `num_dialogs` dialogs and prints thread count and turn latencies """
+    logger = DiasysLogger(console_log_lvl=LogLevel.NONE, file_log_lvl=LogLevel.NONE)
+    domain = JSONLookupDomain('ImsLecturers', display_name="Lecturers")
+    user = ScriptedUser(turns)
+    threads_before = threading.active_count()
+    ds = DialogSystem(services=[user, DomainTracker(domains=[domain]), HandcraftedNLU(domain=domain),
+                                HandcraftedBST(domain=domain), HandcraftedPolicy(domain=domain, logger=logger),
+                                HandcraftedNLG(domain=domain, logger=logger)], runtime=runtime)
+    for _ in range(num_dialogs):
+        ds.run_dialog({Topic.DIALOG_END: False})
+    threads = threading.active_count() - threads_before
+    ds.shutdown()
+    latencies = np.array(user.latencies) * 1000
+    print(f"{runtime:>10} {threads:>8} {len(latencies):>8} {np.percentile(latencies, 50):>10.3f} "
+          f"{np.percentile(latencies, 99):>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--dialogs", type=int, default=50, help="number of dialogs per runtime")
+    parser.add_argument("-t", "--turns", type=int, default=6, help="number of turns per dialog")
+    parser.add_argument("-r", "--runtime", choices=['threads', 'asyncio'],
+                        help="measure only this runtime (in this process)")
+    args = parser.parse_args()
+
+    if args.runtime:
+        benchmark(args.runtime, args.dialogs, args.turns)
+    else:
+        print(f"{'runtime':>10} {'threads':>8} {'turns':>8} {'p50 ms':>10} {'p99 ms':>10}")
+        for runtime in ('threads', 'asyncio'):
+            subprocess.run([sys.executable, os.path.abspath(__file__), '-r', runtime,
+                            '-n', str(args.dialogs), '-t', str(args.turns)], check=True)
@@ -0,0 +1,106 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+"""
+Compares the linear prefix scan previously used to route topics with `utils.topics.TopicTrie`,
+for services subscribing to 5, 50 and 500 topics (spread over several domains):
+    * dispatch: finding the subscribed topic (function argument) for a received message
+    * validation: `DialogSystem.list_inconsistencies` on a graph with as many published as subscribed topics
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+sys.path.append(get_root_dir())
+
+from utils.topics import TopicTrie
+
+DOMAINS = ["ImsLecturers", "ImsCourses", "mensa", "weather", "superhero"]
+
+
+def make_topics(num_topics: int) -> list:
+    """ Subscription strings as produced by services with `sub_topic_domains` """
+    return [f"topic_{i}/{DOMAINS[i % len(DOMAINS)]}" for i in range(num_topics)]
+
+
+def linear_longest_prefix(topic: str, sub_topics: list) -> str:
+    common_prefix = ""
+    for key in sub_topics:
+        if topic.startswith(key) and len(key) > len(common_prefix):
+            common_prefix = key
+    return common_prefix
+
+
+def linear_inconsistencies(sub_topics: list, pub_topics: list):
+    errors = [sub for sub in sub_topics if not any(pub.startswith(sub) for pub in pub_topics)]
+    warnings = [pub for pub in pub_topics if not any(pub.startswith(sub) for sub in sub_topics)]
+    return errors, warnings
+
+
+def trie_inconsistencies(sub_topics: list, pub_topics: list):
+    pub_trie, sub_trie = TopicTrie(pub_topics), TopicTrie(sub_topics)
+    errors = [sub for sub in sub_topics if not pub_trie.has_extension(sub)]
+    warnings = [pub for pub in pub_topics if not sub_trie.prefixes(pub)]
+    return errors, warnings
+
+
+def timed(func, repetitions: int) -> float:
+    """ Returns microseconds per call """
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        func()
+    return (time.perf_counter() - start) / repetitions * 1e6
+
+
+def benchmark(topic_counts: list, num_messages: int):
+    print(f"{'topics':>8} {'scan us/msg':>12} {'trie us/msg':>12} {'scan us/graph':>14} {'trie us/graph':>14}")
+    for num_topics in topic_counts:
+        sub_topics = make_topics(num_topics)
+        # published topics carry a further suffix for half of the topics, others are published to unchanged
+        pub_topics = [topic + ("/extra" if i % 2 else "") for i, topic in enumerate(sub_topics)]
+        messages = [random.choice(pub_topics) for _ in range(num_messages)]
+        trie = TopicTrie(sub_topics)
+        assert all(trie.longest_prefix(msg) == linear_longest_prefix(msg, sub_topics) for msg in messages)
+        assert trie_inconsistencies(sub_topics, pub_topics) == linear_inconsistencies(sub_topics, pub_topics)
+
+        scan_us = timed(lambda: [linear_longest_prefix(msg, sub_topics) for msg in messages], 1) / num_messages
+        trie_us = timed(lambda: [trie.longest_prefix(msg) for msg in messages], 1) / num_messages
+        repetitions = max(1, 5000 // num_topics)
+        scan_graph_us = timed(lambda: linear_inconsistencies(sub_topics, pub_topics), repetitions)
+        trie_graph_us = timed(lambda: trie_inconsistencies(sub_topics, pub_topics), repetitions)
+        print(f"{num_topics:>8} {scan_us:>12.3f} {trie_us:>12.3f} {scan_graph_us:>14.1f} {trie_graph_us:>14.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-t", "--topics", nargs="+", type=int, default=[5, 50, 500],
+                        help="numbers of subscribed topics per service")
+    parser.add_argument("-n", "--messages", type=int, default=100000, help="number of routed messages")
+    parser.add_argument("-rs", "--randomseed", type=int, default=12345, help="seed for random generators")
+    args = parser.parse_args()
+
+    random.seed(args.randomseed)
+    benchmark(args.topics, args.messages)
@@ -0,0 +1,104 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+"""
+Compares turn latency of the zmq transport and the in-process ('direct') transport of `DialogSystem`
+on the text-only ImsLecturers pipeline (DomainTracker -> NLU -> BST -> policy -> NLG) with a scripted user.
+A turn is measured from publishing the user utterance to receiving the system utterance.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+
+def get_root_dir():
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+sys.path.append(get_root_dir())
+
+import numpy as np
+
+from services.bst import HandcraftedBST
+from services.domain_tracker.domain_tracker import DomainTracker
+from services.nlg.nlg import HandcraftedNLG
+from services.nlu.nlu import HandcraftedNLU
+from services.policy import HandcraftedPolicy
+from services.service import DialogSystem, PublishSubscribe, Service
+from utils.domain.jsonlookupdomain import JSONLookupDomain
+from utils.logger import DiasysLogger, LogLevel
+from utils.topics import Topic
+
+UTTERANCES = ["hello", "i am looking for a lecturer", "someone working on speech",
+              "what is the phone number", "and the email address", "thank you"]
+
+
+class ScriptedUser(Service):
+    """ Replaces console input / output: says the next scripted utterance whenever the system answered """
+
+    def __init__(self, turns: int):
+        Service.__init__(self, domain="")
+        self.turns = turns
+        self.latencies = []
+
+    def dialog_start(self):
+        self.turn = 0
+
+    @PublishSubscribe(sub_topics=[Topic.DIALOG_END], pub_topics=["gen_user_utterance"])
+    def say(self, dialog_end: bool = True):
+        if dialog_end:
+            return
+        self.sent = time.perf_counter()
+        return {"gen_user_utterance": UTTERANCES[self.turn % len(UTTERANCES)]}
+
+    @PublishSubscribe(sub_topics=["sys_utterance"], pub_topics=[Topic.DIALOG_END])
+    def listen(self, sys_utterance: str = None):
+        self.latencies.append(time.perf_counter() - self.sent)
+        self.turn += 1
+        return {Topic.DIALOG_END: self.turn >= self.turns}
+
+
+def benchmark(name: str, num_dialogs: int, turns: int, **ds_args):
+    """ Runs `num_dialogs` dialogs and prints median and 99th percentile turn latency """
+    logger = DiasysLogger(console_log_lvl=LogLevel.NONE, file_log_lvl=LogLevel.NONE)
+    domain = JSONLookupDomain('ImsLecturers', display_name="Lecturers")
+    user = ScriptedUser(turns)
+    ds = DialogSystem(services=[user, DomainTracker(domains=[domain]), HandcraftedNLU(domain=domain),
+                                HandcraftedBST(domain=domain), HandcraftedPolicy(domain=domain, logger=logger),
+                                HandcraftedNLG(domain=domain, logger=logger)], **ds_args)
+    for _ in range(num_dialogs):
+        ds.run_dialog({Topic.DIALOG_END: False})
+    ds.shutdown()
+    latencies = np.array(user.latencies) * 1000
+    print(f"{name:>24} {len(latencies):>8} {np.percentile(latencies, 50):>10.3f} {np.percentile(latencies, 99):>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--dialogs", type=int, default=50, help="number of dialogs per transport")
+    parser.add_argument("-t", "--turns", type=int, default=6, help="number of turns per dialog")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="thread pool size for the direct transport")
+    args = parser.parse_args()
+
+    print(f"{'transport':>24} {'turns':>8} {'p50 ms':>10} {'p99 ms':>10}")
+    benchmark("zmq (tcp)", args.dialogs, args.turns, transport='zmq')
+    benchmark("direct", args.dialogs, args.turns, transport='direct')
+    benchmark(f"direct ({args.workers} workers)", args.dialogs, args.turns,
+              transport='direct', max_workers=args.workers)
@@ -25,40 +25,118 @@ head_location = os.path.abspath(os.path.join(os.path.abspath(__file__), '..', '.
 sys.path.append(head_location)
 
 import json
+from typing import List, Tuple
+
+from services.nlu.rule_cache import content_hash, load_rules, read_cache, rule_files
+from utils.common import Language
 from utils.domain.jsonlookupdomain import JSONLookupDomain
 from utils.useract import UserAct, UserActionType
 from tools.regextemplates.rules.regexfile import RegexFile
 
 
-def _write_dict_to_file(dict_object: dict, filename: str):
-    file_path = os.path.join(head_location, 'resources', 'nlu_regexes', filename)
+def _write_dict_to_file(dict_object: dict, file_path: str):
     with open(file_path, 'w', encoding='utf-8') as file:
         json.dump(dict_object, file, sort_keys=True)
 
 
-def _create_request_json(domain: JSONLookupDomain, template: RegexFile):
+def _read_dict_from_file(file_path: str) -> dict:
+    if not os.path.exists(file_path):
+        return {}
+    with open(file_path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+class _IncrementalTemplate:
+    """Creates the regexes of a domain's slots from a template, reusing the regexes of all slots
+    whose sources (template file and the slot's values in the ontology) did not change since the
+    last build.
+
+    Attributes:
+        build {dict} -- hashes of the sources of this build (stored with the compiled rules)
+        regenerated {List[Tuple[str, str]]} -- (act, slot) of all slots whose regexes were created
+    """
+
+    def __init__(self, domain: JSONLookupDomain, template_filename: str, previous_build: dict, force: bool):
+        self.domain = domain
+        self.template_filename = template_filename
+        self._template = None
+        with open(template_filename, 'rb') as file:
+            nlu_hash = content_hash(file.read())
+        self.build = {'nlu': nlu_hash, 'slots': {}}
+        self._previous_slots = {} if force or previous_build.get('nlu') != nlu_hash \
+            else previous_build.get('slots', {})
+        self.regenerated = []
+
+    @property
+    def template(self) -> RegexFile:
+        # the template is only parsed if a slot has to be created
+        if self._template is None:
+            self._template = RegexFile(self.template_filename, self.domain)
+        return self._template
+
+    def is_up_to_date(self, act: str, slot: str, values: List[str], previous_regexes: dict) -> bool:
+        """Records the sources of the slot, returns whether its previous regexes can be reused"""
+        source_hash = content_hash(json.dumps([act, slot, values]).encode('utf-8'))
+        self.build['slots'][(act, slot)] = source_hash
+        if self._previous_slots.get((act, slot)) == source_hash and slot in previous_regexes:
+            return True
+        self.regenerated.append((act, slot))
+        return False
+
+
+def _create_request_json(domain: JSONLookupDomain, template: _IncrementalTemplate, previous_json: dict):
     request_regex_json = {}
     for slot in domain.get_requestable_slots():
+        if template.is_up_to_date('request', slot, [], previous_json):
+            request_regex_json[slot] = previous_json[slot]
+            continue
         request_act = UserAct(act_type=UserActionType.Request, slot=slot)
-        request_regex_json[slot] = template.create_regex(request_act)
+        request_regex_json[slot] = template.template.create_regex(request_act)
     return request_regex_json
 
 
-def _create_inform_json(domain: JSONLookupDomain, template: RegexFile):
+def _create_inform_json(domain: JSONLookupDomain, template: _IncrementalTemplate, previous_json: dict):
     inform_regex_json = {}
     for slot in domain.get_informable_slots():
+        values = domain.get_possible_values(slot)
+        if template.is_up_to_date('inform', slot, values, previous_json):
+            inform_regex_json[slot] = previous_json[slot]
+            continue
         inform_regex_json[slot] = {}
-        for value in domain.get_possible_values(slot):
+        for value in values:
             inform_act = UserAct(act_type=UserActionType.Inform, slot=slot, value=value)
-            inform_regex_json[slot][value] = template.create_regex(inform_act)
+            inform_regex_json[slot][value] = template.template.create_regex(inform_act)
     return inform_regex_json
 
 
-def create_json_from_template(domain: JSONLookupDomain, template_filename: str):
-    template = RegexFile(template_filename, domain)
-    domain_name = domain.get_domain_name()
-    _write_dict_to_file(_create_request_json(domain, template), f'{domain_name}RequestRules.json')
-    _write_dict_to_file(_create_inform_json(domain, template), f'{domain_name}InformRules.json')
+def create_json_from_template(domain: JSONLookupDomain, template_filename: str, folder: str = None,
+                              force: bool = False) -> List[Tuple[str, str]]:
+    """Creates the request and inform regex files of the domain and the compiled rules of the NLU
+    (see services.nlu.rule_cache).
+
+    Only the regexes of slots whose sources changed since the last build are created again: all
+    slots if the template file changed, otherwise the slots whose values in the ontology changed.
+    Database contents accessed by the template are not tracked, use force after changing them.
+
+    Arguments:
+        domain {JSONLookupDomain} -- domain to create the regexes for
+        template_filename {str} -- path of the .nlu template file
+        folder {str} -- folder of the regex files (default: resources/nlu_regexes)
+        force {bool} -- create the regexes of all slots
+
+    Returns:
+        List[Tuple[str, str]] -- (act, slot) of all slots whose regexes were created
+    """
+    folder = folder or os.path.join(head_location, 'resources', 'nlu_regexes')
+    general_file, request_file, inform_file, cache_file = rule_files(folder, domain.get_domain_name(),
+                                                                     Language.ENGLISH)
+    previous = read_cache(cache_file)
+    template = _IncrementalTemplate(domain, template_filename, previous.build if previous else {}, force)
+    _write_dict_to_file(_create_request_json(domain, template, _read_dict_from_file(request_file)), request_file)
+    _write_dict_to_file(_create_inform_json(domain, template, _read_dict_from_file(inform_file)), inform_file)
+    load_rules(general_file, request_file, inform_file, domain.get_requestable_slots(),
+               domain.get_informable_slots(), cache_file=cache_file, build=template.build)
+    return template.regenerated
 
 
 if __name__ == '__main__':
@@ -66,7 +144,10 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument("domain", help="name of the domain")
     parser.add_argument("filename", help="name of your .nlu file without the .nlu ending (e.g.: resources/nlu_regexes/YOURNLUFILE.nlu -> provide YOURFILE)")
+    parser.add_argument("-f", "--force", action='store_true',
+                        help="create the regexes of all slots, not only of the ones whose sources changed")
     args = parser.parse_args()
     nlu_file = os.path.join(head_location, 'resources', 'nlu_regexes', f"{args.filename}.nlu")
     dom = JSONLookupDomain(args.domain)
-    create_json_from_template(dom, nlu_file)
+    regenerated = create_json_from_template(dom, nlu_file, force=args.force)
+    print(f"created the regexes of {len(regenerated)} slots")
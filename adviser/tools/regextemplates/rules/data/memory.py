@@ -79,9 +79,11 @@ class GlobalMemory(Memory):
     def get_member(self, primary_key_value: str, attribute_name: str) -> str:
         primary_key_name = self.domain.get_primary_key()
         table_name = self.domain.get_domain_name()
+        if not attribute_name.isidentifier():
+            raise ValueError(f"Invalid attribute name {attribute_name}.")
         query_result = self.domain.query_db(
-            f'SELECT {attribute_name} FROM {table_name} '
-            f'WHERE {primary_key_name} = \'{primary_key_value}\'')
+            f'SELECT {attribute_name} FROM {table_name} WHERE {primary_key_name} = ?',
+            (primary_key_value,))
         if not query_result:
             raise ValueError(f"Couldn't find an entry for primary key {primary_key_value}.")
         return query_result[0][attribute_name]
@@ -24,6 +24,76 @@ import copy
 from utils.domain.jsonlookupdomain import JSONLookupDomain
 
 
+class _CopyOnWriteDict(dict):
+    """ Shallow copy of a dict which copies its nested dicts, sets and lists the first time they are
+        accessed by key (e.g. `informs['area']['west'] = 1.0`), so that values of the original dict
+        are never modified through it. Values obtained with `items()` / `values()` are shared with
+        the original dict and must not be modified.
+        Once frozen (see `_freeze`), nothing is copied anymore.
+    """
+
+    def __init__(self, shared: dict):
+        dict.__init__(self, shared)
+        # keys whose values are not shared with the original dict (None if frozen)
+        self._copied = set()
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if self._copied is not None and key not in self._copied:
+            self._copied.add(key)
+            copied = _copy_for_write(value)
+            if copied is not value:
+                dict.__setitem__(self, key, copied)
+            return copied
+        return value
+
+    def __setitem__(self, key, value):
+        if self._copied is not None:
+            self._copied.add(key)
+        dict.__setitem__(self, key, value)
+
+    def __deepcopy__(self, memo):
+        # copies values without marking them as copied (they may still be shared within the copied belief state)
+        result = _CopyOnWriteDict({})
+        memo[id(self)] = result
+        for key, value in dict.items(self):
+            dict.__setitem__(result, key, copy.deepcopy(value, memo))
+        result._copied = copy.copy(self._copied)
+        return result
+
+    def __reduce__(self):
+        # pickle restores the items of dict subclasses through `__setitem__` before `_copied` is set,
+        # the unpickled turn is not shared with anything, so it is rebuilt as a plain dict
+        return dict, (dict(self),)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+
+def _freeze(value):
+    """ Stops copying on access in `value` and all its copied nested dicts (as they become part of
+        a previous turn, which is only read) """
+    if isinstance(value, _CopyOnWriteDict) and value._copied is not None:
+        copied, value._copied = value._copied, None
+        for key in copied:
+            if key in value:
+                _freeze(dict.__getitem__(value, key))
+
+
+def _copy_for_write(value):
+    """ Returns a copy of mutable containers (nested dicts are copied on access), other values as they are """
+    if isinstance(value, dict):
+        return _CopyOnWriteDict(value)
+    if isinstance(value, (set, list)):
+        return type(value)(value)
+    return value
+
+
 class BeliefState:
     """
     A representation of the belief state, can be accessed like a dictionary.
@@ -35,13 +105,20 @@ class BeliefState:
         * number of db matches for given constraints
         * if the db matches can further be split
 
+    Each turn shares all values with the previous turn until they are accessed in the current turn
+    (`state['informs']`): then only this value is copied, with its nested dicts copied as they are
+    accessed. Therefore, previous turns (`state[-2]`) and values obtained through them must only be
+    read, never modified.
     """
     def __init__(self, domain: JSONLookupDomain):
         self.domain = domain
         self._history = [self._init_beliefstate()]
-    
+        # keys of the current turn whose values are not shared with previous turns
+        self._copied = set(self._history[-1])
+
     def dialog_start(self):
         self._history = [self._init_beliefstate()]
+        self._copied = set(self._history[-1])
 
     def __getitem__(self, val):  # for indexing
         # if used with numbers: int (e.g. state[-2]) or slice (e.g. state[3:6])
@@ -49,14 +126,20 @@ class BeliefState:
             return self._history[val]  # interpret the number as turn
         # if used with strings (e.g. state['beliefs'])
         elif isinstance(val, str):
-            # take the current turn's belief state
-            return self._history[-1][val]
+            # take the current turn's belief state (copying the value if still shared, as the
+            # caller might modify it)
+            turn = self._history[-1]
+            if val not in self._copied and val in turn:
+                self._copied.add(val)
+                turn[val] = _copy_for_write(turn[val])
+            return turn[val]
 
     def __iter__(self):
         return iter(self._history[-1])
 
     def __setitem__(self, key, val):
         # e.g. state['beliefs']['area']['west'] = 1.0
+        self._copied.add(key)
         self._history[-1][key] = val
 
     def __len__(self):
@@ -91,8 +174,12 @@ class BeliefState:
         to ensure the correct history can be accessed correctly by other modules
         """
 
-        # copy last turn's dict
-        self._history.append(copy.deepcopy(self._history[-1]))
+        # share all values with the last turn, they are copied on access (see `__getitem__`)
+        turn = self._history[-1]
+        for key in self._copied:
+            _freeze(turn.get(key))
+        self._history.append(dict(turn))
+        self._copied = set()
 
     def _init_beliefstate(self):
         """Initializes the belief state based on the currently active domain
@@ -175,9 +262,9 @@ class BeliefState:
 
         candidates = {}
         informs = self._history[turn_idx]["informs"]
-        for slot in informs:
+        for slot, slot_beliefs in informs.items():
             # sort by belief
-            sorted_slot_cands = sorted(informs[slot].items(), key=lambda kv: kv[1], reverse=True)
+            sorted_slot_cands = sorted(slot_beliefs.items(), key=lambda kv: kv[1], reverse=True)
             # restrict result count to specified maximum
             filtered_slot_cands = sorted_slot_cands[:max_results]
             # threshold by probabilities
@@ -220,24 +307,9 @@ class BeliefState:
         candidates = self.get_most_probable_inf_beliefs(consider_NONE=True, threshold=0.7,
                                                         max_results=1)
         constraints = self._remove_dontcare_slots(candidates)
-        db_matches = self.domain.find_entities(constraints, self.domain.get_informable_slots())
-        num_matches = len(db_matches)
-
         # check if matching db entities could be discriminated by more
-        # information from user
-        discriminable = False
-        if len(db_matches) > 1:
-            dontcare_slots = set(candidates.keys()) - set(constraints.keys())
-            informable_slots = set(self.domain.get_informable_slots()) - set(self.domain.get_primary_key())
-            for informable_slot in informable_slots:
-                if informable_slot not in dontcare_slots:
-                    # this slot could be used to gather more information
-                    db_values_for_slot = set()
-                    for db_match in db_matches:
-                        db_values_for_slot.add(db_match[informable_slot])
-                    if len(db_values_for_slot) > 1:
-                        # at least 2 different values for slot
-                        # ->can use this slot to differentiate between entities
-                        discriminable = True
-                        break
-        return num_matches, discriminable
+        # information from user (the domain only counts, it does not fetch the entities)
+        dontcare_slots = set(candidates.keys()) - set(constraints.keys())
+        informable_slots = set(self.domain.get_informable_slots()) - set(self.domain.get_primary_key())
+        slots = [slot for slot in informable_slots if slot not in dontcare_slots]
+        return self.domain.count_and_discriminable(constraints, slots)
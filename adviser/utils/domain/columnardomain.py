@@ -0,0 +1,274 @@
+###############################################################################
+#
+# Copyright 2020, University of Stuttgart: Institute for Natural Language Processing (IMS)
+#
+# This file is part of Adviser.
+# Adviser is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3.
+#
+# Adviser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Adviser.  If not, see <https://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from utils.domain.jsonlookupdomain import JSONLookupDomain, STREAM_BATCH_SIZE
+from utils.domain.lookupdomain import fold_case
+
+# number of set bits of each byte (for counting the rows of a packed bitmap)
+_POPCOUNT = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.uint8)
+# bitmaps are kept for all values of columns with at most this many distinct values
+_MAX_CACHED_BITMAPS = 256
+# constraints matching at most 1 / _SPARSE_FRACTION of all rows are answered from the
+# row lists of the column instead of intersecting bitmaps
+_SPARSE_FRACTION = 64
+
+
+def _entity_id_forms(entity_id) -> list:
+    """ Returns the primary key values an entity id may be stored as: the id itself, its string and,
+        for integer literals, its integer """
+    forms = [entity_id, str(entity_id)]
+    try:
+        forms.append(int(str(entity_id)))
+    except ValueError:
+        pass
+    return forms
+
+
+class _Column(object):
+    """ Dictionary-encoded column of a table: each row stores the code of its value
+
+    Attributes:
+        values (list): distinct values of the column (indexed by code)
+        codes (np.ndarray): code of the value of each row (int32)
+        code_of (dict): value -> code
+        folded (Dict[str, List[int]]): value ignoring the case of ASCII letters -> codes of all
+                                       values equal to it (NULL is never equal to a value)
+    """
+
+    def __init__(self, values: list):
+        """
+        Args:
+            values (list): value of each row
+        """
+        self.values = list(dict.fromkeys(values))
+        self.code_of = {value: code for code, value in enumerate(self.values)}
+        self.codes = np.fromiter(map(self.code_of.__getitem__, values), dtype=np.int32, count=len(values))
+        self._folded = None
+        # row indices sorted by code and the start of the rows of each code in it (built on first use)
+        self._order = None
+        self._starts = None
+        self._bitmaps = {}
+
+    @property
+    def folded(self) -> Dict[str, List[int]]:
+        # built on first use (most columns are never constrained)
+        if self._folded is None:
+            self._folded = {}
+            for code, value in enumerate(self.values):
+                if value is not None:
+                    self._folded.setdefault(fold_case(str(value)), []).append(code)
+        return self._folded
+
+    def _index(self):
+        if self._order is None:
+            self._order = np.argsort(self.codes, kind='stable')
+            self._starts = np.searchsorted(self.codes[self._order], np.arange(len(self.values) + 1))
+
+    def count(self, codes: List[int]) -> int:
+        """ Returns the number of rows with one of the codes """
+        self._index()
+        return int(sum(self._starts[code + 1] - self._starts[code] for code in codes))
+
+    def rows(self, codes: List[int]) -> np.ndarray:
+        """ Returns the indices of all rows with one of the codes (ascending) """
+        self._index()
+        rows = [self._order[self._starts[code]:self._starts[code + 1]] for code in codes]
+        return rows[0] if len(rows) == 1 else np.sort(np.concatenate(rows))
+
+    def bitmap(self, codes: List[int]) -> np.ndarray:
+        """ Returns the packed bitmap (see `np.packbits`) of the rows with one of the codes """
+        key = tuple(codes)
+        bitmap = self._bitmaps.get(key)
+        if bitmap is None:
+            bitmap = np.packbits(self.codes == codes[0] if len(codes) == 1 else np.isin(self.codes, codes))
+            if len(self.folded) <= _MAX_CACHED_BITMAPS:
+                self._bitmaps[key] = bitmap
+        return bitmap
+
+    def take(self, rows: np.ndarray) -> list:
+        """ Returns the values of the given rows """
+        return list(map(self.values.__getitem__, self.codes[rows].tolist()))
+
+
+class ColumnarLookupDomain(JSONLookupDomain):
+    """ Domain based on a JSON-ontology and a sqllite database which answers `find_entities` and
+        `find_info_about_entity` from columnar arrays instead of SQL.
+
+        The table is read once into dictionary-encoded columns. A constraint selects the rows of
+        all values equal to it (ignoring the case of ASCII letters, like `COLLATE NOCASE`);
+        several constraints are combined by intersecting bitmaps (one bit per row) or, if one
+        constraint matches only few rows, by filtering the rows of the most selective one. Counts
+        (`count_entities`) never materialize rows. `query_db` still runs SQL on the database.
+    """
+
+    def __init__(self, name: str, json_ontology_file: str = None, sqllite_db_file: str = None,
+                 display_name: str = None, db_mode: str = 'memory', query_cache_size: int = 256):
+        """ Loads the ontology and the database (see `JSONLookupDomain`) and reads the table of
+            the domain into columns """
+        JSONLookupDomain.__init__(self, name, json_ontology_file=json_ontology_file,
+                                  sqllite_db_file=sqllite_db_file, display_name=display_name,
+                                  db_mode=db_mode, query_cache_size=query_cache_size)
+        self._load_columns()
+
+    def __getstate__(self):
+        # the columns are read from the database again after unpickling
+        state = JSONLookupDomain.__getstate__(self)
+        for attribute in ('columns', 'column_names', 'num_rows'):
+            state.pop(attribute, None)
+        return state
+
+    def __getattr__(self, attribute):
+        # only called for missing attributes, e.g. the columns of an unpickled domain
+        if attribute in ('columns', 'column_names', 'num_rows'):
+            self._load_columns()
+            return self.__dict__[attribute]
+        raise AttributeError(attribute)
+
+    def _open_db(self):
+        # the columns of the previous database are read again on first use
+        for attribute in ('columns', 'column_names', 'num_rows'):
+            self.__dict__.pop(attribute, None)
+        return JSONLookupDomain._open_db(self)
+
+    def _load_columns(self):
+        """ Reads all columns of the domain's table """
+        if "db" not in self.__dict__:
+            self.db = self._open_db()
+        table = self.get_domain_name()
+        cursor = self.db.cursor()
+        cursor.row_factory = None
+        self.column_names = [column[1] for column in cursor.execute(f"PRAGMA table_info({table})")]
+        rows = cursor.execute(f"SELECT {', '.join(self.column_names)} FROM {table} ORDER BY rowid").fetchall()
+        self.num_rows = len(rows)
+        columns = zip(*rows) if rows else ([] for _ in self.column_names)
+        del rows
+        self.columns = {column_name: _Column(list(values)) for column_name, values in zip(self.column_names, columns)}
+
+    def _column(self, slot: str) -> _Column:
+        if slot not in self.columns:
+            raise ValueError(f"no such column: {slot}")
+        return self.columns[slot]
+
+    def _match(self, constraints: Dict[str, str], count_only: bool = False):
+        """ Finds the rows matching all constraints
+
+        Args:
+            constraints (Dict[str, str]): slot-value mapping of constraints (without dontcare)
+            count_only (bool): whether only the number of rows is needed
+
+        Returns:
+            the indices of the rows (ascending) or their number if count_only
+        """
+        if not constraints:
+            return self.num_rows if count_only else np.arange(self.num_rows)
+        terms = []
+        for slot, value in constraints.items():
+            column = self._column(slot)
+            codes = column.folded.get(fold_case(value))
+            if not codes:
+                return 0 if count_only else np.arange(0)
+            terms.append((column.count(codes), column, codes))
+        terms.sort(key=itemgetter(0))
+
+        num_rows, column, codes = terms[0]
+        if len(terms) == 1 and count_only:
+            return num_rows
+        if len(terms) == 1 or num_rows * _SPARSE_FRACTION <= self.num_rows:
+            rows = column.rows(codes)
+            for _, column, codes in terms[1:]:
+                values = column.codes[rows]
+                rows = rows[values == codes[0] if len(codes) == 1 else np.isin(values, codes)]
+            return len(rows) if count_only else rows
+        bitmap = column.bitmap(codes)
+        for _, column, codes in terms[1:]:
+            bitmap = bitmap & column.bitmap(codes)
+        if count_only:
+            return int(_POPCOUNT[bitmap].sum(dtype=np.int64))
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.num_rows))
+
+    def _take(self, rows: np.ndarray, columns: Iterable[str]) -> List[dict]:
+        """ Returns the values of the given columns of the rows as dicts """
+        columns = list(columns)
+        values = [self._column(column).take(rows) for column in columns]
+        return [dict(zip(columns, row)) for row in zip(*values)]
+
+    def count_entities(self, constraints: dict) -> int:
+        """ Returns the number of entities meeting the constraints (see `find_entities`) """
+        return self._match(self._normalize_constraints(constraints), count_only=True)
+
+    def _count_and_discriminable(self, constraints: Dict[str, str], slots: List[str]) -> Tuple[int, bool]:
+        num_matches = self._match(constraints, count_only=True)
+        if num_matches < 2:
+            return num_matches, False
+        if not constraints:
+            return num_matches, any(len(self._column(slot).values) > 1 for slot in slots)
+        rows = self._match(constraints)
+        for slot in slots:
+            codes = self._column(slot).codes[rows]
+            if codes.min() != codes.max():
+                return num_matches, True
+        return num_matches, False
+
+    def _value_counts(self, constraints: Dict[str, str], slots: List[str]) -> Dict[str, Dict[object, int]]:
+        # without constraints the counts are the sizes of the row lists of the values
+        rows = self._match(constraints) if constraints else None
+        counts = {}
+        for slot in slots:
+            column = self._column(slot)
+            if rows is None:
+                column._index()
+                code_counts = np.diff(column._starts)
+            else:
+                code_counts = np.bincount(column.codes[rows], minlength=len(column.values))
+            counts[slot] = {column.values[code]: int(code_counts[code]) for code in np.flatnonzero(code_counts)}
+        return counts
+
+    def _select_entities(self, constraints: Dict[str, str], columns: Set[str]) -> Iterable[dict]:
+        return self._take(self._match(constraints), columns)
+
+    def _count_entities(self, constraints: dict) -> int:
+        return self.count_entities(constraints)
+
+    def _iter_select_entities(self, constraints: Dict[str, str], columns: Tuple[str]) -> Iterator[tuple]:
+        rows = self._match(constraints)
+        for start in range(0, len(rows), STREAM_BATCH_SIZE):
+            yield from zip(*(self._column(column).take(rows[start:start + STREAM_BATCH_SIZE]) for column in columns))
+
+    def _select_entities_at(self, constraints: Dict[str, str], columns: Tuple[str],
+                            indices: List[int]) -> List[tuple]:
+        # only the selected rows are looked up in the columns
+        rows = self._match(constraints)[indices]
+        return list(zip(*(self._column(column).take(rows) for column in columns)))
+
+    def _select_entity_info(self, entity_id, columns: Optional[List[str]]) -> Iterable[dict]:
+        primary_key = self._column(self.get_primary_key())
+        # SQL converts the bound id to the type of INTEGER / TEXT keys, so both forms are looked up
+        code = None
+        for key in _entity_id_forms(entity_id):
+            code = primary_key.code_of.get(key)
+            if code is not None:
+                break
+        if code is None:
+            return []
+        return self._take(primary_key.rows([code]), columns if columns is not None else self.column_names)
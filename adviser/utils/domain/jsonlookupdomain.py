@@ -21,10 +21,20 @@
 import json
 import os
 import sqlite3
-from io import StringIO
-from typing import List, Iterable
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from urllib.parse import quote
 
 from utils.domain import Domain
+from utils.domain.lookupdomain import EntityResult, FrozenRow, fold_case
+from utils.lru import LRUCache
+
+
+# ways of accessing the database of a JSONLookupDomain (see `JSONLookupDomain.__init__`)
+DB_MODES = ('memory', 'shared')
+# number of SQL statements (one per query shape) kept prepared by each database connection
+STATEMENT_CACHE_SIZE = 128
+# number of rows fetched at once when streaming query results (see `query_entities`)
+STREAM_BATCH_SIZE = 256
 
 
 class JSONLookupDomain(Domain):
@@ -33,7 +43,7 @@ class JSONLookupDomain(Domain):
     """
 
     def __init__(self, name: str, json_ontology_file: str = None, sqllite_db_file: str = None, \
-                 display_name: str = None):
+                 display_name: str = None, db_mode: str = 'memory', query_cache_size: int = 256):
         """ Loads the ontology from a json file and the data from a sqllite
             database.
 
@@ -49,20 +59,30 @@ class JSONLookupDomain(Domain):
                                 (from the top-level adviser directory, e.g. resources/databases)
             display_name (str): the domain's name as it appears on the screen
                                 (e.g. containing whitespaces)
+            db_mode (str): how the database is accessed, one of
+                           'memory': the database is copied into memory (each process holds its own copy)
+                           'shared': the database file is opened read-only and memory-mapped, so all
+                                     processes using it share the pages of the file (the file must not
+                                     be modified while it is in use)
+            query_cache_size (int): number of results of `find_entities` and `find_info_about_entity`
+                                    which are cached (0 disables caching), see `query_cache`
         """
         super(JSONLookupDomain, self).__init__(name)
 
+        if db_mode not in DB_MODES:
+            raise ValueError(f"unknown database mode '{db_mode}', expected one of {DB_MODES}")
         root_dir = self._get_root_dir()
         self.sqllite_db_file = sqllite_db_file
+        self.db_mode = db_mode
+        # results of recent queries (shared by all services using this domain instance)
+        self.query_cache = LRUCache(query_cache_size) if query_cache_size > 0 else None
         # make sure to set default values in case of None
         json_ontology_file = json_ontology_file or os.path.join('resources', 'ontologies',
                                                                 name + '.json')
-        sqllite_db_file = sqllite_db_file or os.path.join('resources', 'databases',
-                                                          name + '.db')
 
-        self.ontology_json = json.load(open(root_dir + '/' + json_ontology_file))
+        self.ontology_json = json.load(open(os.path.join(root_dir, json_ontology_file)))
         # load database
-        self.db = self._load_db_to_memory(root_dir + '/' + sqllite_db_file)
+        self.db = self._open_db()
 
         self.display_name = display_name if display_name is not None else name
 
@@ -71,6 +91,8 @@ class JSONLookupDomain(Domain):
         state = self.__dict__.copy()
         if 'db' in state:
             del state['db']
+        if state.get('query_cache') is not None:
+            state['query_cache'] = LRUCache(self.query_cache.max_size)
         return state
 
     def _get_root_dir(self):
@@ -85,6 +107,38 @@ class JSONLookupDomain(Domain):
             row_dict[col[0]] = row[col_idx]
         return row_dict
 
+    def _open_db(self):
+        """ Opens the database of the domain as configured by `db_mode`
+
+        Returns:
+            A sqllite3 connection
+        """
+        self.clear_query_cache()
+        sqllite_db_file = self.sqllite_db_file or os.path.join('resources', 'databases', self.name + '.db')
+        db_file_path = os.path.join(self._get_root_dir(), sqllite_db_file)
+        # domains pickled by older versions do not know about database modes
+        if getattr(self, 'db_mode', 'memory') == 'shared':
+            return self._open_db_shared(db_file_path)
+        db = self._load_db_to_memory(db_file_path)
+        self._create_indexes(db)
+        return db
+
+    def _create_indexes(self, db):
+        """ Creates indexes on the informable columns (compared ignoring case, see `find_entities`)
+            and on the primary key (compared exactly, see `find_info_about_entity`) of the
+            domain's table, unless the database already has them """
+        table = self.get_domain_name()
+        columns = {column['name'] for column in db.execute(f"PRAGMA table_info({table})")}
+        indexes = [(slot, 'NOCASE') for slot in self.get_informable_slots()] + [(self.get_primary_key(), 'BINARY')]
+        for slot, collation in indexes:
+            if slot in columns:
+                db.execute(f"CREATE INDEX IF NOT EXISTS adviser_{table}_{slot}_{collation.lower()} "
+                           f"ON {table} ({slot} COLLATE {collation})")
+        # statistics let the query planner choose between the indexes and scanning (for very
+        # unselective values); sampling keeps this fast for large tables
+        db.execute("PRAGMA analysis_limit=1000")
+        db.execute("ANALYZE")
+
     def _load_db_to_memory(self, db_file_path : str):
         """ Loads a sqllite3 database from file to memory in order to save
             I/O operations
@@ -96,22 +150,110 @@ class JSONLookupDomain(Domain):
             A sqllite3 connection
         """
 
-        # open and read db file to temporary file
+        # copy the pages of the db file into a database in memory
         file_db = sqlite3.connect(db_file_path, check_same_thread=False)
-        tempfile = StringIO()
-        for line in file_db.iterdump():
-            tempfile.write('%s\n' % line)
+        db = sqlite3.connect(':memory:', check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
+        file_db.backup(db)
         file_db.close()
-        tempfile.seek(0)
-        # Create a database in memory and import from temporary file
-        db = sqlite3.connect(':memory:', check_same_thread=False)
         db.row_factory = self._sqllite_dict_factory
-        db.cursor().executescript(tempfile.read())
-        db.commit()
-        # file_db.backup(databases[domain]) # works only in python >= 3.7
 
         return db
 
+    def _open_db_shared(self, db_file_path: str):
+        """ Opens a sqllite3 database file read-only and memory-maps it, so the operating system
+            keeps a single copy of its pages for all processes reading it
+
+        Args:
+            db_file_path (str): absolute path to database file
+
+        Returns:
+            A sqllite3 connection
+        """
+        if not os.path.isfile(db_file_path):
+            # sqlite would only fail on the first query
+            raise FileNotFoundError(db_file_path)
+        # immutable: the file is never changed, so sqlite needs neither locks nor change detection
+        uri = 'file:{}?mode=ro&immutable=1'.format(quote(os.path.abspath(db_file_path)))
+        db = sqlite3.connect(uri, uri=True, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
+        db.execute('PRAGMA mmap_size={}'.format(os.path.getsize(db_file_path)))
+        db.row_factory = self._sqllite_dict_factory
+
+        return db
+
+    def clear_query_cache(self):
+        """ Removes all cached query results (if caching is enabled), e.g. after the database changed """
+        if getattr(self, 'query_cache', None) is not None:
+            self.query_cache.clear()
+
+    def query_cache_stats(self) -> dict:
+        """ Returns the usage statistics of the query cache (see `utils.lru.LRUCache.stats`),
+            an empty dict if caching is disabled """
+        query_cache = getattr(self, 'query_cache', None)
+        return query_cache.stats() if query_cache is not None else {}
+
+    def _cached(self, key: tuple, compute: Callable[[], Any]) -> Any:
+        """ Returns the result of a query from the query cache if possible, computes (and caches) it
+            otherwise
+
+        Args:
+            key (tuple): normalized description of the query (everything its result depends on)
+            compute (Callable): computes the (immutable) result of the query
+        """
+        query_cache = getattr(self, 'query_cache', None)
+        if query_cache is not None:
+            result = query_cache.get(key)
+            if result is not None:
+                return result
+        result = compute()
+        if query_cache is not None:
+            query_cache.put(key, result)
+        return result
+
+    def _cached_rows(self, key: tuple, fetch: Callable[[], Iterable[dict]]) -> tuple:
+        """ Returns the rows of a query as tuple of `FrozenRow`s, from the query cache if possible
+
+        Args:
+            key (tuple): normalized description of the query (everything its result depends on)
+            fetch (Callable): returns the rows of the query from the database
+        """
+        return self._cached(key, lambda: tuple(FrozenRow(row) for row in fetch()))
+
+    def _statement(self, shape: tuple, build: Callable[[], str]) -> str:
+        """ Returns the SQL statement (with parameters for all values) of a query shape, building
+            it only once; running the same statement text again lets sqlite3 reuse the prepared
+            statement (see `STATEMENT_CACHE_SIZE`)
+
+        Args:
+            shape (tuple): everything the statement depends on (kind of query, slots and columns)
+            build (Callable): builds the statement
+        """
+        statements = self.__dict__.get('_statements')
+        if statements is None:
+            statements = self._statements = LRUCache(STATEMENT_CACHE_SIZE)
+        statement = statements.get(shape)
+        if statement is None:
+            statement = build()
+            statements.put(shape, statement)
+        return statement
+
+    def _where_clause(self, slots: List[str]) -> str:
+        """ Returns the WHERE clause comparing the slots with parameters, ignoring case """
+        if not slots:
+            return ""
+        return " WHERE " + " AND ".join("{} = ? COLLATE NOCASE".format(slot) for slot in slots)
+
+    @staticmethod
+    def _normalize_constraints(constraints: dict) -> Dict[str, str]:
+        """ Returns the constraints without the ones which do not constrain (None, dontcare) """
+        return {slot: str(value) for slot, value in constraints.items()
+                if value is not None and str(value).lower() != 'dontcare'}
+
+    @staticmethod
+    def _constraints_key(constraints: Dict[str, str]) -> tuple:
+        """ Returns a hashable key of normalized constraints, equal for all constraints matching the
+            same entities """
+        return tuple(sorted((slot, fold_case(value)) for slot, value in constraints.items()))
+
     def find_entities(self, constraints: dict, requested_slots: Iterable = iter(())):
         """ Returns all entities from the data backend that meet the constraints, with values for
             the primary key and the system requestable slots (and optional slots, specifyable
@@ -123,18 +265,173 @@ class JSONLookupDomain(Domain):
             requested_slots (Iterable): list of slots that should be returned in addition to the
                                         system requestable slots and the primary key
 
+        Returns:
+            (tuple): matching rows as read-only dicts (`FrozenRow`)
         """
         # values for name and all system requestable slots
-        select_clause = ", ".join(set([self.get_primary_key()]) |
-                                  set(self.get_system_requestable_slots()) |
-                                  set(requested_slots))
-        query = "SELECT {} FROM {}".format(select_clause, self.get_domain_name())
-        constraints = {slot: value.replace("'", "''") for slot, value in constraints.items()
-                       if value is not None and str(value).lower() != 'dontcare'}
-        if constraints:
-            query += ' WHERE ' + ' AND '.join("{}='{}' COLLATE NOCASE".format(key, str(val))
-                                              for key, val in constraints.items())
-        return self.query_db(query)
+        columns = set([self.get_primary_key()]) | set(self.get_system_requestable_slots()) | \
+            set(requested_slots)
+        constraints = self._normalize_constraints(constraints)
+        key = ('entities', frozenset(columns), self._constraints_key(constraints))
+        return self._cached_rows(key, lambda: self._select_entities(constraints, columns))
+
+    def _select_entities(self, constraints: Dict[str, str], columns: Set[str]) -> Iterable[dict]:
+        """ Returns the values of the columns of all entities matching the constraints (ignoring the
+            case of ASCII letters), see `find_entities`
+
+        Args:
+            constraints (Dict[str, str]): slot-value mapping of constraints (without dontcare)
+            columns (Set[str]): slots to return
+        """
+        slots = sorted(constraints)
+        query = self._statement(('entities', frozenset(columns), tuple(slots)),
+                                lambda: "SELECT {} FROM {}{}".format(", ".join(columns), self.get_domain_name(),
+                                                                     self._where_clause(slots)))
+        return self.query_db(query, [constraints[slot] for slot in slots])
+
+    def query_entities(self, constraints: dict, requested_slots: Iterable = iter(())) -> EntityResult:
+        """ Returns a lazy handle on the entities `find_entities` returns (see `EntityResult`):
+            counting them runs an aggregate query, iterating streams the rows from a cursor and
+            `first` / `sample` stop reading rows once they found the requested ones (results already
+            in the query cache are used instead).
+
+        Args:
+            constraints (dict): Slot-value mapping of constraints.
+                                If empty, all entities in the database will be matched.
+            requested_slots (Iterable): list of slots that should be returned in addition to the
+                                        system requestable slots and the primary key
+        """
+        columns = set([self.get_primary_key()]) | set(self.get_system_requestable_slots()) | \
+            set(requested_slots)
+        return EntityResult(self, constraints, sorted(columns))
+
+    def _count_entities(self, constraints: dict) -> int:
+        return self.count_and_discriminable(constraints, ())[0]
+
+    def _cached_entities(self, constraints: Dict[str, str], columns: Tuple[str]) -> Optional[tuple]:
+        """ Returns the rows of `find_entities` if they are in the query cache """
+        query_cache = getattr(self, 'query_cache', None)
+        key = ('entities', frozenset(columns), self._constraints_key(constraints))
+        if query_cache is None or key not in query_cache:
+            return None
+        return query_cache.get(key)
+
+    def _stream_entities(self, constraints: dict, columns: Tuple[str]) -> Iterator[FrozenRow]:
+        constraints = self._normalize_constraints(constraints)
+        cached = self._cached_entities(constraints, columns)
+        if cached is not None:
+            return iter(cached)
+        return (FrozenRow(zip(columns, row)) for row in self._iter_select_entities(constraints, columns))
+
+    def _entities_at(self, constraints: dict, columns: Tuple[str], indices: List[int]) -> List[FrozenRow]:
+        constraints = self._normalize_constraints(constraints)
+        cached = self._cached_entities(constraints, columns)
+        if cached is not None:
+            return [cached[index] for index in indices]
+        rows = self._select_entities_at(constraints, columns, indices)
+        return [FrozenRow(zip(columns, row)) for row in rows]
+
+    def _iter_select_entities(self, constraints: Dict[str, str], columns: Tuple[str]) -> Iterator[tuple]:
+        """ Streams the values of the columns (as tuples) of all entities matching the constraints,
+            in the order of `_select_entities` """
+        if "db" not in self.__dict__:
+            self.db = self._open_db()
+        slots = sorted(constraints)
+        query = self._statement(('entities', columns, tuple(slots)),
+                                lambda: "SELECT {} FROM {}{}".format(", ".join(columns), self.get_domain_name(),
+                                                                     self._where_clause(slots)))
+        cursor = self.db.cursor()
+        cursor.row_factory = None
+        cursor.execute(query, [constraints[slot] for slot in slots])
+        rows = cursor.fetchmany(STREAM_BATCH_SIZE)
+        while rows:
+            yield from rows
+            rows = cursor.fetchmany(STREAM_BATCH_SIZE)
+
+    def _select_entities_at(self, constraints: Dict[str, str], columns: Tuple[str],
+                            indices: List[int]) -> List[tuple]:
+        """ Returns the values of the columns of the matching entities at the given positions (in
+            the order of `_iter_select_entities`), reading rows only up to the last position """
+        wanted = set(indices)
+        found = {}
+        for position, row in enumerate(self._iter_select_entities(constraints, columns)):
+            if position in wanted:
+                found[position] = row
+                if len(found) == len(wanted):
+                    break
+        return [found[index] for index in indices]
+
+    def count_and_discriminable(self, constraints: dict, slots: Iterable[str]) -> Tuple[int, bool]:
+        """ Returns the number of entities meeting the constraints and whether they could be told
+            apart by asking for one of the slots, without fetching the entities.
+
+        Args:
+            constraints (dict): slot-value mapping of constraints (see `find_entities`)
+            slots (Iterable[str]): slots whose values could be used to discriminate the entities
+
+        Returns:
+            (int): number of matching entities
+            (bool): whether there are at least two matching entities and one of the slots has
+                    different values (missing values count as a value) for them
+        """
+        constraints = self._normalize_constraints(constraints)
+        slots = sorted(set(slots))
+        key = ('count', frozenset(slots), self._constraints_key(constraints))
+        return self._cached(key, lambda: self._count_and_discriminable(constraints, slots))
+
+    def _count_and_discriminable(self, constraints: Dict[str, str], slots: List[str]) -> Tuple[int, bool]:
+        """ Computes `count_and_discriminable` with a single aggregate query """
+        constraint_slots = sorted(constraints)
+
+        def build():
+            # a slot has different values if its smallest and largest (non-NULL) values differ or if
+            # only some of its values are NULL (cheaper than COUNT(DISTINCT ...), which sorts the values)
+            different = ["(MIN({0}) < MAX({0}) OR COUNT({0}) NOT IN (0, COUNT(*)))".format(slot) for slot in slots]
+            return "SELECT COUNT(*) AS num_matches, {} AS different FROM {}{}".format(
+                " OR ".join(different) if different else "0", self.get_domain_name(),
+                self._where_clause(constraint_slots))
+
+        query = self._statement(('count', tuple(slots), tuple(constraint_slots)), build)
+        result = self.query_db(query, [constraints[slot] for slot in constraint_slots])[0]
+        num_matches = result['num_matches']
+        discriminable = num_matches > 1 and bool(result['different'])
+        return num_matches, discriminable
+
+    def value_counts(self, constraints: dict, slots: Iterable[str]) -> Dict[str, Dict[object, int]]:
+        """ Returns how many of the entities meeting the constraints have each value of the slots,
+            without fetching the entities.
+
+        Args:
+            constraints (dict): slot-value mapping of constraints (see `find_entities`)
+            slots (Iterable[str]): slots whose values are counted
+
+        Returns:
+            (Dict[str, Dict[object, int]]): for each slot the number of entities per value (missing
+                                            values count as a value, values no entity has are left out)
+        """
+        constraints = self._normalize_constraints(constraints)
+        slots = sorted(set(slots))
+        key = ('value_counts', tuple(slots), self._constraints_key(constraints))
+        counts = self._cached(key, lambda: tuple((slot, tuple(slot_counts.items())) for slot, slot_counts
+                                                 in self._value_counts(constraints, slots).items()))
+        return {slot: dict(slot_counts) for slot, slot_counts in counts}
+
+    def _value_counts(self, constraints: Dict[str, str], slots: List[str]) -> Dict[str, Dict[object, int]]:
+        """ Computes `value_counts` with a single query grouping the matching entities by each slot
+            (using the indexes of the informable columns) """
+        if not slots:
+            return {}
+        constraint_slots = sorted(constraints)
+        where_clause = self._where_clause(constraint_slots)
+        query = self._statement(('value_counts', tuple(slots), tuple(constraint_slots)),
+                                lambda: " UNION ALL ".join(
+                                    "SELECT {0} AS slot, {1} AS value, COUNT(*) AS count FROM {2}{3} GROUP BY {1}".format(
+                                        index, slot, self.get_domain_name(), where_clause)
+                                    for index, slot in enumerate(slots)))
+        counts = {slot: {} for slot in slots}
+        for row in self.query_db(query, [constraints[slot] for slot in constraint_slots] * len(slots)):
+            counts[slots[row['slot']]][row['value']] = row['count']
+        return counts
 
     def find_info_about_entity(self, entity_id, requested_slots: Iterable):
         """ Returns the values (stored in the data backend) of the specified slots for the
@@ -144,35 +441,63 @@ class JSONLookupDomain(Domain):
             entity_id (str): primary key value of the entity
             requested_slots (dict): slot-value mapping of constraints
 
+        Returns:
+            (tuple): matching rows as read-only dicts (`FrozenRow`)
         """
-        if requested_slots:
-            select_clause = ", ".join(sorted(requested_slots))
         # If the user hasn't specified any slots we don't know what they want so we give everything
-        else:
-            select_clause = "*"
-        query = 'SELECT {} FROM {} WHERE {}="{}";'.format(
-            select_clause, self.get_domain_name(), self.get_primary_key(), entity_id)
-        return self.query_db(query)
-
-    def query_db(self, query_str):
+        columns = sorted(requested_slots) if requested_slots else None
+        key = ('info', str(entity_id), None if columns is None else tuple(columns))
+        return self._cached_rows(key, lambda: self._select_entity_info(entity_id, columns))
+
+    def _select_entity_info(self, entity_id, columns: Optional[List[str]]) -> Iterable[dict]:
+        """ Returns the values of the columns (all columns if `None`) of the entity with the given
+            primary key, see `find_info_about_entity` """
+        select_clause = ", ".join(columns) if columns is not None else "*"
+        query = self._statement(('info', select_clause),
+                                lambda: "SELECT {} FROM {} WHERE {} = ?".format(
+                                    select_clause, self.get_domain_name(), self.get_primary_key()))
+        return self.query_db(query, [str(entity_id)])
+
+    def query_db(self, query_str: str, params: Iterable = ()):
         """ Function for querying the sqlite3 db
 
         Args:
-            query_str (string): sqlite3 query style string
+            query_str (string): sqlite3 query style string, values should be passed as parameters
+                                (placeholders `?` or `:name`) instead of being formatted into it
+            params (Iterable): values of the parameters of the query (sequence or dict)
 
         Return:
             (iterable): rows of the query response set
         """
         if "db" not in self.__dict__:
-            root_dir = self._get_root_dir()
-            sqllite_db_file = self.sqllite_db_file or os.path.join(
-                'resources', 'databases', self.name + '.db')
-            self.db = self._load_db_to_memory(root_dir + '/' + sqllite_db_file)
+            self.db = self._open_db()
         cursor = self.db.cursor()
-        cursor.execute(query_str)
+        cursor.execute(query_str, params)
         res = cursor.fetchall()
         return res
 
+    def explain(self, query_str: str, params: Iterable = ()) -> List[str]:
+        """ Returns how sqlite executes a query (one line per step of its query plan), e.g. to see
+            whether it uses an index
+
+        Args:
+            query_str (string): sqlite3 query style string
+            params (Iterable): values of the parameters of the query
+
+        Return:
+            (List[str]): the steps of the query plan
+        """
+        return [row['detail'] for row in self.query_db("EXPLAIN QUERY PLAN " + query_str, params)]
+
+    def explain_entities(self, constraints: dict, requested_slots: Iterable = iter(())) -> List[str]:
+        """ Returns the query plan of `find_entities` for the given arguments (see `explain`) """
+        columns = set([self.get_primary_key()]) | set(self.get_system_requestable_slots()) | \
+            set(requested_slots)
+        constraints = self._normalize_constraints(constraints)
+        slots = sorted(constraints)
+        query = "SELECT {} FROM {}{}".format(", ".join(columns), self.get_domain_name(), self._where_clause(slots))
+        return self.explain(query, [constraints[slot] for slot in slots])
+
     def get_display_name(self):
         return self.display_name
 
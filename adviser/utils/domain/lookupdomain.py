@@ -17,9 +17,120 @@
 #
 ###############################################################################
 
-from typing import List, Iterable
+import random
+import string
+from collections import Counter
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Tuple
 from utils.domain.domain import Domain
 
+
+def fold_case(value: str) -> str:
+    """ Returns the value as compared by SQLite's COLLATE NOCASE (which only ignores the case of
+        ASCII letters) """
+    return value.translate(_ASCII_LOWERCASE)
+
+
+_ASCII_LOWERCASE = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+class FrozenRow(dict):
+    """ Database row (column -> value) which cannot be modified, so rows can be shared between
+        several consumers of a query result (e.g. when results are cached) """
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("database rows are read-only, copy them with dict(row) to modify them")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _immutable
+    __ior__ = _immutable
+
+    def __reduce__(self):
+        return FrozenRow, (dict(self),)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+class EntityResult(object):
+    """ Lazy handle on the entities meeting constraints (see `query_entities` of the domains).
+
+        Nothing is fetched when the handle is created: counting asks the domain for the number of
+        matches, iterating streams the entities from the backend and `first` / `sample` only fetch
+        the requested entities. Handles can be used like a sequence of the entities (`len`,
+        truth value, indexing), but only store the query.
+
+    Attributes:
+        domain: domain answering the query
+        constraints (dict): slot-value mapping of constraints
+        columns (Tuple[str]): slots of the returned entities
+    """
+
+    def __init__(self, domain, constraints: dict, columns: Iterable[str]):
+        self.domain = domain
+        self.constraints = dict(constraints)
+        self.columns = tuple(columns)
+        self._count = None
+
+    def count(self) -> int:
+        """ Returns the number of matching entities (without fetching them in domains which can count) """
+        if self._count is None:
+            self._count = self.domain._count_entities(self.constraints)
+        return self._count
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __bool__(self) -> bool:
+        return self.count() > 0
+
+    def __iter__(self) -> Iterator[FrozenRow]:
+        return self.domain._stream_entities(self.constraints, self.columns)
+
+    def iter(self) -> Iterator[FrozenRow]:
+        """ Streams the matching entities (in the order of `find_entities` with the same slots,
+            the backend may return other projections in a different order) """
+        return iter(self)
+
+    def first(self, k: int = 1) -> List[FrozenRow]:
+        """ Returns the first k matching entities (fewer if there are not as many) """
+        return list(islice(self, k))
+
+    def sample(self, k: int = 1, rng=None) -> List[FrozenRow]:
+        """ Returns k distinct matching entities drawn uniformly at random (all of them in random
+            order if there are not as many)
+
+        Args:
+            k (int): number of entities
+            rng: random generator (`random` module or `random.Random`), consumes the same random
+                 numbers as `rng.sample(entities, k)` (and `rng.choice(entities)` for k = 1)
+        """
+        num_entities = self.count()
+        indices = (rng if rng is not None else random).sample(range(num_entities), min(k, num_entities))
+        return self.domain._entities_at(self.constraints, self.columns, indices)
+
+    def project(self, columns: Iterable[str]) -> 'EntityResult':
+        """ Returns a handle on the same entities returning only the given slots """
+        return EntityResult(self.domain, self.constraints, columns)
+
+    def all(self) -> Tuple[FrozenRow, ...]:
+        """ Fetches all matching entities """
+        return tuple(self)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice) or index < 0:
+            return self.all()[index]
+        entities = self.first(index + 1)
+        if len(entities) <= index:
+            raise IndexError("entity index out of range")
+        return entities[index]
+
+    def __repr__(self):
+        return f"EntityResult({self.domain.get_domain_name()}, {self.constraints}, {list(self.columns)})"
+
+
 class LookupDomain(Domain):
     """ Abstract class for linking a domain with a data access method.
 
@@ -40,6 +151,72 @@ class LookupDomain(Domain):
         """
         raise NotImplementedError
 
+    def query_entities(self, constraints: dict, requested_slots: Iterable = iter(())) -> EntityResult:
+        """ Returns a lazy handle on the entities `find_entities` returns (see `EntityResult`).
+
+            Override `_count_entities`, `_stream_entities` and `_entities_at` if the data backend can
+            count, stream or select entities without fetching all of them.
+
+        Args:
+            constraints (dict): slot-value mapping of constraints
+            requested_slots (Iterable): slots of the entities (in addition to the ones
+                                        `find_entities` returns)
+        """
+        return EntityResult(self, constraints, requested_slots)
+
+    def _count_entities(self, constraints: dict) -> int:
+        return len(self.find_entities(constraints))
+
+    def _stream_entities(self, constraints: dict, columns: Tuple[str]) -> Iterator[dict]:
+        return iter(self.find_entities(constraints, columns))
+
+    def _entities_at(self, constraints: dict, columns: Tuple[str], indices: List[int]) -> List[dict]:
+        entities = self.find_entities(constraints, columns)
+        return [entities[index] for index in indices]
+
+    def count_and_discriminable(self, constraints: dict, slots: Iterable[str]) -> Tuple[int, bool]:
+        """ Returns the number of entities meeting the constraints and whether they could be told
+            apart by asking for one of the slots.
+
+            Override this function if the data backend can compute both without returning
+            the matching entities.
+
+        Args:
+            constraints (dict): slot-value mapping of constraints
+            slots (Iterable[str]): slots whose values could be used to discriminate the entities
+
+        Returns:
+            (int): number of matching entities
+            (bool): whether there are at least two matching entities and one of the slots has
+                    different values (missing values count as a value) for them
+        """
+        slots = list(slots)
+        entities = self.find_entities(constraints, slots)
+        discriminable = len(entities) > 1 and \
+            any(len({entity[slot] for entity in entities}) > 1 for slot in slots)
+        return len(entities), discriminable
+
+    def value_counts(self, constraints: dict, slots: Iterable[str]) -> Dict[str, Dict[object, int]]:
+        """ Returns how many of the entities meeting the constraints have each value of the slots.
+
+            Override this function if the data backend can count the values without returning
+            the matching entities.
+
+        Args:
+            constraints (dict): slot-value mapping of constraints
+            slots (Iterable[str]): slots whose values are counted
+
+        Returns:
+            (Dict[str, Dict[object, int]]): for each slot the number of entities per value (missing
+                                            values count as a value, values no entity has are left out)
+        """
+        slots = list(slots)
+        counts = {slot: Counter() for slot in slots}
+        for entity in self.find_entities(constraints, slots):
+            for slot in slots:
+                counts[slot][entity.get(slot)] += 1
+        return {slot: dict(slot_counts) for slot, slot_counts in counts.items()}
+
     def find_info_about_entity(self, entity_id, requested_slots: Iterable):
         """ Returns the values (stored in the data backend) of the specified slots for the
             specified entity.
@@ -22,3 +22,73 @@ class Topic(object):
     DIALOG_START = 'dialog_start'  # Called at the beginning of a new dialog. Subscribe here to set stateful variables for one dialog.
     DIALOG_END = 'dialog_end'      # Called at the end of a dialog (after a bye-action).
     DIALOG_EXIT = 'dialog_exit'    # Called when the dialog system shuts down. Subscribe here if you e.g. have to close resource handles / free locks.
+
+
+class TopicTrie(object):
+    """ Prefix tree over topic strings, used to route published topics to subscriptions.
+
+        Matching follows zmq's subscription semantics: a subscription matches every topic it is a
+        (character-level) prefix of. Lookups are cached per topic, so routing a topic seen before
+        costs a single dictionary lookup.
+    """
+
+    _MAX_CACHE_SIZE = 4096
+
+    def __init__(self, topics=()):
+        """
+        Args:
+            topics (Iterable[str]): initial topics
+        """
+        self._root = {}  # char -> child node, '' -> topic ending at this node
+        self._cache = {}  # topic -> tuple of all stored prefixes of it
+        for topic in topics:
+            self.add(topic)
+
+    def add(self, topic: str):
+        """ Stores a topic """
+        node = self._root
+        for char in topic:
+            node = node.setdefault(char, {})
+        node[''] = topic
+        self._cache.clear()
+
+    def __contains__(self, topic: str) -> bool:
+        node = self._find_node(topic)
+        return node is not None and '' in node
+
+    def _find_node(self, prefix: str):
+        node = self._root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return None
+        return node
+
+    def prefixes(self, topic: str) -> tuple:
+        """ Returns all stored topics which are a prefix of `topic` (shortest first) """
+        prefixes = self._cache.get(topic)
+        if prefixes is None:
+            found = []
+            node = self._root
+            if '' in node:
+                found.append(node[''])
+            for char in topic:
+                node = node.get(char)
+                if node is None:
+                    break
+                if '' in node:
+                    found.append(node[''])
+            prefixes = tuple(found)
+            if len(self._cache) >= self._MAX_CACHE_SIZE:
+                self._cache.clear()
+            self._cache[topic] = prefixes
+        return prefixes
+
+    def longest_prefix(self, topic: str):
+        """ Returns the longest stored topic which is a prefix of `topic` (or `None`) """
+        prefixes = self.prefixes(topic)
+        return prefixes[-1] if prefixes else None
+
+    def has_extension(self, prefix: str) -> bool:
+        """ Returns `True` if `prefix` is a prefix of any stored topic """
+        return self._find_node(prefix) is not None